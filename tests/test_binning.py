@@ -0,0 +1,100 @@
+import json
+import statistics
+from collections import Counter
+import pytest
+from vgrid.binning.bin_helper import get_default_stats_structure, merge_numeric_stats, add_median_sample, get_stats_value, \
+    iter_point_features, bin_points
+
+
+def test_running_stats_match_statistics():
+    """Running (Welford) statistics merged batch by batch match statistics computed from all values."""
+    data = [3.5, -1.0, 7.25, 7.25, 0.0, 12.5, 4.0]
+    values = get_default_stats_structure()
+    for batch in (data[:1], data[1:4], data[4:]):
+        mean = sum(batch) / len(batch)
+        merge_numeric_stats(values, len(batch), sum(batch), min(batch), max(batch), sum((x - mean) ** 2 for x in batch))
+        add_median_sample(values, batch)
+    assert get_stats_value(values, 'sum') == sum(data)
+    assert get_stats_value(values, 'mean') == pytest.approx(statistics.mean(data))
+    assert get_stats_value(values, 'median') == statistics.median(data)
+    assert get_stats_value(values, 'std') == pytest.approx(statistics.stdev(data))
+    assert get_stats_value(values, 'var') == pytest.approx(statistics.variance(data))
+    assert get_stats_value(values, 'range') == max(data) - min(data)
+
+
+def test_iter_point_features_geojsonseq(tmp_path):
+    """Point features are read from GeoJSON and streamed from GeoJSONSeq files alike."""
+    features = [{"type": "Feature", "geometry": {"type": "Point", "coordinates": [106.7, 10.8 + i]},
+                 "properties": {"id": i}} for i in range(3)]
+    geojson_path, geojsonseq_path = tmp_path / "points.geojson", tmp_path / "points.geojsonl"
+    geojson_path.write_text(json.dumps({"type": "FeatureCollection", "features": features}, indent=2))
+    geojsonseq_path.write_text("".join(json.dumps(feature) + "\n" for feature in features))
+    assert list(iter_point_features(str(geojson_path))) == features
+    assert list(iter_point_features(str(geojsonseq_path))) == features
+
+
+def test_polygon_bin_first_containing_polygon():
+    """Each point is binned into the first polygon containing it, overlapping polygons included."""
+    from shapely.geometry import box, mapping
+    from vgrid.binning.polygonbin import polygon_bin
+    polygons = [{"type": "Feature", "geometry": mapping(geometry), "properties": {"name": name}}
+                for name, geometry in [("a", box(0, 0, 2, 2)), ("b", box(1, 1, 3, 3)), ("c", box(5, 5, 6, 6))]]
+    points = [{"type": "Feature", "geometry": {"type": "Point", "coordinates": coords}, "properties": {"v": v}}
+              for coords, v in [([0.5, 0.5], 1), ([1.5, 1.5], 2), ([2.5, 2.5], 3), ([9, 9], 4)]]
+    binned = polygon_bin(polygons, points, 'sum', field_name='v')
+    assert [feature["properties"].get("sum") for feature in binned] == [3.0, 3.0, None]
+
+
+def test_bin_points_matches_statistics_per_cell(monkeypatch):
+    """The columnar engine, merging chunk aggregates, matches statistics computed from the values of each cell."""
+    import random
+    from vgrid.conversion.latlon2dggs import latlon2geohash, latlon2geohash_array
+    monkeypatch.setattr("vgrid.generator.settings.chunk_size", 37)
+    rng = random.Random(0)
+    features = [{"type": "Feature",
+                 "geometry": {"type": "Point", "coordinates": [106 + rng.random() * 0.2, 10 + rng.random() * 0.2]},
+                 "properties": {"v": rng.choice([rng.uniform(0, 10), rng.randint(0, 3), None, "x"]), "cat": rng.choice("ab")}}
+                for _ in range(500)]
+    numeric_stats = {'sum': sum, 'mean': statistics.mean, 'std': lambda vals: statistics.stdev(vals) if len(vals) > 1 else 0,
+                     'median': statistics.median, 'range': lambda vals: max(vals) - min(vals)}
+    for stats in ['count', 'sum', 'mean', 'std', 'median', 'range', 'majority', 'variety']:
+        # Values of each cell and category, in the order the cells and categories are first seen
+        expected = {}
+        for feature in features:
+            lon, lat = feature["geometry"]["coordinates"]
+            value, cat = feature["properties"]["v"], feature["properties"]["cat"]
+            categories = expected.setdefault(latlon2geohash(lat, lon, 5), {})
+            if stats == 'count' or (stats in ('majority', 'variety') and value is not None) or isinstance(value, (int, float)):
+                categories.setdefault(cat, []).append(value)
+        bins = bin_points(iter(features), latlon2geohash_array, 5, stats, "cat", "v")
+        assert list(bins) == list(expected)
+        for cell_id, categories in expected.items():
+            assert list(bins[cell_id]) == list(categories)
+            for cat, vals in categories.items():
+                if stats == 'count':
+                    expected_value = len(vals)
+                elif stats == 'majority':
+                    expected_value = Counter(vals).most_common(1)[0][0]
+                elif stats == 'variety':
+                    expected_value = len(set(vals))
+                else:
+                    expected_value = numeric_stats[stats]([float(val) for val in vals])
+                assert get_stats_value(bins[cell_id][cat]["v"], stats) == pytest.approx(expected_value)
+
+
+def test_multi_statistic_binning_matches_single_runs():
+    """Several statistics of several fields in one pass give the same columns as separate runs."""
+    from vgrid.binning.geohashbin import geohash_bin
+    features = [{"type": "Feature", "geometry": {"type": "Point", "coordinates": [106.70 + i * 0.013, 10.77 + i * 0.007]},
+                 "properties": {"a": i % 7, "b": float(i) / 3, "cat": "xy"[i % 2]}} for i in range(200)]
+    combined = geohash_bin(features, 5, ['count', 'mean', 'majority'], 'cat', ['a', 'b'])
+    for field in ['a', 'b']:
+        for stats in ['count', 'mean', 'majority']:
+            single = geohash_bin(features, 5, stats, 'cat', field)
+            assert len(single) == len(combined)
+            for combined_feature, single_feature in zip(combined, single):
+                for cat in 'xy':
+                    if f'{cat}_{stats}' in single_feature['properties']:
+                        combined_key = f'{cat}_{stats}' if stats == 'count' else f'{cat}_{field}_{stats}'
+                        assert combined_feature['properties'][combined_key] == \
+                            pytest.approx(single_feature['properties'][f'{cat}_{stats}'])
@@ -1,9 +1,207 @@
 import pytest
-from vgrid.conversion.latlon2dggs import latlon2h3
+import numpy as np
+from vgrid.conversion.latlon2dggs import latlon2h3, latlon2geohash, latlon2geohash_array, latlon2olc, latlon2olc_array, \
+    latlon2tilecode, latlon2tilecode_array, latlon2quadkey, latlon2quadkey_array, latlon2rhealpix, latlon2rhealpix_array, \
+    latlon2s2, latlon2s2_array
 
 def test_latlon2h3_basic(sample_data):
     """Test basic lat/lon to H3 conversion."""
     lat, lon = sample_data["lat"], sample_data["lon"]
     h3_index = latlon2h3(lat, lon, res=9)
     assert h3_index is not None
-    assert isinstance(h3_index, str)
\ No newline at end of file
+    assert isinstance(h3_index, str)
+
+def test_latlon2dggs_array_matches_scalar():
+    """Vectorized encoders return the same cell ids as the scalar encoders (None where those raise)."""
+    from vgrid.utils.mercantile import InvalidLatitudeError
+
+    def encode_or_none(encode, lat, lon, res):
+        try:
+            return encode(lat, lon, res)
+        except InvalidLatitudeError:
+            return None
+
+    rng = np.random.default_rng(0)
+    lats = np.concatenate([rng.uniform(-85, 85, 500), [0.0, -89.5, 45.0, 10.775275567242561]])
+    lons = np.concatenate([rng.uniform(-180, 180, 500), [0.0, -180.0, 179.9999999, 106.70679737574993]])
+    for encode, encode_array, res in [(latlon2geohash, latlon2geohash_array, 7),
+                                      (latlon2olc, latlon2olc_array, 11),
+                                      (latlon2tilecode, latlon2tilecode_array, 18),
+                                      (latlon2quadkey, latlon2quadkey_array, 18),
+                                      (latlon2rhealpix, latlon2rhealpix_array, 9),
+                                      (latlon2s2, latlon2s2_array, 17)]:
+        expected = [encode_or_none(encode, lat, lon, res) for lat, lon in zip(lats, lons)]
+        assert encode_array(lats, lons, res).tolist() == expected
+
+    # Tiles stop at the Web Mercator latitudes: the scalar encoders raise and the arrays have no cell
+    polar_lats = np.array([90.0, -90.0, 89.99, 85.06, -85.06, 85.05, 10.0])
+    polar_lons = np.array([0.0, 10.0, -20.0, 30.0, 40.0, 50.0, 60.0])
+    for encode, encode_array in [(latlon2tilecode, latlon2tilecode_array), (latlon2quadkey, latlon2quadkey_array)]:
+        for zoom in (0, 12):
+            expected = [encode_or_none(encode, lat, lon, zoom) for lat, lon in zip(polar_lats, polar_lons)]
+            assert expected.count(None) == 5
+            assert encode_array(polar_lats, polar_lons, zoom).tolist() == expected
+
+def test_sample_raster_windowed(tmp_path):
+    """Windowed sampling (serial and threaded) matches indexing the fully loaded raster."""
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_origin
+    from vgrid.conversion.raster2dggs.raster_helper import raster_windows, sample_raster
+    raster_path = str(tmp_path / "tiled.tif")
+    transform = from_origin(106.0, 11.0, 0.01, 0.01)
+    data = np.arange(2 * 100 * 120, dtype='int32').reshape(2, 100, 120)
+    with rasterio.open(raster_path, 'w', driver='GTiff', width=120, height=100, count=2, dtype='int32',
+                       crs='EPSG:4326', transform=transform, tiled=True, blockxsize=32, blockysize=32) as dst:
+        dst.write(data)
+    with rasterio.open(raster_path) as src:
+        windows = raster_windows(src)
+    rng = np.random.default_rng(0)
+    lats, lons = rng.uniform(9.9, 11.1, 300), rng.uniform(105.9, 107.3, 300)
+    cell_ids = [f"cell_{i}" for i in range(300)]
+    cols, rows = ~transform * (lons, lats)
+    inside = (cols >= 0) & (cols < 120) & (rows >= 0) & (rows < 100)
+    expected = [(cell_id, data[:, int(row), int(col)].tolist())
+                for cell_id, row, col, ok in zip(cell_ids, rows, cols, inside) if ok]
+    for workers in (1, 3):
+        samples = sample_raster(raster_path, windows, cell_ids, lats, lons, workers=workers)
+        assert [(cell_id, values.tolist()) for cell_id, values in samples] == expected
+
+def test_zonal_stats_merges_windows(tmp_path):
+    """Zonal statistics and cell ids over block windows (serial and threaded) match grouping every pixel at once."""
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_origin
+    from vgrid.conversion.raster2dggs.raster_helper import raster_windows, pixel_centers, zonal_stats, raster_cell_ids
+    raster_path = str(tmp_path / "striped.tif")
+    transform = from_origin(106.0, 11.0, 0.01, 0.01)
+    data = np.random.default_rng(0).integers(0, 5, (1, 64, 80)).astype('uint8')
+    with rasterio.open(raster_path, 'w', driver='GTiff', width=80, height=64, count=1, dtype='uint8',
+                       crs='EPSG:4326', transform=transform, blockysize=8) as dst:
+        dst.write(data)
+    with rasterio.open(raster_path) as src:
+        windows = raster_windows(src, block_size=500)
+        lons, lats = pixel_centers(transform, rasterio.windows.Window(0, 0, 80, 64))
+    assert len(windows) > 1
+    cell_ids = latlon2geohash_array(lats, lons, 4)
+    pixels = data[0].ravel()
+    for workers in (1, 3):
+        assert raster_cell_ids(latlon2geohash_array, transform, windows, 4, workers) == set(cell_ids.tolist())
+    for stats, workers in [('mean', 1), ('mode', 1), ('mean', 3), ('mode', 3)]:
+        result = dict(zonal_stats(latlon2geohash_array, raster_path, windows, 4, stats, workers))
+        assert sorted(result) == sorted(set(cell_ids.tolist()))
+        for cell_id, values in result.items():
+            cell_pixels = pixels[cell_ids == cell_id]
+            if stats == 'mean':
+                assert values[0] == pytest.approx(cell_pixels.mean())
+            else:
+                assert values[0] == np.argmax(np.bincount(cell_pixels))
+
+def test_prefix_compaction_matches_child_sets():
+    """Sorted-prefix compaction merges complete sibling sets bottom-up, like the per-DGGS loops did."""
+    from vgrid.utils import geohash, tilecode
+    from vgrid.utils.prefixcompact import compact_prefix_ids
+    from vgrid.conversion.dggscompact import geohash_compact, quadkey_compact
+    geohash_ids = geohash.geohash_children('u4p', 5) + geohash.geohash_children('w2', 3)[:-1] + ['s0123', 'u4p00']
+    assert geohash_compact(geohash_ids) == sorted(['u4p', 's0123'] + geohash.geohash_children('w2', 3)[:-1])
+    quadkey_ids = tilecode.quadkey_children('0213', 7) + tilecode.quadkey_children('312', 4)[1:] + ['22']
+    assert quadkey_compact(quadkey_ids) == ['0213', '22', '3121', '3122', '3123']
+    assert compact_prefix_ids(['0', '1', '2', '3'], 4).tolist() == ['0', '1', '2', '3']
+    assert compact_prefix_ids([], 4).tolist() == []
+
+
+def test_s2_compaction_matches_cell_union():
+    """uint64 S2 compaction gives the cells of CellUnion.normalize, and expanding it restores the input."""
+    from vgrid.utils import s2
+    from vgrid.conversion.dggscompact import s2_expand
+    parents = s2.cell_ids_from_latlng([10.5, -33.9, 60.1], [100.2, 18.4, 179.9], 4)
+    cell_ids = np.concatenate([s2.cell_id_children(parents[:1], 7), s2.cell_id_children(parents[1:2], 6)[1:],
+                               parents[2:], s2.cell_id_children(parents[2:], 8)[:5]])
+    cell_union = s2.CellUnion([s2.CellId(int(cell_id)) for cell_id in cell_ids])
+    cell_union.normalize()
+    compacted = s2.compact_cell_ids(cell_ids[::-1])
+    assert compacted.tolist() == [cell_id.id() for cell_id in cell_union.cell_ids()]
+    assert s2_expand(compacted, 8).tolist() == s2_expand(cell_ids, 8).tolist()
+    assert s2.compact_cell_ids([]).tolist() == []
+
+
+def test_geohash_arrays_match_scalar():
+    """Array geohash encode/decode/bbox match the scalar functions, and integers sort like their geohashes."""
+    from vgrid.utils import geohash
+    rng = np.random.default_rng(3)
+    lats, lons = rng.uniform(-90, 90, 500), rng.uniform(-180, 180, 500)
+    for precision in (1, 6, 12):
+        ints = geohash.encode_int_array(lats, lons, precision)
+        geohash_ids = geohash.int_array_to_hashcodes(ints, precision)
+        assert geohash_ids.tolist() == [geohash.encode(lat, lon, precision) for lat, lon in zip(lats, lons)]
+        assert geohash_ids[np.argsort(ints)].tolist() == sorted(geohash_ids.tolist())
+    mixed = ['u', 'w3gvk1', 's0123', 'zzzzzzzzzzzz']
+    expected = [geohash.bbox(geohash_id) for geohash_id in mixed]
+    assert geohash.bbox_array(mixed).tolist() == [[bbox['w'], bbox['s'], bbox['e'], bbox['n']] for bbox in expected]
+    assert np.stack(geohash.decode_array(mixed, delta=True), axis=1).tolist() == [list(geohash.decode_exactly(geohash_id)) for geohash_id in mixed]
+    with pytest.raises(ValueError):
+        geohash.bbox_array(['bad'])
+
+def test_rhealpix_boundaries_match_cell_vertices():
+    """Vectorized rHEALPix boundaries and shapes match the per-cell vertices, including polar caps and darts."""
+    from vgrid.generator.rhealpixgrid import get_rhealpix_dggs
+    for rhealpix_dggs in (get_rhealpix_dggs(), get_rhealpix_dggs(1, 3)):
+        cells = list(rhealpix_dggs.grid(2)) + [rhealpix_dggs.cell(('N',)), rhealpix_dggs.cell(('S', 4, 8, 0))]
+        cell_ids = [str(cell) for cell in cells]
+        expected = np.array([cell.vertices(plane=False) for cell in cells])
+        assert np.allclose(rhealpix_dggs.boundaries(cell_ids), expected, rtol=0, atol=1e-9)
+        assert rhealpix_dggs.ellipsoidal_shapes(cell_ids).tolist() == [cell.ellipsoidal_shape() for cell in cells]
+
+def test_qtm_id_arrays_match_scalar_facets():
+    """Array QTM encoding and facets match the per-point IDs and facets."""
+    from shapely.geometry import Point
+    from vgrid.utils import qtm
+    rng = np.random.default_rng(0)
+    lats = np.concatenate([rng.uniform(-89, 89, 300), [0.0, 45.0]])
+    lons = np.concatenate([rng.uniform(-180, 180, 300), [10.0, 0.0]])
+    qtm_ids = qtm.latlon_to_qtm_id_array(lats, lons, 12)
+    for lat, lon, qtm_id in zip(lats.tolist(), lons.tolist(), qtm_ids):
+        if qtm_id is None:
+            with pytest.raises(ValueError):
+                qtm.latlon_to_qtm_id(lat, lon, 12)
+        else:
+            assert qtm_id == qtm.latlon_to_qtm_id(lat, lon, 12)
+            assert qtm.constructGeometry(qtm.qtm_id_to_facet(qtm_id)).contains(Point(lon, lat))
+    vertices, _ = qtm.qtm_ids_to_facets(qtm_ids[:50].tolist())
+    assert all(polygon.equals_exact(qtm.constructGeometry(qtm.qtm_id_to_facet(qtm_id)), 0)
+               for polygon, qtm_id in zip(qtm.facet_polygons(vertices), qtm_ids[:50]))
+
+def test_packed_qtm_ids_round_trip_and_hierarchy():
+    """Packed QTM IDs round-trip, sort like their strings and give the same parents, children and facets."""
+    from vgrid.utils import qtm
+    from vgrid.conversion.dggscompact import qtm_compact
+    rng = np.random.default_rng(0)
+    qtm_ids = [str(rng.integers(1, 9)) + ''.join(rng.choice(list('0123'), rng.integers(0, 24))) for _ in range(500)]
+    packed = qtm.pack_qtm_ids(qtm_ids)
+    assert qtm.unpack_qtm_ids(packed).tolist() == qtm_ids
+    assert np.array_equal(np.argsort(packed, kind='stable'), np.argsort(np.array(qtm_ids), kind='stable'))
+    assert qtm.unpack_qtm_ids(qtm.packed_qtm_parent(packed)).tolist() == [qtm.qtm_parent(qtm_id) for qtm_id in qtm_ids]
+    children = qtm.packed_qtm_children(qtm.pack_qtm_ids(['3102']), 6)
+    assert qtm.unpack_qtm_ids(children.ravel()).tolist() == qtm.qtm_children('3102', 6)
+    vertices, _ = qtm.packed_qtm_to_facets(packed[:100])
+    for facet_vertices, qtm_id in zip(vertices, qtm_ids[:100]):
+        assert np.array_equal(facet_vertices, np.array(qtm.qtm_id_to_facet(qtm_id)[:4]))
+    assert qtm_compact(qtm.qtm_children('31', 4) + ['2', '5301']) == ['2', '31', '5301']
+    with pytest.raises(ValueError):
+        qtm.pack_qtm_ids(['94'])
+
+def test_s2_cell_arrays_match_scalar_cells():
+    """Vectorized S2 cell ids, tokens and polygons match the scalar CellId and Cell code."""
+    from vgrid.utils import s2
+    from vgrid.generator.s2grid import s2_cell_to_polygon, s2_cells_to_polygons
+    rng = np.random.default_rng(0)
+    lats, lngs = rng.uniform(-90, 90, 300), rng.uniform(-180, 180, 300)
+    for level in [0, 3, 12, 30]:
+        cell_ids = s2.cell_ids_from_latlng(lats, lngs, level)
+        expected = [s2.CellId.from_lat_lng(s2.LatLng.from_degrees(lat, lng)).parent(level) for lat, lng in zip(lats, lngs)]
+        assert cell_ids.tolist() == [cell_id.id() for cell_id in expected]
+        assert s2.cell_levels(cell_ids).tolist() == [level] * len(cell_ids)
+        tokens = s2.cell_ids_to_tokens(cell_ids)
+        assert tokens.tolist() == [cell_id.to_token() for cell_id in expected]
+        assert np.array_equal(s2.cell_ids_from_tokens(tokens), cell_ids)
+        polygons = s2_cells_to_polygons(cell_ids[:50])
+        assert all(polygon.equals_exact(s2_cell_to_polygon(cell_id), 0) for polygon, cell_id in zip(polygons, expected))
+    assert not s2.is_valid_cell_ids([0, 7 << 61 | 1]).any()
@@ -0,0 +1,54 @@
+import h3
+from shapely.geometry import Polygon
+from vgrid.generator.h3grid import fix_h3_antimeridian_cells
+from vgrid.generator.settings import geodesic_dggs_to_feature, geodesic_dggs_to_features, \
+    graticule_dggs_to_feature, graticule_dggs_to_features
+from vgrid.generator.geohashgrid import geohash_to_polygon
+
+def test_geodesic_dggs_to_features_matches_scalar():
+    """Batch H3 (hexagons and pentagons) and polar rHEALPix features match the per-cell path."""
+    h3_ids = list(h3.cell_to_children('8001fffffffffff', 2)) + ['820807fffffffff']
+    cell_polygons = [Polygon([(lon, lat) for lat, lon in fix_h3_antimeridian_cells(h3.cell_to_boundary(h3_id))])
+                     for h3_id in h3_ids]
+    num_edges = [5 if h3.is_pentagon(h3_id) else 6 for h3_id in h3_ids]
+    expected = [geodesic_dggs_to_feature("h3", h3_id, 2, cell_polygon, edges)
+                for h3_id, cell_polygon, edges in zip(h3_ids, cell_polygons, num_edges)]
+    assert geodesic_dggs_to_features("h3", h3_ids, 2, cell_polygons, num_edges) == expected
+    # Polar rHEALPix cells: N44 collapses to zero planar area, S44 nearly so
+    from vgrid.generator.rhealpixgrid import get_rhealpix_dggs, rhealpix_cell_to_polygon
+    rhealpix_cells = [get_rhealpix_dggs().cell(suid) for suid in [('N', 4, 4), ('N', 4, 0), ('S', 4, 4), ('P', 1, 2)]]
+    rhealpix_ids = [str(cell) for cell in rhealpix_cells]
+    cell_polygons = [rhealpix_cell_to_polygon(cell) for cell in rhealpix_cells]
+    num_edges = [3 if cell.ellipsoidal_shape() == 'dart' else 4 for cell in rhealpix_cells]
+    expected = [geodesic_dggs_to_feature("rhealpix", rhealpix_id, 2, cell_polygon, edges)
+                for rhealpix_id, cell_polygon, edges in zip(rhealpix_ids, cell_polygons, num_edges)]
+    assert expected[0]["properties"]["center_lon"] == -225.0
+    assert geodesic_dggs_to_features("rhealpix", rhealpix_ids, 2, cell_polygons, num_edges) == expected
+
+def test_graticule_dggs_to_features_matches_scalar():
+    """Batch Geohash features match the per-cell path."""
+    geohash_ids = ['w3gv', 'w3gy', 'u4pr', '0000', 'zzzz']
+    cell_polygons = [geohash_to_polygon(gh) for gh in geohash_ids]
+    expected = [graticule_dggs_to_feature("geohash", gh, 4, cell_polygon)
+                for gh, cell_polygon in zip(geohash_ids, cell_polygons)]
+    assert graticule_dggs_to_features("geohash", geohash_ids, 4, cell_polygons) == expected
+
+def test_parallel_world_grid_matches_serial():
+    """Whole-world grids sharded across worker processes match the serial generators."""
+    from vgrid.generator import h3grid, geohashgrid, rhealpixgrid
+    for generator, resolution in [(h3grid, 1), (geohashgrid, 2), (rhealpixgrid, 1)]:
+        assert list(generator.iter_grid(resolution, workers=2)) == list(generator.iter_grid(resolution))
+
+def test_rhealpix_bbox_grid_matches_cell_features():
+    """rHEALPix bbox and sample grids give each cell its own polygon and shape, including polar darts."""
+    from shapely.geometry import box, mapping
+    from vgrid.generator.rhealpixgrid import generate_grid_within_bbox, generate_grid_sample, get_rhealpix_dggs, \
+        rhealpix_cell_to_polygon
+    for features in (generate_grid_within_bbox(2, [-180, 60, 180, 90])["features"],
+                     generate_grid_sample(2, {"features": [{"geometry": mapping(box(-180, -90, 180, -60))}]})["features"]):
+        assert len(features) == 49
+        for feature in features:
+            cell_id = feature["properties"]["rhealpix"]
+            cell = get_rhealpix_dggs().cell((cell_id[0],) + tuple(map(int, cell_id[1:])))
+            num_edges = 3 if cell.ellipsoidal_shape() == 'dart' else 4
+            assert feature == geodesic_dggs_to_feature('rhealpix', cell_id, 2, rhealpix_cell_to_polygon(cell), num_edges)
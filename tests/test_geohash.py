@@ -0,0 +1,26 @@
+from vgrid.generator.geohashgrid import geohash_to_polygon
+
+def test_geohash_bbox_and_cover_match_recursive_expansion():
+    """Grid arithmetic and boundary-only cover find the cells of the per-cell recursive expansion."""
+    from shapely.geometry import LineString, Polygon, box
+    from vgrid.utils import geohash
+    from vgrid.generator.geohashgrid import geohash_bbox_ints, geohash_cover
+
+    def expand(gh, resolution, geometry):
+        if not geohash_to_polygon(gh).intersects(geometry):
+            return []
+        if len(gh) == resolution:
+            return [gh]
+        return [cell for char in "0123456789bcdefghjkmnpqrstuvwxyz" for cell in expand(gh + char, resolution, geometry)]
+
+    def expected(geometry, resolution):
+        return sorted(cell for char in "0123456789bcdefghjkmnpqrstuvwxyz" for cell in expand(char, resolution, geometry))
+
+    for bbox in [(100, 10, 100.3, 10.2), (170, 80, 180, 90), (-10, 86, 10, 90), (179.99, -1, 180, 1)]:
+        for resolution in [1, 3]:
+            assert geohash.int_array_to_hashcodes(geohash_bbox_ints(resolution, bbox), resolution).tolist() == expected(box(*bbox), resolution)
+    geometries = [Polygon([(100, 10), (101.3, 10.2), (100.5, 11)]), LineString([(100, 10), (102, 12), (102.5, 11)]),
+                  Polygon([(-20, -10), (30, -5), (25, 40), (-15, 30)])]
+    for geometry in geometries:
+        for resolution in [2, 4]:
+            assert geohash.int_array_to_hashcodes(geohash_cover(geometry, resolution), resolution).tolist() == expected(geometry, resolution)
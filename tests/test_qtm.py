@@ -0,0 +1,14 @@
+def test_qtm_cover_matches_facet_subdivision():
+    """QTM covering matches subdividing and testing every facet with Shapely."""
+    from shapely.geometry import LineString, Point, Polygon
+    from vgrid.utils import qtm
+    geometries = [Polygon([(102, 8), (110, 8), (109.5, 23), (103, 22.5)]), LineString([(-170, -60), (0, 0), (60, 70), (150, 85)]),
+                  Point(20, 0).buffer(30).difference(Point(20, 0).buffer(10))]
+    for geometry in geometries:
+        facets = [(str(i), qtm.qtm_id_to_facet(str(i))) for i in range(1, 9)]
+        facets = [(qtm_id, facet) for qtm_id, facet in facets if qtm.constructGeometry(facet).intersects(geometry)]
+        for _ in range(1, 6):
+            facets = [(qtm_id + str(j), subfacet) for qtm_id, facet in facets for j, subfacet in enumerate(qtm.divideFacet(facet))
+                      if qtm.constructGeometry(subfacet).intersects(geometry)]
+        assert sorted(qtm.qtm_cover(geometry, 6)) == sorted(qtm_id for qtm_id, _ in facets)
+        assert sorted(qtm.qtm_cover(geometry, 6, compact=True)) == sorted(qtm.compact_qtm_ids([qtm_id for qtm_id, _ in facets]).tolist())
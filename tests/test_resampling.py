@@ -0,0 +1,45 @@
+import pytest
+from shapely.geometry import box, mapping
+from vgrid.resampling.dggsresample import resampling, resampling_nested
+from vgrid.utils.geohash import geohash_children
+
+
+def feature_collection(geometries, values=None):
+    return {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "geometry": mapping(geometry),
+                      "properties": {} if values is None else {"value": value}}
+                     for geometry, value in zip(geometries, values or [None] * len(geometries))]
+    }
+
+
+def test_resampling_area_weighted():
+    """Source values are split over the target cells in proportion to the overlapping area."""
+    layer1 = feature_collection([box(0, 0, 2, 2), box(2, 0, 4, 2)], [8, 4.0])
+    layer2 = feature_collection([box(0, 0, 1, 1), box(1, 0, 3, 1), box(10, 10, 11, 11)])
+    resampled = resampling(layer1, layer2, "value")
+    assert [feature["properties"]["value"] for feature in resampled["features"]] == [2.0, 3.0, 0]
+
+
+def test_resampling_non_numeric():
+    """Non-numeric source values leave the target layer unchanged."""
+    layer1 = feature_collection([box(0, 0, 2, 2)], ["a"])
+    layer2 = feature_collection([box(0, 0, 1, 1)])
+    assert resampling(layer1, layer2, "value")["features"][0]["properties"] == {}
+
+
+def test_resampling_nested_ids():
+    """Nested DGGS are resampled from cell IDs: parents sum their children, children split their parent."""
+    children = geohash_children("w3gv", 5)
+    layer1 = {"type": "FeatureCollection",
+              "features": [{"type": "Feature", "geometry": None, "properties": {"geohash": gh, "value": 1}}
+                           for gh in children]}
+    coarse = resampling_nested(layer1, "geohash", "geohash", "geohash", 4, "value")
+    assert [(feature["properties"]["geohash"], feature["properties"]["value"]) for feature in coarse["features"]] == [("w3gv", 32)]
+
+    layer1 = {"type": "FeatureCollection",
+              "features": [{"type": "Feature", "geometry": None, "properties": {"tilecode": "z10x813y480", "value": 16}}]}
+    fine = resampling_nested(layer1, "tilecode", "tilecode", "quadkey", 12, "value")
+    assert len(fine["features"]) == 16
+    assert all(len(feature["properties"]["quadkey"]) == 12 for feature in fine["features"])
+    assert sum(feature["properties"]["value"] for feature in fine["features"]) == pytest.approx(16, abs=0.01)
@@ -0,0 +1,56 @@
+import numpy as np
+
+def test_rhealpix_shared_dggs_cell_caches():
+    """Cached rHEALPix polygons and neighbors match a freshly constructed DGGS."""
+    from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
+    from vgrid.utils.rhealpixdggs.ellipsoids import WGS84_ELLIPSOID
+    from vgrid.generator.rhealpixgrid import get_rhealpix_dggs, rhealpix_cell_to_polygon, rhealpix_cell_neighbors
+    assert get_rhealpix_dggs(1, 3) is get_rhealpix_dggs(north_square=1, south_square=3)
+    fresh_dggs = RHEALPixDGGS(ellipsoid=WGS84_ELLIPSOID, north_square=1, south_square=3, N_side=3)
+    for suid in [('N', 4, 2), ('P', 0, 8), ('S', 7, 1), ('R', 4, 4)]:
+        cell, fresh_cell = get_rhealpix_dggs(1, 3).cell(suid), fresh_dggs.cell(suid)
+        for _ in range(2):
+            assert rhealpix_cell_to_polygon(cell).equals_exact(rhealpix_cell_to_polygon(fresh_cell), 0)
+            assert [str(c) for c in rhealpix_cell_neighbors(cell)] == [str(c) for c in rhealpix_cell_neighbors(fresh_cell)]
+
+def test_rhealpix_polyfill_matches_brute_force():
+    """Top-down rHEALPix polyfill/linetrace finds the same cells as testing every cell of the grid."""
+    import shapely
+    from shapely.geometry import LineString, Polygon, box
+    from vgrid.generator.rhealpixgrid import get_rhealpix_dggs, rhealpix_cells_to_polygons
+    from vgrid.utils.rhealpixdggs.rhp_wrappers import polyfill, linetrace
+    rhealpix_dggs = get_rhealpix_dggs()
+    cell_ids = np.array([str(cell) for cell in rhealpix_dggs.grid(3)])
+    cell_polygons, _ = rhealpix_cells_to_polygons(rhealpix_dggs, cell_ids)
+    geometries = [Polygon([(102, 8), (110, 8), (109.5, 23), (103, 22.5)]), box(-180, -90, 180, -70),
+                  box(-180, -50, -175, 50), LineString([(-179, 89), (179, 89.5), (45, 41.8), (45, -80)])]
+    for geometry in geometries:
+        expected = set(cell_ids[shapely.intersects(geometry, cell_polygons)])
+        cover = linetrace if geometry.geom_type == 'LineString' else polyfill
+        assert sorted(cover(geometry, 3, rdggs=rhealpix_dggs)) == sorted(expected)
+    compact_ids = polyfill(box(-20, -60, 40, 10), 3, compact=True, rdggs=rhealpix_dggs)
+    assert any(len(cell_id) < 4 for cell_id in compact_ids)
+    expanded = {str(cell) for cell_id in compact_ids
+                for cell in rhealpix_dggs.cell((cell_id[0],) + tuple(map(int, cell_id[1:]))).subcells(3)}
+    assert expanded == set(polyfill(box(-20, -60, 40, 10), 3, rdggs=rhealpix_dggs))
+
+def test_rhealpix_bin_cache_keeps_dggs_configurations_apart(tmp_path):
+    """Binned cells from the cell cache keep the polygons of the rHEALPix configuration they were binned with."""
+    from vgrid.utils import cellcache
+    from vgrid.binning.rhealpixbin import rhealpix_bin
+    from vgrid.generator.rhealpixgrid import get_rhealpix_dggs, rhealpix_cell_to_polygon
+    configurations = [get_rhealpix_dggs(0, 0), get_rhealpix_dggs(1, 3)]
+    # A point inside cell N18 of each configuration, where N18 lies at a different longitude
+    points = [[{"type": "Feature", "geometry": {"type": "Point", "coordinates": [center.x, center.y]}, "properties": {}}]
+              for center in (rhealpix_cell_to_polygon(rdggs.cell(('N', 1, 8))).centroid for rdggs in configurations)]
+    uncached = [rhealpix_bin(rdggs, iter(cell_points), 2, 'count', None, None)
+                for rdggs, cell_points in zip(configurations, points)]
+    assert uncached[0][0]["properties"]["rhealpix"] == uncached[1][0]["properties"]["rhealpix"]
+    assert uncached[0][0]["geometry"] != uncached[1][0]["geometry"]
+    try:
+        cellcache.set_cell_cache(str(tmp_path / "cells.sqlite"))
+        for _ in range(2):
+            assert [rhealpix_bin(rdggs, iter(cell_points), 2, 'count', None, None)
+                    for rdggs, cell_points in zip(configurations, points)] == uncached
+    finally:
+        cellcache.set_cell_cache(None)
@@ -0,0 +1,17 @@
+def test_s2_cover_matches_bounding_box_filter():
+    """Covering the geometry itself finds the same cells as filtering a covering of its bounds."""
+    from shapely.geometry import LineString, Polygon, box
+    from vgrid.utils import s2
+    from vgrid.generator.s2grid import s2_cover, s2_cell_to_polygon
+    geometries = [Polygon([(100, 10), (101.3, 10.2), (100.5, 11)]), LineString([(100, 10), (102, 12), (102.5, 11)]),
+                  box(175, -20, 180, -10), Polygon([(-170, 70), (170, 70), (0, 88)])]
+    for geometry in geometries:
+        for level in [3, 6]:
+            coverer = s2.RegionCoverer()
+            coverer.min_level = coverer.max_level = level
+            min_lng, min_lat, max_lng, max_lat = geometry.bounds
+            rect = s2.LatLngRect(s2.LatLng.from_degrees(min_lat, min_lng), s2.LatLng.from_degrees(max_lat, max_lng))
+            expected = sorted(cell_id.id() for cell_id in coverer.get_covering(rect)
+                              if s2_cell_to_polygon(cell_id).intersects(geometry))
+            assert s2_cover(geometry, level).tolist() == expected
+            assert s2.cell_id_children(s2_cover(geometry, level, compact=True), level).tolist() == expected
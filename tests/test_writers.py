@@ -0,0 +1,80 @@
+import json
+import pytest
+import h3
+import shapely
+from shapely.geometry import shape
+from vgrid.generator.geohashgrid import iter_grid, generate_grid
+from vgrid.generator.h3grid import h3_cell_to_feature
+from vgrid.utils.writers import write_features, write_geoparquet
+
+def test_streamed_output_matches_feature_collection(tmp_path):
+    """Streaming a generator to GeoJSON and GeoJSONSeq gives the same features as the in-memory grid."""
+    expected = generate_grid(1)["features"]
+
+    geojson_path = tmp_path / "geohash_grid_1.geojson"
+    assert write_features(iter_grid(1), geojson_path, 'geojson') == len(expected)
+    with open(geojson_path) as f:
+        assert json.load(f)["features"] == json.loads(json.dumps(expected))
+
+    geojsonseq_path = tmp_path / "geohash_grid_1.geojsonl"
+    assert write_features(iter_grid(1), geojsonseq_path, 'geojsonseq') == len(expected)
+    with open(geojsonseq_path) as f:
+        assert [json.loads(line) for line in f] == json.loads(json.dumps(expected))
+
+def test_geoparquet_row_groups(tmp_path):
+    """GeoParquet output has WKB geometry, typed property columns and one row group per chunk."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    expected = generate_grid(1)["features"]
+
+    parquet_path = tmp_path / "geohash_grid_1.parquet"
+    assert write_geoparquet(iter_grid(1), parquet_path, chunk_size=10) == len(expected)
+    parquet_file = pq.ParquetFile(parquet_path)
+    assert parquet_file.metadata.num_row_groups == 4
+    assert json.loads(parquet_file.schema_arrow.metadata[b"geo"])["columns"]["geometry"]["encoding"] == "WKB"
+
+    table = parquet_file.read()
+    assert table.column("geohash").to_pylist() == [f["properties"]["geohash"] for f in expected]
+    assert str(table.schema.field("cell_area").type) == "double"
+    assert shapely.from_wkb(table.column("geometry").to_pylist()[0]).equals(shape(expected[0]["geometry"]))
+
+def test_geoparquet_mixed_properties(tmp_path):
+    """Property columns come from all features with int/float promotion, and mismatches raise instead of being cast."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    pa = pytest.importorskip("pyarrow")
+    geometry = {"type": "Point", "coordinates": [0, 0]}
+    features = [{"type": "Feature", "geometry": geometry, "properties": properties}
+                for properties in [{"A_count": 1, "v": 1}, {"A_count": 2}, {"B_count": 3, "v": 2.5}]]
+
+    parquet_path = tmp_path / "mixed.parquet"
+    assert write_geoparquet(features, parquet_path, chunk_size=2) == 3
+    table = pq.read_table(parquet_path)
+    assert table.column("A_count").to_pylist() == [1, 2, None]
+    assert table.column("B_count").to_pylist() == [None, None, 3]
+    assert table.column("v").to_pylist() == [1.0, None, 2.5]
+
+    # Streamed features take their columns from the first chunk, so later mismatches raise
+    with pytest.raises(ValueError):
+        write_geoparquet(iter(features), tmp_path / "streamed.parquet", chunk_size=2)
+    schema = pa.schema([("A_count", pa.int64()), ("B_count", pa.int64()), ("v", pa.float64())])
+    assert write_features(iter(features), tmp_path / "declared.parquet", 'geoparquet', schema=schema) == 3
+    assert pq.read_table(tmp_path / "declared.parquet").column("v").to_pylist() == [1.0, None, 2.5]
+
+def test_cell_cache_lookup_and_eviction(tmp_path):
+    """Cached cell features equal freshly built ones, and the cache keeps at most max_cells cells."""
+    from vgrid.utils import cellcache
+    h3_ids = list(h3.cell_to_children('8001fffffffffff', 3))
+    try:
+        cache = cellcache.set_cell_cache(str(tmp_path / "cells.sqlite"), max_cells=30)
+        built = [cellcache.cell_feature("h3", h3_id, h3_cell_to_feature) for h3_id in h3_ids]
+        cache.flush()
+        assert cellcache.cached_cells("h3", h3_ids) == [False] * (len(h3_ids) - 30) + [True] * 30
+        cached = [cellcache.cell_feature("h3", h3_id, lambda cell_id: pytest.fail("cell not cached"))
+                  for h3_id in h3_ids[-30:]]
+        cached[0]["properties"]["count"] = 1
+        assert cellcache.cell_feature("h3", h3_ids[-30], h3_cell_to_feature) == built[-30]
+        assert cached[1:] == built[-29:]
+        assert built == [h3_cell_to_feature(h3_id) for h3_id in h3_ids]
+        assert cache.connect().execute("SELECT COUNT(*) FROM cells").fetchone()[0] == 30
+    finally:
+        cellcache.set_cell_cache(None)
+    assert cellcache.cached_cells("h3", h3_ids[:2]) == [False, False]
@@ -1,35 +1,293 @@
-from collections import defaultdict
+import json, random, statistics
+from collections import defaultdict, Counter
+import numpy as np
+from tqdm import tqdm
+from vgrid.generator.settings import chunked
+from vgrid.utils.cellcache import cell_feature
+
+# Values kept per cell for the median: exact up to this many values per cell,
+# a uniform reservoir sample beyond it
+median_sample_size = 10000
+_reservoir_random = random.Random(0)
 
 def get_default_stats_structure():
+    """
+    Running statistics of one cell (and category), updated one value at a time,
+    so memory grows with the number of cells rather than the number of points.
+    """
     return {
-        'count': 0,
-        'sum': [],
-        'min': [],
-        'max': [],
-        'mean': [],
-        'median': [],
-        'std': [],
-        'var': [],
-        'range': [],
-        'values': []  # For variety, minority, majority
+        'count': 0,          # Points in the cell
+        'n': 0,              # Numeric values in the cell
+        'sum': 0.0,
+        'min': None,
+        'max': None,
+        'mean': 0.0,         # Welford running mean
+        'm2': 0.0,           # Welford running sum of squared deviations from the mean
+        'sample': [],        # Reservoir sample for the median
+        'values': Counter()  # Value frequencies for variety, minority, majority
     }
 
-def append_stats_value(h3_bins, h3_id, props, stats, category_field, numeric_field=None):
-    category_value = props.get(category_field, "all") if category_field else "all"
-    if h3_id not in h3_bins:
-        h3_bins[h3_id] = defaultdict(get_default_stats_structure)
+def add_median_sample(values, vals):
+    """Add values to the median reservoir sample of a cell (values['n'] must already count them)."""
+    sample = values['sample']
+    seen = values['n'] - len(vals)
+    for val in vals:
+        seen += 1
+        if len(sample) < median_sample_size:
+            sample.append(val)
+        else:
+            j = _reservoir_random.randrange(seen)
+            if j < median_sample_size:
+                sample[j] = val
+
+def merge_numeric_stats(values, n, total, minimum, maximum, m2):
+    """
+    Merge the count, sum, min/max and sum of squared deviations of a batch of values
+    into the running statistics (Chan et al. parallel update of the Welford mean/variance).
+    """
+    n_total = values['n'] + n
+    delta = total / n - values['mean']
+    values['m2'] += m2 + delta * delta * values['n'] * n / n_total
+    values['mean'] += delta * n / n_total
+    values['n'] = n_total
+    values['sum'] += total
+    values['min'] = minimum if values['min'] is None else min(values['min'], minimum)
+    values['max'] = maximum if values['max'] is None else max(values['max'], maximum)
 
+def get_stats_value(values, stats):
+    """Final value of a statistic from the running statistics of a cell."""
     if stats == 'count':
-        h3_bins[h3_id][category_value]['count'] += 1
-    elif stats in ['minority', 'majority', 'variety']:
-        value = props.get(numeric_field or category_field)
-        if value is not None:
-            h3_bins[h3_id][category_value]['values'].append(value)
-    elif numeric_field:
-        value = props.get(numeric_field)
-        if value is not None:
-            try:
-                val = float(value)
-                h3_bins[h3_id][category_value][stats].append(val)
-            except ValueError:
-                pass
+        return values['count']
+    elif stats == 'sum':
+        return values['sum']
+    elif stats == 'min':
+        return values['min']
+    elif stats == 'max':
+        return values['max']
+    elif stats == 'mean':
+        return values['mean']
+    elif stats == 'median':
+        return statistics.median(values['sample'])
+    elif stats == 'std':
+        return (values['m2'] / (values['n'] - 1)) ** 0.5 if values['n'] > 1 else 0
+    elif stats == 'var':
+        return values['m2'] / (values['n'] - 1) if values['n'] > 1 else 0
+    elif stats == 'range':
+        return values['max'] - values['min'] if values['n'] else 0
+    elif stats == 'minority':
+        return min(values['values'].items(), key=lambda x: x[1])[0] if values['values'] else None
+    elif stats == 'majority':
+        return max(values['values'].items(), key=lambda x: x[1])[0] if values['values'] else None
+    elif stats == 'variety':
+        return len(values['values'])
+
+def iter_point_features(point_path):
+    """
+    Yield the features of a GeoJSON FeatureCollection or, streamed line by line,
+    of a GeoJSONSeq / newline-delimited GeoJSON file.
+    """
+    with open(point_path, 'r', encoding='utf-8') as f:
+        first_line = ''
+        for first_line in f:
+            if first_line.strip('\x1e \t\r\n'):
+                break
+        try:
+            first_feature = json.loads(first_line.strip('\x1e \t\r\n'))
+        except ValueError:
+            first_feature = None
+        if isinstance(first_feature, dict) and first_feature.get('type') == 'Feature':
+            yield first_feature
+            for line in f:
+                line = line.strip('\x1e \t\r\n')
+                if line:
+                    yield json.loads(line)
+            return
+        if isinstance(first_feature, dict) and first_feature.get('type') == 'FeatureCollection':
+            yield from first_feature['features']
+            return
+        f.seek(0)
+        yield from json.load(f)['features']
+
+def factorize(items):
+    """Integer codes of hashable items and the unique items, in order of first appearance."""
+    uniques = {}
+    codes = np.fromiter((uniques.setdefault(item, len(uniques)) for item in items), dtype=np.int64, count=len(items))
+    return codes, list(uniques)
+
+def group_by(keys):
+    """
+    Sort-based group-by of integer keys: the group of every key, the sort order and
+    start offsets of the groups, with groups numbered in order of first appearance.
+    """
+    unique_keys, first, groups = np.unique(keys, return_index=True, return_inverse=True)
+    rank = np.empty(len(unique_keys), dtype=np.int64)
+    rank[np.argsort(first, kind='stable')] = np.arange(len(unique_keys))
+    groups = rank[groups.ravel()]
+    order = np.argsort(groups, kind='stable')
+    starts = np.flatnonzero(np.r_[True, groups[order][1:] != groups[order][:-1]])
+    return groups, order, starts
+
+bin_statistics = ['count', 'min', 'max', 'sum', 'mean', 'median', 'std', 'var', 'range', 'minority', 'majority', 'variety']
+numeric_statistics = ['min', 'max', 'sum', 'mean', 'median', 'std', 'var', 'range']
+categorical_statistics = ['minority', 'majority', 'variety']
+
+def as_list(value):
+    """A statistic or field name, or a list of them, as a list."""
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+def bin_points(point_features, encode, resolution, stats, category=None, field_name=None):
+    """
+    Columnar binning core shared by the *bin modules. Points are read in chunks into
+    coordinate, category and value arrays, encoded to cell ids in bulk with
+    encode(lats, lons, resolution), and aggregated per (cell, category) with a
+    sort-based group-by; chunk aggregates are merged into running statistics.
+    stats and field_name may be lists: all statistics of all fields are computed
+    in the same pass. encode may return None (or -1 for integer cell ids) for points that fall in no cell.
+    Returns {cell_id: {category: {field_name: running statistics}}} in order of first appearance.
+    """
+    stats = as_list(stats)
+    fields = as_list(field_name) or [None]
+    bins = {}
+    for chunk in chunked(tqdm(point_features, desc="Binning points")):
+        # Step 1: Columns of the Point and MultiPoint coordinates and of their feature properties
+        lats, lons, rows = [], [], []
+        for i, feature in enumerate(chunk):
+            geom = feature['geometry']
+            if geom['type'] == 'Point':
+                coordinates = [geom['coordinates']]
+            elif geom['type'] == 'MultiPoint':
+                coordinates = geom['coordinates']
+            else:
+                continue
+            for coords in coordinates:
+                lons.append(coords[0])
+                lats.append(coords[1])
+                rows.append(i)
+        if not rows:
+            continue
+        rows = np.array(rows, dtype=np.int64)
+        props = [feature.get('properties', {}) for feature in chunk]
+
+        # Step 2: Encode the cell ids in bulk and register the cells in order of appearance
+        cell_ids = np.asarray(encode(np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64), resolution))
+        if cell_ids.dtype == object or cell_ids.dtype.kind == 'i':
+            # Points outside the grid have no cell: None, or -1 for integer (packed) cell ids
+            inside = np.not_equal(cell_ids, None) if cell_ids.dtype == object else cell_ids >= 0
+            cell_ids, rows = cell_ids[inside], rows[inside]
+            if not len(rows):
+                continue
+        cell_keys, first, cell_codes = np.unique(cell_ids, return_index=True, return_inverse=True)
+        cell_codes = cell_codes.ravel()
+        cell_keys = cell_keys.tolist()
+        for k in np.argsort(first, kind='stable').tolist():
+            if cell_keys[k] not in bins:
+                bins[cell_keys[k]] = defaultdict(lambda: defaultdict(get_default_stats_structure))
+
+        category_codes, categories = factorize([prop.get(category, "all") if category else "all" for prop in props])
+        point_groups = cell_codes * len(categories) + category_codes[rows]
+
+        def groups_of(valid):
+            """(cell, category) groups of the points with a valid value, numbered in order of appearance."""
+            groups, order, starts = group_by(point_groups[valid])
+            group_keys = point_groups[valid][order][starts]
+            group_cells = [cell_keys[key] for key in (group_keys // len(categories)).tolist()]
+            group_categories = [categories[key] for key in (group_keys % len(categories)).tolist()]
+            return groups, order, starts, group_cells, group_categories
+
+        # Step 3: Count the points of every (cell, category)
+        if 'count' in stats:
+            groups, order, starts, group_cells, group_categories = groups_of(np.ones(len(rows), dtype=bool))
+            counts = np.diff(np.r_[starts, len(order)]).tolist()
+            for cell_id, cat, count in zip(group_cells, group_categories, counts):
+                for field in fields:
+                    bins[cell_id][cat][field]['count'] += count
+
+        for field in fields:
+            # Step 4: Value frequencies of the field (or category) for minority, majority and variety
+            if any(stat in categorical_statistics for stat in stats):
+                feature_values = [prop.get(field or category) for prop in props]
+                valid = np.array([feature_values[row] is not None for row in rows.tolist()], dtype=bool)
+                if valid.any():
+                    groups, order, starts, group_cells, group_categories = groups_of(valid)
+                    value_codes, value_items = factorize([feature_values[row] for row in rows[valid].tolist()])
+                    pair_keys = groups * len(value_items) + value_codes
+                    _, pair_order, pair_starts = group_by(pair_keys)
+                    pair_counts = np.diff(np.r_[pair_starts, len(pair_order)]).tolist()
+                    for key, count in zip(pair_keys[pair_order][pair_starts].tolist(), pair_counts):
+                        group, value_code = divmod(key, len(value_items))
+                        bins[group_cells[group]][group_categories[group]][field]['values'][value_items[value_code]] += count
+
+            # Step 5: Numeric aggregates of the field, merged into the running statistics
+            if field and any(stat in numeric_statistics for stat in stats):
+                feature_values = np.full(len(chunk), np.nan)
+                feature_valid = np.zeros(len(chunk), dtype=bool)
+                for i, prop in enumerate(props):
+                    value = prop.get(field)
+                    if value is not None:
+                        try:
+                            feature_values[i] = float(value)
+                            feature_valid[i] = True
+                        except ValueError:
+                            pass
+                valid = feature_valid[rows]
+                if valid.any():
+                    groups, order, starts, group_cells, group_categories = groups_of(valid)
+                    counts = np.diff(np.r_[starts, len(order)])
+                    vals = feature_values[rows[valid]][order]
+                    totals = np.add.reduceat(vals, starts)
+                    minimums = np.minimum.reduceat(vals, starts)
+                    maximums = np.maximum.reduceat(vals, starts)
+                    m2s = np.add.reduceat((vals - np.repeat(totals / counts, counts)) ** 2, starts)
+                    group_vals = np.split(vals, starts[1:]) if 'median' in stats else None
+                    for group, (cell_id, cat) in enumerate(zip(group_cells, group_categories)):
+                        values = bins[cell_id][cat][field]
+                        merge_numeric_stats(values, int(counts[group]), float(totals[group]), float(minimums[group]),
+                                            float(maximums[group]), float(m2s[group]))
+                        if group_vals is not None:
+                            add_median_sample(values, group_vals[group].tolist())
+
+    return bins
+
+def has_stats_value(values, stats):
+    """Whether the running statistics hold any value for the statistic."""
+    if stats == 'count':
+        return True
+    elif stats in categorical_statistics:
+        return bool(values['values'])
+    return values['n'] > 0
+
+def bin_properties(categories, stats, category=None, field_name=None):
+    """
+    Statistics properties of one binned cell: <category>_<stats> for a single field,
+    <category>_<field>_<stats> for several fields (count is shared by all fields).
+    """
+    stats = as_list(stats)
+    fields = as_list(field_name) or [None]
+    properties = {}
+    for cat, field_values in categories.items():
+        key_prefix = '' if category is None else f'{cat}_'
+        for field, values in field_values.items():
+            field_prefix = f'{field}_' if len(fields) > 1 else ''
+            for stat in stats:
+                if stat == 'count':
+                    properties[f'{key_prefix}count'] = values['count']
+                elif has_stats_value(values, stat):
+                    properties[f'{key_prefix}{field_prefix}{stat}'] = get_stats_value(values, stat)
+    return properties
+
+def bins_to_features(bins, cell_to_feature, stats, category=None, field_name=None, dggs_name=None):
+    """
+    Features of the binned cells with the statistics of each category as properties.
+    cell_to_feature(cell_id) returns the cell feature, or None to skip the cell.
+    With dggs_name, cell features are looked up in the persistent cell cache first.
+    """
+    features = []
+    for cell_id, categories in bins.items():
+        feature = cell_feature(dggs_name, cell_id, cell_to_feature) if dggs_name else cell_to_feature(cell_id)
+        if feature is None:
+            continue
+        feature['properties'].update(bin_properties(categories, stats, category, field_name))
+        features.append(feature)
+    return features
@@ -1,9 +1,9 @@
 import argparse, os, json
-from shapely.geometry import shape, Point
-from collections import defaultdict, Counter
-import statistics
-from tqdm import tqdm
-from vgrid.binning.bin_helper import get_default_stats_structure, append_stats_value
+import numpy as np
+import shapely
+from shapely.geometry import shape
+from vgrid.binning.bin_helper import bin_statistics, bin_points, bin_properties, iter_point_features
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 def polygon_bin(polygon_features, point_features, stat, category=None, field_name=None):
     """
@@ -11,9 +11,9 @@ def polygon_bin(polygon_features, point_features, stat, category=None, field_nam
 
     :param polygon_features: list of polygon GeoJSON features
     :param point_features: list of point GeoJSON features
-    :param stat: statistic type (count, sum, mean, etc.)
+    :param stat: statistic type (count, sum, mean, etc.), or a list of them
     :param category: optional grouping field in properties
-    :param field_name: field to use for statistical calculation (except for count)
+    :param field_name: field (or list of fields) to use for statistical calculation (except for count)
     :return: list of polygon features with stats in properties
     """
     # Preprocess polygons
@@ -24,79 +24,46 @@ def polygon_bin(polygon_features, point_features, stat, category=None, field_nam
             continue
         polygons.append((feature, poly))
 
-    # Initialize stat structure per polygon ID
-    polygon_bins = defaultdict(lambda: defaultdict(get_default_stats_structure))
+    # Index the polygons with an STRtree, so points are only tested against the polygons around them
+    tree = shapely.STRtree([poly for _, poly in polygons])
 
-    for point_feature in tqdm(point_features, desc="Binning points into polygons"):
-        point_geom = shape(point_feature['geometry'])
-        props = point_feature.get('properties', {})
+    def locate(lats, lons, resolution):
+        """Bulk point-in-polygon test: index of the first polygon containing each point, or None."""
+        point_index, poly_index = tree.query(shapely.points(lons, lats), predicate='within')
+        # One point belongs to only one polygon: the first one containing it
+        order = np.lexsort((poly_index, point_index))
+        point_index, poly_index = point_index[order], poly_index[order]
+        first = np.r_[True, point_index[1:] != point_index[:-1]] if len(point_index) else np.zeros(0, dtype=bool)
+        poly_ids = np.full(len(lats), None, dtype=object)
+        poly_ids[point_index[first]] = poly_index[first].tolist()
+        return poly_ids
 
-        if not isinstance(point_geom, Point):
-            continue
-
-        for poly_feature, poly_shape in polygons:
-            if poly_shape.contains(point_geom):
-                poly_id = id(poly_feature)  # Use object ID as unique key
-                append_stats_value(polygon_bins, poly_id, props, stat, category, field_name)
-                break  # one point belongs to only one polygon
+    point_features = (point_feature for point_feature in point_features
+                      if point_feature.get('geometry') and point_feature['geometry']['type'] == 'Point')
+    polygon_bins = bin_points(point_features, locate, None, stat, category, field_name)
 
     # Attach stats to polygon properties
     result_features = []
-    for poly_feature, poly_shape in polygons:
-        poly_id = id(poly_feature)
-        categories = polygon_bins.get(poly_id, {})
+    for poly_id, (poly_feature, poly_shape) in enumerate(polygons):
         out_feature = poly_feature.copy()
         out_feature['properties'] = out_feature.get('properties', {}).copy()
-
-        for cat, values in categories.items():
-            key_prefix = '' if category is None else f'{cat}_'
-
-            if stat == 'count':
-                out_feature['properties'][f'{key_prefix}count'] = values['count']
-            elif stat == 'sum':
-                out_feature['properties'][f'{key_prefix}sum'] = sum(values['sum'])
-            elif stat == 'min':
-                out_feature['properties'][f'{key_prefix}min'] = min(values['min'])
-            elif stat == 'max':
-                out_feature['properties'][f'{key_prefix}max'] = max(values['max'])
-            elif stat == 'mean':
-                out_feature['properties'][f'{key_prefix}mean'] = statistics.mean(values['mean'])
-            elif stat == 'median':
-                out_feature['properties'][f'{key_prefix}median'] = statistics.median(values['median'])
-            elif stat == 'std':
-                out_feature['properties'][f'{key_prefix}std'] = statistics.stdev(values['std']) if len(values['std']) > 1 else 0
-            elif stat == 'var':
-                out_feature['properties'][f'{key_prefix}var'] = statistics.variance(values['var']) if len(values['var']) > 1 else 0
-            elif stat == 'range':
-                out_feature['properties'][f'{key_prefix}range'] = max(values['range']) - min(values['range']) if values['range'] else 0
-            elif stat == 'minority':
-                freq = Counter(values['values'])
-                min_item = min(freq.items(), key=lambda x: x[1])[0] if freq else None
-                out_feature['properties'][f'{key_prefix}minority'] = min_item
-            elif stat == 'majority':
-                freq = Counter(values['values'])
-                max_item = max(freq.items(), key=lambda x: x[1])[0] if freq else None
-                out_feature['properties'][f'{key_prefix}majority'] = max_item
-            elif stat == 'variety':
-                out_feature['properties'][f'{key_prefix}variety'] = len(set(values['values']))
-
+        out_feature['properties'].update(bin_properties(polygon_bins.get(poly_id, {}), stat, category, field_name))
         result_features.append(out_feature)
 
     return result_features
 
 def main(): 
     parser = argparse.ArgumentParser(description="Bin points into polygons and compute statistics")
-    parser.add_argument('-point', '--point', type=str, required=True, help="GeoJSON file path (Point or MultiPoint)")
+    parser.add_argument('-point', '--point', type=str, required=True, help="GeoJSON or GeoJSONSeq file path (Point or MultiPoint)")
     parser.add_argument('-polygon', '--polygon', type=str, required=True, help="Polygon GeoJSON file path")
     parser.add_argument(
-        '-stats', '--statistic', choices=[
-            'count', 'min', 'max', 'sum', 'mean', 'median',
-            'std', 'var', 'range', 'minority', 'majority', 'variety'
-        ], required=True,
-        help="Statistic option: choose from count, min, max, sum, mean, median, std, var, range, minority, majority, variety"
+        '-stats', '--statistic', choices=bin_statistics, nargs='+', required=True,
+        help="Statistic options, computed in one pass: choose from count, min, max, sum, mean, median, std, var, range, minority, majority, variety"
     )
     parser.add_argument('-category', '--category', required=False, help="Optional category field for grouping")
-    parser.add_argument('-field', '--field', required=False, help="Field name for numeric values")
+    parser.add_argument('-field', '--field', required=False, nargs='+', help="Field names for numeric values")
+
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
 
     args = parser.parse_args()
     
@@ -114,13 +81,11 @@ def main():
         print(f"Error: The file {polygon_path} does not exist.")
         return
 
-    if stats != 'count' and not field_name:
+    if set(stats) - {'count'} and not field_name:
         print("Error: A field name is required for statistics other than 'count'.")
         return
 
-    with open(point_path, 'r', encoding='utf-8') as f:
-        point_data = json.load(f)
-    point_features = point_data['features']
+    point_features = iter_point_features(point_path)
 
     with open(polygon_path, 'r', encoding='utf-8') as f:
         polygon_data = json.load(f)
@@ -130,12 +95,11 @@ def main():
 
     out_name = os.path.splitext(os.path.basename(point_path))[0]
     polygon_name = os.path.splitext(os.path.basename(polygon_path))[0]
-    out_path = f"{out_name}_bin_{polygon_name}_{stats}.geojson"
+    out_path = get_output_path(f"{out_name}_bin_{polygon_name}_{'_'.join(stats)}", args.format)
 
-    with open(out_path, 'w', encoding='utf-8') as f:
-        json.dump({"type": "FeatureCollection", "features": result_features}, f, indent=2)
+    write_features(result_features, out_path, args.format)
 
-    print(f"GeoJSON saved as {out_path}")
+    print(f"Output saved as {out_path}")
 
 if __name__ == "__main__":
     main()
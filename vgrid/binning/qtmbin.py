@@ -1,97 +1,49 @@
-import argparse, os, json, statistics
-from collections import defaultdict,Counter
-from shapely.geometry import Point
-from tqdm import tqdm
-from vgrid.binning.bin_helper import get_default_stats_structure, append_stats_value
+import argparse, os
+import numpy as np
+from vgrid.binning.bin_helper import bin_statistics, bin_points, bins_to_features, iter_point_features
 from vgrid.generator.settings import  geodesic_dggs_to_feature
 from vgrid.utils import qtm
+from vgrid.utils.cellcache import cached_cells
+from vgrid.utils.writers import output_formats, write_features, get_output_path
+
+def qtm_cell_to_feature(qtm_id, resolution, cell_polygon=None):
+    if cell_polygon is None:
+        cell_polygon = qtm.constructGeometry(qtm.qtm_id_to_facet(qtm_id))
+    if not cell_polygon.is_valid:
+        return None
+    num_edges = 3
+    return geodesic_dggs_to_feature("qtm", qtm_id, resolution, cell_polygon, num_edges)
 
 def qtm_bin(point_features, resolution, stats, category, field_name):
-    qtm_bins = defaultdict(lambda: defaultdict(get_default_stats_structure))
-
-    for feature in tqdm(point_features, desc="Binning points"):
-        geom = feature['geometry']
-        props = feature.get('properties', {})
-
-        if geom['type'] == 'Point':
-            point = Point(geom['coordinates'])
-            qtm_id = qtm.latlon_to_qtm_id(point.y, point.x, resolution)
-            append_stats_value(qtm_bins, qtm_id, props, stats, category, field_name)
-
-        elif geom['type'] == 'MultiPoint':
-            for coords in geom['coordinates']:
-                point = Point(coords)
-                qtm_id = qtm.latlon_to_qtm_id(point.y, point.x, resolution)
-                append_stats_value(qtm_bins, qtm_id, props, stats, category, field_name)
-
-    qtm_features = []
-    for qtm_id, categories in qtm_bins.items():
-        facet = qtm.qtm_id_to_facet(qtm_id)
-        cell_polygon = qtm.constructGeometry(facet)    
-
-        if not cell_polygon.is_valid:
-            continue
-        
-        num_edges = 3
-        qtm_feature = geodesic_dggs_to_feature("qtm", qtm_id, resolution, cell_polygon,num_edges)
-
-        for cat, values in categories.items():
-            key_prefix = '' if category is None else f'{cat}_'
-
-            if stats == 'count':
-                qtm_feature['properties'][f'{key_prefix}count'] = values['count']
-            elif stats == 'sum':
-                qtm_feature['properties'][f'{key_prefix}sum'] = sum(values['sum'])
-            elif stats == 'min':
-                qtm_feature['properties'][f'{key_prefix}min'] = min(values['min'])
-            elif stats == 'max':
-                qtm_feature['properties'][f'{key_prefix}max'] = max(values['max'])
-            elif stats == 'mean':
-                qtm_feature['properties'][f'{key_prefix}mean'] = statistics.mean(values['mean'])
-            elif stats == 'median':
-                qtm_feature['properties'][f'{key_prefix}median'] = statistics.median(values['median'])
-            elif stats == 'std':
-                qtm_feature['properties'][f'{key_prefix}std'] = statistics.stdev(values['std']) if len(values['std']) > 1 else 0
-            elif stats == 'var':
-                qtm_feature['properties'][f'{key_prefix}var'] = statistics.variance(values['var']) if len(values['var']) > 1 else 0
-            elif stats == 'range':
-                qtm_feature['properties'][f'{key_prefix}range'] = max(values['range']) - min(values['range']) if values['range'] else 0
-            
-            elif stats == 'minority':
-                freq = Counter(values['values'])
-                min_item = min(freq.items(), key=lambda x: x[1])[0] if freq else None
-                qtm_feature['properties'][f'{key_prefix}minority'] = min_item
-
-            elif stats == 'majority':
-                freq = Counter(values['values'])
-                max_item = max(freq.items(), key=lambda x: x[1])[0] if freq else None
-                qtm_feature['properties'][f'{key_prefix}majority'] = max_item
-
-            elif stats == 'variety':
-                qtm_feature['properties'][f'{key_prefix}variety'] = len(set(values['values']))
-
-
-        qtm_features.append(qtm_feature)
-
-    return qtm_features
+    # Bin by packed QTM IDs, then decode the facets of the binned cells missing from the cell cache at once
+    packed_bins = bin_points(point_features, qtm.latlon_to_packed_qtm, resolution, stats, category, field_name)
+    packed_ids = np.array(list(packed_bins))
+    qtm_ids = qtm.unpack_qtm_ids(packed_ids).tolist()
+    qtm_bins = dict(zip(qtm_ids, packed_bins.values()))
+    missing = ~np.array(cached_cells("qtm", qtm_ids), dtype=bool)
+    cell_polygons = {}
+    if missing.any():
+        facet_vertices, _ = qtm.packed_qtm_to_facets(packed_ids[missing])
+        cell_polygons = dict(zip(np.array(qtm_ids, dtype=object)[missing], qtm.facet_polygons(facet_vertices)))
+    return bins_to_features(qtm_bins, lambda qtm_id: qtm_cell_to_feature(qtm_id, resolution, cell_polygons.get(qtm_id)),
+                            stats, category, field_name, "qtm")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Binning point to QTM DGGS")
-    parser.add_argument('-point', '--point', type=str, required=True, help="GeoJSON file path (Point or MultiPoint)")
+    parser.add_argument('-point', '--point', type=str, required=True, help="GeoJSON or GeoJSONSeq file path (Point or MultiPoint)")
     parser.add_argument('-r', '--resolution', type=int, default=14, help="Resolution of the grid [1..24]")
     parser.add_argument(
             '-stats', '--statistics',
-            choices=[
-                'count', 'min', 'max', 'sum', 'mean', 'median',
-                'std', 'var', 'range', 'minority', 'majority', 'variety'
-            ],
+            choices=bin_statistics, nargs='+',
             required=True,
-            help="Statistic option"
+            help="Statistic options, computed in one pass (e.g. -stats count mean std)"
         )
 
     parser.add_argument('-category', '--category', required=False, help="Optional category field for grouping")
-    parser.add_argument('-field', '--field', required=False, help="Numeric field to compute statistics")
+    parser.add_argument('-field', '--field', required=False, nargs='+', help="Numeric fields to compute statistics")
+
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
 
     args = parser.parse_args()
 
@@ -109,23 +61,19 @@ def main():
         print(f"Error: The file {point} does not exist.")
         return
 
-    if stats != 'count' and not field_name:
+    if set(stats) - {'count'} and not field_name:
         print("Error: A field name is required for statistics other than 'count'.")
         return
 
-    with open(point, 'r', encoding='utf-8') as f:
-        point_data = json.load(f)
-
-    point_features = point_data['features']
+    point_features = iter_point_features(point)
     qtm_features = qtm_bin(point_features,resolution, stats, category, field_name)
 
     out_name = os.path.splitext(os.path.basename(point))[0]
-    out_path = f"{out_name}_bin_qtm_{resolution}_{stats}.geojson"
+    out_path = get_output_path(f"{out_name}_bin_qtm_{resolution}_{'_'.join(stats)}", args.format)
 
-    with open(out_path, 'w', encoding='utf-8') as f:
-        json.dump({"type": "FeatureCollection", "features": qtm_features}, f, indent=2)
+    write_features(qtm_features, out_path, args.format)
 
-    print(f"GeoJSON saved as {out_path}")
+    print(f"Output saved as {out_path}")
 
 
 if __name__ == "__main__":
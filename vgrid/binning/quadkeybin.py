@@ -1,111 +1,49 @@
-import argparse, os, re, json, statistics
-from collections import defaultdict,Counter
-from shapely.geometry import Point,Polygon
-from tqdm import tqdm
-from vgrid.binning.bin_helper import get_default_stats_structure, append_stats_value
+import argparse, os, re
+from shapely.geometry import Polygon
+from vgrid.binning.bin_helper import bin_statistics, bin_points, bins_to_features, iter_point_features
+from vgrid.conversion.latlon2dggs import latlon2quadkey_array
 from vgrid.generator.settings import  graticule_dggs_to_feature
-from vgrid.conversion.latlon2dggs import latlon2quadkey
 from vgrid.utils import mercantile
+from vgrid.utils.writers import output_formats, write_features, get_output_path
+
+def quadkey_cell_to_feature(quadkey_id, resolution):
+    tile = mercantile.quadkey_to_tile(quadkey_id)
+    # Get the bounds of the tile in (west, south, east, north)
+    bounds = mercantile.bounds(tile.x, tile.y, tile.z)
+    min_lat, min_lon = bounds.south, bounds.west
+    max_lat, max_lon = bounds.north, bounds.east
+    cell_polygon = Polygon([
+        [min_lon, min_lat],  # Bottom-left corner
+        [max_lon, min_lat],  # Bottom-right corner
+        [max_lon, max_lat],  # Top-right corner
+        [min_lon, max_lat],  # Top-left corner
+        [min_lon, min_lat]   # Closing the polygon (same as the first point)
+    ])
+
+    if not cell_polygon.is_valid:
+        return None
+    return graticule_dggs_to_feature("quadkey", quadkey_id, resolution, cell_polygon)
 
 def quadkey_bin(point_features, resolution, stats, category, field_name):
-    quadkey_bins = defaultdict(lambda: defaultdict(get_default_stats_structure))
-
-    for feature in tqdm(point_features, desc="Binning points"):
-        geom = feature['geometry']
-        props = feature.get('properties', {})
-
-        if geom['type'] == 'Point':
-            point = Point(geom['coordinates'])
-            quadkey_id = latlon2quadkey(point.y, point.x, resolution)
-            append_stats_value(quadkey_bins, quadkey_id, props, stats, category, field_name)
-
-        elif geom['type'] == 'MultiPoint':
-            for coords in geom['coordinates']:
-                point = Point(coords)
-                quadkey_id = latlon2quadkey(point.y, point.x, resolution)
-                append_stats_value(quadkey_bins, quadkey_id, props, stats, category, field_name)
-
-    quadkey_features = []
-    for quadkey_id, categories in quadkey_bins.items():
-        tile = mercantile.quadkey_to_tile(quadkey_id)  
-        z = tile.z
-        x = tile.x
-        y = tile.y
-        # Get the bounds of the tile in (west, south, east, north)
-        bounds = mercantile.bounds(x, y, z)    
-        min_lat, min_lon = bounds.south, bounds.west
-        max_lat, max_lon = bounds.north, bounds.east
-
-        cell_polygon = Polygon([
-            [min_lon, min_lat],  # Bottom-left corner
-            [max_lon, min_lat],  # Bottom-right corner
-            [max_lon, max_lat],  # Top-right corner
-            [min_lon, max_lat],  # Top-left corner
-            [min_lon, min_lat]   # Closing the polygon (same as the first point)
-        ])
-
-        if not cell_polygon.is_valid:
-            continue
-        
-        quadkey_feature = graticule_dggs_to_feature("quadkey", quadkey_id, resolution, cell_polygon)
-
-        for cat, values in categories.items():
-            key_prefix = '' if category is None else f'{cat}_'
-
-            if stats == 'count':
-                quadkey_feature['properties'][f'{key_prefix}count'] = values['count']
-            elif stats == 'sum':
-                quadkey_feature['properties'][f'{key_prefix}sum'] = sum(values['sum'])
-            elif stats == 'min':
-                quadkey_feature['properties'][f'{key_prefix}min'] = min(values['min'])
-            elif stats == 'max':
-                quadkey_feature['properties'][f'{key_prefix}max'] = max(values['max'])
-            elif stats == 'mean':
-                quadkey_feature['properties'][f'{key_prefix}mean'] = statistics.mean(values['mean'])
-            elif stats == 'median':
-                quadkey_feature['properties'][f'{key_prefix}median'] = statistics.median(values['median'])
-            elif stats == 'std':
-                quadkey_feature['properties'][f'{key_prefix}std'] = statistics.stdev(values['std']) if len(values['std']) > 1 else 0
-            elif stats == 'var':
-                quadkey_feature['properties'][f'{key_prefix}var'] = statistics.variance(values['var']) if len(values['var']) > 1 else 0
-            elif stats == 'range':
-                quadkey_feature['properties'][f'{key_prefix}range'] = max(values['range']) - min(values['range']) if values['range'] else 0
-            
-            elif stats == 'minority':
-                freq = Counter(values['values'])
-                min_item = min(freq.items(), key=lambda x: x[1])[0] if freq else None
-                quadkey_feature['properties'][f'{key_prefix}minority'] = min_item
-
-            elif stats == 'majority':
-                freq = Counter(values['values'])
-                max_item = max(freq.items(), key=lambda x: x[1])[0] if freq else None
-                quadkey_feature['properties'][f'{key_prefix}majority'] = max_item
-
-            elif stats == 'variety':
-                quadkey_feature['properties'][f'{key_prefix}variety'] = len(set(values['values']))
-
-
-        quadkey_features.append(quadkey_feature)
-
-    return quadkey_features
+    quadkey_bins = bin_points(point_features, latlon2quadkey_array, resolution, stats, category, field_name)
+    return bins_to_features(quadkey_bins, lambda quadkey_id: quadkey_cell_to_feature(quadkey_id, resolution), stats, category, field_name, "quadkey")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Binning point to quadkey DGGS")
-    parser.add_argument('-point', '--point', type=str, required=True, help="GeoJSON file path (Point or MultiPoint)")
+    parser.add_argument('-point', '--point', type=str, required=True, help="GeoJSON or GeoJSONSeq file path (Point or MultiPoint)")
     parser.add_argument('-r', '--resolution', type=int, default=15, help="Resolution of the grid [0..29]")
     parser.add_argument(
             '-stats', '--statistics',
-            choices=[
-                'count', 'min', 'max', 'sum', 'mean', 'median',
-                'std', 'var', 'range', 'minority', 'majority', 'variety'
-            ],
+            choices=bin_statistics, nargs='+',
             required=True,
-            help="Statistic option"
+            help="Statistic options, computed in one pass (e.g. -stats count mean std)"
         )
 
     parser.add_argument('-category', '--category', required=False, help="Optional category field for grouping")
-    parser.add_argument('-field', '--field', required=False, help="Numeric field to compute statistics")
+    parser.add_argument('-field', '--field', required=False, nargs='+', help="Numeric fields to compute statistics")
+
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
 
     args = parser.parse_args()
 
@@ -123,23 +61,19 @@ def main():
         print(f"Error: The file {point} does not exist.")
         return
 
-    if stats != 'count' and not field_name:
+    if set(stats) - {'count'} and not field_name:
         print("Error: A field name is required for statistics other than 'count'.")
         return
 
-    with open(point, 'r', encoding='utf-8') as f:
-        point_data = json.load(f)
-
-    point_features = point_data['features']
+    point_features = iter_point_features(point)
     quadkey_features = quadkey_bin(point_features,resolution, stats, category, field_name)
 
     out_name = os.path.splitext(os.path.basename(point))[0]
-    out_path = f"{out_name}_bin_quadkey_{resolution}_{stats}.geojson"
+    out_path = get_output_path(f"{out_name}_bin_quadkey_{resolution}_{'_'.join(stats)}", args.format)
 
-    with open(out_path, 'w', encoding='utf-8') as f:
-        json.dump({"type": "FeatureCollection", "features": quadkey_features}, f, indent=2)
+    write_features(quadkey_features, out_path, args.format)
 
-    print(f"GeoJSON saved as {out_path}")
+    print(f"Output saved as {out_path}")
 
 
 if __name__ == "__main__":
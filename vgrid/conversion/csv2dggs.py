@@ -1,11 +1,14 @@
-import os,argparse,json, re
+import os,argparse, re
 import pandas as pd
+import numpy as np
 from tqdm import tqdm
 import h3
 
 from shapely.geometry import Polygon, mapping
-from vgrid.generator.h3grid import fix_h3_antimeridian_cells
-from vgrid.generator.settings import  chunk_size, geodesic_dggs_to_feature
+from vgrid.generator.h3grid import h3_cell_to_feature
+from vgrid.utils.cellcache import cell_feature
+from vgrid.utils.writers import output_formats, write_features, get_output_path
+from vgrid.generator.settings import  chunk_size, geodesic_dggs_to_feature, geodesic_dggs_to_features
 
 from vgrid.utils import s2, olc, geohash, georef, mgrs, mercantile, maidenhead
 from vgrid.utils.gars import garsgrid
@@ -14,9 +17,10 @@ from shapely.wkt import loads
 
 from vgrid.utils.antimeridian import fix_polygon
 
-from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
 from vgrid.utils.rhealpixdggs.ellipsoids import WGS84_ELLIPSOID
-from vgrid.conversion.dggs2geojson import rhealpix_cell_to_polygon
+from vgrid.generator.rhealpixgrid import get_rhealpix_dggs, rhealpix_cell_to_polygon
+from vgrid.generator.s2grid import s2_cells_to_polygons
+from vgrid.generator.geohashgrid import geohash_bbox_polygons
 
 import platform
 if (platform.system() == 'Windows'):   
@@ -31,8 +35,8 @@ if (platform.system() == 'Windows'):
 from vgrid.utils.easedggs.constants import levels_specs
 from vgrid.utils.easedggs.dggs.grid_addressing import grid_ids_to_geos
 
-from vgrid.generator.settings import isea3h_accuracy_res_dict, geodesic_dggs_to_feature, graticule_dggs_to_feature
-from vgrid.utils.qtm import constructGeometry, qtm_id_to_facet
+from vgrid.generator.settings import isea3h_accuracy_res_dict, geodesic_dggs_to_feature, graticule_dggs_to_feature, graticule_dggs_to_features
+from vgrid.utils.qtm import constructGeometry, qtm_id_to_facet, pack_qtm_ids, packed_qtm_to_facets, facet_polygons
 
 
 from pyproj import Geod
@@ -45,19 +49,7 @@ E = WGS84_ELLIPSOID
 #################################################################################
 def h32feature(h3_id):
     """Convert H3 cell ID to a GeoJSON Polygon."""
-    cell_boundary = h3.cell_to_boundary(h3_id)
-    if cell_boundary:
-        filtered_boundary = fix_h3_antimeridian_cells(cell_boundary)
-        # Reverse lat/lon to lon/lat for GeoJSON compatibility
-        reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
-        cell_polygon = Polygon(reversed_boundary)
-        resolution = h3.get_resolution(h3_id)             
-        num_edges = 6
-        if h3.is_pentagon(h3_id):
-            num_edges = 6         
-        h3_feature = geodesic_dggs_to_feature("h3",h3_id,resolution,cell_polygon,num_edges)              
-        
-        return h3_feature
+    return cell_feature("h3", h3_id, h3_cell_to_feature)
     
 def csv2h3(csv_file, id_col=None):
     if not os.path.exists(csv_file):
@@ -96,46 +88,42 @@ def csv2h3_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with H3 column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with H3 column")
     parser.add_argument("id", help="Name of the H3 column (default: 'h3')", default='h3')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     h3_csv = args.csv
     h3_id = args.id
 
     h3_geojson = csv2h3(h3_csv, h3_id)
     geojson_name = os.path.splitext(os.path.basename(h3_csv))[0]
-    geojson_path = f"{geojson_name}2h3.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2h3", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(h3_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(h3_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 #################################################################################
 #  S2
 #################################################################################
-def s22feature(s2_token):
-    # Create an S2 cell from the given cell ID
-    cell_id = s2.CellId.from_token(s2_token)
-    cell = s2.Cell(cell_id)
-    if cell:
-        # Get the vertices of the cell (4 vertices for a rectangular cell)
-        vertices = [cell.get_vertex(i) for i in range(4)]
-        # Prepare vertices in (longitude, latitude) format for Shapely
-        shapely_vertices = []
-        for vertex in vertices:
-            lat_lng = s2.LatLng.from_point(vertex)  # Convert Point to LatLng
-            longitude = lat_lng.lng().degrees  # Access longitude in degrees
-            latitude = lat_lng.lat().degrees   # Access latitude in degrees
-            shapely_vertices.append((longitude, latitude))
-
-        # Close the polygon by adding the first vertex again
-        shapely_vertices.append(shapely_vertices[0])  # Closing the polygon
-        # Create a Shapely Polygon
-        cell_polygon = fix_polygon(Polygon(shapely_vertices)) # Fix antimeridian
-        resolution = cell_id.level()            
-        num_edges = 4        
-        
-        s2_feature = geodesic_dggs_to_feature("s2",s2_token,resolution,cell_polygon,num_edges)              
-        return s2_feature
+def s22features(s2_tokens):
+    """S2 features of many S2 tokens, converted together as 64-bit cell ids (None for invalid tokens)."""
+    try:
+        cell_ids = s2.cell_ids_from_tokens(s2_tokens)
+    except Exception:
+        # Find the invalid tokens one by one
+        cell_ids = np.zeros(len(s2_tokens), dtype=np.uint64)
+        for i, s2_token in enumerate(s2_tokens):
+            try:
+                cell_ids[i] = s2.cell_ids_from_tokens([s2_token])[0]
+            except Exception as e:
+                print(f" Skipping S2 token {s2_token}: {e}")
+    valid = np.flatnonzero(s2.is_valid_cell_ids(cell_ids))
+    s2_features = [None] * len(s2_tokens)
+    num_edges = 4
+    features = geodesic_dggs_to_features("s2", [s2_tokens[i] for i in valid], s2.cell_levels(cell_ids[valid]).tolist(),
+                                         s2_cells_to_polygons(cell_ids[valid]), num_edges)
+    for i, s2_feature in zip(valid.tolist(), features):
+        s2_features[i] = s2_feature
+    return s2_features
 
 def csv2s2(csv_file, id_col=None):
     if not os.path.exists(csv_file):
@@ -157,15 +145,12 @@ def csv2s2(csv_file, id_col=None):
         return
     
     geojson_features = []    
-    for _, row in df.iterrows():
-        try:
-            s2_id = row[id_col]
-            s2_feature = s22feature(s2_id)
-            if s2_feature:
-                s2_feature["properties"].update(row.to_dict())  # Append all CSV data to properties
-                geojson_features.append(s2_feature)
-        except Exception as e:
-            print(f" Skipping row {row.to_dict()}: {e}")
+    rows = df.to_dict('records')
+    s2_features = s22features([row[id_col] for row in rows])
+    for row, s2_feature in zip(rows, s2_features):
+        if s2_feature:
+            s2_feature["properties"].update(row)  # Append all CSV data to properties
+            geojson_features.append(s2_feature)
     
     s2_geojson = {"type": "FeatureCollection", "features": geojson_features}
     return s2_geojson
@@ -174,25 +159,25 @@ def csv2s2_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with S2 column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with S2 column")
     parser.add_argument("id", help="Name of the S2 column (default: 's2')", default='s2')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     s2_csv = args.csv
     s2_id = args.id
 
     s2_geojson = csv2s2(s2_csv, s2_id)
     geojson_name = os.path.splitext(os.path.basename(s2_csv))[0]
-    geojson_path = f"{geojson_name}2s2.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2s2", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(s2_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(s2_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 #################################################################################
 #  Rhealpix
 #################################################################################
 def rhealpix2feature(rhealpix_id):
     rhealpix_uids = (rhealpix_id[0],) + tuple(map(int, rhealpix_id[1:]))
-    rhealpix_dggs = RHEALPixDGGS(ellipsoid=E, north_square=1, south_square=3, N_side=3) 
+    rhealpix_dggs = get_rhealpix_dggs(north_square=1, south_square=3)
     rhealpix_cell = rhealpix_dggs.cell(rhealpix_uids)
     if rhealpix_cell:
         resolution = rhealpix_cell.resolution        
@@ -240,18 +225,18 @@ def csv2rhealpix_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with rhealpix column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with rhealpix column")
     parser.add_argument("id", help="Name of the rhealpix column (default: 'rhealpix')", default='rhealpix')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     rhealpix_csv = args.csv
     rhealpix_id = args.id
 
     rhealpix_geojson = csv2rhealpix(rhealpix_csv, rhealpix_id)
     geojson_name = os.path.splitext(os.path.basename(rhealpix_csv))[0]
-    geojson_path = f"{geojson_name}2rhealpix.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2rhealpix", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(rhealpix_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(rhealpix_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 #################################################################################
 #  Open-Eaggr ISEA4T
@@ -309,18 +294,18 @@ def csv2isea4t_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with ISEA4T column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with ISEA4T column")
     parser.add_argument("id", help="Name of the ISEA4T column (default: 'isea4t')", default='isea4t')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     isea4t_csv = args.csv
     isea4t_id = args.id
 
     isea4t_geojson = csv2isea4t(isea4t_csv, isea4t_id)
     geojson_name = os.path.splitext(os.path.basename(isea4t_csv))[0]
-    geojson_path = f"{geojson_name}2isea4t.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2isea4t", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(isea4t_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(isea4t_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 #################################################################################
 #  Open-Eaggr ISEA3H
@@ -418,18 +403,18 @@ def csv2isea3h_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with ISEA3H column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with ISEA3H column")
     parser.add_argument("id", help="Name of the ISEA3H column (default: 'isea3h')", default='isea3h')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     isea3h_csv = args.csv
     isea3h_id = args.id
 
     isea3h_geojson = csv2isea3h(isea3h_csv, isea3h_id)
     geojson_name = os.path.splitext(os.path.basename(isea3h_csv))[0]
-    geojson_path = f"{geojson_name}2isea3h.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2isea3h", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(isea3h_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(isea3h_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
     
 #################################################################################
 #  EASE-DGGS
@@ -500,18 +485,18 @@ def csv2ease_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with EASE column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with EASE column")
     parser.add_argument("id", help="Name of the EASE column (default: 'ease')", default='ease')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     ease_csv = args.csv
     ease_id = args.id
 
     ease_geojson = csv2ease(ease_csv, ease_id)
     geojson_name = os.path.splitext(os.path.basename(ease_csv))[0]
-    geojson_path = f"{geojson_name}2ease.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2ease", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(ease_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(ease_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 
 #################################################################################
@@ -525,6 +510,28 @@ def qtm2feature(qtm_id):
         num_edges = 3
         qtm_feature = geodesic_dggs_to_feature("qtm",qtm_id,resolution,cell_polygon,num_edges)   
         return qtm_feature
+
+def qtm2features(qtm_ids):
+    """QTM features of many QTM IDs, decoded together as packed IDs (None for invalid IDs)."""
+    try:
+        packed = pack_qtm_ids(qtm_ids)
+    except Exception:
+        # Find the invalid IDs one by one
+        packed = np.full(len(qtm_ids), -1, dtype=np.int64)
+        for i, qtm_id in enumerate(qtm_ids):
+            try:
+                packed[i] = pack_qtm_ids([qtm_id])[0]
+            except Exception as e:
+                print(f" Skipping QTM ID {qtm_id}: {e}")
+    valid = np.flatnonzero(packed >= 0)
+    qtm_features = [None] * len(qtm_ids)
+    facet_vertices, _ = packed_qtm_to_facets(packed[valid])
+    valid_ids = [qtm_ids[i] for i in valid]
+    num_edges = 3
+    features = geodesic_dggs_to_features("qtm", valid_ids, [len(qtm_id) for qtm_id in valid_ids], facet_polygons(facet_vertices), num_edges)
+    for i, qtm_feature in zip(valid.tolist(), features):
+        qtm_features[i] = qtm_feature
+    return qtm_features
     
 def csv2qtm(csv_file, id_col=None):
     if not os.path.exists(csv_file):
@@ -546,15 +553,12 @@ def csv2qtm(csv_file, id_col=None):
         return
     
     geojson_features = []    
-    for _, row in df.iterrows():
-        try:
-            qtm_id = row[id_col]
-            qtm_feature = qtm2feature(qtm_id)
-            if qtm_feature:
-                qtm_feature["properties"].update(row.to_dict())  # Append all CSV data to properties
-                geojson_features.append(qtm_feature)
-        except Exception as e:
-            print(f" Skipping row {row.to_dict()}: {e}")
+    rows = df.to_dict('records')
+    qtm_features = qtm2features([row[id_col] for row in rows])
+    for row, qtm_feature in zip(rows, qtm_features):
+        if qtm_feature:
+            qtm_feature["properties"].update(row)  # Append all CSV data to properties
+            geojson_features.append(qtm_feature)
     
     qtm_geojson = {"type": "FeatureCollection", "features": geojson_features}
     return qtm_geojson
@@ -563,18 +567,18 @@ def csv2qtm_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with qtm column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with qtm column")
     parser.add_argument("id", help="Name of the qtm column (default: 'qtm')", default='qtm')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     qtm_csv = args.csv
     qtm_id = args.id
 
     qtm_geojson = csv2qtm(qtm_csv, qtm_id)
     geojson_name = os.path.splitext(os.path.basename(qtm_csv))[0]
-    geojson_path = f"{geojson_name}2qtm.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2qtm", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(qtm_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(qtm_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 
 
@@ -637,18 +641,18 @@ def csv2olc_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with OLC column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with OLC column")
     parser.add_argument("id", help="Name of the OLC column (default: 'olc')", default='olc')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     olc_csv = args.csv
     olc_id = args.id
 
     olc_geojson = csv2olc(olc_csv, olc_id)
     geojson_name = os.path.splitext(os.path.basename(olc_csv))[0]
-    geojson_path = f"{geojson_name}2olc.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2olc", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(olc_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(olc_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 
 #################################################################################
@@ -672,6 +676,23 @@ def geohash2feature(geohash_id):
         geohash_feature = graticule_dggs_to_feature("geohash",geohash_id,resolution,cell_polygon)   
         return geohash_feature
     
+def geohash2features(geohash_ids):
+    """Geohash features of many geohashes, decoded together (None for invalid geohashes)."""
+    try:
+        cell_polygons = geohash_bbox_polygons(geohash_ids)
+    except Exception:
+        # Decode the geohashes one by one to skip the invalid ones
+        geohash_features = []
+        for geohash_id in geohash_ids:
+            try:
+                geohash_features.append(geohash2feature(geohash_id))
+            except Exception as e:
+                print(f" Skipping Geohash ID {geohash_id}: {e}")
+                geohash_features.append(None)
+        return geohash_features
+    cell_resolutions = [len(geohash_id) for geohash_id in geohash_ids]
+    return graticule_dggs_to_features("geohash", geohash_ids, cell_resolutions, cell_polygons)
+
 def csv2geohash(csv_file, id_col=None):
     if not os.path.exists(csv_file):
         print(f"Error: Input file {csv_file} does not exist.")
@@ -692,15 +713,12 @@ def csv2geohash(csv_file, id_col=None):
         return
     
     geojson_features = []    
-    for _, row in df.iterrows():
-        try:
-            geohash_id = row[id_col]
-            geohash_feature = geohash2feature(geohash_id)
-            if geohash_feature:
-                geohash_feature["properties"].update(row.to_dict())  # Append all CSV data to properties
-                geojson_features.append(geohash_feature)
-        except Exception as e:
-            print(f" Skipping row {row.to_dict()}: {e}")
+    rows = df.to_dict('records')
+    geohash_features = geohash2features([row[id_col] for row in rows])
+    for row, geohash_feature in zip(rows, geohash_features):
+        if geohash_feature:
+            geohash_feature["properties"].update(row)  # Append all CSV data to properties
+            geojson_features.append(geohash_feature)
     
     geohash_geojson = {"type": "FeatureCollection", "features": geojson_features}
     return geohash_geojson
@@ -709,18 +727,18 @@ def csv2geohash_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with Geohash column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with Geohash column")
     parser.add_argument("id", help="Name of the Geohash column (default: 'geohash')", default='geohash')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geohash_csv = args.csv
     geohash_id = args.id
 
     geohash_geojson = csv2geohash(geohash_csv, geohash_id)
     geojson_name = os.path.splitext(os.path.basename(geohash_csv))[0]
-    geojson_path = f"{geojson_name}2geohash.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2geohash", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(geohash_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(geohash_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 
 #################################################################################
@@ -777,18 +795,18 @@ def csv2georef_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with GEOREF column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with GEOREF column")
     parser.add_argument("id", help="Name of the GEOREF column (default: 'georef')", default='georef')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     georef_csv = args.csv
     georef_id = args.id
 
     georef_geojson = csv2georef(georef_csv, georef_id)
     geojson_name = os.path.splitext(os.path.basename(georef_csv))[0]
-    geojson_path = f"{geojson_name}2georef.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2georef", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(georef_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(georef_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
     
     
 #################################################################################
@@ -848,18 +866,18 @@ def csv2mgrs_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with mgrs column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with mgrs column")
     parser.add_argument("id", help="Name of the mgrs column (default: 'mgrs')", default='mgrs')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     mgrs_csv = args.csv
     mgrs_id = args.id
 
     mgrs_geojson = csv2mgrs(mgrs_csv, mgrs_id)
     geojson_name = os.path.splitext(os.path.basename(mgrs_csv))[0]
-    geojson_path = f"{geojson_name}2mgrs.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2mgrs", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(mgrs_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(mgrs_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 #################################################################################
 #  Tilecode
@@ -927,18 +945,18 @@ def csv2tilecode_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with tilecode column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with tilecode column")
     parser.add_argument("id", help="Name of the tilecode column (default: 'tilecode')", default='tilecode')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     tilecode_csv = args.csv
     tilecode_id = args.id
 
     tilecode_geojson = csv2tilecode(tilecode_csv, tilecode_id)
     geojson_name = os.path.splitext(os.path.basename(tilecode_csv))[0]
-    geojson_path = f"{geojson_name}2tilecode.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2tilecode", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(tilecode_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(tilecode_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 
 #################################################################################
@@ -1007,18 +1025,18 @@ def csv2quadkey_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with quadkey column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with quadkey column")
     parser.add_argument("id", help="Name of the quadkey column (default: 'quadkey')", default='quadkey')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     quadkey_csv = args.csv
     quadkey_id = args.id
 
     quadkey_geojson = csv2quadkey(quadkey_csv, quadkey_id)
     geojson_name = os.path.splitext(os.path.basename(quadkey_csv))[0]
-    geojson_path = f"{geojson_name}2quadkey.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2quadkey", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(quadkey_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(quadkey_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 
 #################################################################################
@@ -1077,18 +1095,18 @@ def csv2maidenhead_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with Maidenhead column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with Maidenhead column")
     parser.add_argument("id", help="Name of the Maidenhead column (default: 'maidenhead')", default='maidenhead')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     maidenhead_csv = args.csv
     maidenhead_id = args.id
 
     maidenhead_geojson = csv2maidenhead(maidenhead_csv, maidenhead_id)
     geojson_name = os.path.splitext(os.path.basename(maidenhead_csv))[0]
-    geojson_path = f"{geojson_name}2maidenhead.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2maidenhead", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(maidenhead_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
+    write_features(maidenhead_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
 
 
 #################################################################################
@@ -1154,15 +1172,15 @@ def csv2gars_cli():
     parser = argparse.ArgumentParser(description="Convert CSV with GARS column to GeoJSON")
     parser.add_argument("csv", help="Input CSV file with GARS column")
     parser.add_argument("id", help="Name of the GARS column (default: 'gars')", default='gars')
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     gars_csv = args.csv
     gars_id = args.id
 
     gars_geojson = csv2gars(gars_csv, gars_id)
     geojson_name = os.path.splitext(os.path.basename(gars_csv))[0]
-    geojson_path = f"{geojson_name}2gars.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2gars", args.format)
 
-    with open(geojson_path, "w") as f:
-        json.dump(gars_geojson, f)
-    
-    print(f"GeoJSON saved to {geojson_path}")
\ No newline at end of file
+    write_features(gars_geojson["features"], geojson_path, args.format)
+
+    print(f"Output saved to {geojson_path}")
\ No newline at end of file
@@ -3,8 +3,6 @@ from vgrid.utils.gars import garsgrid
 from vgrid.utils.qtm import constructGeometry, qtm_id_to_facet
 import h3
 
-from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
-from vgrid.utils.rhealpixdggs.utils import my_round
 from vgrid.utils.rhealpixdggs.ellipsoids import WGS84_ELLIPSOID
 import platform
 
@@ -29,7 +27,7 @@ from shapely.geometry import shape, Polygon,mapping
 
 import json, re,os,argparse
 from vgrid.generator.h3grid import fix_h3_antimeridian_cells
-from vgrid.generator.rhealpixgrid import fix_rhealpix_antimeridian_cells
+from vgrid.generator.rhealpixgrid import get_rhealpix_dggs, rhealpix_cell_to_polygon
 
 from vgrid.utils.antimeridian import fix_polygon
 
@@ -113,16 +111,9 @@ def s22geojson_cli():
     print(geojson_data)
 
 
-def rhealpix_cell_to_polygon(cell):
-    vertices = [tuple(my_round(coord, 14) for coord in vertex) for vertex in cell.vertices(plane=False)]
-    if vertices[0] != vertices[-1]:
-        vertices.append(vertices[0])
-    vertices = fix_rhealpix_antimeridian_cells(vertices)
-    return Polygon(vertices)
-
 def rhealpix2geojson(rhealpix_id):
     rhealpix_uids = (rhealpix_id[0],) + tuple(map(int, rhealpix_id[1:]))
-    rhealpix_dggs = RHEALPixDGGS(ellipsoid=E, north_square=1, south_square=3, N_side=3) 
+    rhealpix_dggs = get_rhealpix_dggs(north_square=1, south_square=3)
     rhealpix_cell = rhealpix_dggs.cell(rhealpix_uids)
     rhealpix_features = []
     if rhealpix_cell:
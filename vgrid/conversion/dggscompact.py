@@ -1,12 +1,12 @@
 from shapely.wkt import loads
 from shapely.geometry import Polygon,mapping
 import json, re,os,argparse
+import numpy as np
 
 from vgrid.utils import s2, olc, geohash,  mercantile, tilecode
 from vgrid.utils import qtm
 import h3
 
-from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
 from vgrid.utils.rhealpixdggs.ellipsoids import WGS84_ELLIPSOID
 import platform
 
@@ -24,15 +24,19 @@ if (platform.system() == 'Linux'):
 from vgrid.utils.easedggs.constants import levels_specs
 from vgrid.utils.easedggs.dggs.grid_addressing import grid_ids_to_geos
 
-from vgrid.generator.h3grid import fix_h3_antimeridian_cells
+from vgrid.generator.h3grid import h3_cell_to_feature
+from vgrid.utils.cellcache import cell_feature
+from vgrid.utils.prefixcompact import compact_prefix_ids
 
 from vgrid.utils.antimeridian import fix_polygon
 
-from vgrid.generator.settings import graticule_dggs_to_feature, geodesic_dggs_to_feature,isea3h_accuracy_res_dict
-from vgrid.conversion.dggs2geojson import rhealpix_cell_to_polygon
+from vgrid.generator.settings import graticule_dggs_to_feature, graticule_dggs_to_features, geodesic_dggs_to_feature, geodesic_dggs_to_features, chunked, isea3h_accuracy_res_dict
+from vgrid.generator.rhealpixgrid import get_rhealpix_dggs, rhealpix_cell_to_polygon
 from vgrid.utils.easedggs.dggs.hierarchy import _parent_to_children
 from vgrid.utils.easedggs.dggs.grid_addressing import grid_ids_to_geos
-from vgrid.generator.geohashgrid import geohash_to_polygon
+from vgrid.generator.geohashgrid import geohash_to_polygons
+from vgrid.generator.s2grid import s2_cells_to_polygons
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 from pyproj import Geod
 geod = Geod(ellps="WGS84")
@@ -62,17 +66,8 @@ def h3compact(geojson_data,h3_id=None):
     if h3_ids_compact:
         h3_features = [] 
         for h3_id_compact in tqdm(h3_ids_compact, desc="Compacting cells "):  
-            cell_boundary = h3.cell_to_boundary(h3_id_compact)   
-            if cell_boundary:
-                filtered_boundary = fix_h3_antimeridian_cells(cell_boundary)
-                # Reverse lat/lon to lon/lat for GeoJSON compatibility
-                reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
-                cell_polygon = Polygon(reversed_boundary)
-                cell_resolution = h3.get_resolution(h3_id_compact)
-                num_edges = 6
-                if (h3.is_pentagon(h3_id_compact)):
-                    num_edges = 5
-                h3_feature = geodesic_dggs_to_feature("h3",h3_id_compact,cell_resolution,cell_polygon,num_edges)   
+            h3_feature = cell_feature("h3", h3_id_compact, h3_cell_to_feature)
+            if h3_feature:
                 h3_features.append(h3_feature)
 
         return {
@@ -92,6 +87,8 @@ def h3compact_cli():
         '-cellid', '--cellid', type=str, help="H3 ID field"
     )
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     cellid = args.cellid
@@ -105,12 +102,11 @@ def h3compact_cli():
     
     geojson_features = h3compact(geojson_data, cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "h3_compacted.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("h3_compacted", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else: 
         print('H3 compact failed.')
 
@@ -136,17 +132,8 @@ def h3expand(geojson_data,resolution,h3_id=None):
     if h3_ids_expand:
         h3_features = [] 
         for h3_id_expand in tqdm(h3_ids_expand, desc="Expanding cells "):
-            cell_boundary = h3.cell_to_boundary(h3_id_expand)   
-            if cell_boundary:
-                filtered_boundary = fix_h3_antimeridian_cells(cell_boundary)
-                # Reverse lat/lon to lon/lat for GeoJSON compatibility
-                reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
-                cell_polygon = Polygon(reversed_boundary)
-                cell_resolution = resolution
-                num_edges = 6
-                if (h3.is_pentagon(h3_id_expand)):
-                    num_edges = 5
-                h3_feature = geodesic_dggs_to_feature("h3",h3_id_expand,cell_resolution,cell_polygon,num_edges)   
+            h3_feature = cell_feature("h3", h3_id_expand, h3_cell_to_feature)
+            if h3_feature:
                 h3_features.append(h3_feature)
 
         return {
@@ -168,6 +155,8 @@ def h3expand_cli():
         '-cellid', '--cellid', type=str, help="H3 ID field"
     )
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -186,62 +175,44 @@ def h3expand_cli():
     
     geojson_features = h3expand(geojson_data,resolution,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"h3_{resolution}_expanded.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path(f"h3_{resolution}_expanded", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else:
         print('H3 expand failed.')
         
 #################
 # S2
 #################
+def s2_features(s2_ids, desc):
+    """S2 features of uint64 cell ids of any level, rendering the tokens and polygons a chunk at a time."""
+    s2_features = []
+    num_edges = 4
+    for chunk in tqdm(list(chunked(s2_ids)), desc=desc):
+        chunk = np.asarray(chunk, dtype=np.uint64)
+        s2_tokens = s2.cell_ids_to_tokens(chunk).tolist()
+        cell_resolutions = s2.cell_levels(chunk).tolist()
+        s2_features.extend(geodesic_dggs_to_features("s2", s2_tokens, cell_resolutions, s2_cells_to_polygons(chunk), num_edges))
+    return s2_features
+
 def s2compact(geojson_data,s2_token=None):
     if not s2_token:
         s2_token = 's2'
-    s2_tokens_compact = []
     try:
         s2_tokens = [feature["properties"][s2_token] for feature in geojson_data.get("features", []) if s2_token in feature.get("properties", {})]
-        s2_ids = [s2.CellId.from_token(token) for token in s2_tokens]
-        s2_ids = list(set(s2_ids))
-        if not s2_ids:
+        if not s2_tokens:
             print(f"No S2 tokens found in <{s2_token}> field.")
             return
-        covering = s2.CellUnion(s2_ids)
-        covering.normalize()
-        s2_tokens_compact = [cell_id.to_token() for cell_id in covering.cell_ids()]
+        s2_ids_compact = s2.compact_cell_ids(s2.cell_ids_from_tokens(s2_tokens))
     except:
         raise Exception("Compact cells failed. Please check your S2 token field.") 
 
-    if s2_tokens_compact:
-        s2_features = [] 
-        for s2_token_compact in tqdm(s2_tokens_compact, desc="Compacting cells "):
-            s2_id_compact = s2.CellId.from_token(s2_token_compact)
-            s2_cell = s2.Cell(s2_id_compact)    
-            # Get the vertices of the cell (4 vertices for a rectangular cell)
-            vertices = [s2_cell.get_vertex(i) for i in range(4)]
-            # Prepare vertices in (longitude, latitude) format for Shapely
-            shapely_vertices = []
-            for vertex in vertices:
-                lat_lng = s2.LatLng.from_point(vertex)  # Convert Point to LatLng
-                longitude = lat_lng.lng().degrees  # Access longitude in degrees
-                latitude = lat_lng.lat().degrees   # Access latitude in degrees
-                shapely_vertices.append((longitude, latitude))
-
-            # Close the polygon by adding the first vertex again
-            shapely_vertices.append(shapely_vertices[0])  # Closing the polygon
-            # Create a Shapely Polygon
-            cell_polygon = fix_polygon(Polygon(shapely_vertices)) # Fix antimeridian
-            cell_resolution = s2_id_compact.level()
-            num_edges = 4
-            s2_feature = geodesic_dggs_to_feature("s2",s2_token_compact,cell_resolution,cell_polygon,num_edges)   
-            s2_features.append(s2_feature)
-
+    if len(s2_ids_compact):
         return {
             "type": "FeatureCollection",
-            "features": s2_features
+            "features": s2_features(s2_ids_compact, "Compacting cells ")
         }
         
 def s2compact_cli():
@@ -255,6 +226,7 @@ def s2compact_cli():
     parser.add_argument(
         '-cellid', '--cellid', type=str, required=True, help="S2 token field"
     )
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     cellid = args.cellid
@@ -268,73 +240,42 @@ def s2compact_cli():
     
     geojson_features = s2compact(geojson_data, cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "s2_compacted.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("s2_compacted", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else: 
         print('S2 compact failed.')
         
 def s2_expand(s2_ids, resolution):
-    uncopmpacted_cells = []
-    for s2_id in s2_ids:
-        if s2_id.level() >= resolution:
-            uncopmpacted_cells.append(s2_id)
-        else:
-            uncopmpacted_cells.extend(s2_id.children(resolution))  # Expand to the target level
-
-    return uncopmpacted_cells
+    """Expand uint64 cell ids to the target level, keeping the cells already at or below it."""
+    s2_ids = np.asarray(s2_ids, dtype=np.uint64)
+    finer = s2.cell_levels(s2_ids) >= resolution
+    return np.unique(np.concatenate([s2_ids[finer], s2.cell_id_children(s2_ids[~finer], resolution)]))
 
 def s2expand(geojson_data,resolution, s2_token=None):
     if not s2_token:
         s2_token = 's2'
-    s2_tokens_expand = []
     try:        
         s2_tokens = [feature["properties"][s2_token] for feature in geojson_data.get("features", []) if s2_token in feature.get("properties", {})]
-        s2_ids = [s2.CellId.from_token(token) for token in s2_tokens]
-        s2_ids = list(set(s2_ids))
-        if not s2_ids:
+        if not s2_tokens:
             print(f"No S2 tokens found in <{s2_token}> field.")
             return
+        s2_ids = np.unique(s2.cell_ids_from_tokens(s2_tokens))
         
-        max_res = max(s2_id.level() for s2_id in s2_ids)
+        max_res = int(s2.cell_levels(s2_ids).max())
         if resolution <= max_res:
             print(f"Target expand resolution ({resolution}) must > {max_res}.")
             return 
         s2_ids_expand = s2_expand(s2_ids, resolution)
-        s2_tokens_expand = [s2_id_expand.to_token() for s2_id_expand in s2_ids_expand]
     except:
         raise Exception("Expand cells failed. Please check your S2 token field.")
     
-    if s2_tokens_expand:        
-        s2_features = [] 
-        for s2_token_expand in tqdm(s2_tokens_expand, desc="Expanding cells "):
-            s2_id_expand = s2.CellId.from_token(s2_token_expand)
-            s2_cell_expand = s2.Cell(s2_id_expand)    
-            # Get the vertices of the cell (4 vertices for a rectangular cell)
-            vertices = [s2_cell_expand.get_vertex(i) for i in range(4)]
-            # Prepare vertices in (longitude, latitude) format for Shapely
-            shapely_vertices = []
-            for vertex in vertices:
-                lat_lng = s2.LatLng.from_point(vertex)  # Convert Point to LatLng
-                longitude = lat_lng.lng().degrees  # Access longitude in degrees
-                latitude = lat_lng.lat().degrees   # Access latitude in degrees
-                shapely_vertices.append((longitude, latitude))
-
-            # Close the polygon by adding the first vertex again
-            shapely_vertices.append(shapely_vertices[0])  # Closing the polygon
-            # Create a Shapely Polygon
-            cell_polygon = fix_polygon(Polygon(shapely_vertices)) # Fix antimeridian
-            cell_resolution = resolution
-            num_edges = 4
-            s2_feature = geodesic_dggs_to_feature("s2",s2_token_expand,cell_resolution,cell_polygon,num_edges)   
-            s2_features.append(s2_feature)
-
+    if len(s2_ids_expand):
         return {
             "type": "FeatureCollection",
-            "features": s2_features
+            "features": s2_features(s2_ids_expand, "Expanding cells ")
         }
         
 def s2expand_cli():
@@ -349,6 +290,7 @@ def s2expand_cli():
     parser.add_argument(
         '-cellid', '--cellid', type=str, help="S2 token field"
     )
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     cellid = args.cellid
@@ -368,12 +310,11 @@ def s2expand_cli():
     
     geojson_features = s2expand(geojson_data,resolution,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"s2_{resolution}_expanded.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path(f"s2_{resolution}_expanded", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else:
         print('S2 expand failed.')
         
@@ -382,42 +323,10 @@ def s2expand_cli():
 # rHEALPix
 #################
 def rhealpix_compact(rhealpix_dggs, rhealpix_ids):
-    rhealpix_ids = set(rhealpix_ids)  # Remove duplicates
-    
-    # Main loop for compaction
-    while True:
-        grouped_rhealpix_ids = defaultdict(set)
-        
-        # Group cells by their parent
-        for rhealpix_id in rhealpix_ids:
-            if len(rhealpix_id) > 1:  # Ensure there's a valid parent
-                parent = rhealpix_id[:-1]
-                grouped_rhealpix_ids[parent].add(rhealpix_id)
-        
-        new_rhealpix_ids = set(rhealpix_ids)
-        changed = False
-        
-        # Check if we can replace children with parent
-        for parent, children in grouped_rhealpix_ids.items():
-            parent_uids = (parent[0],) + tuple(map(int, parent[1:]))  # Assuming parent is a string like 'A0'
-            parent_cell = rhealpix_dggs.cell(parent_uids)  # Retrieve the parent cell object
-            
-            # Generate the subcells for the parent at the next resolution
-            subcells_at_next_res = set(str(subcell) for subcell in parent_cell.subcells())  # Collect subcells as strings
-            
-            # Check if the current children match the subcells at the next resolution
-            if children == subcells_at_next_res:
-                new_rhealpix_ids.difference_update(children)  # Remove children
-                new_rhealpix_ids.add(parent)  # Add the parent
-                changed = True  # A change occurred
-        
-        if not changed:
-            break  # Stop if no more compaction is possible
-        rhealpix_ids = new_rhealpix_ids  # Continue compacting
-    
-    return sorted(rhealpix_ids)  # Sorted for consistency
+    # A parent rHEALPix cell has N_side**2 children, each its ID plus one digit
+    return compact_prefix_ids(rhealpix_ids, rhealpix_dggs.N_side**2).tolist()
+
 
-       
 def rhealpixcompact(rhealpix_dggs,geojson_data,rhealpix_id=None):
     if not rhealpix_id:
         rhealpix_id = 'rhealpix'
@@ -463,7 +372,9 @@ def rhealpixcompact_cli():
         '-cellid', '--cellid', type=str, help="rHEALPix ID field"
     )
 
-    rhealpix_dggs = RHEALPixDGGS()
+    rhealpix_dggs = get_rhealpix_dggs()
+
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
 
     args = parser.parse_args()
     geojson = args.geojson
@@ -478,12 +389,11 @@ def rhealpixcompact_cli():
     
     geojson_features = rhealpixcompact(rhealpix_dggs,geojson_data,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "rhealpix_compacted.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("rhealpix_compacted", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else:
         print('rHEALPix compact failed.')
 
@@ -558,7 +468,9 @@ def rhealpixexpand_cli():
     parser.add_argument('-r', '--resolution', type=int, required=True, help="Resolution [0..15]")
     parser.add_argument('-cellid', '--cellid', type=str, help="rHEALPix ID field")
 
-    rhealpix_dggs = RHEALPixDGGS()
+    rhealpix_dggs = get_rhealpix_dggs()
+
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
 
     args = parser.parse_args()
     geojson = args.geojson
@@ -578,12 +490,11 @@ def rhealpixexpand_cli():
     
     geojson_features = rhealpixexpand(rhealpix_dggs,geojson_data,resolution,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"rhealpix_{resolution}_expanded.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path(f"rhealpix_{resolution}_expanded", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
    
     else:
         print('rHEALPix expand failed.')
@@ -692,6 +603,8 @@ def isea4tcompact_cli():
             '-cellid', '--cellid', type=str,  help="ISEA4T ID field"
         )
 
+        parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
         args = parser.parse_args()
         geojson = args.geojson
         cellid = args.cellid
@@ -705,12 +618,11 @@ def isea4tcompact_cli():
         
         geojson_features = isea4tcompact(isea4t_dggs,geojson_data,cellid)
         if geojson_features:
-            # Define the GeoJSON file path
-            geojson_path = "isea4t_compacted.geojson"
-            with open(geojson_path, 'w') as f:
-                json.dump(geojson_features, f, indent=2)
+            # Define the output file path
+            geojson_path = get_output_path("isea4t_compacted", args.format)
+            write_features(geojson_features["features"], geojson_path, args.format)
 
-            print(f"GeoJSON saved as {geojson_path}")
+            print(f"Output saved as {geojson_path}")
         else:
             print('ISEA4T compact failed.')
         
@@ -777,6 +689,8 @@ def isea4texpand_cli():
         parser.add_argument('-r', '--resolution', type=int, required=True, help="Resolution [0..25]")
         parser.add_argument('-cellid', '--cellid', type=str, help="ISEA4T ID field")
 
+        parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
         args = parser.parse_args()
         geojson = args.geojson
         resolution = args.resolution
@@ -796,12 +710,11 @@ def isea4texpand_cli():
         
         geojson_features = isea4texpand(isea4t_dggs,geojson_data,resolution,cellid)
         if geojson_features:
-            # Define the GeoJSON file path
-            geojson_path = f"isea4t_{resolution}_expanded.geojson"
-            with open(geojson_path, 'w') as f:
-                json.dump(geojson_features, f, indent=2)
+            # Define the output file path
+            geojson_path = get_output_path(f"isea4t_{resolution}_expanded", args.format)
+            write_features(geojson_features["features"], geojson_path, args.format)
 
-            print(f"GeoJSON saved as {geojson_path}")
+            print(f"Output saved as {geojson_path}")
         else:
             print('ISEA4T expand failed.')
 
@@ -1022,6 +935,8 @@ def isea3hcompact_cli():
             '-cellid', '--cellid', type=str, help="ISEA3H ID field"
         )
 
+        parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
         args = parser.parse_args()
         geojson = args.geojson
         celiid = args.cellid
@@ -1035,12 +950,11 @@ def isea3hcompact_cli():
         
         geojson_features = isea3hcompact(isea3h_dggs,geojson_data,celiid)
         if geojson_features:
-            # Define the GeoJSON file path
-            geojson_path = "isea3h_compacted.geojson"
-            with open(geojson_path, 'w') as f:
-                json.dump(geojson_features, f, indent=2)
+            # Define the output file path
+            geojson_path = get_output_path("isea3h_compacted", args.format)
+            write_features(geojson_features["features"], geojson_path, args.format)
 
-            print(f"GeoJSON saved as {geojson_path}")
+            print(f"Output saved as {geojson_path}")
         else:
             print('ISEA3H compact failed.')
         
@@ -1147,6 +1061,8 @@ def isea3hexpand_cli():
         parser.add_argument('-r', '--resolution', type=int, required=True, help="Resolution [0..32]")
         parser.add_argument('-cellid', '--cellid', type=str, help="ISEA3H ID field")
 
+        parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
         args = parser.parse_args()
         geojson = args.geojson
         resolution = args.resolution
@@ -1166,12 +1082,11 @@ def isea3hexpand_cli():
         
         geojson_features = isea3hexpand(isea3h_dggs,geojson_data,resolution,cellid)
         if geojson_features:
-            # Define the GeoJSON file path
-            geojson_path = f"isea3h_{resolution}_expanded.geojson"
-            with open(geojson_path, 'w') as f:
-                json.dump(geojson_features, f, indent=2)
+            # Define the output file path
+            geojson_path = get_output_path(f"isea3h_{resolution}_expanded", args.format)
+            write_features(geojson_features["features"], geojson_path, args.format)
 
-            print(f"GeoJSON saved as {geojson_path}")
+            print(f"Output saved as {geojson_path}")
         else:
             print('ISEA3H expand failed.')
 
@@ -1287,6 +1202,8 @@ def easecompact_cli():
         '-cellid', '--cellid', type=str, help="EASE ID field"
     )
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     cellid = args.cellid
@@ -1300,12 +1217,11 @@ def easecompact_cli():
     
     geojson_features = easecompact(geojson_data,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "ease_compacted.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("ease_compacted", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}") 
+        print(f"Output saved as {geojson_path}") 
     else:
         print('EASE compact failed.')
         
@@ -1385,6 +1301,8 @@ def easeexpand_cli():
     parser.add_argument('-r', '--resolution', type=int, required=True, help="Resolution [0..6]")
     parser.add_argument('-cellid', '--cellid', type=str, help="EASE ID field")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -1404,12 +1322,11 @@ def easeexpand_cli():
     
     geojson_features = easeexpand(geojson_data,resolution,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "ease_expanded.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("ease_expanded", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}") 
+        print(f"Output saved as {geojson_path}") 
     else:
         print('EASE expand failed.')
         
@@ -1417,35 +1334,17 @@ def easeexpand_cli():
 # QTM
 #################
 def qtm_compact(qtm_ids):
-    qtm_ids = set(qtm_ids)  # Remove duplicates
-    # Main loop for compaction
-    while True:
-        grouped_qtm_ids = defaultdict(set)        
-        # Group cells by their parent
-        for qtm_id in qtm_ids:
-            parent = qtm.qtm_parent(qtm_id)
-            grouped_qtm_ids[parent].add(qtm_id)
-
-        new_qtm_ids = set(qtm_ids)
-        changed = False
-
-        # Check if we can replace children with parent
-        for parent, children in grouped_qtm_ids.items():
-            next_resolution = len(parent)+1          
-            # Generate the subcells for the parent at the next resolution
-            childcells_at_next_res = set(childcell for childcell in qtm.qtm_children(parent,next_resolution)) 
-            
-            # Check if the current children match the subcells at the next resolution
-            if children == childcells_at_next_res:
-                new_qtm_ids.difference_update(children)  # Remove children
-                new_qtm_ids.add(parent)  # Add the parent
-                changed = True  # A change occurred
-        
-        if not changed:
-            break  # Stop if no more compaction is possible
-        qtm_ids = new_qtm_ids  # Continue compacting
-    
-    return sorted(qtm_ids)  # Sorted for consistency
+    return qtm.compact_qtm_ids(qtm_ids).tolist()
+
+def qtm_features(qtm_ids, desc):
+    """QTM features of QTM IDs of any resolution, decoding the facets a chunk at a time."""
+    qtm_features = []
+    num_edges = 3
+    for chunk in tqdm(list(chunked(qtm_ids)), desc=desc):
+        facet_vertices, _ = qtm.qtm_ids_to_facets(chunk)
+        cell_resolutions = [len(qtm_id) for qtm_id in chunk]
+        qtm_features.extend(geodesic_dggs_to_features("qtm", chunk, cell_resolutions, qtm.facet_polygons(facet_vertices), num_edges))
+    return qtm_features
 
 def qtmcompact(geojson_data, qtm_id=None):
     if not qtm_id:
@@ -1460,19 +1359,9 @@ def qtmcompact(geojson_data, qtm_id=None):
         raise Exception("Compact cells failed. Please check your QTM ID field.") 
         
     if qtm_ids_compact:
-        qtm_features = [] 
-        for qtm_id_compact in tqdm(qtm_ids_compact, desc="Compacting cells "):  
-            facet = qtm.qtm_id_to_facet(qtm_id_compact)
-            cell_polygon = qtm.constructGeometry(facet)    
-            cell_resolution = len(qtm_id_compact)
-            num_edges = 3
-
-            qtm_feature = geodesic_dggs_to_feature("qtm",qtm_id_compact,cell_resolution,cell_polygon,num_edges)  
-            qtm_features.append(qtm_feature)
-
         return {
             "type": "FeatureCollection",
-            "features": qtm_features
+            "features": qtm_features(qtm_ids_compact, "Compacting cells ")
         }
     
 def qtmcompact_cli():
@@ -1487,6 +1376,8 @@ def qtmcompact_cli():
         '-cellid', '--cellid', type=str, help="QTM ID field"
     )
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     cellid = args.cellid
@@ -1500,23 +1391,25 @@ def qtmcompact_cli():
     
     geojson_features = qtmcompact(geojson_data, cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "qtm_compacted.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("qtm_compacted", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else:
         print('QTM compact failed.')
         
 def qtm_expand(qtm_ids, resolution):
     expand_cells = []
-    for qtm_id in qtm_ids: 
-        cell_resolution = len(qtm_id)
+    packed = qtm.pack_qtm_ids(qtm_ids)
+    resolutions = qtm.packed_qtm_resolution(packed)
+    for qtm_id, cell_resolution in zip(qtm_ids, resolutions.tolist()):
         if cell_resolution >= resolution:
             expand_cells.append(qtm_id)
-        else:
-            expand_cells.extend(qtm.qtm_children(qtm_id,resolution))  # Expand to the target level
+    # Expand each resolution to the target level at once
+    for cell_resolution in np.unique(resolutions[resolutions < resolution]).tolist():
+        children = qtm.packed_qtm_children(packed[resolutions == cell_resolution], resolution)
+        expand_cells.extend(qtm.unpack_qtm_ids(children.ravel()).tolist())
     return expand_cells
 
 def qtmexpand(geojson_data,resolution, qtm_id=None):
@@ -1539,18 +1432,9 @@ def qtmexpand(geojson_data,resolution, qtm_id=None):
         raise Exception("Expand cells failed. Please check your QTM ID field.") 
         
     if qtm_ids_expand:
-        qtm_features = [] 
-        for qtm_id_expand in tqdm(qtm_ids_expand, desc="Expanding cells "):
-            facet = qtm.qtm_id_to_facet(qtm_id_expand)
-            cell_polygon = qtm.constructGeometry(facet)    
-            cell_resolution = len(qtm_id_expand)
-            num_edges = 3
-            qtm_feature = geodesic_dggs_to_feature("qtm",qtm_id_expand,cell_resolution,cell_polygon,num_edges)  
-            qtm_features.append(qtm_feature)
-
         return {
             "type": "FeatureCollection",
-            "features": qtm_features
+            "features": qtm_features(qtm_ids_expand, "Expanding cells ")
         }
         
     
@@ -1565,6 +1449,8 @@ def qtmexpand_cli():
     parser.add_argument('-r', '--resolution', type=int, required=True, help="Resolution [1..24]")
     parser.add_argument('-cellid', '--cellid', type=str,  help="QTM ID field")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -1583,12 +1469,11 @@ def qtmexpand_cli():
     
     geojson_features = qtmexpand(geojson_data,resolution,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"qtm_{resolution}_expanded.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path(f"qtm_{resolution}_expanded", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else:
         print('QTM expand failed.')
 
@@ -1682,6 +1567,8 @@ def olccompact_cli():
         '-cellid', '--cellid', type=str, help="OLC Token field"
     )
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     cellid = args.cellid
@@ -1695,12 +1582,11 @@ def olccompact_cli():
     
     geojson_features = olccompact(geojson_data,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "olc_compacted.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("olc_compacted", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else:
         print('OLC compact failed.')
         
@@ -1772,6 +1658,8 @@ def olcexpand_cli():
         '-cellid', '--cellid', type=str, help="OLC Token field"
     )
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -1790,12 +1678,11 @@ def olcexpand_cli():
     
     geojson_features = olcexpand(geojson_data,resolution,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"olc_{resolution}_expanded.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path(f"olc_{resolution}_expanded", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else:
         print('OLC expand failed.')
 
@@ -1804,37 +1691,17 @@ def olcexpand_cli():
 # Geohash
 #################
 def geohash_compact(geohash_ids):
-    geohash_ids = set(geohash_ids)  # Remove duplicates
-    # Main loop for compaction
-    while True:
-        grouped_geohash_ids = defaultdict(set)        
-        # Group cells by their parent
-        for geohash_id in geohash_ids:
-            parent = geohash.geohash_parent(geohash_id)
-            grouped_geohash_ids[parent].add(geohash_id)
+    # A parent geohash has 32 children, each its ID plus one base32 character
+    return compact_prefix_ids(geohash_ids, 32).tolist()
 
-        new_geohash_ids = set(geohash_ids)
-        changed = False
-
-
-        # Check if we can replace children with parent
-        for parent, children in grouped_geohash_ids.items():
-            parent_resolution =  len(parent)
-            # Generate the subcells for the parent at the next resolution
-            childcells_at_next_res = set(childcell for childcell in geohash.geohash_children(parent,parent_resolution+1)) 
-            
-            # Check if the current children match the subcells at the next resolution
-            if children == childcells_at_next_res:
-                new_geohash_ids.difference_update(children)  # Remove children
-                new_geohash_ids.add(parent)  # Add the parent
-                changed = True  # A change occurred
-        
-        if not changed:
-            break  # Stop if no more compaction is possible
-        geohash_ids = new_geohash_ids  # Continue compacting
-    
-    return sorted(geohash_ids)  # Sorted for consistency
 
+def geohash_features(geohash_ids, desc):
+    """Geohash features of geohashes of any resolution, decoding the polygons a chunk at a time."""
+    geohash_features = []
+    for chunk in tqdm(list(chunked(geohash_ids)), desc=desc):
+        cell_resolutions = [len(geohash_id) for geohash_id in chunk]
+        geohash_features.extend(graticule_dggs_to_features("geohash", chunk, cell_resolutions, geohash_to_polygons(chunk)))
+    return geohash_features
 
 def geohashcompact(geojson_data,geohash_id=None):
     if not geohash_id:
@@ -1849,16 +1716,9 @@ def geohashcompact(geojson_data,geohash_id=None):
         raise Exception("Compact cells failed. Please check your Geohash ID field.") 
         
     if geohash_ids_compact:
-        geohash_features = [] 
-        for geohash_id_compact in tqdm(geohash_ids_compact, desc="Compacting cells "):  
-            cell_polygon = geohash_to_polygon(geohash_id_compact)
-            cell_resolution =  len(geohash_id_compact)
-            geohash_feature = graticule_dggs_to_feature("geohash",geohash_id_compact,cell_resolution,cell_polygon)   
-            geohash_features.append(geohash_feature)
-
         return {
             "type": "FeatureCollection",
-            "features": geohash_features
+            "features": geohash_features(geohash_ids_compact, "Compacting cells ")
         }
         
 def geohashcompact_cli():
@@ -1873,6 +1733,8 @@ def geohashcompact_cli():
         '-cellid', '--cellid', type=str, help="Geohash cell ID"
     )
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     cellid = args.cellid
@@ -1886,12 +1748,11 @@ def geohashcompact_cli():
     
     geojson_features = geohashcompact(geojson_data, cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "geohash_compacted.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("geohash_compacted", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     
     else:
         print('Geohash compact failed.')
@@ -1927,16 +1788,9 @@ def geohashexpand(geojson_data,resolution,geohash_id=None):
         raise Exception("Expand cells failed. Please check your Geohash ID field.") 
     
     if geohash_ids_expand:
-        geohash_features = [] 
-        for geohash_id_expand in tqdm(geohash_ids_expand, desc="Expanding cells "):
-            cell_polygon = geohash_to_polygon(geohash_id_expand)
-            cell_resolution =  len(geohash_id_expand)
-            geohash_feature = graticule_dggs_to_feature("geohash",geohash_id_expand,cell_resolution,cell_polygon)   
-            geohash_features.append(geohash_feature)
-
         return {
             "type": "FeatureCollection",
-            "features": geohash_features
+            "features": geohash_features(geohash_ids_expand, "Expanding cells ")
         }
         
     
@@ -1951,6 +1805,8 @@ def geohashexpand_cli():
     parser.add_argument('-r', '--resolution', type=int, required=True, help="Resolution [1..10]")
     parser.add_argument('-cellid', '--cellid', type=str, help="Geohash ID field")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -1969,12 +1825,11 @@ def geohashexpand_cli():
     
     geojson_features = geohashexpand(geojson_data,resolution,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"geohash_{resolution}_expanded.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path(f"geohash_{resolution}_expanded", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     
     else:
         print('Geohash expand failed.')
@@ -2077,6 +1932,8 @@ def tilecodecompact_cli():
         '-cellid', '--cellid', type=str,  help="Tilecode ID field"
     )
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     cellid = args.cellid
@@ -2090,12 +1947,11 @@ def tilecodecompact_cli():
     
     geojson_features = tilecodecompact(geojson_data,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "tilecode_compacted.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("tilecode_compacted", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     
     else:
         print('Tilecode compact failed.')
@@ -2176,6 +2032,7 @@ def tilecodeexpand_cli():
     parser.add_argument(
         '-cellid', '--cellid', type=str, help="Tilecode ID field"
     )
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -2194,12 +2051,11 @@ def tilecodeexpand_cli():
     
     geojson_features = tilecodeexpand(geojson_data,resolution,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"tilecode_{resolution}_expanded.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path(f"tilecode_{resolution}_expanded", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     
     else:
         print('Tilecode expand failed.')
@@ -2208,39 +2064,8 @@ def tilecodeexpand_cli():
 # Quadkey
 #################
 def quadkey_compact(quadkey_ids):
-    quadkey_ids = set(quadkey_ids)  # Remove duplicates
-    
-    # Main loop for compaction
-    while True:
-        grouped_quadkey_ids = defaultdict(set)
-        
-        # Group cells by their parent
-        for quadkey_id in quadkey_ids:
-            parent = tilecode.quadkey_parent(quadkey_id)
-            grouped_quadkey_ids[parent].add(quadkey_id)
-
-        new_quadkey_ids = set(quadkey_ids)
-        changed = False
-
-
-        # Check if we can replace children with parent
-        for parent, children in grouped_quadkey_ids.items():
-            parent_resolution = mercantile.quadkey_to_tile(parent).z
-
-            # Generate the subcells for the parent at the next resolution
-            childcells_at_next_res = set(childcell for childcell in tilecode.quadkey_children(parent,parent_resolution+1)) 
-            
-            # Check if the current children match the subcells at the next resolution
-            if children == childcells_at_next_res:
-                new_quadkey_ids.difference_update(children)  # Remove children
-                new_quadkey_ids.add(parent)  # Add the parent
-                changed = True  # A change occurred
-        
-        if not changed:
-            break  # Stop if no more compaction is possible
-        quadkey_ids = new_quadkey_ids  # Continue compacting
-    
-    return sorted(quadkey_ids)  # Sorted for consistency
+    # A parent quadkey has 4 children, each its ID plus one of 0-3
+    return compact_prefix_ids(quadkey_ids, 4).tolist()
 
 
 def quadkeycompact(geojson_data,quadkey_id=None):
@@ -2298,6 +2123,8 @@ def quadkeycompact_cli():
         '-cellid', '--cellid', type=str, help="Quadkey ID field"
     )
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     cellid = args.cellid
@@ -2311,12 +2138,11 @@ def quadkeycompact_cli():
     
     geojson_features = quadkeycompact(geojson_data,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = "quadkey_compacted.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path("quadkey_compacted", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else:
         print('Quadkey compact failed.')
         
@@ -2392,6 +2218,8 @@ def quadkeyexpand_cli():
     )
     parser.add_argument('-cellid', '--cellid', type=str, help="Quadkey ID field")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
+
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -2410,11 +2238,10 @@ def quadkeyexpand_cli():
     
     geojson_features = quadkeyexpand(geojson_data,resolution,cellid)
     if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"quadkey_{resolution}_expanded.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        # Define the output file path
+        geojson_path = get_output_path(f"quadkey_{resolution}_expanded", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     else:
         print('Quadkey expand failed.')
\ No newline at end of file
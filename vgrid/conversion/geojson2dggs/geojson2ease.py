@@ -5,6 +5,7 @@ from vgrid.generator.settings import geodesic_dggs_to_feature
 from vgrid.utils.easedggs.constants import grid_spec, ease_crs, geo_crs, levels_specs
 from vgrid.utils.easedggs.dggs.grid_addressing import grid_ids_to_geos, geos_to_grid_ids, geo_polygon_to_grid_ids
 from vgrid.conversion.dggscompact import ease_compact
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 def point_to_grid(resolution, point, feature_properties):
     """
@@ -201,6 +202,7 @@ def geojson2ease_cli():
     )
     parser.add_argument('-compact', action='store_true', help="Enable EASE compact mode")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -219,14 +221,13 @@ def geojson2ease_cli():
         
         # Save the result
         geojson_name = os.path.splitext(os.path.basename(geojson))[0]
-        geojson_path = f"{geojson_name}2ease_{resolution}.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2ease_{resolution}", args.format)
         if compact:        
-            geojson_path = f"{geojson_name}2ease_{resolution}_compacted.geojson"
+            geojson_path = get_output_path(f"{geojson_name}2ease_{resolution}_compacted", args.format)
             
-        with open(geojson_path, 'w') as f:
-            json.dump(result, f)
+        write_features(result["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
         
     except ValueError as e:
         print(f"Error: {str(e)}")
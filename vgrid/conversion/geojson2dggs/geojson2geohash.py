@@ -5,8 +5,9 @@ import json
 from tqdm import tqdm
 import os
 from vgrid.generator.settings import graticule_dggs_to_feature
-from vgrid.generator.geohashgrid import initial_geohashes, geohash_to_polygon, expand_geohash_bbox
+from vgrid.generator.geohashgrid import geohash_cover, iter_int_features, sorted_int_chunks
 from vgrid.conversion.dggscompact import geohashcompact
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 # Function to generate grid for Point
 def point_to_grid(resolution, point, feature_properties):  
@@ -45,18 +46,10 @@ def poly_to_grid(resolution, geometry,feature_properties,compact):
         polys = list(geometry)
 
     for poly in polys: 
-        intersected_geohashes = {gh for gh in initial_geohashes if geohash_to_polygon(gh).intersects(poly)}
-        # Expand geohash bounding box
-        geohashes_bbox = set()
-        for gh in intersected_geohashes:
-            expand_geohash_bbox(gh, resolution, geohashes_bbox, poly)
-
-        # Process geohashes
-        for gh in geohashes_bbox:
-            cell_polygon = geohash_to_polygon(gh)
-            geohash_feature = graticule_dggs_to_feature("geohash",gh,resolution,cell_polygon)         
+        # Cells intersecting the geometry, testing only the cells on its boundary
+        geohash_ints = geohash_cover(poly, resolution)
+        for geohash_feature in iter_int_features(sorted_int_chunks(geohash_ints), resolution):
             geohash_feature["properties"].update(feature_properties)
-
             geohash_features.append(geohash_feature)
 
     geohash_geosjon = {
@@ -145,6 +138,7 @@ def geojson2geohash_cli():
     )
     parser.add_argument('-compact', action='store_true', help="Enable Geohash compact mode")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -169,14 +163,13 @@ def geojson2geohash_cli():
 
     # Save the results to GeoJSON
     geojson_name = os.path.splitext(os.path.basename(geojson))[0]
-    geojson_path = f"{geojson_name}2geohash_{resolution}.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2geohash_{resolution}", args.format)
     if compact:   
-        geojson_path = f"{geojson_name}2geohash_{resolution}_compacted.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2geohash_{resolution}_compacted", args.format)
     
-    with open(geojson_path, 'w') as f:
-        json.dump(result, f)
+    write_features(result["features"], geojson_path, args.format)
 
-    print(f"GeoJSON saved as {geojson_path}")
+    print(f"Output saved as {geojson_path}")
 
     
 if __name__ == "__main__":
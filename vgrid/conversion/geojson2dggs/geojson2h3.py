@@ -2,9 +2,10 @@ import os, argparse, json
 from tqdm import tqdm
 from shapely.geometry import Point, LineString, Polygon, mapping, box
 import h3
-from vgrid.generator.h3grid import fix_h3_antimeridian_cells
-from vgrid.generator.settings import geodesic_dggs_to_feature
+from vgrid.generator.h3grid import h3_cell_to_polygon, h3_cell_to_feature
+from vgrid.utils.cellcache import cell_feature
 from pyproj import Geod
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 geod = Geod(ellps="WGS84")
 
 # Function to generate grid for Point
@@ -14,21 +15,11 @@ def point_to_grid(resolution, point,feature_properties):
     latitude = point.y
     longitude = point.x
     h3_id = h3.latlng_to_cell(latitude, longitude, resolution)
-    
-    cell_boundary = h3.cell_to_boundary(h3_id)     
-    # Wrap and filter the boundary
-    filtered_boundary = fix_h3_antimeridian_cells(cell_boundary)
-    # Reverse lat/lon to lon/lat for GeoJSON compatibility
-    reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
-    cell_polygon = Polygon(reversed_boundary)
-    if cell_polygon:
-        num_edges = 6       
-        if (h3.is_pentagon(h3_id)):
-            num_edges = 5           
-        h3_feature = geodesic_dggs_to_feature("h3",h3_id,resolution,cell_polygon,num_edges)   
+    h3_feature = cell_feature("h3", h3_id, h3_cell_to_feature)
+    if h3_feature:
         h3_feature["properties"].update(feature_properties)
-        h3_features.append(h3_feature)    
-    
+        h3_features.append(h3_feature)
+
     return {
         "type": "FeatureCollection",
         "features": h3_features,
@@ -65,19 +56,13 @@ def poly_to_grid(resolution, geometry,feature_properties, compact= None):
             bbox_buffer_cells = h3.compact_cells(bbox_buffer_cells)
             
         for bbox_buffer_cell in bbox_buffer_cells:
-            cell_boundary = h3.cell_to_boundary(bbox_buffer_cell)
-            filtered_boundary = fix_h3_antimeridian_cells(cell_boundary)
-            reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
-            cell_polygon = Polygon(reversed_boundary)
+            cell_polygon = h3_cell_to_polygon(bbox_buffer_cell)
             if cell_polygon.intersects(poly):
-                cell_resolution = h3.get_resolution(bbox_buffer_cell)   
-                num_edges = 6       
-                if (h3.is_pentagon(bbox_buffer_cell)):
-                    num_edges = 5           
-                h3_feature = geodesic_dggs_to_feature("h3",bbox_buffer_cell,cell_resolution,cell_polygon,num_edges)   
-                h3_feature["properties"].update(feature_properties)
-                h3_features.append(h3_feature)               
-          
+                h3_feature = cell_feature("h3", bbox_buffer_cell, h3_cell_to_feature)
+                if h3_feature:
+                    h3_feature["properties"].update(feature_properties)
+                    h3_features.append(h3_feature)
+
     return {
         "type": "FeatureCollection",
         "features": h3_features,
@@ -162,6 +147,7 @@ def geojson2h3_cli():
     )
     parser.add_argument('-compact', action='store_true', help="Enable H3 compact mode - for polygon only")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -178,14 +164,13 @@ def geojson2h3_cli():
         result = geojson2h3(geojson_data, resolution, compact)
         
         geojson_name = os.path.splitext(os.path.basename(geojson))[0]
-        geojson_path = f"{geojson_name}2h3_{resolution}.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2h3_{resolution}", args.format)
         if compact:
-            geojson_path = f"{geojson_name}2h3_{resolution}_compacted.geojson"
+            geojson_path = get_output_path(f"{geojson_name}2h3_{resolution}_compacted", args.format)
         
-        with open(geojson_path, 'w') as f:
-            json.dump(result, f)
+        write_features(result["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     except ValueError as e:
         print(f"Error: {str(e)}")
         
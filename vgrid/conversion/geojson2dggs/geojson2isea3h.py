@@ -16,6 +16,7 @@ if (platform.system() == 'Windows'):
 from pyproj import Geod
 geod = Geod(ellps="WGS84")
 from shapely.geometry import Polygon,mapping
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 
 # Function to generate grid for Point
@@ -161,6 +162,7 @@ def geojson2isea3h_cli():
     )
     parser.add_argument('-compact', action='store_true', help="Enable ISEA3H compact mode")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     
     if not os.path.exists(args.geojson):
@@ -174,14 +176,13 @@ def geojson2isea3h_cli():
         result = geojson2isea3h(geojson_data, args.resolution, args.compact)
         
         geojson_name = os.path.splitext(os.path.basename(args.geojson))[0]
-        geojson_path = f"{geojson_name}2isea3h_{args.resolution}.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2isea3h_{args.resolution}", args.format)
         if args.compact:
-            geojson_path = f"{geojson_name}2isea3h_{args.resolution}_compacted.geojson"
+            geojson_path = get_output_path(f"{geojson_name}2isea3h_{args.resolution}_compacted", args.format)
 
-        with open(geojson_path, 'w') as f:
-            json.dump(result, f, indent=2)
+        write_features(result["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
         
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -3,6 +3,7 @@ from tqdm import tqdm
 from shapely.geometry import box, Polygon, Point, LineString
 from vgrid.generator.settings import geodesic_dggs_to_feature
 import platform
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 if (platform.system() == 'Windows'):
     from vgrid.utils.eaggr.eaggr import Eaggr
@@ -167,6 +168,7 @@ def geojson2isea4t_cli():
         print("Error: ISEA4T DGGS conversion is only supported on Windows")
         return
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -183,14 +185,13 @@ def geojson2isea4t_cli():
         result = geojson2isea4t(geojson_data, resolution, compact)
         
         geojson_name = os.path.splitext(os.path.basename(geojson))[0]
-        geojson_path = f"{geojson_name}2isea4t_{resolution}.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2isea4t_{resolution}", args.format)
         if compact:
-            geojson_path = f"{geojson_name}2isea4t_{resolution}_compacted.geojson"
+            geojson_path = get_output_path(f"{geojson_name}2isea4t_{resolution}_compacted", args.format)
     
-        with open(geojson_path, 'w') as f:
-            json.dump(result, f, indent=2)
+        write_features(result["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
         
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -8,6 +8,7 @@ from vgrid.generator.settings import graticule_dggs_to_feature
 from vgrid.conversion.latlon2dggs import latlon2mgrs
 from vgrid.utils import mgrs
 from vgrid.conversion.dggs2geojson import mgrs2geojson
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 def point_to_grid(resolution, point, feature_properties):  
     mgrs_features = []
@@ -109,6 +110,7 @@ def geojson2mgrs_cli():
     parser.add_argument(
         '-geojson', '--geojson', type=str, required=True, help="GeoJSON file path (Point, Polyline or Polygon)"
     )
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -129,11 +131,10 @@ def geojson2mgrs_cli():
         
         # Save the results to GeoJSON
         geojson_name = os.path.splitext(os.path.basename(geojson))[0]
-        geojson_path = f"{geojson_name}2mgrs_{resolution}.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(result, f, indent=2)
+        geojson_path = get_output_path(f"{geojson_name}2mgrs_{resolution}", args.format)
+        write_features(result["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     except ValueError as e:
         print(f"Error: {e}")
         return
@@ -5,6 +5,7 @@ from vgrid.utils import olc
 from vgrid.generator.olcgrid import generate_grid,refine_cell
 from vgrid.generator.settings import graticule_dggs_to_feature
 from vgrid.conversion.dggscompact import olccompact
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 # Function to generate grid for Point
 def point_to_grid(resolution, point,feature_properties):    
@@ -169,6 +170,7 @@ def geojson2olc_cli():
     )
     parser.add_argument('-compact', action='store_true', help="Enable Tilecode compact mode")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -184,14 +186,13 @@ def geojson2olc_cli():
     result = geojson2olc(geojson_data, resolution, compact)
 
     geojson_name = os.path.splitext(os.path.basename(geojson))[0]
-    geojson_path = f"{geojson_name}2olc_{resolution}.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2olc_{resolution}", args.format)
     if compact:
-        geojson_path = f"{geojson_name}2olc_{resolution}_compacted.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2olc_{resolution}_compacted", args.format)
     
-    with open(geojson_path, 'w') as f:
-        json.dump(result, f, indent=2)
+    write_features(result["features"], geojson_path, args.format)
 
-    print(f"GeoJSON saved as {geojson_path}")
+    print(f"Output saved as {geojson_path}")
 
 if __name__ == "__main__":
     geojson2olc_cli()
\ No newline at end of file
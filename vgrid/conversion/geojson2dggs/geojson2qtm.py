@@ -3,12 +3,8 @@ import argparse
 import os, json
 from tqdm import tqdm
 from vgrid.utils import qtm
-from vgrid.generator.settings import geodesic_dggs_to_feature
-from vgrid.conversion.dggscompact import qtmcompact
-
-p90_n180, p90_n90, p90_p0, p90_p90, p90_p180 = (90.0, -180.0), (90.0, -90.0), (90.0, 0.0), (90.0, 90.0), (90.0, 180.0)
-p0_n180, p0_n90, p0_p0, p0_p90, p0_p180 = (0.0, -180.0), (0.0, -90.0), (0.0, 0.0), (0.0, 90.0), (0.0, 180.0)
-n90_n180, n90_n90, n90_p0, n90_p90, n90_p180 = (-90.0, -180.0), (-90.0, -90.0), (-90.0, 0.0), (-90.0, 90.0), (-90.0, 180.0)
+from vgrid.generator.settings import geodesic_dggs_to_feature, geodesic_dggs_to_features, chunked
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 # Function to generate grid for Point
 def point_to_grid(resolution, point, feature_properties):
@@ -32,74 +28,22 @@ def point_to_grid(resolution, point, feature_properties):
 
 
 def poly_to_grid(resolution, geometry, feature_properties,compact=None):    
-    if geometry.geom_type == 'LineString' or geometry.geom_type == 'Polygon':
-        polys = [geometry]
-    elif geometry.geom_type == 'MultiLineString' or geometry.geom_type == 'MultiPolygon':
-        polys = list(geometry)
-
-    for poly in polys:
-        levelFacets = {}
-        QTMID = {}
-        qtm_features = []    
-        for lvl in range(resolution):
-            levelFacets[lvl] = []
-            QTMID[lvl] = []
-
-            if lvl == 0:
-                initial_facets = [
-                    [p0_n180, p0_n90, p90_n90, p90_n180, p0_n180, True],
-                    [p0_n90, p0_p0, p90_p0, p90_n90, p0_n90, True],
-                    [p0_p0, p0_p90, p90_p90, p90_p0, p0_p0, True],
-                    [p0_p90, p0_p180, p90_p180, p90_p90, p0_p90, True],
-                    [n90_n180, n90_n90, p0_n90, p0_n180, n90_n180, False],
-                    [n90_n90, n90_p0, p0_p0, p0_n90, n90_n90, False],
-                    [n90_p0, n90_p90, p0_p90, p0_p0, n90_p0, False],
-                    [n90_p90, n90_p180, p0_p180, p0_p90, n90_p90, False],
-                ]
-
-                for i, facet in enumerate(initial_facets):
-                    QTMID[0].append(str(i + 1))
-                    levelFacets[0].append(facet)
-                    facet_geom = qtm.constructGeometry(facet)                  
-
-                    if shape(facet_geom).intersects(poly) and resolution == 1 :
-                        qtm_id = QTMID[0][i]
-                        num_edges = 3
-                        qtm_feature = geodesic_dggs_to_feature("qtm",qtm_id,resolution,facet_geom,num_edges)   
-                        qtm_feature["properties"].update(feature_properties)
-                        qtm_features.append(qtm_feature)
-
-                        return {
-                            "type": "FeatureCollection",
-                            "features": qtm_features
-                        }                       
-            else:
-                for i, pf in enumerate(levelFacets[lvl - 1]):
-                    subdivided_facets = qtm.divideFacet(pf)
-                    for j, subfacet in enumerate(subdivided_facets):
-                        subfacet_geom = qtm.constructGeometry(subfacet)
-                        if shape(subfacet_geom).intersects(poly):  # Only keep intersecting facets
-                            new_id = QTMID[lvl - 1][i] + str(j)
-                            QTMID[lvl].append(new_id)
-                            levelFacets[lvl].append(subfacet)
-                            if lvl == resolution - 1:  # Only store final resolution in GeoJSON
-                                num_edges = 3
-                                qtm_feature = geodesic_dggs_to_feature("qtm",new_id,resolution,subfacet_geom,num_edges)   
-                                qtm_feature["properties"].update(feature_properties)
-                                qtm_features.append(qtm_feature)
-    
-    qtm_geosjon = {
+    # Cover the geometry top-down from the initial facets, subdividing only the facets on its boundary
+    qtm_ids = qtm.qtm_cover(geometry, resolution, compact=bool(compact))
+    qtm_features = []
+    num_edges = 3
+    for chunk in chunked(qtm_ids):
+        facet_vertices, _ = qtm.qtm_ids_to_facets(chunk)
+        cell_resolutions = [len(qtm_id) for qtm_id in chunk]
+        for qtm_feature in geodesic_dggs_to_features("qtm", chunk, cell_resolutions, qtm.facet_polygons(facet_vertices), num_edges):
+            qtm_feature["properties"].update(feature_properties)
+            qtm_features.append(qtm_feature)
+
+    return {
         "type": "FeatureCollection",
         "features": qtm_features
     }
 
-    if compact:
-        return qtmcompact(qtm_geosjon)
-
-    else: return qtm_geosjon
-                          
-    
-
 def geojson2qtm(geojson_data, resolution, compact=False):
     """
     Convert GeoJSON data to QTM DGGS format.
@@ -178,6 +122,7 @@ def geojson2qtm_cli():
     )
     parser.add_argument('-compact', action='store_true', help="Enable Tilecode compact mode")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -195,14 +140,13 @@ def geojson2qtm_cli():
 
         # Save the results to GeoJSON
         geojson_name = os.path.splitext(os.path.basename(geojson))[0]
-        geojson_path = f"{geojson_name}2qtm_{resolution}.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2qtm_{resolution}", args.format)
         if compact:
-            geojson_path = f"{geojson_name}2qtm_{resolution}_compacted.geojson"
+            geojson_path = get_output_path(f"{geojson_name}2qtm_{resolution}_compacted", args.format)
 
-        with open(geojson_path, 'w') as f:
-            json.dump(result, f, indent=2)
+        write_features(result["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
         
     except ValueError as e:
         print(f"Error: {str(e)}")
@@ -7,6 +7,7 @@ import os
 from vgrid.utils import mercantile
 from vgrid.generator.settings import graticule_dggs_to_feature
 from vgrid.conversion.dggscompact import quadkeycompact
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 # Function to generate grid for Point
 def point_to_grid(resolution, point, feature_properties):  
@@ -156,6 +157,7 @@ def geojson2quadkey_cli():
     )
     parser.add_argument('-compact', action='store_true', help="Enable Tilecode compact mode")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -181,14 +183,13 @@ def geojson2quadkey_cli():
 
     # Save the results to GeoJSON
     geojson_name = os.path.splitext(os.path.basename(geojson))[0]
-    geojson_path = f"{geojson_name}2quadkey_{resolution}.geojson"
+    geojson_path = get_output_path(f"{geojson_name}2quadkey_{resolution}", args.format)
     if compact:
-        geojson_path = f"{geojson_name}2quadkey_{resolution}_compacted.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2quadkey_{resolution}_compacted", args.format)
     
-    with open(geojson_path, 'w') as f:
-        json.dump(result, f, indent=2)
+    write_features(result["features"], geojson_path, args.format)
 
-    print(f"GeoJSON saved as {geojson_path}")
+    print(f"Output saved as {geojson_path}")
 
 if __name__ == "__main__":
     geojson2quadkey_cli()
\ No newline at end of file
@@ -1,22 +1,13 @@
 import argparse
 import json
-from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
-from vgrid.utils.rhealpixdggs.utils import my_round
 from vgrid.utils.rhealpixdggs.conversion import compress_order_cells, get_finest_containing_cell
-from shapely.geometry import Polygon, box, Point, LineString
+from shapely.geometry import Polygon, Point, LineString
 import os
-from vgrid.generator.rhealpixgrid import fix_rhealpix_antimeridian_cells
-from vgrid.generator.settings import geodesic_dggs_to_feature
-from vgrid.conversion.dggscompact import rhealpix_compact 
+from vgrid.generator.rhealpixgrid import get_rhealpix_dggs, rhealpix_cell_to_polygon, rhealpix_cells_to_polygons
+from vgrid.generator.settings import geodesic_dggs_to_feature, geodesic_dggs_to_features, chunked
+from vgrid.utils.rhealpixdggs.rhp_wrappers import polyfill, linetrace
 from tqdm import tqdm
-
-# Function to convert cell vertices to a Shapely Polygon
-def rhealpix_cell_to_polygon(cell):
-    vertices = [tuple(my_round(coord, 14) for coord in vertex) for vertex in cell.vertices(plane=False)]
-    if vertices[0] != vertices[-1]:
-        vertices.append(vertices[0])
-    vertices = fix_rhealpix_antimeridian_cells(vertices)
-    return Polygon(vertices)
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 # Function to generate grid for Point
 def point_to_grid(rhealpix_dggs, resolution, point,feature_properties):
@@ -40,83 +31,19 @@ def point_to_grid(rhealpix_dggs, resolution, point,feature_properties):
  
 
 def poly_to_grid(rhealpix_dggs, resolution, geometry,feature_properties, compact = None):
-    rhealpix_features = []
-    if geometry.geom_type == 'LineString' or geometry.geom_type == 'Polygon' :
-        polys = [geometry]
-    elif geometry.geom_type == 'MultiLineString' or geometry.geom_type == 'MultiPolygon' :
-        polys = list(geometry)
-
-    for poly in polys:
-        minx, miny, maxx, maxy = poly.bounds
-        # Create a bounding box polygon
-        bbox_polygon = box(minx, miny, maxx, maxy)
-
-        bbox_center_lon = bbox_polygon.centroid.x
-        bbox_center_lat = bbox_polygon.centroid.y
-        seed_point = (bbox_center_lon, bbox_center_lat)
+    # Cover the geometry top-down from the resolution 0 cells, refining only the cells on its boundary
+    if geometry.geom_type in ('LineString', 'MultiLineString'):
+        cell_ids = linetrace(geometry, resolution, rdggs=rhealpix_dggs)
+    else:
+        cell_ids = polyfill(geometry, resolution, compact=bool(compact), rdggs=rhealpix_dggs)
 
-        seed_cell = rhealpix_dggs.cell_from_point(resolution, seed_point, plane=False)
-        seed_cell_id = str(seed_cell)  # Unique identifier for the current cell
-        seed_cell_polygon = rhealpix_cell_to_polygon(seed_cell)
-
-        if seed_cell_polygon.contains(bbox_polygon):
-            num_edges = 4
-            if seed_cell.ellipsoidal_shape() == 'dart':
-                num_edges = 3
-            cell_resolution = resolution
-            rhealpix_feature = geodesic_dggs_to_feature("rhealpix",seed_cell_id,cell_resolution,seed_cell_polygon,num_edges)   
+    rhealpix_features = []
+    for chunk in chunked(cell_ids):
+        cell_polygons, num_edges = rhealpix_cells_to_polygons(rhealpix_dggs, chunk)
+        cell_resolutions = [len(cell_id) - 1 for cell_id in chunk]
+        for rhealpix_feature in geodesic_dggs_to_features("rhealpix", chunk, cell_resolutions, cell_polygons, num_edges.tolist()):
             rhealpix_feature["properties"].update(feature_properties)
             rhealpix_features.append(rhealpix_feature)
-
-            return {
-                "type": "FeatureCollection",
-                "features": rhealpix_features
-            }  
-       
-
-        else:
-            # Initialize sets and queue
-            covered_cells = set()  # Cells that have been processed (by their unique ID)
-            queue = [seed_cell]  # Queue for BFS exploration
-            while queue:
-                current_cell = queue.pop()
-                current_cell_id = str(current_cell)  # Unique identifier for the current cell
-
-                if current_cell_id in covered_cells:
-                    continue
-
-                # Add current cell to the covered set
-                covered_cells.add(current_cell_id)
-
-                # Convert current cell to polygon
-                cell_polygon = rhealpix_cell_to_polygon(current_cell)
-
-                # Skip cells that do not intersect the bounding box
-                if not cell_polygon.intersects(bbox_polygon):
-                    continue
-
-                # Get neighbors and add to queue
-                neighbors = current_cell.neighbors(plane=False)
-                for _, neighbor in neighbors.items():
-                    neighbor_id = str(neighbor)  # Unique identifier for the neighbor
-                    if neighbor_id not in covered_cells:
-                        queue.append(neighbor)
-            if compact:
-                # need to recheck
-                covered_cells = rhealpix_compact(rhealpix_dggs,covered_cells)
-
-            for cell_id in covered_cells:
-                rhealpix_uids = (cell_id[0],) + tuple(map(int, cell_id[1:]))
-                rhelpix_cell = rhealpix_dggs.cell(rhealpix_uids)   
-                cell_resolution = rhelpix_cell.resolution
-                cell_polygon = rhealpix_cell_to_polygon(rhelpix_cell)
-                if cell_polygon.intersects(poly):
-                    num_edges = 4
-                    if seed_cell.ellipsoidal_shape() == 'dart':
-                        num_edges = 3
-                    rhealpix_feature = geodesic_dggs_to_feature("rhealpix",str(cell_id),cell_resolution, cell_polygon,num_edges)   
-                    rhealpix_feature["properties"].update(feature_properties)
-                    rhealpix_features.append(rhealpix_feature)                
     return {
         "type": "FeatureCollection",
         "features": rhealpix_features,
@@ -138,7 +65,7 @@ def geojson2rhealpix(geojson_data, resolution, compact=False):
         raise ValueError("Resolution must be in range [0..15]")
         
     # Initialize RHEALPix DGGS
-    rhealpix_dggs = RHEALPixDGGS()
+    rhealpix_dggs = get_rhealpix_dggs()
     geojson_features = []
 
     for feature in tqdm(geojson_data['features'], desc="Processing features"):  
@@ -203,6 +130,7 @@ def geojson2rhealpix_cli():
     )
     parser.add_argument('-compact', action='store_true', help="Enable H3 compact mode - for polygon only")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     
     if not os.path.exists(args.geojson):
@@ -217,14 +145,13 @@ def geojson2rhealpix_cli():
         
         # Save the results to GeoJSON
         geojson_name = os.path.splitext(os.path.basename(args.geojson))[0]
-        geojson_path = f"{geojson_name}2rhealpix_{args.resolution}.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2rhealpix_{args.resolution}", args.format)
         if args.compact:
-            geojson_path = f"{geojson_name}2rhealpix_{args.resolution}_compacted.geojson"
+            geojson_path = get_output_path(f"{geojson_name}2rhealpix_{args.resolution}_compacted", args.format)
             
-        with open(geojson_path, 'w') as f:
-            json.dump(result, f, indent=2)
+        write_features(result["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
         
     except ValueError as e:
         print(f"Error: {str(e)}")
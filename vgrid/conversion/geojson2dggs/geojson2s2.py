@@ -4,8 +4,9 @@ import argparse
 import json
 from tqdm import tqdm
 import os
-from vgrid.generator.s2grid import s2_cell_to_polygon
-from vgrid.generator.settings import geodesic_dggs_to_feature
+from vgrid.generator.s2grid import s2_cell_to_polygon, s2_cells_to_polygons, s2_cover
+from vgrid.generator.settings import chunk_size, geodesic_dggs_to_feature, geodesic_dggs_to_features
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 def point_to_grid(resolution, point, feature_properties):    
     s2_features = []
@@ -31,43 +32,17 @@ def point_to_grid(resolution, point, feature_properties):
     }
         
 def poly_to_grid(resolution, geometry, feature_properties, compact=None):
-    s2_features = []
-    
-    if geometry.geom_type == 'LineString' or geometry.geom_type == 'Polygon':
-        polys = [geometry]
-    elif geometry.geom_type == 'MultiLineString' or geometry.geom_type == 'MultiPolygon':
-        polys = list(geometry)
-
-    for poly in polys:    
-        min_lng, min_lat, max_lng, max_lat = poly.bounds
-        level = resolution
-        cell_ids = []
-        coverer = s2.RegionCoverer()
-        coverer.min_level = level
-        coverer.max_level = level
-
-        region = s2.LatLngRect(
-            s2.LatLng.from_degrees(min_lat, min_lng),
-            s2.LatLng.from_degrees(max_lat, max_lng)
-        )
+    # Cover the actual geometry top-down, polygonizing only the cells along its boundary
+    cell_ids = s2_cover(geometry, resolution, compact=bool(compact))
 
-        covering = coverer.get_covering(region)
-        cell_ids = covering  
-        if compact:
-            covering = s2.CellUnion(covering)
-            covering.normalize()
-            cell_ids = covering.cell_ids()  
-            
-        for cell_id in cell_ids:
-            cell_polygon = s2_cell_to_polygon(cell_id)
-          
-            if cell_polygon.intersects(poly):
-                cell_token = s2.CellId.to_token(cell_id)  
-                cell_resolution = cell_id.level()
-                num_edges = 4
-                s2_feature = geodesic_dggs_to_feature("s2",cell_token,cell_resolution,cell_polygon,num_edges)   
-                s2_feature["properties"].update(feature_properties)    
-                s2_features.append(s2_feature)
+    s2_features = []
+    for start in range(0, len(cell_ids), chunk_size):
+        chunk = cell_ids[start:start + chunk_size]
+        s2_tokens = s2.cell_ids_to_tokens(chunk).tolist()
+        num_edges = 4
+        for s2_feature in geodesic_dggs_to_features("s2", s2_tokens, s2.cell_levels(chunk).tolist(), s2_cells_to_polygons(chunk), num_edges):
+            s2_feature["properties"].update(feature_properties)
+            s2_features.append(s2_feature)
                             
     return {
         "type": "FeatureCollection",
@@ -151,6 +126,7 @@ def geojson2s2_cli():
     )
     parser.add_argument('-compact', action='store_true', help="Enable S2 compact mode - for polygon only")
 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
     args = parser.parse_args()
     geojson = args.geojson
     resolution = args.resolution
@@ -168,14 +144,13 @@ def geojson2s2_cli():
         
         # Save the results to GeoJSON
         geojson_name = os.path.splitext(os.path.basename(geojson))[0]
-        geojson_path = f"{geojson_name}2s2_{resolution}.geojson"
+        geojson_path = get_output_path(f"{geojson_name}2s2_{resolution}", args.format)
         if compact:
-            geojson_path = f"{geojson_name}2s2_{resolution}_compacted.geojson"
+            geojson_path = get_output_path(f"{geojson_name}2s2_{resolution}_compacted", args.format)
         
-        with open(geojson_path, 'w') as f:
-            json.dump(result, f, indent=2)
+        write_features(result["features"], geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+        print(f"Output saved as {geojson_path}")
     except ValueError as e:
         print(f"Error: {str(e)}")
     except Exception as e:
@@ -2,9 +2,8 @@ from vgrid.utils import s2, olc, geohash, georef, mgrs, maidenhead, tilecode, qt
 import h3
 
 from vgrid.utils.gars.garsgrid import GARSGrid
+from vgrid.generator.rhealpixgrid import get_rhealpix_dggs
 
-from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
-from vgrid.utils.rhealpixdggs.ellipsoids import WGS84_ELLIPSOID
 import platform, math 
 
 if (platform.system() == 'Windows'):
@@ -26,6 +25,15 @@ from vgrid.utils.easedggs.dggs.grid_addressing import geos_to_grid_ids
 
 import argparse
 
+def pointwise(latlon2cell):
+    """
+    Wrap a scalar latlon2cell(lat, lon, resolution) encoder so it accepts arrays
+    of latitudes and longitudes, for DGGS without a vectorized encoder.
+    """
+    def encode(lats, lons, resolution):
+        return [latlon2cell(lat, lon, resolution) for lat, lon in zip(lats.tolist(), lons.tolist())]
+    return encode
+
 def latlon2h3(lat,lon,res=13):
     # res: [0..15]  
     if res < 0 or res > 15:
@@ -63,6 +71,12 @@ def latlon2s2(lat,lon,res=21):
     cell_token = s2.CellId.to_token(cell_id) # get Cell ID Token, shorter than cell_id.id()
     return cell_token
 
+def latlon2s2_array(lats,lons,res=21):
+    # Vectorized latlon2s2 for NumPy arrays of latitudes and longitudes
+    if res < 0 or res > 30:
+        raise ValueError(f"Invalid resolution {res}. Please input a valid resolution in [0..30].")
+    return s2.cell_ids_to_tokens(s2.cell_ids_from_latlng(lats, lons, res))
+
 def latlon2s2_cli():
     """
     Command-line interface for latlon2s2.
@@ -87,12 +101,18 @@ def latlon2rhealpix(lat,lon,res=14):
     # res: [0..15]        
     if res < 0 or res > 15:
         raise ValueError(f"Invalid resolution {res}. Please input a valid resolution in [0..15].")
-    E = WGS84_ELLIPSOID
-    rhealpix_dggs = RHEALPixDGGS(ellipsoid=E, north_square=1, south_square=3, N_side=3)
+    rhealpix_dggs = get_rhealpix_dggs(north_square=1, south_square=3)
     point = (lon, lat)
     rhealpix_cell = rhealpix_dggs.cell_from_point(res, point, plane=False)
     return str(rhealpix_cell)
 
+def latlon2rhealpix_array(lats,lons,res=14):
+    # Vectorized latlon2rhealpix for NumPy arrays of latitudes and longitudes
+    if res < 0 or res > 15:
+        raise ValueError(f"Invalid resolution {res}. Please input a valid resolution in [0..15].")
+    rhealpix_dggs = get_rhealpix_dggs(north_square=1, south_square=3)
+    return rhealpix_dggs.cells_from_points(res, lons, lats)
+
 def latlon2rhealpix_cli():
     """
     Command-line interface for latlon2rhealpix.
@@ -251,6 +271,12 @@ def latlon2qtm(lat, lon, res=10):
     if res < 1 or res > 24:
         raise ValueError(f"Invalid resolution {res}. Please input a valid resolution in [1..24].")
     return qtm.latlon_to_qtm_id(lat, lon, res)
+
+def latlon2qtm_array(lats,lons,res=10):
+    # Vectorized latlon2qtm for NumPy arrays of latitudes and longitudes
+    if res < 1 or res > 24:
+        raise ValueError(f"Invalid resolution {res}. Please input a valid resolution in [1..24].")
+    return qtm.latlon_to_qtm_id_array(lats, lons, res)
     
 def latlon2qtm_cli():
     """
@@ -281,6 +307,13 @@ def latlon2olc(lat,lon,res=11):
     olc_cell = olc.encode(lat, lon, res)
     return olc_cell
 
+def latlon2olc_array(lats,lons,res=11):
+    # Vectorized latlon2olc for NumPy arrays of latitudes and longitudes
+    valid_resolutions = [2, 4, 6, 8, 10, 11, 12, 13, 14, 15]
+    if res not in valid_resolutions:
+        raise ValueError(f"Invalid resolution {res}. Please input a valid resolution in {valid_resolutions}.")
+    return olc.encode_array(lats, lons, res)
+
 def latlon2olc_cli():
     """
     Command-line interface for latlon2olc.
@@ -311,6 +344,12 @@ def latlon2geohash(lat,lon,res=6):
     geohash_id= geohash.encode(lat, lon, res)
     return geohash_id
 
+def latlon2geohash_array(lats,lons,res=6):
+    # Vectorized latlon2geohash for NumPy arrays of latitudes and longitudes
+    if res < 1 or res > 10:
+        raise ValueError(f"Invalid resolution {res}. Please input a valid resolution in [1..10].")
+    return geohash.encode_array(lats, lons, res)
+
 def latlon2geohash_cli():
     """
     Command-line interface for latlon2geohash.
@@ -392,6 +431,12 @@ def latlon2tilecode(lat,lon,res=23):
     tilecode_id = tilecode.latlon2tilecode(lat,lon,res)
     return tilecode_id
 
+def latlon2tilecode_array(lats,lons,res=23):
+    # Vectorized latlon2tilecode for NumPy arrays of latitudes and longitudes
+    if res < 0 or res > 29:
+        raise ValueError(f"Invalid resolution {res}. Please input a valid resolution in [0..29].")
+    return tilecode.latlon2tilecode_array(lats, lons, res)
+
 def latlon2tilecode_cli():
     """
     Command-line interface for latlon2tilecode.
@@ -420,6 +465,12 @@ def latlon2quadkey(lat,lon,res=23):
     quadkey = tilecode.latlon2quadkey(lat,lon,res)
     return quadkey
 
+def latlon2quadkey_array(lats,lons,res=23):
+    # Vectorized latlon2quadkey for NumPy arrays of latitudes and longitudes
+    if res < 0 or res > 29:
+        raise ValueError(f"Invalid resolution {res}. Please input a valid resolution in [0..29].")
+    return tilecode.latlon2quadkey_array(lats, lons, res)
+
 def latlon2quadkey_cli():
     """
     Command-line interface for latlon2tilecode.
@@ -2,14 +2,15 @@ import os, argparse, json
 from tqdm import tqdm
 import rasterio
 import numpy as np
-from shapely.geometry import Polygon
 import json
 from vgrid.stats.geohashstats import geohash_metrics
-from vgrid.generator.settings import graticule_dggs_to_feature
-from vgrid.conversion.latlon2dggs import latlon2geohash
+from vgrid.generator.settings import graticule_dggs_to_features
+from vgrid.generator.geohashgrid import geohash_bbox_polygons
+from vgrid.conversion.raster2dggs.raster_helper import raster_windows, raster_cell_ids, sample_raster, zonal_statistics, zonal_stats
 from math import cos, radians
 import re
 from vgrid.utils import geohash
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 import csv
 
 def get_nearest_geohash_resolution(raster_path):
@@ -56,7 +57,7 @@ def convert_numpy_types(obj):
     else:
         return obj
 
-def raster2geohash(raster_path, resolution=None, format='geojson'):
+def raster2geohash(raster_path, resolution=None, format='geojson', stats=None, workers=1):
     # Step 1: Determine the nearest geohash resolution if none is provided
     if resolution is None:
         resolution = get_nearest_geohash_resolution(raster_path)
@@ -68,35 +69,29 @@ def raster2geohash(raster_path, resolution=None, format='geojson'):
 
     # Open the raster file to get metadata and data
     with rasterio.open(raster_path) as src:
-        raster_data = src.read()  # Read all bands
+        windows = raster_windows(src)  # Bands are read per window, not all at once
         transform = src.transform
         width, height = src.width, src.height
         band_count = src.count  # Number of bands in the raster
 
-    geohash_ids = set()
-    
-    for row in range(height):
-        for col in range(width):
-            lon, lat = transform * (col, row)
-            geohash_id = latlon2geohash(lat,lon,resolution)            
-            geohash_ids.add(geohash_id)
+    # Cells are carried as uint64 geohash integers and only rendered as geohashes for the output
+    if stats:
+        # Aggregate all pixels in each geohash cell with the selected statistic
+        cell_values = zonal_stats(geohash.encode_int_array, raster_path, windows, resolution, stats, workers)
+    else:
+        cell_ids = np.sort(np.fromiter(raster_cell_ids(geohash.encode_int_array, transform, windows, resolution, workers), dtype=np.uint64))
+
+        # Sample the raster values at the centroids of the geohash cells
+        centroid_lats, centroid_lons = geohash.decode_array(geohash.int_array_to_hashcodes(cell_ids, resolution))
+        cell_values = sample_raster(raster_path, windows, cell_ids.tolist(), centroid_lats.tolist(), centroid_lons.tolist(), workers)
 
-    # Sample the raster values at the centroids of the geohash hexagons
+    geohash_ids = geohash.int_array_to_hashcodes(np.array([cell_id for cell_id, _ in cell_values], dtype=np.uint64), resolution).tolist()
     geohash_data = []
-    
-    for geohash_id in tqdm(geohash_ids, desc="Resampling", unit=" cells"):
-        # Get the centroid of the geohash cell
-        centroid_lat, centroid_lon = geohash.decode(geohash_id)        
-        # Sample the raster values at the centroid (lat, lon)
-        col, row = ~transform * (centroid_lon, centroid_lat)
-        
-        if 0 <= col < width and 0 <= row < height:
-            # Get the values for all bands at this centroid
-            values = raster_data[:, int(row), int(col)]
-            geohash_data.append({
-                "geohash": geohash_id,
-                **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
-            })
+    for geohash_id, (_, values) in zip(geohash_ids, cell_values):
+        geohash_data.append({
+            "geohash": geohash_id,
+            **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
+        })
     
     if format.lower() == 'csv':
         import io
@@ -108,26 +103,10 @@ def raster2geohash(raster_path, resolution=None, format='geojson'):
         return output.getvalue()
     
     # Create the GeoJSON-like structure
-    geohash_features = []
-    for data in tqdm(geohash_data, desc="Converting to GeoJSON", unit=" cells"):
-        geohash_id = data["geohash"]
-        geohash_bbox =  geohash.bbox(geohash_id)
-        if geohash_bbox:
-            min_lat, min_lon = geohash_bbox['s'], geohash_bbox['w']  # Southwest corner
-            max_lat, max_lon = geohash_bbox['n'], geohash_bbox['e']  # Northeast corner        
-            cell_resolution =  len(geohash_id)
-            # Define the polygon based on the bounding box
-            cell_polygon = Polygon([
-                [min_lon, min_lat],  # Bottom-left corner
-                [max_lon, min_lat],  # Bottom-right corner
-                [max_lon, max_lat],  # Top-right corner
-                [min_lon, max_lat],  # Top-left corner
-                [min_lon, min_lat]   # Closing the polygon (same as the first point)
-            ])
-            geohash_feature = graticule_dggs_to_feature("geohash",geohash_id,cell_resolution,cell_polygon)   
-            band_properties = {f"band_{i+1}": data[f"band_{i+1}"] for i in range(band_count)}
-            geohash_feature["properties"].update(convert_numpy_types(band_properties) )
-            geohash_features.append(geohash_feature)               
+    geohash_features = graticule_dggs_to_features("geohash", geohash_ids, resolution, geohash_bbox_polygons(geohash_ids))
+    for geohash_feature, data in zip(geohash_features, tqdm(geohash_data, desc="Converting to GeoJSON", unit=" cells")):
+        band_properties = {f"band_{i+1}": data[f"band_{i+1}"] for i in range(band_count)}
+        geohash_feature["properties"].update(convert_numpy_types(band_properties))
             
     return {
         "type": "FeatureCollection",
@@ -142,39 +121,50 @@ def raster2geohash_cli():
     
     parser.add_argument(
         '-r', '--resolution', type=int, required=False, default=None, 
-        help="Resolution [1..10]", min=1, max=10
+        help="Resolution [1..10]"
     )
 
     parser.add_argument(
         '-f', '--format', type=str, required=False, default='geojson', 
-        choices=['geojson', 'csv'], help="Output format (geojson or csv)"
+        choices=output_formats + ['csv'], help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+
+    parser.add_argument(
+        '-stats', '--statistics', type=str, required=False, default=None,
+        choices=zonal_statistics, help="Aggregate all pixels in each cell with this statistic (default: sample the pixel at the cell centroid)"
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of threads reading and assigning raster windows (default is 1)"
     )
 
     args = parser.parse_args()
     raster = args.raster
     resolution = args.resolution
-    output_format = args.format
+    format = args.format
     
     if not os.path.exists(raster):
         print(f"Error: The file {raster} does not exist.")
         return
+    if resolution is not None:
+        if resolution < 1 or resolution > 10:
+            print(f"Please select a resolution in [1..10] range and try again ")
+            return
 
-    result = raster2geohash(raster, resolution, output_format)
     base_name = os.path.splitext(os.path.basename(raster))[0]
-    
-    if output_format.lower() == 'csv':
+
+    if format.lower() == 'csv':
+        # raster2geohash returns the CSV text directly
+        result = raster2geohash(raster, resolution, format, stats=args.statistics, workers=args.workers)
         output_path = f"{base_name}2geohash.csv"
-        # Get all possible field names from the first row
-        fieldnames = list(result[0].keys())
         with open(output_path, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(result)
+            f.write(result)
     else:
-        output_path = f"{base_name}2geohash.geojson"
-        with open(output_path, 'w') as f:
-            json.dump(result, f)
-    
+        result = raster2geohash(raster, resolution, 'geojson', stats=args.statistics, workers=args.workers)
+        output_path = get_output_path(f"{base_name}2geohash", format)
+        write_features(result["features"], output_path, format)
+
     print(f"Output saved as {output_path}")
 
 
@@ -6,8 +6,11 @@ import numpy as np
 from shapely.geometry import Polygon, Point, mapping
 import json
 import csv
-from vgrid.generator.h3grid import fix_h3_antimeridian_cells
-from vgrid.generator.settings import geodesic_dggs_to_feature
+from vgrid.generator.h3grid import h3_cell_to_feature
+from vgrid.utils.cellcache import cell_feature
+from vgrid.conversion.latlon2dggs import latlon2h3
+from vgrid.conversion.raster2dggs.raster_helper import raster_windows, pointwise, raster_cell_ids, sample_raster, zonal_statistics, zonal_stats
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from math import cos, radians
 
 def get_nearest_h3_resolution(raster_path):
@@ -54,7 +57,7 @@ def convert_numpy_types(obj):
     else:
         return obj
 
-def raster2h3(raster_path, resolution=None, format='geojson'):
+def raster2h3(raster_path, resolution=None, format='geojson', stats=None, workers=1):
     # Step 1: Determine the nearest H3 resolution if none is provided
     if resolution is None:
         resolution = get_nearest_h3_resolution(raster_path)
@@ -66,35 +69,32 @@ def raster2h3(raster_path, resolution=None, format='geojson'):
 
     # Open the raster file to get metadata and data
     with rasterio.open(raster_path) as src:
-        raster_data = src.read()  # Read all bands
+        windows = raster_windows(src)  # Bands are read per window, not all at once
         transform = src.transform
         width, height = src.width, src.height
         band_count = src.count  # Number of bands in the raster
 
-    h3_ids = set()
-    
-    for row in range(height):
-        for col in range(width):
-            lon, lat = transform * (col, row)
-            h3_id = h3.latlng_to_cell(lat, lon,resolution)
-            h3_ids.add(h3_id)
+    if stats:
+        # Aggregate all pixels in each h3 cell with the selected statistic
+        cell_values = zonal_stats(pointwise(latlon2h3), raster_path, windows, resolution, stats, workers)
+    else:
+        h3_ids = list(raster_cell_ids(pointwise(latlon2h3), transform, windows, resolution, workers))
+
+        # Sample the raster values at the centroids of the H3 cells
+        centroid_lats, centroid_lons = [], []
+        for h3_id in tqdm(h3_ids, desc="Resampling", unit=" cells"):
+            # Get the centroid of the H3 cell
+            centroid_lat, centroid_lon = h3.cell_to_latlng(h3_id)
+            centroid_lats.append(centroid_lat)
+            centroid_lons.append(centroid_lon)
+        cell_values = sample_raster(raster_path, windows, h3_ids, centroid_lats, centroid_lons, workers)
 
-    # Sample the raster values at the centroids of the H3 hexagons
     h3_data = []
-    
-    for h3_id in tqdm(h3_ids, desc="Resampling", unit=" cells"):
-        # Get the centroid of the H3 cell
-        centroid_lat, centroid_lon = h3.cell_to_latlng(h3_id)
-        # Sample the raster values at the centroid (lat, lon)
-        col, row = ~transform * (centroid_lon, centroid_lat)
-        
-        if 0 <= col < width and 0 <= row < height:
-            # Get the values for all bands at this centroid
-            values = raster_data[:, int(row), int(col)]
-            h3_data.append({
-                "h3": h3_id,
-                **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
-            })
+    for h3_id, values in cell_values:
+        h3_data.append({
+            "h3": h3_id,
+            **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
+        })
     
     if format.lower() == 'csv':
         import io
@@ -108,20 +108,10 @@ def raster2h3(raster_path, resolution=None, format='geojson'):
     # Create the GeoJSON-like structure
     h3_features = []
     for data in tqdm(h3_data, desc="Converting to GeoJSON", unit=" cells"):
-        cell_boundary = h3.cell_to_boundary(data["h3"])   
-        if cell_boundary:
-            filtered_boundary = fix_h3_antimeridian_cells(cell_boundary)
-            # Reverse lat/lon to lon/lat for GeoJSON compatibility
-            reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
-            cell_polygon = Polygon(reversed_boundary)            
-            num_edges = 6
-            if (h3.is_pentagon(data["h3"])):
-                num_edges = 5
-            
-            h3_feature = geodesic_dggs_to_feature("h3",data["h3"],resolution,cell_polygon,num_edges)   
-        
+        h3_feature = cell_feature("h3", data["h3"], h3_cell_to_feature)
+        if h3_feature:
             band_properties = {f"band_{i+1}": data[f"band_{i+1}"] for i in range(band_count)}
-            h3_feature["properties"].update(convert_numpy_types(band_properties) )
+            h3_feature["properties"].update(convert_numpy_types(band_properties))
             h3_features.append(h3_feature)               
           
     return {
@@ -137,12 +127,22 @@ def raster2h3_cli():
     
     parser.add_argument(
         '-r', '--resolution', type=int, required=False, default=None, 
-        help="Resolution [0..15]", min=0, max=15
+        help="Resolution [0..15]"
     )
 
     parser.add_argument(
         '-f', '--format', type=str, required=False, default='geojson', 
-        choices=['geojson', 'csv'], help="Output format (geojson or csv)"
+        choices=output_formats + ['csv'], help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+
+    parser.add_argument(
+        '-stats', '--statistics', type=str, required=False, default=None,
+        choices=zonal_statistics, help="Aggregate all pixels in each cell with this statistic (default: sample the pixel at the cell centroid)"
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of threads reading and assigning raster windows (default is 1)"
     )
 
     args = parser.parse_args()
@@ -158,22 +158,18 @@ def raster2h3_cli():
             print(f"Please select a resolution in [0..15] range and try again ")
             return
 
-    result = raster2h3(raster, resolution, format)
     base_name = os.path.splitext(os.path.basename(raster))[0]
-    output_path = f"{base_name}2h3.{format}"
-    
     
-    if format.lower() == 'geojson':
-        with open(output_path, 'w') as f:
-            json.dump(result, f)
-    
-    elif format.lower() == 'csv':
-        # Get all possible field names from the first row
-        fieldnames = list(result[0].keys())
+    if format.lower() == 'csv':
+        # raster2h3 returns the CSV text directly
+        result = raster2h3(raster, resolution, format, stats=args.statistics, workers=args.workers)
+        output_path = f"{base_name}2h3.csv"
         with open(output_path, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(result)
+            f.write(result)
+    else:
+        result = raster2h3(raster, resolution, 'geojson', stats=args.statistics, workers=args.workers)
+        output_path = get_output_path(f"{base_name}2h3", format)
+        write_features(result["features"], output_path, format)
     
     print(f"Output saved as {output_path}")
 
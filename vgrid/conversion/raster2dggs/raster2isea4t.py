@@ -8,6 +8,8 @@ import csv
 from vgrid.stats.isea4tstats import isea4t_metrics
 from vgrid.utils.antimeridian import fix_polygon
 from vgrid.generator.settings import geodesic_dggs_metrics, geodesic_dggs_to_feature
+from vgrid.conversion.raster2dggs.raster_helper import raster_windows, pointwise, raster_cell_ids, sample_raster, zonal_statistics, zonal_stats
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from math import cos, radians
 import platform
 if (platform.system() == 'Windows'):   
@@ -66,7 +68,7 @@ def convert_numpy_types(obj):
     else:
         return obj
 
-def raster2isea4t(isea4t_dggs, raster_path, resolution=None, format='geojson'):
+def raster2isea4t(isea4t_dggs, raster_path, resolution=None, format='geojson', stats=None, workers=1):
     if (platform.system() == 'Windows'):  
         # Step 1: Determine the nearest isea4t resolution if none is provided
         if resolution is None:
@@ -75,45 +77,46 @@ def raster2isea4t(isea4t_dggs, raster_path, resolution=None, format='geojson'):
 
         # Open the raster file to get metadata and data
         with rasterio.open(raster_path) as src:
-            raster_data = src.read()  # Read all bands
+            windows = raster_windows(src)  # Bands are read per window, not all at once
             transform = src.transform
             width, height = src.width, src.height
             band_count = src.count  # Number of bands in the raster
 
-        isea4t_ids = set()
-        
-        for row in range(height):
-            for col in range(width):
-                lon, lat = transform * (col, row)
-                max_accuracy =  isea4t_res_accuracy_dict[39] # maximum cell_id length with 41 characters
-                lat_long_point = LatLongPoint(lat, lon, max_accuracy)
-                isea4t_cell_max_accuracy = isea4t_dggs.convert_point_to_dggs_cell(lat_long_point)
-                cell_id_len = resolution+2
-                isea4t_cell = DggsCell(isea4t_cell_max_accuracy._cell_id[:cell_id_len])
-                isea4t_ids.add(isea4t_cell._cell_id)
-
-        # Sample the raster values at the centroids of the isea4t hexagons
+        def latlon2isea4t(lat, lon, resolution):
+            max_accuracy =  isea4t_res_accuracy_dict[39] # maximum cell_id length with 41 characters
+            lat_long_point = LatLongPoint(lat, lon, max_accuracy)
+            isea4t_cell_max_accuracy = isea4t_dggs.convert_point_to_dggs_cell(lat_long_point)
+            cell_id_len = resolution+2
+            return isea4t_cell_max_accuracy._cell_id[:cell_id_len]
+
+        if stats:
+            # Aggregate all pixels in each isea4t cell with the selected statistic
+            cell_values = zonal_stats(pointwise(latlon2isea4t), raster_path, windows, resolution, stats, workers)
+        else:
+            isea4t_ids = list(raster_cell_ids(pointwise(latlon2isea4t), transform, windows, resolution, workers))
+
+            # Sample the raster values at the centroids of the isea4t cells
+            centroid_lats, centroid_lons = [], []
+            for isea4t_id in tqdm(isea4t_ids, desc="Resampling", unit=" cells"):
+                cell_to_shape = isea4t_dggs.convert_dggs_cell_outline_to_shape_string(DggsCell(isea4t_id),ShapeStringFormat.WKT)
+                cell_to_shape_fixed = loads(fix_isea4t_wkt(cell_to_shape))
+                if isea4t_id.startswith('00') or isea4t_id.startswith('09') or isea4t_id.startswith('14')\
+                    or isea4t_id.startswith('04') or isea4t_id.startswith('19'):
+                    cell_to_shape_fixed = fix_isea4t_antimeridian_cells(cell_to_shape_fixed)
+
+                num_edges = 3
+                cell_polygon = Polygon(list(cell_to_shape_fixed.exterior.coords))        
+                centroid_lat, centroid_lon,avg_edge_len,cell_area =  geodesic_dggs_metrics(cell_polygon,num_edges)            
+                centroid_lats.append(centroid_lat)
+                centroid_lons.append(centroid_lon)
+            cell_values = sample_raster(raster_path, windows, isea4t_ids, centroid_lats, centroid_lons, workers)
+
         isea4t_data = []
-        
-        for isea4t_id in tqdm(isea4t_ids, desc="Resampling", unit=" cells"):
-            cell_to_shape = isea4t_dggs.convert_dggs_cell_outline_to_shape_string(DggsCell(isea4t_id),ShapeStringFormat.WKT)
-            cell_to_shape_fixed = loads(fix_isea4t_wkt(cell_to_shape))
-            if isea4t_id.startswith('00') or isea4t_id.startswith('09') or isea4t_id.startswith('14')\
-                or isea4t_id.startswith('04') or isea4t_id.startswith('19'):
-                cell_to_shape_fixed = fix_isea4t_antimeridian_cells(cell_to_shape_fixed)
-            
-            num_edges = 3
-            cell_polygon = Polygon(list(cell_to_shape_fixed.exterior.coords))        
-            centroid_lat, centroid_lon,avg_edge_len,cell_area =  geodesic_dggs_metrics(cell_polygon,num_edges)            
-            col, row = ~transform * (centroid_lon, centroid_lat)
-            
-            if 0 <= col < width and 0 <= row < height:
-                # Get the values for all bands at this centroid
-                values = raster_data[:, int(row), int(col)]
-                isea4t_data.append({
-                    "isea4t": isea4t_id,
-                    **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
-                })
+        for isea4t_id, values in cell_values:
+            isea4t_data.append({
+                "isea4t": isea4t_id,
+                **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
+            })
         
         if format.lower() == 'csv':
             import io
@@ -162,7 +165,17 @@ def raster2isea4t_cli():
 
     parser.add_argument(
         '-f', '--format', type=str, required=False, default='geojson', 
-        choices=['geojson', 'csv'], help="Output format (geojson or csv)"
+        choices=output_formats + ['csv'], help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+
+    parser.add_argument(
+        '-stats', '--statistics', type=str, required=False, default=None,
+        choices=zonal_statistics, help="Aggregate all pixels in each cell with this statistic (default: sample the pixel at the cell centroid)"
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of threads reading and assigning raster windows (default is 1)"
     )
 
     if (platform.system() == 'Windows'):
@@ -180,21 +193,19 @@ def raster2isea4t_cli():
                 print(f"Please select a resolution in [0..23] range and try again ")
                 return
 
-        result = raster2isea4t(isea4t_dggs, raster, resolution, format)
         base_name = os.path.splitext(os.path.basename(raster))[0]
-        
+
         if format.lower() == 'csv':
+            # raster2isea4t returns the CSV text directly
+            result = raster2isea4t(isea4t_dggs, raster, resolution, format, stats=args.statistics, workers=args.workers)
             output_path = f"{base_name}2isea4t.csv"
             with open(output_path, 'w', newline='') as f:
-                if result:
-                    writer = csv.DictWriter(f, fieldnames=result[0].keys())
-                    writer.writeheader()
-                    writer.writerows(result)
+                f.write(result)
         else:
-            output_path = f"{base_name}2isea4t.geojson"
-            with open(output_path, 'w') as f:
-                json.dump(result, f)
-        
+            result = raster2isea4t(isea4t_dggs, raster, resolution, 'geojson', stats=args.statistics, workers=args.workers)
+            output_path = get_output_path(f"{base_name}2isea4t", format)
+            write_features(result["features"], output_path, format)
+
         print(f"Output saved as {output_path}")
 
 if __name__ == "__main__":
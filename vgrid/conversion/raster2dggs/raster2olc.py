@@ -9,7 +9,9 @@ from vgrid.stats.olcstats import olc_metrics
 from vgrid.generator.settings import graticule_dggs_to_feature
 from math import cos, radians
 import re
-from vgrid.conversion.latlon2dggs import latlon2olc
+from vgrid.conversion.latlon2dggs import latlon2olc_array
+from vgrid.conversion.raster2dggs.raster_helper import raster_windows, raster_cell_ids, sample_raster, zonal_statistics, zonal_stats
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 import csv
 
 def get_nearest_olc_resolution(raster_path):
@@ -57,7 +59,7 @@ def convert_numpy_types(obj):
     else:
         return obj
 
-def raster2olc(raster_path, resolution=None, format='geojson'):
+def raster2olc(raster_path, resolution=None, format='geojson', stats=None, workers=1):
     # Step 1: Determine the nearest olc resolution if none is provided
     if resolution is None:
         resolution = get_nearest_olc_resolution(raster_path)
@@ -65,37 +67,33 @@ def raster2olc(raster_path, resolution=None, format='geojson'):
 
     # Open the raster file to get metadata and data
     with rasterio.open(raster_path) as src:
-        raster_data = src.read()  # Read all bands
+        windows = raster_windows(src)  # Bands are read per window, not all at once
         transform = src.transform
         width, height = src.width, src.height
         band_count = src.count  # Number of bands in the raster
 
-    olc_ids = set()
-    
-    for row in range(height):
-        for col in range(width):
-            lon, lat = transform * (col, row)
-            olc_id = latlon2olc(lat,lon,resolution)            
-            olc_ids.add(olc_id)
+    if stats:
+        # Aggregate all pixels in each olc cell with the selected statistic
+        cell_values = zonal_stats(latlon2olc_array, raster_path, windows, resolution, stats, workers)
+    else:
+        olc_ids = list(raster_cell_ids(latlon2olc_array, transform, windows, resolution, workers))
+
+        # Sample the raster values at the centroids of the olc cells
+        centroid_lats, centroid_lons = [], []
+        for olc_id in tqdm(olc_ids, desc="Resampling", unit=" cells"):
+            # Get the centroid of the olc cell
+            coord = olc.decode(olc_id)
+            centroid_lat, centroid_lon = coord.latitudeCenter, coord.longitudeCenter
+            centroid_lats.append(centroid_lat)
+            centroid_lons.append(centroid_lon)
+        cell_values = sample_raster(raster_path, windows, olc_ids, centroid_lats, centroid_lons, workers)
 
-    # Sample the raster values at the centroids of the olc hexagons
     olc_data = []
-    
-    for olc_id in tqdm(olc_ids, desc="Resampling", unit=" cells"): 
-        # Get the centroid of the olc cell
-        coord = olc.decode(olc_id)
-        centroid_lat, centroid_lon = coord.latitudeCenter, coord.longitudeCenter
-        
-        # Sample the raster values at the centroid (lat, lon)
-        col, row = ~transform * (centroid_lon, centroid_lat)
-        
-        if 0 <= col < width and 0 <= row < height:
-            # Get the values for all bands at this centroid
-            values = raster_data[:, int(row), int(col)]
-            olc_data.append({
-                "olc": olc_id,
-                **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
-            })
+    for olc_id, values in cell_values:
+        olc_data.append({
+            "olc": olc_id,
+            **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
+        })
     
     if format.lower() == 'csv':
         import io
@@ -150,7 +148,17 @@ def raster2olc_cli():
 
     parser.add_argument(
         '-f', '--format', type=str, required=False, default='geojson',
-        choices=['geojson', 'csv'], help="Output format (geojson or csv)"
+        choices=output_formats + ['csv'], help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+
+    parser.add_argument(
+        '-stats', '--statistics', type=str, required=False, default=None,
+        choices=zonal_statistics, help="Aggregate all pixels in each cell with this statistic (default: sample the pixel at the cell centroid)"
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of threads reading and assigning raster windows (default is 1)"
     )
 
     args = parser.parse_args()
@@ -167,20 +175,19 @@ def raster2olc_cli():
             print(f"Please select a resolution in [10..12] range and try again ")
             return
 
-    output_data = raster2olc(raster, resolution, format)
-    output_name = os.path.splitext(os.path.basename(raster))[0]
-    output_path = f"{output_name}2olc.{format}"
-   
+    base_name = os.path.splitext(os.path.basename(raster))[0]
+
     if format.lower() == 'csv':
+        # raster2olc returns the CSV text directly
+        result = raster2olc(raster, resolution, format, stats=args.statistics, workers=args.workers)
+        output_path = f"{base_name}2olc.csv"
         with open(output_path, 'w', newline='') as f:
-            if output_data:
-                writer = csv.DictWriter(f, fieldnames=output_data[0].keys())
-                writer.writeheader()
-                writer.writerows(output_data)
-    else:  # geojson
-        with open(output_path, 'w') as f:
-            json.dump(output_data, f)
-            
+            f.write(result)
+    else:
+        result = raster2olc(raster, resolution, 'geojson', stats=args.statistics, workers=args.workers)
+        output_path = get_output_path(f"{base_name}2olc", format)
+        write_features(result["features"], output_path, format)
+
     print(f"Output saved as {output_path}")
 
 if __name__ == "__main__":
@@ -1,16 +1,19 @@
 import os, argparse, json
 from tqdm import tqdm
 import rasterio
-from vgrid.utils.qtm import constructGeometry, qtm_id_to_facet
+from vgrid.utils.qtm import qtm_ids_to_facets, facet_polygons
 
 import numpy as np
+import shapely
 from shapely.geometry import Polygon, Point, mapping
 import json
 from vgrid.stats.qtmstats import qtm_metrics
-from vgrid.generator.settings import geodesic_dggs_to_feature
+from vgrid.generator.settings import geodesic_dggs_to_features
 from math import cos, radians
 import re
-from vgrid.conversion.latlon2dggs import latlon2qtm
+from vgrid.conversion.latlon2dggs import latlon2qtm_array
+from vgrid.conversion.raster2dggs.raster_helper import raster_windows, raster_cell_ids, sample_raster, zonal_statistics, zonal_stats
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 import csv
 
 
@@ -58,7 +61,7 @@ def convert_numpy_types(obj):
     else:
         return obj
 
-def raster2qtm(raster_path, resolution=None, format='geojson'):
+def raster2qtm(raster_path, resolution=None, format='geojson', stats=None, workers=1):
     """
     Convert raster data to QTM DGGS format.
     
@@ -77,39 +80,29 @@ def raster2qtm(raster_path, resolution=None, format='geojson'):
 
     # Open the raster file to get metadata and data
     with rasterio.open(raster_path) as src:
-        raster_data = src.read()  # Read all bands
+        windows = raster_windows(src)  # Bands are read per window, not all at once
         transform = src.transform
         width, height = src.width, src.height
         band_count = src.count  # Number of bands in the raster
 
-    qtm_ids = set()
-    
-    for row in range(height):
-        for col in range(width):
-            lon, lat = transform * (col, row)
-            qtm_id = latlon2qtm(lat,lon,resolution)            
-            qtm_ids.add(qtm_id)
+    if stats:
+        # Aggregate all pixels in each qtm cell with the selected statistic
+        cell_values = zonal_stats(latlon2qtm_array, raster_path, windows, resolution, stats, workers)
+    else:
+        qtm_ids = list(raster_cell_ids(latlon2qtm_array, transform, windows, resolution, workers))
+
+        # Sample the raster values at the centroids of the qtm cells
+        facet_vertices, _ = qtm_ids_to_facets(qtm_ids)
+        centroids = shapely.centroid(facet_polygons(facet_vertices))
+        centroid_lats, centroid_lons = shapely.get_y(centroids), shapely.get_x(centroids)
+        cell_values = sample_raster(raster_path, windows, qtm_ids, centroid_lats, centroid_lons, workers)
 
-    # Sample the raster values at the centroids of the qtm hexagons
     qtm_data = []
-    
-    for qtm_id in tqdm(qtm_ids, desc="Resampling", unit=" cells"):
-        # Get the centroid of the qtm cell
-        facet = qtm_id_to_facet(qtm_id)
-        cell_polygon = constructGeometry(facet)    
-        centroid = cell_polygon.centroid
-        centroid_lon, centroid_lat = centroid.x, centroid.y
-                
-        # Sample the raster values at the centroid (lat, lon)
-        col, row = ~transform * (centroid_lon, centroid_lat)
-        
-        if 0 <= col < width and 0 <= row < height:
-            # Get the values for all bands at this centroid
-            values = raster_data[:, int(row), int(col)]
-            qtm_data.append({
-                "qtm": qtm_id,
-                **{f"band_{i+1}": values[i] for i in range(band_count)}
-            })
+    for qtm_id, values in cell_values:
+        qtm_data.append({
+            "qtm": qtm_id,
+            **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
+        })
     
     if format.lower() == 'csv':
         import io
@@ -121,17 +114,13 @@ def raster2qtm(raster_path, resolution=None, format='geojson'):
         return output.getvalue()
     
     # Create the GeoJSON-like structure
-    qtm_features = []
-    for data in tqdm(qtm_data, desc="Converting to GeoJSON", unit=" cells"):
-        qtm_id = data["qtm"]
-        facet = qtm_id_to_facet(qtm_id)
-        cell_polygon = constructGeometry(facet)    
-        cell_resolution = len(qtm_id)
-        num_edges = 3
-        qtm_feature = geodesic_dggs_to_feature("qtm",qtm_id,cell_resolution,cell_polygon,num_edges)   
+    qtm_ids = [data["qtm"] for data in qtm_data]
+    facet_vertices, _ = qtm_ids_to_facets(qtm_ids)
+    num_edges = 3
+    qtm_features = geodesic_dggs_to_features("qtm", qtm_ids, [len(qtm_id) for qtm_id in qtm_ids], facet_polygons(facet_vertices), num_edges)
+    for qtm_feature, data in zip(qtm_features, tqdm(qtm_data, desc="Converting to GeoJSON", unit=" cells")):
         band_properties = {f"band_{i+1}": data[f"band_{i+1}"] for i in range(band_count)}
         qtm_feature["properties"].update(convert_numpy_types(band_properties))
-        qtm_features.append(qtm_feature)               
             
     return {
         "type": "FeatureCollection",
@@ -149,7 +138,17 @@ def raster2qtm_cli():
     )
     parser.add_argument(
         '-f', '--format', type=str, required=False, default='geojson',
-        choices=['geojson', 'csv'], help="Output format (geojson or csv)"
+        choices=output_formats + ['csv'], help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+
+    parser.add_argument(
+        '-stats', '--statistics', type=str, required=False, default=None,
+        choices=zonal_statistics, help="Aggregate all pixels in each cell with this statistic (default: sample the pixel at the cell centroid)"
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of threads reading and assigning raster windows (default is 1)"
     )
 
     args = parser.parse_args()
@@ -165,21 +164,19 @@ def raster2qtm_cli():
             print(f"Please select a resolution in [1..24] range and try again ")
             return
 
-    # Process the raster
-    result = raster2qtm(raster, resolution, format)
-    
-    # Generate output filename
     base_name = os.path.splitext(os.path.basename(raster))[0]
-    output_path = f"{base_name}2qtm.{format}"
-    
-    # Save the output
-    if format.lower() == 'geojson':
-        with open(output_path, 'w') as f:
-            json.dump(result, f)
-    else:  # csv
+
+    if format.lower() == 'csv':
+        # raster2qtm returns the CSV text directly
+        result = raster2qtm(raster, resolution, format, stats=args.statistics, workers=args.workers)
+        output_path = f"{base_name}2qtm.csv"
         with open(output_path, 'w', newline='') as f:
             f.write(result)
-    
+    else:
+        result = raster2qtm(raster, resolution, 'geojson', stats=args.statistics, workers=args.workers)
+        output_path = get_output_path(f"{base_name}2qtm", format)
+        write_features(result["features"], output_path, format)
+
     print(f"Output saved as {output_path}")
 
 if __name__ == "__main__":
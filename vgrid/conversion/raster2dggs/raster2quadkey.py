@@ -7,6 +7,9 @@ from shapely.geometry import Polygon
 import json
 from vgrid.stats.quadkeystats import quadkey_metrics
 from vgrid.generator.settings import graticule_dggs_to_feature
+from vgrid.conversion.latlon2dggs import latlon2quadkey_array
+from vgrid.conversion.raster2dggs.raster_helper import raster_windows, raster_cell_ids, sample_raster, zonal_statistics, zonal_stats
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from math import cos, radians
 import csv
 
@@ -54,7 +57,7 @@ def convert_numpy_types(obj):
     else:
         return obj
 
-def raster2quadkey(raster_path, resolution=None, format='geojson'):
+def raster2quadkey(raster_path, resolution=None, format='geojson', stats=None, workers=1):
     """Convert raster to quadkey format
     
     Args:
@@ -73,36 +76,32 @@ def raster2quadkey(raster_path, resolution=None, format='geojson'):
 
     # Open the raster file to get metadata and data
     with rasterio.open(raster_path) as src:
-        raster_data = src.read()  # Read all bands
+        windows = raster_windows(src)  # Bands are read per window, not all at once
         transform = src.transform
         width, height = src.width, src.height
         band_count = src.count  # Number of bands in the raster
 
-    quadkey_ids = set()
-    
-    for row in range(height):
-        for col in range(width):
-            lon, lat = transform * (col, row)
-            quadkey_id = tilecode.latlon2quadkey(lat,lon,resolution)            
-            quadkey_ids.add(quadkey_id)
+    if stats:
+        # Aggregate all pixels in each quadkey cell with the selected statistic
+        cell_values = zonal_stats(latlon2quadkey_array, raster_path, windows, resolution, stats, workers)
+    else:
+        quadkey_ids = list(raster_cell_ids(latlon2quadkey_array, transform, windows, resolution, workers))
+
+        # Sample the raster values at the centroids of the quadkey cells
+        centroid_lats, centroid_lons = [], []
+        for quadkey_id in tqdm(quadkey_ids, desc="Resampling", unit=" cells"):
+            # Get the centroid of the quadkey cell
+            centroid_lat, centroid_lon = tilecode.quadkey2latlon(quadkey_id)
+            centroid_lats.append(centroid_lat)
+            centroid_lons.append(centroid_lon)
+        cell_values = sample_raster(raster_path, windows, quadkey_ids, centroid_lats, centroid_lons, workers)
 
-    # Sample the raster values at the centroids of the quadkey hexagons
     quadkey_data = []
-    
-    for quadkey_id in tqdm(quadkey_ids, desc="Resampling", unit=" cells"):  
-        # Get the centroid of the quadkey cell
-        centroid_lat, centroid_lon = tilecode.quadkey2latlon(quadkey_id)
-        
-        # Sample the raster values at the centroid (lat, lon)
-        col, row = ~transform * (centroid_lon, centroid_lat)
-        
-        if 0 <= col < width and 0 <= row < height:
-            # Get the values for all bands at this centroid
-            values = raster_data[:, int(row), int(col)]
-            quadkey_data.append({
-                "quadkey": quadkey_id,
-                **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
-            })
+    for quadkey_id, values in cell_values:
+        quadkey_data.append({
+            "quadkey": quadkey_id,
+            **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
+        })
     
     if format == 'csv':
         import io
@@ -158,8 +157,17 @@ def raster2quadkey_cli():
     
     parser.add_argument(
         '-f', '--format', type=str, required=False, default='geojson',
-        choices=['geojson', 'csv'], 
-        help="Output format: 'geojson' for GeoJSON format with geometry, 'csv' for tabular data with quadkey and band values"
+        choices=output_formats + ['csv'], help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+
+    parser.add_argument(
+        '-stats', '--statistics', type=str, required=False, default=None,
+        choices=zonal_statistics, help="Aggregate all pixels in each cell with this statistic (default: sample the pixel at the cell centroid)"
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of threads reading and assigning raster windows (default is 1)"
     )
 
     args = parser.parse_args()
@@ -176,20 +184,19 @@ def raster2quadkey_cli():
             print(f"Please select a resolution in [0..29] range and try again ")
             return
 
-    result = raster2quadkey(raster, resolution, format)
-
-    output_name = os.path.splitext(os.path.basename(raster))[0]
-    output_path = f"{output_name}2quadkey.{format}"
-   
-   
+    base_name = os.path.splitext(os.path.basename(raster))[0]
 
     if format.lower() == 'csv':
+        # raster2quadkey returns the CSV text directly
+        result = raster2quadkey(raster, resolution, format, stats=args.statistics, workers=args.workers)
+        output_path = f"{base_name}2quadkey.csv"
         with open(output_path, 'w', newline='') as f:
             f.write(result)
-    else:  # geojson
-        with open(output_path, 'w') as f:
-            json.dump(result, f)
-            
+    else:
+        result = raster2quadkey(raster, resolution, 'geojson', stats=args.statistics, workers=args.workers)
+        output_path = get_output_path(f"{base_name}2quadkey", format)
+        write_features(result["features"], output_path, format)
+
     print(f"Output saved as {output_path}")
 
 if __name__ == "__main__":
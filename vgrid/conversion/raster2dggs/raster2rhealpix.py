@@ -2,17 +2,18 @@ import os, argparse, json
 from tqdm import tqdm
 import rasterio
 import numpy as np
+import shapely
 from shapely.geometry import Polygon, Point, mapping
 import json
 import csv
 import io
 from vgrid.stats.rhealpixstats import rhealpix_metrics
-from vgrid.generator.settings import geodesic_dggs_metrics, geodesic_dggs_to_feature
+from vgrid.generator.settings import geodesic_dggs_to_features
 from math import cos, radians
-from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
 from vgrid.utils.rhealpixdggs.utils import my_round
-from vgrid.utils.rhealpixdggs.ellipsoids import WGS84_ELLIPSOID
-from vgrid.conversion.dggs2geojson import rhealpix_cell_to_polygon
+from vgrid.generator.rhealpixgrid import get_rhealpix_dggs, rhealpix_cells_to_polygons
+from vgrid.conversion.raster2dggs.raster_helper import raster_windows, raster_cell_ids, sample_raster, zonal_statistics, zonal_stats
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 def get_nearest_rhealpix_resolution(raster_path):
     with rasterio.open(raster_path) as src:
@@ -58,7 +59,7 @@ def convert_numpy_types(obj):
     else:
         return obj
 
-def raster2rhealpix(rhealpix_dggs, raster_path, resolution=None, format='geojson'):
+def raster2rhealpix(rhealpix_dggs, raster_path, resolution=None, format='geojson', stats=None, workers=1):
     # Step 1: Determine the nearest rhealpix resolution if none is provided
     if resolution is None:
         resolution = get_nearest_rhealpix_resolution(raster_path)
@@ -66,41 +67,33 @@ def raster2rhealpix(rhealpix_dggs, raster_path, resolution=None, format='geojson
 
     # Open the raster file to get metadata and data
     with rasterio.open(raster_path) as src:
-        raster_data = src.read()  # Read all bands
+        windows = raster_windows(src)  # Bands are read per window, not all at once
         transform = src.transform
         width, height = src.width, src.height
         band_count = src.count  # Number of bands in the raster
 
-    rhealpix_ids = set()
-    
-    for row in range(height):
-        for col in range(width):
-            lon, lat = transform * (col, row)
-            point = (lon, lat)
-            rhealpix_cell = rhealpix_dggs.cell_from_point(resolution, point, plane=False)   
-            rhealpix_ids.add(str(rhealpix_cell))
-
-    # Sample the raster values at the centroids of the rhealpix hexagons
+    def latlon2rhealpix_array(lats, lons, resolution):
+        return rhealpix_dggs.cells_from_points(resolution, lons, lats)
+
+    if stats:
+        # Aggregate all pixels in each rhealpix cell with the selected statistic
+        cell_values = zonal_stats(latlon2rhealpix_array, raster_path, windows, resolution, stats, workers)
+    else:
+        rhealpix_ids = list(raster_cell_ids(latlon2rhealpix_array, transform, windows, resolution, workers))
+
+        # Sample the raster values at the centroids of the rhealpix cells
+        cell_polygons, _ = rhealpix_cells_to_polygons(rhealpix_dggs, rhealpix_ids)
+        centroids = shapely.centroid(cell_polygons)
+        centroid_lats = np.round(shapely.get_y(centroids), 7)
+        centroid_lons = np.round(shapely.get_x(centroids), 7)
+        cell_values = sample_raster(raster_path, windows, rhealpix_ids, centroid_lats, centroid_lons, workers)
+
     rhealpix_data = []
-    
-    for rhealpix_id in tqdm(rhealpix_ids, desc="Resampling", unit=" cells"):           
-        rhealpix_uids = (rhealpix_id[0],) + tuple(map(int, rhealpix_id[1:]))
-        rhealpix_cell = rhealpix_dggs.cell(rhealpix_uids)
-        cell_polygon = rhealpix_cell_to_polygon(rhealpix_cell)
-        num_edges = 4
-        if rhealpix_cell.ellipsoidal_shape() == 'dart':
-            num_edges = 3        
-        centroid_lat, centroid_lon,avg_edge_len,cell_area =  geodesic_dggs_metrics(cell_polygon,num_edges)
-        
-        col, row = ~transform * (centroid_lon, centroid_lat)
-        
-        if 0 <= col < width and 0 <= row < height:
-            # Get the values for all bands at this centroid
-            values = raster_data[:, int(row), int(col)]
-            rhealpix_data.append({
-                "rhealpix": rhealpix_id,
-                **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
-            })
+    for rhealpix_id, values in cell_values:
+        rhealpix_data.append({
+            "rhealpix": rhealpix_id,
+            **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
+        })
     
     if format.lower() == 'csv':
         import io
@@ -112,21 +105,13 @@ def raster2rhealpix(rhealpix_dggs, raster_path, resolution=None, format='geojson
         return output.getvalue()
             
     # Create the GeoJSON-like structure
-    rhealpix_features = []
-    for data in tqdm(rhealpix_data, desc="Converting to GeoJSON", unit=" cells"):
-        rhealpix_uids = (data['rhealpix'][0],) + tuple(map(int, data['rhealpix'][1:]))
-        rhealpix_cell = rhealpix_dggs.cell(rhealpix_uids)
-        if rhealpix_cell:
-            cell_polygon = rhealpix_cell_to_polygon(rhealpix_cell)
-            num_edges = 4
-            if rhealpix_cell.ellipsoidal_shape() == 'dart':
-                num_edges = 3
-            rhealpix_feature = geodesic_dggs_to_feature("rhealpix",str(rhealpix_cell),resolution,cell_polygon,num_edges)   
-            band_properties = {f"band_{i+1}": data[f"band_{i+1}"] for i in range(band_count)}
-            rhealpix_feature["properties"].update(convert_numpy_types(band_properties))
-            rhealpix_features.append(rhealpix_feature)
-
-   
+    rhealpix_ids = [data['rhealpix'] for data in rhealpix_data]
+    cell_polygons, num_edges = rhealpix_cells_to_polygons(rhealpix_dggs, rhealpix_ids)
+    rhealpix_features = geodesic_dggs_to_features("rhealpix", rhealpix_ids, resolution, cell_polygons, num_edges)
+    for rhealpix_feature, data in zip(rhealpix_features, tqdm(rhealpix_data, desc="Converting to GeoJSON", unit=" cells")):
+        band_properties = {f"band_{i+1}": data[f"band_{i+1}"] for i in range(band_count)}
+        rhealpix_feature["properties"].update(convert_numpy_types(band_properties))
+
     return {
         "type": "FeatureCollection",
         "features": rhealpix_features
@@ -144,14 +129,23 @@ def raster2rhealpix_cli():
     )
     parser.add_argument(
         '-f', '--format', type=str, required=False, default='geojson',
-        choices=['geojson', 'csv'], help="Output format (geojson or csv)"
+        choices=output_formats + ['csv'], help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+
+    parser.add_argument(
+        '-stats', '--statistics', type=str, required=False, default=None,
+        choices=zonal_statistics, help="Aggregate all pixels in each cell with this statistic (default: sample the pixel at the cell centroid)"
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of threads reading and assigning raster windows (default is 1)"
     )
 
     args = parser.parse_args()
     
     try:
-        E = WGS84_ELLIPSOID
-        rhealpix_dggs = RHEALPixDGGS(ellipsoid=E, north_square=1, south_square=3, N_side=3)
+        rhealpix_dggs = get_rhealpix_dggs(north_square=1, south_square=3)
         
         if not os.path.exists(args.raster):
             raise FileNotFoundError(f"The file {args.raster} does not exist.")
@@ -159,20 +153,20 @@ def raster2rhealpix_cli():
         if args.resolution is not None and (args.resolution < 0 or args.resolution > 15):
             raise ValueError("Resolution must be in range [0..15]")
 
-        result = raster2rhealpix(rhealpix_dggs, args.raster, args.resolution, args.format)
-        
-        # Generate output filename
+        format = args.format
         base_name = os.path.splitext(os.path.basename(args.raster))[0]
-        
-        if args.format.lower() == 'csv':
+
+        if format.lower() == 'csv':
+            # raster2rhealpix returns the CSV text directly
+            result = raster2rhealpix(rhealpix_dggs, args.raster, args.resolution, format, stats=args.statistics, workers=args.workers)
             output_path = f"{base_name}2rhealpix.csv"
             with open(output_path, 'w', newline='') as f:
                 f.write(result)
         else:
-            output_path = f"{base_name}2rhealpix.geojson"
-            with open(output_path, 'w') as f:
-                json.dump(result, f)
-        
+            result = raster2rhealpix(rhealpix_dggs, args.raster, args.resolution, 'geojson', stats=args.statistics, workers=args.workers)
+            output_path = get_output_path(f"{base_name}2rhealpix", format)
+            write_features(result["features"], output_path, format)
+
         print(f"Output saved as {output_path}")
         
     except Exception as e:
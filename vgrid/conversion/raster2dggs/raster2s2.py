@@ -3,10 +3,13 @@ from tqdm import tqdm
 import rasterio
 from vgrid.utils import s2
 import numpy as np
+import shapely
 from shapely.geometry import Polygon, Point, mapping
 from vgrid.stats.s2stats import s2_metrics
-from vgrid.utils.antimeridian import fix_polygon
-from vgrid.generator.settings import geodesic_dggs_metrics, geodesic_dggs_to_feature
+from vgrid.generator.settings import geodesic_dggs_to_features
+from vgrid.generator.s2grid import s2_cells_to_polygons
+from vgrid.conversion.raster2dggs.raster_helper import raster_windows, raster_cell_ids, sample_raster, zonal_statistics, zonal_stats
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from math import cos, radians
 
 def get_nearest_s2_resolution(raster_path):
@@ -53,7 +56,7 @@ def convert_numpy_types(obj):
     else:
         return obj
 
-def raster2s2(raster_path, resolution=None, format='geojson'):
+def raster2s2(raster_path, resolution=None, format='geojson', stats=None, workers=1):
     # Step 1: Determine the nearest s2 resolution if none is provided
     if resolution is None:
         resolution = get_nearest_s2_resolution(raster_path)
@@ -61,53 +64,32 @@ def raster2s2(raster_path, resolution=None, format='geojson'):
 
     # Open the raster file to get metadata and data
     with rasterio.open(raster_path) as src:
-        raster_data = src.read()  # Read all bands
+        windows = raster_windows(src)  # Bands are read per window, not all at once
         transform = src.transform
         width, height = src.width, src.height
         band_count = src.count  # Number of bands in the raster
 
-    s2_tokens = set()
-    
-    for row in range(height):
-        for col in range(width):
-            lon, lat = transform * (col, row)
-            lat_lng = s2.LatLng.from_degrees(lat, lon)
-            s2_id = s2.CellId.from_lat_lng(lat_lng) # return S2 cell at max level 30
-            s2_id = s2_id.parent(resolution) # get S2 cell at resolution
-            s2_token = s2.CellId.to_token(s2_id) # get Cell ID Token, shorter than cell_id.id()
-            s2_tokens.add(s2_token)
-
-    # Sample the raster values at the centroids of the s2 hexagons
+    # Cells are carried as uint64 ids and only rendered as tokens for the output
+    if stats:
+        # Aggregate all pixels in each s2 cell with the selected statistic
+        cell_values = zonal_stats(s2.cell_ids_from_latlng, raster_path, windows, resolution, stats, workers)
+    else:
+        cell_ids = np.sort(np.fromiter(raster_cell_ids(s2.cell_ids_from_latlng, transform, windows, resolution, workers), dtype=np.uint64))
+
+        # Sample the raster values at the centroids of the s2 cells
+        centroids = shapely.centroid(s2_cells_to_polygons(cell_ids))
+        centroid_lats = [round(lat, 7) for lat in shapely.get_y(centroids).tolist()]
+        centroid_lons = [round(lon, 7) for lon in shapely.get_x(centroids).tolist()]
+        cell_values = sample_raster(raster_path, windows, cell_ids.tolist(), centroid_lats, centroid_lons, workers)
+
+    cell_ids = np.array([cell_id for cell_id, _ in cell_values], dtype=np.uint64)
+    s2_tokens = s2.cell_ids_to_tokens(cell_ids).tolist()
     s2_data = []
-    
-    for s2_token in tqdm(s2_tokens, desc="Resampling", unit=" cells"):
-        cell_id = s2.CellId.from_token(s2_token)
-        s2_cell = s2.Cell(cell_id)
-        vertices = [s2_cell.get_vertex(i) for i in range(4)]
-        
-        shapely_vertices = []
-        for vertex in vertices:
-            lat_lng = s2.LatLng.from_point(vertex)  # Convert Point to LatLng
-            longitude = lat_lng.lng().degrees  # Access longitude in degrees
-            latitude = lat_lng.lat().degrees   # Access latitude in degrees
-            shapely_vertices.append((longitude, latitude))
-
-        # Close the polygon by adding the first vertex again
-        shapely_vertices.append(shapely_vertices[0])  # Closing the polygon
-        # Create a Shapely Polygon
-        cell_polygon = fix_polygon(Polygon(shapely_vertices)) # Fix antimeridian
-        num_edges = 4
-        centroid_lat, centroid_lon,_,_ =  geodesic_dggs_metrics(cell_polygon,num_edges)
-        
-        col, row = ~transform * (centroid_lon, centroid_lat)
-        
-        if 0 <= col < width and 0 <= row < height:
-            # Get the values for all bands at this centroid
-            values = raster_data[:, int(row), int(col)]
-            s2_data.append({
-                "s2": s2_token,
-                **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
-            })
+    for s2_token, (_, values) in zip(s2_tokens, cell_values):
+        s2_data.append({
+            "s2": s2_token,
+            **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
+        })
     
     if format.lower()  == 'csv':
         import io
@@ -119,31 +101,11 @@ def raster2s2(raster_path, resolution=None, format='geojson'):
         return output.getvalue()
     
     # Create the GeoJSON-like structure
-    s2_features = []
-    for data in tqdm(s2_data, desc="Converting to GeoJSON", unit=" cells"):
-        cell_id = s2.CellId.from_token(data['s2'])
-        s2_cell = s2.Cell(cell_id)
-        if s2_cell:
-            # Get the vertices of the cell (4 vertices for a rectangular cell)
-            vertices = [s2_cell.get_vertex(i) for i in range(4)]
-            # Prepare vertices in (longitude, latitude) format for Shapely
-            shapely_vertices = []
-            for vertex in vertices:
-                lat_lng = s2.LatLng.from_point(vertex)  # Convert Point to LatLng
-                longitude = lat_lng.lng().degrees  # Access longitude in degrees
-                latitude = lat_lng.lat().degrees   # Access latitude in degrees
-                shapely_vertices.append((longitude, latitude))
-
-            # Close the polygon by adding the first vertex again
-            shapely_vertices.append(shapely_vertices[0])  # Closing the polygon
-            # Create a Shapely Polygon
-            cell_polygon = fix_polygon(Polygon(shapely_vertices)) # Fix antimeridian
-            num_edges = 4
-            band_properties = {f"band_{i+1}": data[f"band_{i+1}"] for i in range(band_count)}
-            s2_feature = geodesic_dggs_to_feature("s2",data["s2"],resolution,cell_polygon,num_edges)   
-            s2_feature["properties"].update(convert_numpy_types(band_properties))
-
-            s2_features.append(s2_feature)
+    num_edges = 4
+    s2_features = geodesic_dggs_to_features("s2", s2_tokens, resolution, s2_cells_to_polygons(cell_ids), num_edges)
+    for s2_feature, data in zip(s2_features, tqdm(s2_data, desc="Converting to GeoJSON", unit=" cells")):
+        band_properties = {f"band_{i+1}": data[f"band_{i+1}"] for i in range(band_count)}
+        s2_feature["properties"].update(convert_numpy_types(band_properties))
 
     return {
         "type": "FeatureCollection",
@@ -163,7 +125,17 @@ def raster2s2_cli():
 
     parser.add_argument(
         '-f', '--format', type=str, required=False, default='geojson',
-        choices=['geojson', 'csv'], help="Output format (geojson or csv)"
+        choices=output_formats + ['csv'], help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+
+    parser.add_argument(
+        '-stats', '--statistics', type=str, required=False, default=None,
+        choices=zonal_statistics, help="Aggregate all pixels in each cell with this statistic (default: sample the pixel at the cell centroid)"
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of threads reading and assigning raster windows (default is 1)"
     )
 
     args = parser.parse_args()
@@ -180,24 +152,19 @@ def raster2s2_cli():
             print(f"Please select a resolution in [0..24] range and try again")
             return
 
-    # Process the raster
-    result = raster2s2(raster, resolution, format)
-    
-    # Generate output filename
     base_name = os.path.splitext(os.path.basename(raster))[0]
-    output_path = f"{base_name}2s2.{format}"
-    
-    # Save the output
-    if format.lower()  == 'geojson':
-        with open(output_path, 'w') as f:
-            json.dump(result, f)
-    elif format.lower()  == 'csv':
-        fieldnames = list(result[0].keys())
+
+    if format.lower() == 'csv':
+        # raster2s2 returns the CSV text directly
+        result = raster2s2(raster, resolution, format, stats=args.statistics, workers=args.workers)
+        output_path = f"{base_name}2s2.csv"
         with open(output_path, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(result)
-    
+            f.write(result)
+    else:
+        result = raster2s2(raster, resolution, 'geojson', stats=args.statistics, workers=args.workers)
+        output_path = get_output_path(f"{base_name}2s2", format)
+        write_features(result["features"], output_path, format)
+
     print(f"Output saved as {output_path}")
 
 if __name__ == "__main__":
@@ -7,6 +7,9 @@ from shapely.geometry import Polygon
 import json
 from vgrid.stats.tilecodestats import tilecode_metrics
 from vgrid.generator.settings import graticule_dggs_to_feature
+from vgrid.conversion.latlon2dggs import latlon2tilecode_array
+from vgrid.conversion.raster2dggs.raster_helper import raster_windows, raster_cell_ids, sample_raster, zonal_statistics, zonal_stats
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from math import cos, radians
 import csv
 import re
@@ -55,7 +58,7 @@ def convert_numpy_types(obj):
     else:
         return obj
 
-def raster2tilecode(raster_path, resolution=None, format='geojson'):
+def raster2tilecode(raster_path, resolution=None, format='geojson', stats=None, workers=1):
     """Convert raster to tilecode format
     
     Args:
@@ -74,36 +77,32 @@ def raster2tilecode(raster_path, resolution=None, format='geojson'):
 
     # Open the raster file to get metadata and data
     with rasterio.open(raster_path) as src:
-        raster_data = src.read()  # Read all bands
+        windows = raster_windows(src)  # Bands are read per window, not all at once
         transform = src.transform
         width, height = src.width, src.height
         band_count = src.count  # Number of bands in the raster
 
-    tilecode_ids = set()
-    
-    for row in range(height):
-        for col in range(width):
-            lon, lat = transform * (col, row)
-            tilecode_id = tilecode.latlon2tilecode(lat,lon,resolution)            
-            tilecode_ids.add(tilecode_id)
+    if stats:
+        # Aggregate all pixels in each tilecode cell with the selected statistic
+        cell_values = zonal_stats(latlon2tilecode_array, raster_path, windows, resolution, stats, workers)
+    else:
+        tilecode_ids = list(raster_cell_ids(latlon2tilecode_array, transform, windows, resolution, workers))
+
+        # Sample the raster values at the centroids of the tilecode cells
+        centroid_lats, centroid_lons = [], []
+        for tilecode_id in tqdm(tilecode_ids, desc="Resampling", unit=" cells"):
+            # Get the centroid of the tilecode cell
+            centroid_lat, centroid_lon = tilecode.tilecode2latlon(tilecode_id)
+            centroid_lats.append(centroid_lat)
+            centroid_lons.append(centroid_lon)
+        cell_values = sample_raster(raster_path, windows, tilecode_ids, centroid_lats, centroid_lons, workers)
 
-    # Sample the raster values at the centroids of the tilecode hexagons
     tilecode_data = []
-    
-    for tilecode_id in tqdm(tilecode_ids, desc="Resampling", unit=" cells"):  
-        # Get the centroid of the tilecode cell
-        centroid_lat, centroid_lon = tilecode.tilecode2latlon(tilecode_id)
-        
-        # Sample the raster values at the centroid (lat, lon)
-        col, row = ~transform * (centroid_lon, centroid_lat)
-        
-        if 0 <= col < width and 0 <= row < height:
-            # Get the values for all bands at this centroid
-            values = raster_data[:, int(row), int(col)]
-            tilecode_data.append({
-                "tilecode": tilecode_id,
-                **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
-            })
+    for tilecode_id, values in cell_values:
+        tilecode_data.append({
+            "tilecode": tilecode_id,
+            **{f"band_{i+1}": values[i] for i in range(band_count)}  # Create separate columns for each band
+        })
     
     if format == 'csv':
         import io
@@ -162,8 +161,17 @@ def raster2tilecode_cli():
     
     parser.add_argument(
         '-f', '--format', type=str, required=False, default='geojson',
-        choices=['geojson', 'csv'], 
-        help="Output format: 'geojson' for GeoJSON format with geometry, 'csv' for tabular data with tilecode and band values"
+        choices=output_formats + ['csv'], help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+
+    parser.add_argument(
+        '-stats', '--statistics', type=str, required=False, default=None,
+        choices=zonal_statistics, help="Aggregate all pixels in each cell with this statistic (default: sample the pixel at the cell centroid)"
+    )
+
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of threads reading and assigning raster windows (default is 1)"
     )
 
     args = parser.parse_args()
@@ -180,18 +188,19 @@ def raster2tilecode_cli():
             print(f"Please select a resolution in [0..26] range and try again ")
             return
 
-    result = raster2tilecode(raster, resolution, format)
+    base_name = os.path.splitext(os.path.basename(raster))[0]
 
-    output_name = os.path.splitext(os.path.basename(raster))[0]
-    output_path = f"{output_name}2tilecode.{format}"
-   
     if format.lower() == 'csv':
+        # raster2tilecode returns the CSV text directly
+        result = raster2tilecode(raster, resolution, format, stats=args.statistics, workers=args.workers)
+        output_path = f"{base_name}2tilecode.csv"
         with open(output_path, 'w', newline='') as f:
             f.write(result)
-    else:  # geojson
-        with open(output_path, 'w') as f:
-            json.dump(result, f)
-            
+    else:
+        result = raster2tilecode(raster, resolution, 'geojson', stats=args.statistics, workers=args.workers)
+        output_path = get_output_path(f"{base_name}2tilecode", format)
+        write_features(result["features"], output_path, format)
+
     print(f"Output saved as {output_path}")
 
 if __name__ == "__main__":
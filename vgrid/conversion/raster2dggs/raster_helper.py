@@ -0,0 +1,222 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from vgrid.generator.settings import chunk_size
+from vgrid.conversion.latlon2dggs import pointwise
+
+
+def raster_windows(src, block_size=None):
+    """
+    Windows covering the raster on a regular grid: the native block windows for
+    tiled rasters, or strips of whole block rows with about block_size pixels each.
+    """
+    block_height, block_width = src.block_shapes[0]
+    if block_width < src.width:
+        return [window for _, window in src.block_windows(1)]
+    rows_per_window = max(block_height, (block_size or chunk_size) // max(src.width, 1) // block_height * block_height)
+    return [Window(0, row_off, src.width, min(rows_per_window, src.height - row_off))
+            for row_off in range(0, src.height, rows_per_window)]
+
+
+def pixel_centers(transform, window):
+    """
+    Longitudes and latitudes of the pixel centres in a window,
+    computed from the affine transform as flat arrays (row-major order).
+    """
+    col_off, row_off = int(window.col_off), int(window.row_off)
+    cols, rows = np.meshgrid(np.arange(col_off, col_off + int(window.width)) + 0.5,
+                             np.arange(row_off, row_off + int(window.height)) + 0.5)
+    lons = transform.a * cols + transform.b * rows + transform.c
+    lats = transform.d * cols + transform.e * rows + transform.f
+    return lons.ravel(), lats.ravel()
+
+
+def raster_cell_ids(encode, transform, windows, resolution, workers=1):
+    """
+    Set of cell ids containing the raster pixel centres, assigned window by window
+    (in parallel with workers > 1).
+    encode(lats, lons, resolution) returns the cell ids of a block of points.
+    """
+    def assign(worker_windows):
+        cell_ids = set()
+        for window in worker_windows:
+            lons, lats = pixel_centers(transform, window)
+            window_cell_ids = np.asarray(encode(lats, lons, resolution))
+            if window_cell_ids.dtype == object:
+                window_cell_ids = window_cell_ids[np.not_equal(window_cell_ids, None)]
+            cell_ids.update(np.unique(window_cell_ids).tolist())
+        return cell_ids
+
+    if workers > 1 and len(windows) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return set().union(*executor.map(assign, [windows[i::workers] for i in range(workers)]))
+    return assign(windows)
+
+
+def read_window_values(raster_path, tasks, rows, cols, values):
+    """Read each (window, indices) task and copy the band values of its pixels into values."""
+    with rasterio.open(raster_path) as src:
+        for window, indices in tasks:
+            data = src.read(window=window)
+            values[indices] = data[:, rows[indices] - int(window.row_off), cols[indices] - int(window.col_off)].T
+
+
+def sample_raster(raster_path, windows, cell_ids, centroid_lats, centroid_lons, workers=1):
+    """
+    Sample all bands at the cell centroids, reading only the windows that contain
+    a centroid (in parallel with workers > 1), so the raster is never fully loaded.
+    Returns (cell_id, band values) pairs for centroids that fall inside the raster.
+    """
+    if len(cell_ids) == 0:
+        return []
+    with rasterio.open(raster_path) as src:
+        inverse = ~src.transform
+        width, height = src.width, src.height
+        dtype = np.result_type(*src.dtypes)
+        band_count = src.count
+
+    centroid_lats = np.asarray(centroid_lats, dtype=np.float64)
+    centroid_lons = np.asarray(centroid_lons, dtype=np.float64)
+    cols = inverse.a * centroid_lons + inverse.b * centroid_lats + inverse.c
+    rows = inverse.d * centroid_lons + inverse.e * centroid_lats + inverse.f
+    inside = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+    cell_ids = np.asarray(cell_ids, dtype=object)[inside]
+    rows, cols = rows[inside].astype(np.int64), cols[inside].astype(np.int64)
+
+    # Group the centroid pixels by the window containing them
+    window_height, window_width = int(windows[0].height), int(windows[0].width)
+    window_cols = -(-width // window_width)
+    keys = (rows // window_height) * window_cols + cols // window_width
+    order = np.argsort(keys, kind='stable')
+    unique_keys, starts = np.unique(keys[order], return_index=True)
+    tasks = []
+    for key, indices in zip(unique_keys.tolist(), np.split(order, starts[1:])):
+        row_off, col_off = (key // window_cols) * window_height, (key % window_cols) * window_width
+        window = Window(col_off, row_off, min(window_width, width - col_off), min(window_height, height - row_off))
+        tasks.append((window, indices))
+
+    values = np.empty((len(rows), band_count), dtype=dtype)
+    if workers > 1 and len(tasks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda worker_tasks: read_window_values(raster_path, worker_tasks, rows, cols, values),
+                              [tasks[i::workers] for i in range(workers)]))
+    else:
+        read_window_values(raster_path, tasks, rows, cols, values)
+    return list(zip(cell_ids.tolist(), values))
+
+
+zonal_statistics = ['mean', 'min', 'max', 'sum', 'count', 'mode']
+
+
+def group_reduce(keys, values, ufunc):
+    """Reduce the rows of values that share an integer key with ufunc (sort + reduceat)."""
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], ufunc.reduceat(values[order], starts, axis=0)
+
+
+def value_counts(keys, values, counts=None):
+    """
+    Count the occurrences of each (key, value) pair, or sum their counts if given.
+    Returns the unique keys, values and their counts.
+    """
+    counts = np.ones(len(keys), dtype=np.int64) if counts is None else counts
+    order = np.lexsort((values, keys))
+    keys, values, counts = keys[order], values[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]) | (values[1:] != values[:-1])])
+    return keys[starts], values[starts], np.add.reduceat(counts, starts)
+
+
+def window_zonal_stats(encode, src, window, resolution, stats):
+    """
+    Partial aggregates of one window: the cell ids of its valid pixels and, per cell,
+    the pixel count plus the sum/min/max (or the per-band value counts for mode).
+    """
+    data = src.read(window=window, masked=True)
+    band_count = data.shape[0]
+    valid = ~np.ma.getmaskarray(data).any(axis=0).ravel()
+    lons, lats = pixel_centers(src.transform, window)
+    if not valid.any():
+        return None
+    cell_ids = np.asarray(encode(lats[valid], lons[valid], resolution))
+    if cell_ids.dtype == object:
+        # Pixels outside the grid (e.g. on the edges of the initial QTM facets) have no cell
+        inside = np.not_equal(cell_ids, None)
+        valid[np.flatnonzero(valid)[~inside]] = False
+        cell_ids = cell_ids[inside]
+        if not valid.any():
+            return None
+    cell_ids, keys = np.unique(cell_ids, return_inverse=True)
+    keys = keys.ravel()
+    pixels = np.ma.getdata(data).reshape(band_count, -1)[:, valid].T
+
+    partial = {'cell_ids': cell_ids, 'count': np.bincount(keys, minlength=len(cell_ids))}
+    if stats in ('mean', 'sum'):
+        partial['sum'] = group_reduce(keys, pixels.astype(np.float64), np.add)[1]
+    elif stats == 'min':
+        partial['min'] = group_reduce(keys, pixels, np.minimum)[1]
+    elif stats == 'max':
+        partial['max'] = group_reduce(keys, pixels, np.maximum)[1]
+    elif stats == 'mode':
+        partial['mode'] = [value_counts(keys, pixels[:, band]) for band in range(band_count)]
+    return partial
+
+
+def zonal_stats(encode, raster_path, windows, resolution, stats, workers=1):
+    """
+    Aggregate every valid pixel into the cell containing its centre with
+    stats (mean, min, max, sum, count or mode) in a single pass over the windows.
+    Partial aggregates of cells split across windows are merged with the same
+    sort + reduceat group-by. Returns (cell_id, band values) pairs sorted by cell id.
+    """
+    if stats not in zonal_statistics:
+        raise ValueError(f"Unsupported statistic '{stats}'. Supported statistics: {', '.join(zonal_statistics)}")
+
+    def aggregate(worker_windows):
+        with rasterio.open(raster_path) as src:
+            return [window_zonal_stats(encode, src, window, resolution, stats) for window in worker_windows]
+
+    if workers > 1 and len(windows) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            partials = [partial for worker_partials in executor.map(aggregate, [windows[i::workers] for i in range(workers)])
+                        for partial in worker_partials]
+    else:
+        partials = aggregate(windows)
+    partials = [partial for partial in partials if partial is not None]
+    if not partials:
+        return []
+    with rasterio.open(raster_path) as src:
+        band_count = src.count
+
+    # Merge the partial aggregates by global cell key
+    cell_ids, keys = np.unique(np.concatenate([partial['cell_ids'] for partial in partials]), return_inverse=True)
+    keys = keys.ravel()
+    offsets = np.cumsum([0] + [len(partial['cell_ids']) for partial in partials])
+    count = np.bincount(keys, weights=np.concatenate([partial['count'] for partial in partials]),
+                        minlength=len(cell_ids)).astype(np.int64)
+
+    if stats == 'count':
+        values = np.repeat(count[:, None], band_count, axis=1)
+    elif stats in ('mean', 'sum'):
+        values = group_reduce(keys, np.concatenate([partial['sum'] for partial in partials]), np.add)[1]
+        if stats == 'mean':
+            values = values / count[:, None]
+    elif stats in ('min', 'max'):
+        ufunc = np.minimum if stats == 'min' else np.maximum
+        values = group_reduce(keys, np.concatenate([partial[stats] for partial in partials]), ufunc)[1]
+    else:
+        # Sum the value counts of each (cell, value) pair, then keep the most frequent value
+        # of each cell (the smallest one on ties)
+        values = np.empty((len(cell_ids), band_count), dtype=partials[0]['mode'][0][1].dtype)
+        for band in range(band_count):
+            band_keys = np.concatenate([keys[offset + partial['mode'][band][0]] for offset, partial in zip(offsets, partials)])
+            band_values = np.concatenate([partial['mode'][band][1] for partial in partials])
+            band_counts = np.concatenate([partial['mode'][band][2] for partial in partials])
+            band_keys, band_values, band_counts = value_counts(band_keys, band_values, band_counts)
+            order = np.lexsort((band_values, -band_counts, band_keys))
+            first = np.flatnonzero(np.r_[True, band_keys[order][1:] != band_keys[order][:-1]])
+            values[band_keys[order][first], band] = band_values[order][first]
+
+    return list(zip(cell_ids.tolist(), values))
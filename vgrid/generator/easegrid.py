@@ -1,10 +1,10 @@
 import argparse 
-import json
 from shapely.geometry import mapping, Point, Polygon, box
 from tqdm import tqdm
 from vgrid.utils.easedggs.constants import grid_spec, ease_crs, geo_crs, levels_specs
 from vgrid.utils.easedggs.dggs.grid_addressing import grid_ids_to_geos, geo_polygon_to_grid_ids
-from vgrid.generator.settings import max_cells, geodesic_dggs_to_feature
+from vgrid.generator.settings import geodesic_dggs_to_features, iter_geodesic_dggs_features
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 # Initialize the geodetic model
 
@@ -47,43 +47,46 @@ def get_ease_cells_bbox(resolution, bbox):
     cells_bbox = geo_polygon_to_grid_ids(bounding_box_wkt, level=resolution, source_crs = geo_crs, target_crs = ease_crs, levels_specs = levels_specs, return_centroids = True, wkt_geom=True)
     return cells_bbox
 
-def generate_grid(resolution):
-    ease_features = []
-   
+def iter_grid(resolution):
+    """Lazily yield the global EASE-DGGS grid at the given resolution as GeoJSON-like features."""
     level_spec = levels_specs[resolution]
     n_row = level_spec["n_row"]
     n_col = level_spec["n_col"]
+    num_edges = 4
 
     cells = get_ease_cells(resolution)
 
-    for cell in tqdm(cells, total=len(cells), desc="Generating EASE DGGS", unit=" cells"):
-        geo = grid_ids_to_geos([cell])
-        center_lon, center_lat = geo['result']['data'][0]
-        cell_min_lat = center_lat - (180 / (2 * n_row))
-        cell_max_lat = center_lat + (180 / (2 * n_row))
-        cell_min_lon = center_lon - (360 / (2 * n_col))
-        cell_max_lon = center_lon + (360 / (2 * n_col))    
-        
-        cell_polygon = Polygon([
-            [cell_min_lon, cell_min_lat],
-            [cell_max_lon, cell_min_lat],
-            [cell_max_lon, cell_max_lat],
-            [cell_min_lon, cell_max_lat],
-            [cell_min_lon, cell_min_lat]
-        ])
-        if cell_polygon:
-            num_edges = 4
-            ease_feature = geodesic_dggs_to_feature('ease', str(cell), resolution, cell_polygon, num_edges)
-            ease_features.append(ease_feature)
-    
+    def ease_cells():
+        for cell in tqdm(cells, total=len(cells), desc="Generating EASE DGGS", unit=" cells"):
+            geo = grid_ids_to_geos([cell])
+            center_lon, center_lat = geo['result']['data'][0]
+            cell_min_lat = center_lat - (180 / (2 * n_row))
+            cell_max_lat = center_lat + (180 / (2 * n_row))
+            cell_min_lon = center_lon - (360 / (2 * n_col))
+            cell_max_lon = center_lon + (360 / (2 * n_col))    
+            
+            cell_polygon = Polygon([
+                [cell_min_lon, cell_min_lat],
+                [cell_max_lon, cell_min_lat],
+                [cell_max_lon, cell_max_lat],
+                [cell_min_lon, cell_max_lat],
+                [cell_min_lon, cell_min_lat]
+            ])
+            if cell_polygon:
+                yield str(cell), cell_polygon, num_edges
+
+    return iter_geodesic_dggs_features('ease', ease_cells(), resolution)
+
+
+def generate_grid(resolution):
     return {
         "type": "FeatureCollection",
-        "features": ease_features
+        "features": list(iter_grid(resolution))
     }
 
 
 def generate_grid_within_bbox(resolution, bbox):
-    ease_features = []
+    ease_ids, cell_polygons = [], []
     level_spec = levels_specs[resolution]
     n_row = level_spec["n_row"]
     n_col = level_spec["n_col"]
@@ -108,10 +111,11 @@ def generate_grid_within_bbox(resolution, bbox):
                     [cell_min_lon, cell_max_lat],
                     [cell_min_lon, cell_min_lat]
                 ])
-                num_edges = 4
-                ease_feature = geodesic_dggs_to_feature('ease', str(cell), resolution, cell_polygon, num_edges)
-                ease_features.append(ease_feature)
-         
+                ease_ids.append(str(cell))
+                cell_polygons.append(cell_polygon)
+
+        num_edges = 4
+        ease_features = geodesic_dggs_to_features('ease', ease_ids, resolution, cell_polygons, num_edges)
         return {
             "type": "FeatureCollection",
             "features": ease_features
@@ -123,6 +127,7 @@ def main():
     parser = argparse.ArgumentParser(description='Generate EASE-DGGS DGGS.')
     parser.add_argument('-r', '--resolution', type=int, required=True, help='resolution [0..6]')
     parser.add_argument('-b', '--bbox', type=float, nargs=4, help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)")
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
 
     args = parser.parse_args()
     resolution = args.resolution
@@ -139,23 +144,20 @@ def main():
         total_cells = n_row*n_col
         
         print(f"Resolution {resolution} will generate {total_cells} cells ")
-        if total_cells > max_cells:
-            print(f"which exceeds the limit of {max_cells}.")
-            print("Please select a smaller resolution and try again.")
-            return
-        # Start generating and saving the grid in chunks
-        geojson_features = generate_grid(resolution)
+        # Features are streamed to disk, so the world grid is not limited to max_cells
+        geojson_features = iter_grid(resolution)
         
     else: 
         geojson_features = generate_grid_within_bbox(resolution, bbox)
+        if not geojson_features:
+            return
+        geojson_features = geojson_features["features"]
 
-    if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"ease_grid_{resolution}.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+    # Define the output file path
+    geojson_path = get_output_path(f"ease_grid_{resolution}", args.format)
+    write_features(geojson_features, geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+    print(f"GeoJSON saved as {geojson_path}")
 
 
 if __name__ == '__main__':
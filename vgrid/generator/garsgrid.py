@@ -1,10 +1,11 @@
-import json, argparse
+import argparse
 from tqdm import tqdm
 from shapely.geometry import Polygon, mapping, box
 import numpy as np
 from vgrid.utils.gars.garsgrid import GARSGrid  # Ensure the correct import path
 
-from vgrid.generator.settings import max_cells, graticule_dggs_to_feature
+from vgrid.generator.settings import graticule_dggs_to_features, iter_graticule_dggs_features
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 def get_resolution_minutes(resolution):
     """Convert resolution level to minutes.
@@ -31,7 +32,8 @@ def get_resolution_minutes(resolution):
     }
     return minutes_map[resolution]
 
-def generate_grid(resolution):
+def iter_grid(resolution):
+    """Lazily yield the global GARS grid at the given resolution as GeoJSON-like features."""
     # Default to the whole world if no bounding box is provided
     lon_min, lat_min, lon_max, lat_max = -180, -90, 180, 90
 
@@ -43,27 +45,27 @@ def generate_grid(resolution):
     latitudes = np.arange(lat_min, lat_max, resolution_degrees)
 
     total_cells = len(longitudes) * len(latitudes)
-        
-    gars_features = []
-    # Loop over longitudes and latitudes with tqdm progress bar
-    with tqdm(total=total_cells, desc="Generating GARS DGGS", unit=" cells") as pbar:
-        for lon in longitudes:
-            for lat in latitudes:
-                # Create the GARS grid code
-                gars_cell = GARSGrid.from_latlon(lat, lon, resolution_minutes)
-                wkt_polygon = gars_cell.polygon
-                
-                if wkt_polygon:
-                    cell_polygon = Polygon(list(wkt_polygon.exterior.coords))
-                    gars_id = gars_cell.gars_id
-                    gars_feature = graticule_dggs_to_feature('gars', gars_id, resolution, cell_polygon)
-                    gars_features.append(gars_feature)
-                    pbar.update(1)
 
+    def cells():
+        # Loop over longitudes and latitudes with tqdm progress bar
+        with tqdm(total=total_cells, desc="Generating GARS DGGS", unit=" cells") as pbar:
+            for lon in longitudes:
+                for lat in latitudes:
+                    # Create the GARS grid code
+                    gars_cell = GARSGrid.from_latlon(lat, lon, resolution_minutes)
+                    wkt_polygon = gars_cell.polygon
+                    
+                    if wkt_polygon:
+                        yield gars_cell.gars_id, Polygon(list(wkt_polygon.exterior.coords))
+                        pbar.update(1)
+
+    return iter_graticule_dggs_features('gars', cells(), resolution)
+
+def generate_grid(resolution):
     # Create a FeatureCollection
     return {
             "type": "FeatureCollection",
-            "features": gars_features,
+            "features": list(iter_grid(resolution)),
         }
  
 def generate_grid_within_bbox(bbox, resolution):
@@ -77,7 +79,7 @@ def generate_grid_within_bbox(bbox, resolution):
     longitudes = np.arange(lon_min-resolution_degrees, lon_max + resolution_degrees, resolution_degrees)
     latitudes = np.arange(lat_min-resolution_degrees, lat_max + resolution_degrees, resolution_degrees)
 
-    gars_features = []
+    gars_ids, cell_polygons = [], []
     # Loop over longitudes and latitudes with tqdm progress bar
     with tqdm(desc="Generating GARS DGGS", unit=" cells") as pbar:
         for lon in longitudes:
@@ -90,11 +92,11 @@ def generate_grid_within_bbox(bbox, resolution):
                     cell_polygon = Polygon(list(wkt_polygon.exterior.coords))                
                    
                     if bbox_polygon.intersects(cell_polygon):
-                        gars_id = gars_cell.gars_id                       
-                        gars_feature = graticule_dggs_to_feature('gars', gars_id, resolution, cell_polygon)
-                        gars_features.append(gars_feature)
+                        gars_ids.append(gars_cell.gars_id)
+                        cell_polygons.append(cell_polygon)
                         pbar.update(1)
 
+    gars_features = graticule_dggs_to_features('gars', gars_ids, resolution, cell_polygons)
     # Create a FeatureCollection
     return {
             "type": "FeatureCollection",
@@ -112,6 +114,10 @@ def main():
         "-b", "--bbox", type=float, nargs=4,
         help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)"
     )
+    parser.add_argument(
+        "-f", "--format", type=str, choices=output_formats, default="geojson",
+        help="Output format (geojson, geojsonseq or geoparquet)"
+    )
 
     args = parser.parse_args()
     resolution = args.resolution
@@ -131,20 +137,14 @@ def main():
 
         total_cells = len(longitudes) * len(latitudes)
         print(f"Resolution level {resolution} ({resolution_minutes} minutes) will generate {total_cells} cells ")
-        if total_cells > max_cells:
-            print(f"which exceeds the limit of {max_cells}.")
-            print("Please select a smaller resolution and try again.")
-            return
-    
-        geojson_features = generate_grid(resolution)
+        # Features are streamed to disk, so the world grid is not limited to max_cells
+        geojson_features = iter_grid(resolution)
     
     else: 
-        geojson_features = generate_grid_within_bbox(bbox, resolution)
+        geojson_features = generate_grid_within_bbox(bbox, resolution)["features"]
     
-    output_filename = f'gars_grid_{resolution}.geojson'
-   
-    with open(output_filename, 'w') as f:
-        json.dump(geojson_features, f, indent=2)
+    output_filename = get_output_path(f'gars_grid_{resolution}', args.format)
+    write_features(geojson_features, output_filename, args.format)
 
     print(f"GARS grid saved to {output_filename}")
 
@@ -1,10 +1,15 @@
 # Reference: https://geohash.softeng.co/uekkn, https://github.com/vinsci/geohash, https://www.movable-type.co.uk/scripts/geohash.html?geohash=dp3
 import  vgrid.utils.geohash as geohash
-import argparse,json
+import argparse
+import numpy as np
+import shapely
+from itertools import product
 from shapely.geometry import Polygon, shape
 from shapely.ops import unary_union
 from tqdm import tqdm
-from vgrid.generator.settings import max_cells, graticule_dggs_to_feature
+from functools import partial
+from vgrid.generator.settings import graticule_dggs_to_features, iter_parallel_features, chunk_size
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 initial_geohashes = [
     "b", "c", "f", "g", "u", "v", "y", "z",
@@ -33,94 +38,166 @@ def geohash_to_polygon(gh):
         (bbox['w'], bbox['s'])
     ])
 
-def expand_geohash(gh, target_length, geohashes):
-    if len(gh) == target_length:
-        geohashes.add(gh)
-        return
-    for char in "0123456789bcdefghjkmnpqrstuvwxyz":
-        expand_geohash(gh + char, target_length, geohashes)
-
-def generate_grid(resolution):
+def clipped_polygons(lat, lon, lat_err, lon_err):
+    """Polygons of cell centres and half sizes, clipped as in geohash_to_polygon."""
+    w, e = np.maximum(lon - lon_err, -180), np.minimum(lon + lon_err, 180)
+    s, n = np.maximum(lat - lat_err, -85.051129), np.minimum(lat + lat_err, 85.051129)
+    rings = np.stack([np.stack([w, s], axis=-1), np.stack([w, n], axis=-1), np.stack([e, n], axis=-1),
+                      np.stack([e, s], axis=-1), np.stack([w, s], axis=-1)], axis=1)
+    return shapely.polygons(rings)
+
+def geohash_to_polygons(geohash_ids):
+    """Batch geohash_to_polygon: polygons of an array of geohashes, decoded together."""
+    return clipped_polygons(*geohash.decode_array(geohash_ids, delta=True))
+
+def lattice_lengths(resolution):
+    """Numbers of latitude and longitude bits of the geohash grid at a resolution."""
+    return resolution * 5 // 2, resolution * 5 - resolution * 5 // 2
+
+def geohash_int_polygons(geohash_ints, resolution):
+    """Polygons (as geohash_to_polygon) of uint64 geohash integers of a resolution, from their grid rows and columns."""
+    lat, lon = geohash.int_array_to_lattice(geohash_ints, resolution)
+    return clipped_polygons(*geohash.lattice_decode(lat, lon, *lattice_lengths(resolution), delta=True))
+
+def geohash_bbox_polygons(geohash_ids):
+    """Polygons of the geohash.bbox of an array of geohashes, counterclockwise from the southwest corner."""
+    w, s, e, n = geohash.bbox_array(geohash_ids).T
+    rings = np.stack([np.stack([w, s], axis=-1), np.stack([e, s], axis=-1), np.stack([e, n], axis=-1),
+                      np.stack([w, n], axis=-1), np.stack([w, s], axis=-1)], axis=1)
+    return shapely.polygons(rings)
+
+def iter_int_features(int_chunks, resolution):
+    """Lazily yield the features of chunks of uint64 geohash integers of a resolution."""
+    for geohash_ints in int_chunks:
+        geohash_ids = geohash.int_array_to_hashcodes(geohash_ints, resolution).tolist()
+        yield from graticule_dggs_to_features("geohash", geohash_ids, resolution, geohash_int_polygons(geohash_ints, resolution))
+
+def prefix_int_chunks(prefix, resolution):
+    """uint64 geohash integers of all cells of a resolution under a geohash prefix, in geohash order, a chunk at a time."""
+    shift = 5 * (resolution - len(prefix))
+    start = 0
+    for char in prefix:
+        start = start * 32 + "0123456789bcdefghjkmnpqrstuvwxyz".index(char)
+    stop = (start + 1) << shift
+    for chunk_start in range(start << shift, stop, chunk_size):
+        yield np.arange(chunk_start, min(chunk_start + chunk_size, stop), dtype=np.uint64)
+
+def prefix_features(prefix, resolution):
+    """Geohash features of all cells under a geohash prefix, one unit of work for a worker process."""
+    return list(iter_int_features(prefix_int_chunks(prefix, resolution), resolution))
+
+def iter_grid(resolution, workers=1):
+    """
+    Lazily yield Geohash features for the entire world at the given geohash resolution,
+    optionally sharded by geohash prefix across `workers` processes.
+    """
+    total_cells = 32 ** resolution
+    if workers > 1:
+        # Prefixes with at most 32**3 cells each keep the processes evenly loaded
+        prefix_length = max(1, resolution - 3)
+        shards = [gh + "".join(suffix) for gh in initial_geohashes
+                  for suffix in product("0123456789bcdefghjkmnpqrstuvwxyz", repeat=prefix_length - 1)]
+        return iter_parallel_features(partial(prefix_features, resolution=resolution), shards, workers,
+                                      total=total_cells, desc="Generating Geohash DGGS")
+
+    def int_chunks():
+        with tqdm(total=total_cells, desc="Generating Geohash DGGS", unit=" cells") as pbar:
+            for gh in initial_geohashes:
+                for geohash_ints in prefix_int_chunks(gh, resolution):
+                    yield geohash_ints
+                    pbar.update(len(geohash_ints))
+
+    return iter_int_features(int_chunks(), resolution)
+
+def generate_grid(resolution, workers=1):
     """Generate GeoJSON for the entire world at the given geohash resolution."""
-  
-    geohashes = set()
-    for gh in initial_geohashes:
-        expand_geohash(gh, resolution, geohashes)
-
-    geohash_features = []
-    for gh in tqdm(geohashes, desc="Generating Geohash DGGS", unit=" cells"):
-        cell_polygon = geohash_to_polygon(gh)
-        geohash_feature = graticule_dggs_to_feature("geohash",gh,resolution,cell_polygon)   
-        geohash_features.append(geohash_feature)
-
     return {
         "type": "FeatureCollection",
-        "features": geohash_features
+        "features": list(iter_grid(resolution, workers))
     }
 
-
-def expand_geohash_bbox(gh, target_length, geohashes,bbox_polygon):
-    """Expand geohash only if it intersects the bounding box."""
-    polygon = geohash_to_polygon(gh)
-    if not polygon.intersects(bbox_polygon):
-        return  
-
-    if len(gh) == target_length:
-        geohashes.add(gh)  # Add to the set if it reaches the target resolution
-        return
-
-    for char in "0123456789bcdefghjkmnpqrstuvwxyz":
-        expand_geohash_bbox(gh + char, target_length, geohashes,bbox_polygon)
+def lattice_indexes(min_value, max_value, resolution, axis):
+    """
+    Rows (axis 0) or columns (axis 1) of the geohash grid at a resolution whose cells, and all their
+    parents, span [min_value, max_value] in latitude or longitude. Cells are refined one resolution at
+    a time, keeping the children of the rows or columns that overlap the range.
+    """
+    indexes = np.arange(1 << lattice_lengths(1)[axis])
+    for level in range(1, resolution + 1):
+        if level > 1:
+            bits = lattice_lengths(level)[axis] - lattice_lengths(level - 1)[axis]
+            indexes = ((indexes[:, None] << bits) + np.arange(1 << bits)).ravel()
+        lat, lon, lat_err, lon_err = geohash.lattice_decode(indexes, indexes, *lattice_lengths(level), delta=True)
+        if axis == 0:
+            # Cells beyond the clipping latitude are flipped by the clipping, so take both orders
+            s, n = np.maximum(lat - lat_err, -85.051129), np.minimum(lat + lat_err, 85.051129)
+            start, end = np.minimum(s, n), np.maximum(s, n)
+        else:
+            start, end = np.maximum(lon - lon_err, -180), np.minimum(lon + lon_err, 180)
+        indexes = indexes[(start <= max_value) & (end >= min_value)]
+    return indexes
+
+def geohash_bbox_ints(resolution, bbox):
+    """
+    Sorted uint64 geohash integers of the cells at a resolution that intersect a bounding box. Geohash
+    cells form a regular latitude/longitude grid at each resolution, so the rows and columns are
+    selected separately from the cell bounds, without any cell geometry.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    rows = lattice_indexes(min_lat, max_lat, resolution, 0)
+    cols = lattice_indexes(min_lon, max_lon, resolution, 1)
+    rows, cols = np.meshgrid(rows, cols, indexing='ij')
+    return np.sort(geohash.lattice_to_int_array(rows.ravel(), cols.ravel(), resolution))
+
+def geohash_cover(geometry, resolution):
+    """
+    Sorted uint64 geohash integers of the cells at a resolution that intersect a geometry. Cells are
+    refined from resolution 1 and only those on the boundary of the geometry are tested at finer
+    resolutions: all the children of cells inside it intersect it too.
+    """
+    shapely.prepare(geometry)
+    geohash_ints = np.arange(32, dtype=np.uint64)
+    covered = [geohash_ints[:0]]
+    for level in range(1, resolution + 1):
+        if level > 1:
+            geohash_ints = ((geohash_ints[:, None] << np.uint64(5)) | np.arange(32, dtype=np.uint64)).ravel()
+        cell_polygons = geohash_int_polygons(geohash_ints, level)
+        intersects = shapely.intersects(geometry, cell_polygons)
+        inside = shapely.contains(geometry, cell_polygons) if level < resolution else intersects
+        if inside.any():
+            shift = 5 * (resolution - level)
+            covered.append(((geohash_ints[inside][:, None] << np.uint64(shift)) | np.arange(1 << shift, dtype=np.uint64)).ravel())
+        geohash_ints = geohash_ints[intersects & ~inside]
+    return np.sort(np.concatenate(covered))
+
+def sorted_int_chunks(geohash_ints, desc="Generating Geohash DGGS"):
+    """Chunks of an array of geohash integers, with a progress bar over the cells."""
+    with tqdm(total=len(geohash_ints), desc=desc, unit=" cells") as pbar:
+        for start in range(0, len(geohash_ints), chunk_size):
+            yield geohash_ints[start:start + chunk_size]
+            pbar.update(len(geohash_ints[start:start + chunk_size]))
+
+def iter_grid_within_bbox(resolution, bbox):
+    """Lazily yield Geohash features within a bounding box at the given resolution."""
+    return iter_int_features(sorted_int_chunks(geohash_bbox_ints(resolution, bbox)), resolution)
 
 def generate_grid_within_bbox(resolution, bbox):
     """Generate GeoJSON for geohashes within a bounding box at the given resolution."""
-    geohash_features = []
-    bbox_polygon = Polygon.from_bounds(*bbox)
-
-    # Compute intersected geohashes using set comprehension
-    intersected_geohashes = {gh for gh in initial_geohashes if geohash_to_polygon(gh).intersects(bbox_polygon)}
-
-    # Expand geohash bounding box
-    geohashes_bbox = set()
-    for gh in intersected_geohashes:
-        expand_geohash_bbox(gh, resolution, geohashes_bbox, bbox_polygon)
-
-    # Generate GeoJSON features
-    geohash_features.extend(
-        graticule_dggs_to_feature("geohash", gh, resolution, geohash_to_polygon(gh))
-        for gh in tqdm(geohashes_bbox, desc="Generating Geohash DGGS", unit=" cells")
-    )
-
     return {
         "type": "FeatureCollection",
-        "features": geohash_features
+        "features": list(iter_grid_within_bbox(resolution, bbox))
     }
 
 
 def generate_grid_resample(resolution, geojson_features):
     """Generate GeoJSON for geohashes within a GeoJSON feature collection at the given resolution."""
-    geohash_features = []
-
     # Union of all input geometries
     geometries = [shape(feature["geometry"]) for feature in geojson_features["features"]]
     unified_geom = unary_union(geometries)
 
-    # Compute intersected geohashes from the initial set
-    intersected_geohashes = {
-        gh for gh in initial_geohashes
-        if geohash_to_polygon(gh).intersects(unified_geom)
-    }
-
-    # Expand geohash coverage within the unified geometry
-    geohashes_geom = set()
-    for gh in intersected_geohashes:
-        expand_geohash_bbox(gh, resolution, geohashes_geom, unified_geom)
-
-    # Generate GeoJSON features
-    geohash_features.extend(
-        graticule_dggs_to_feature("geohash", gh, resolution, geohash_to_polygon(gh))
-        for gh in tqdm(geohashes_geom, desc="Generating Geohash DGGS", unit="cells")
-    )
+    # Cells intersecting the unified geometry, testing only the cells on its boundary
+    geohash_ints = geohash_cover(unified_geom, resolution)
+    geohash_features = list(iter_int_features(sorted_int_chunks(geohash_ints), resolution))
 
     return {
         "type": "FeatureCollection",
@@ -138,6 +215,14 @@ def main():
         '-b', '--bbox', type=float, nargs=4,
         help='Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)'
     )
+    parser.add_argument(
+        '-f', '--format', type=str, choices=output_formats, default='geojson',
+        help="Output format (geojson, geojsonseq or geoparquet)"
+    )
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of worker processes for the whole-world grid (default is 1)"
+    )
     args = parser.parse_args()
     resolution = args.resolution
     bbox = args.bbox
@@ -146,28 +231,19 @@ def main():
         print("Resolution must be between 1 and 10.")
         return
 
-    # Validate resolution and calculate metrics
+    # Features are streamed to disk, so the world grid is not limited to max_cells
     if not bbox:
         total_cells = 32 ** resolution
         print(f"Resolution {resolution} will generate {total_cells} cells ")
-        if total_cells > max_cells:
-            print(f"which exceeds the limit of {max_cells} cells.")
-            print("Please select a smaller resolution and try again.")
-            return
-
-        geojson_features = generate_grid(resolution)   
+        geojson_features = iter_grid(resolution, args.workers)   
     
     else:
         # Generate grid within the bounding box
-        geojson_features = generate_grid_within_bbox(resolution, bbox)
+        geojson_features = iter_grid_within_bbox(resolution, bbox)
   
-    if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"geohash_grid_{resolution}.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
-
-        print(f"GeoJSON saved as {geojson_path}")
+    output_path = get_output_path(f"geohash_grid_{resolution}", args.format)
+    write_features(geojson_features, output_path, args.format)
+    print(f"Output saved as {output_path}")
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,11 @@
 from vgrid.utils import georef
-import json, argparse
+import argparse
 from tqdm import tqdm
 from shapely.geometry import Polygon, box
 import numpy as np
 
-from vgrid.generator.settings import max_cells, graticule_dggs_to_feature
+from vgrid.generator.settings import max_cells, graticule_dggs_to_features, iter_graticule_dggs_features
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
 RESOLUTION_DEGREES = {
     -1: 15.0,       # 15° x 15°
@@ -27,11 +28,33 @@ RESOLUTION_DEGREES = {
 # }
 
 
-def generate_grid(bbox, resolution):
+def get_grid_axes(bbox, resolution):
     lon_min, lat_min, lon_max, lat_max = bbox    
     resolution_degrees = RESOLUTION_DEGREES[resolution]
     longitudes = np.arange(lon_min, lon_max, resolution_degrees)
     latitudes = np.arange(lat_min, lat_max, resolution_degrees)
+    return longitudes, latitudes
+
+
+def iter_grid(bbox, resolution):
+    """Lazily yield GEOREF cells within bbox as GeoJSON-like features."""
+    resolution_degrees = RESOLUTION_DEGREES[resolution]
+    longitudes, latitudes = get_grid_axes(bbox, resolution)
+    num_cells = len(longitudes) * len(latitudes)
+
+    def cells():
+        with tqdm(total=num_cells, desc="Generating GEOREF DGGS", unit=" cells") as pbar:
+            for lon in longitudes:
+                for lat in latitudes:
+                    cell_polygon = Polygon(box(lon, lat, lon + resolution_degrees, lat + resolution_degrees))
+                    yield georef.encode(lat, lon, resolution), cell_polygon
+                    pbar.update(1)
+
+    return iter_graticule_dggs_features('georef', cells(), resolution)
+
+
+def generate_grid(bbox, resolution):
+    longitudes, latitudes = get_grid_axes(bbox, resolution)
     num_cells = len(longitudes) * len(latitudes)
     
     print(f"Resolution {resolution} will generate {num_cells} cells ")
@@ -39,20 +62,10 @@ def generate_grid(bbox, resolution):
         print(f"which exceeds the limit of {max_cells}.")
         print("Please select a smaller resolution and try again.")
         return
-    georef_features = []
-    
-    with tqdm(total=num_cells, desc="Generating GEOREF DGGS", unit=" cells") as pbar:
-        for lon in longitudes:
-            for lat in latitudes:
-                cell_polygon = Polygon(box(lon, lat, lon + resolution_degrees, lat + resolution_degrees))
-                georef_id = georef.encode(lat, lon, resolution)
-                georef_feature = graticule_dggs_to_feature('georef', georef_id, resolution,cell_polygon)
-                georef_features.append(georef_feature)
-                pbar.update(1)
-    
+
     return {
         "type": "FeatureCollection",
-        "features": georef_features,
+        "features": list(iter_grid(bbox, resolution)),
     }
 
 
@@ -66,6 +79,10 @@ def main():
         "-b", "--bbox", type=float, nargs=4,
         help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)"
     )
+    parser.add_argument(
+        "-f", "--format", type=str, choices=output_formats, default="geojson",
+        help="Output format (geojson, geojsonseq or geoparquet)"
+    )
 
     args = parser.parse_args()
     resolution =args.resolution
@@ -75,11 +92,12 @@ def main():
         print(f"Please select a resolution in [-1..5] range and try again ")
         return
     
-    geojson_features = generate_grid(bbox, resolution)
-    output_filename = f'georef_grid_{resolution}.geojson'
-        
-    with open(output_filename, 'w') as f:
-        json.dump(geojson_features, f, indent=2)
+    longitudes, latitudes = get_grid_axes(bbox, resolution)
+    print(f"Resolution {resolution} will generate {len(longitudes) * len(latitudes)} cells ")
+
+    # Features are streamed to disk, so the grid is not limited to max_cells
+    output_filename = get_output_path(f'georef_grid_{resolution}', args.format)
+    write_features(iter_grid(bbox, resolution), output_filename, args.format)
 
     print(f"GEOREF grid saved to {output_filename}")
 
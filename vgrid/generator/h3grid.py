@@ -4,7 +4,6 @@
 import h3
 from shapely.geometry import Polygon, box
 import argparse
-import json
 import csv
 from tqdm import tqdm
 from pyproj import Geod
@@ -12,7 +11,9 @@ geod = Geod(ellps="WGS84")
 from shapely.geometry import shape, Polygon
 from shapely.ops import unary_union
 
-from vgrid.generator.settings import geodesic_dggs_to_feature
+from functools import partial
+from vgrid.generator.settings import geodesic_dggs_to_feature, geodesic_dggs_to_features, iter_geodesic_dggs_features, iter_parallel_features
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 max_cells = 100_000_000
 
 def fix_h3_antimeridian_cells(hex_boundary, threshold=-128):
@@ -21,32 +22,61 @@ def fix_h3_antimeridian_cells(hex_boundary, threshold=-128):
         return [(lat, lon - 360 if lon > 0 else lon) for lat, lon in hex_boundary]
     return hex_boundary
 
-def generate_grid(resolution, format='geojson'):
-    base_cells = h3.get_res0_cells()
-    num_base_cells = len(base_cells)
-    h3_features = []
-    # Progress bar for base cells
-    with tqdm(total=num_base_cells, desc="Processing base cells", unit=" cells") as pbar:
-        for cell in base_cells:
-            child_cells = h3.cell_to_children(cell, resolution)
-            # Progress bar for child cells
-            for child_cell in child_cells:
-                # Get the boundary of the cell
-                hex_boundary = h3.cell_to_boundary(child_cell)
-                # Wrap and filter the boundary
-                filtered_boundary = fix_h3_antimeridian_cells(hex_boundary)
-                # Reverse lat/lon to lon/lat for GeoJSON compatibility
-                reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
-                cell_polygon = Polygon(reversed_boundary)                
-                if cell_polygon.is_valid:
-                    h3_id = str(child_cell)
-                    num_edges = 6
-                    if (h3.is_pentagon(h3_id)):
-                        num_edges = 5
-                    h3_feature = geodesic_dggs_to_feature("h3",h3_id,resolution,cell_polygon,num_edges)   
-                    h3_features.append(h3_feature)
+def h3_cell_to_polygon(h3_id):
+    # Get the boundary of the cell
+    hex_boundary = h3.cell_to_boundary(h3_id)
+    # Wrap and filter the boundary
+    filtered_boundary = fix_h3_antimeridian_cells(hex_boundary)
+    # Reverse lat/lon to lon/lat for GeoJSON compatibility
+    reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
+    return Polygon(reversed_boundary)
+
+def h3_cell_to_feature(h3_id):
+    """H3 cell feature with its geodesic metrics, or None if the cell polygon is invalid."""
+    cell_polygon = h3_cell_to_polygon(h3_id)
+    if not cell_polygon.is_valid:
+        return None
+    num_edges = 5 if h3.is_pentagon(h3_id) else 6
+    return geodesic_dggs_to_feature("h3", h3_id, h3.get_resolution(h3_id), cell_polygon, num_edges)
+
+def iter_children_cells(cell, resolution):
+    """Yield (h3_id, cell_polygon, num_edges) for the valid children of a cell at the given resolution."""
+    for child_cell in h3.cell_to_children(cell, resolution):
+        cell_polygon = h3_cell_to_polygon(child_cell)
+        if cell_polygon.is_valid:
+            h3_id = str(child_cell)
+            num_edges = 5 if h3.is_pentagon(h3_id) else 6
+            yield h3_id, cell_polygon, num_edges
+
+def children_features(cell, resolution):
+    """H3 features of the children of a cell, one unit of work for a worker process."""
+    return list(iter_geodesic_dggs_features("h3", iter_children_cells(cell, resolution), resolution))
+
+def iter_grid(resolution, workers=1):
+    """
+    Lazily yield H3 features covering the whole world, one base cell at a time,
+    or sharded across `workers` processes.
+    """
+    total_cells = h3.get_num_cells(resolution)
+    if workers > 1:
+        # Shards of at most 7**5 cells keep the processes evenly loaded
+        shard_resolution = max(0, resolution - 5)
+        shards = [shard for cell in h3.get_res0_cells() for shard in h3.cell_to_children(cell, shard_resolution)]
+        return iter_parallel_features(partial(children_features, resolution=resolution), shards, workers,
+                                      total=total_cells, desc="Generating H3 DGGS")
+
+    def cells():
+        with tqdm(total=total_cells, desc="Generating H3 DGGS", unit=" cells") as pbar:
+            for cell in h3.get_res0_cells():
+                for h3_cell in iter_children_cells(cell, resolution):
+                    yield h3_cell
                     pbar.update(1)
 
+    return iter_geodesic_dggs_features("h3", cells(), resolution)
+
+def generate_grid(resolution, format='geojson', workers=1):
+    h3_features = list(iter_grid(resolution, workers))
+
     if format.lower() == 'csv':
         csv_rows = []
         for feature in h3_features:
@@ -62,6 +92,7 @@ def generate_grid(resolution, format='geojson'):
             "features": h3_features,
         }
     
+
 def geodesic_buffer(polygon, distance):
     buffered_coords = []
     for lon, lat in polygon.exterior.coords:
@@ -76,11 +107,30 @@ def geodesic_buffer(polygon, distance):
     all_coords = [coord for circle in buffered_coords for coord in circle]
     return Polygon(all_coords).convex_hull
 
-def generate_grid_within_bbox(resolution, bbox, format='geojson'):
+def get_bbox_buffer_cells(resolution, bbox):
     bbox_polygon = box(*bbox)  # Create a bounding box polygon
     distance = h3.average_hexagon_edge_length(resolution,unit='m')*2
     bbox_buffer = geodesic_buffer(bbox_polygon, distance)
-    bbox_buffer_cells  = h3.geo_to_cells(bbox_buffer,resolution)
+    return h3.geo_to_cells(bbox_buffer,resolution)
+
+def iter_grid_within_bbox(resolution, bbox, bbox_buffer_cells=None):
+    """Lazily yield H3 features intersecting a bounding box."""
+    bbox_polygon = box(*bbox)
+    if bbox_buffer_cells is None:
+        bbox_buffer_cells = get_bbox_buffer_cells(resolution, bbox)
+
+    def cells():
+        for bbox_buffer_cell in tqdm(bbox_buffer_cells, desc="Generating H3 DGGS", unit=" cells"):
+            cell_polygon = h3_cell_to_polygon(bbox_buffer_cell)
+            if cell_polygon.intersects(bbox_polygon):
+                h3_id = str(bbox_buffer_cell)
+                num_edges = 5 if h3.is_pentagon(h3_id) else 6
+                yield h3_id, cell_polygon, num_edges
+
+    return iter_geodesic_dggs_features("h3", cells(), resolution)
+
+def generate_grid_within_bbox(resolution, bbox, format='geojson'):
+    bbox_buffer_cells = get_bbox_buffer_cells(resolution, bbox)
     total_cells = len(bbox_buffer_cells)
     print(f"Resolution {resolution} within bounding box {bbox} will generate {total_cells} cells ")
     
@@ -89,23 +139,7 @@ def generate_grid_within_bbox(resolution, bbox, format='geojson'):
         print("Please select a smaller resolution and try again.")
         return
     else:    
-        h3_features = []
-        # Progress bar for base cells
-        for bbox_buffer_cell in tqdm(bbox_buffer_cells, desc="Processing cells"):
-                # Get the boundary of the cell
-                hex_boundary = h3.cell_to_boundary(bbox_buffer_cell)
-                # Wrap and filter the boundary
-                filtered_boundary = fix_h3_antimeridian_cells(hex_boundary)
-                # Reverse lat/lon to lon/lat for GeoJSON compatibility
-                reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
-                cell_polygon = Polygon(reversed_boundary)
-                if cell_polygon.intersects(bbox_polygon):
-                    h3_id = str(bbox_buffer_cell)
-                    num_edges = 6
-                    if (h3.is_pentagon(h3_id)):
-                        num_edges = 5
-                    h3_feature = geodesic_dggs_to_feature("h3",h3_id,resolution,cell_polygon,num_edges)   
-                    h3_features.append(h3_feature)
+        h3_features = list(iter_grid_within_bbox(resolution, bbox, bbox_buffer_cells))
 
         if format.lower() == 'csv':
             csv_rows = []
@@ -135,26 +169,26 @@ def generate_grid_resample(resolution, geojson_features):
     # Generate H3 cells that cover the buffered geometry
     h3_cells = h3.geo_to_cells(buffered_geom, resolution)
 
-    h3_features = []
+    h3_ids, cell_polygons, cell_num_edges = [], [], []
     for h3_cell in tqdm(h3_cells, desc="Generating H3 DGGS", unit= " cells"):
-        hex_boundary = h3.cell_to_boundary(h3_cell)
-        filtered_boundary = fix_h3_antimeridian_cells(hex_boundary)
-        reversed_boundary = [(lon, lat) for lat, lon in filtered_boundary]
-        cell_polygon = Polygon(reversed_boundary)
+        cell_polygon = h3_cell_to_polygon(h3_cell)
 
         # Only keep cells that intersect the unified input geometry
         if cell_polygon.intersects(unified_geom):
             h3_id = str(h3_cell)
             num_edges = 6 if not h3.is_pentagon(h3_id) else 5
-            h3_feature = geodesic_dggs_to_feature("h3", h3_id, resolution, cell_polygon, num_edges)
-            h3_features.append(h3_feature)
+            h3_ids.append(h3_id)
+            cell_polygons.append(cell_polygon)
+            cell_num_edges.append(num_edges)
+
+    h3_features = geodesic_dggs_to_features("h3", h3_ids, resolution, cell_polygons, cell_num_edges)
 
     return {
         "type": "FeatureCollection",
         "features": h3_features,
     }
 
-def h3grid(resolution, bbox=None, format='geojson'):
+def h3grid(resolution, bbox=None, format='geojson', workers=1):
     """
     Generate H3 grid for pure Python usage.
     
@@ -162,6 +196,7 @@ def h3grid(resolution, bbox=None, format='geojson'):
         resolution (int): H3 resolution [0..15]
         bbox (list, optional): Bounding box [min_lon, min_lat, max_lon, max_lat]. Defaults to None (whole world).
         format (str, optional): Output format ('geojson' or 'csv'). Defaults to 'geojson'.
+        workers (int, optional): Number of processes for the whole-world grid. Defaults to 1.
     
     Returns:
         dict or list: GeoJSON FeatureCollection or list of CSV rows depending on format
@@ -174,7 +209,7 @@ def h3grid(resolution, bbox=None, format='geojson'):
         num_cells = h3.get_num_cells(resolution)
         if num_cells > max_cells:
             raise ValueError(f"Resolution {resolution} will generate {num_cells} cells which exceeds the limit of {max_cells}")
-        return generate_grid(resolution, format)
+        return generate_grid(resolution, format, workers)
     else:
         return generate_grid_within_bbox(resolution, bbox, format)
 
@@ -187,31 +222,40 @@ def h3grid_cli():
         help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)"
     )
     parser.add_argument(
-        '-f', '--format', type=str, choices=['geojson', 'csv'], default='geojson',
-        help="Output format (geojson or csv)"
+        '-f', '--format', type=str, choices=output_formats + ['csv'], default='geojson',
+        help="Output format (geojson, geojsonseq, geoparquet or csv)"
+    )
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of worker processes for the whole-world grid (default is 1)"
     )
     args = parser.parse_args()
     
     try:
-        result = h3grid(args.resolution, args.bbox, args.format)
-        if result is None:
-            return
-
-        # Define the output file path
-        output_path = f"h3_grid_{args.resolution}.{args.format}"
-        
         if args.format == 'csv':
+            result = h3grid(args.resolution, args.bbox, args.format, args.workers)
+            if result is None:
+                return
+            output_path = f"h3_grid_{args.resolution}.csv"
             with open(output_path, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=['h3_id', 'resolution', 'num_edges', 'geometry'])
+                writer = csv.DictWriter(f, fieldnames=['h3'])
                 writer.writeheader()
                 writer.writerows(result)
         else:
-            with open(output_path, 'w') as f:
-                json.dump(result, f, indent=2)
+            # Feature outputs are streamed to disk, so no cell limit applies
+            if args.resolution < 0 or args.resolution > 15:
+                raise ValueError("Resolution must be in range [0..15]")
+            if args.bbox is None:
+                print(f"Resolution {args.resolution} will generate {h3.get_num_cells(args.resolution)} cells ")
+                features = iter_grid(args.resolution, args.workers)
+            else:
+                features = iter_grid_within_bbox(args.resolution, args.bbox)
+            output_path = get_output_path(f"h3_grid_{args.resolution}", args.format)
+            write_features(features, output_path, args.format)
 
         print(f"Output saved as {output_path}")
         
-    except ValueError as e:
+    except (ValueError, ImportError) as e:
         print(f"Error: {str(e)}")
         return
 
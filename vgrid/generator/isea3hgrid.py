@@ -1,5 +1,4 @@
 import argparse
-import json
 from shapely.geometry import Polygon
 from shapely.wkt import loads
 import platform
@@ -11,6 +10,7 @@ if (platform.system() == 'Windows'):
     from vgrid.utils.eaggr.enums.shape_string_format import ShapeStringFormat
     
 from tqdm import tqdm
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from shapely.geometry import Polygon, box, mapping
 from vgrid.utils.antimeridian import fix_polygon
 import platform
@@ -189,6 +189,10 @@ def main():
         '-b', '--bbox', type=float, nargs=4, 
         help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)"
     )
+    parser.add_argument(
+        '-f', '--format', type=str, choices=output_formats, default='geojson',
+        help="Output format (geojson, geojsonseq or geoparquet)"
+    )
     if (platform.system() == 'Windows'):
         isea3h_dggs = Eaggr(Model.ISEA3H)
         args = parser.parse_args()
@@ -214,9 +218,8 @@ def main():
             geojson_features = generate_grid_within_bbox(isea3h_dggs,resolution, bbox)
             
         # Define the GeoJSON file path
-        geojson_path = f"isea3h_grid_{resolution}.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        geojson_path = get_output_path(f"isea3h_grid_{resolution}", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
         print (f"GeoJSON saved as {geojson_path}")
 
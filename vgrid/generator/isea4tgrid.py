@@ -1,5 +1,4 @@
 import argparse
-import json
 from shapely.wkt import loads
 import platform
 
@@ -12,9 +11,10 @@ if (platform.system() == 'Windows'):
 
 from shapely.ops import unary_union
 from tqdm import tqdm
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from shapely.geometry import Polygon, box, shape
 from vgrid.utils.antimeridian import fix_polygon
-from vgrid.generator.settings import max_cells, isea4t_base_cells, geodesic_dggs_to_feature
+from vgrid.generator.settings import max_cells, isea4t_base_cells, geodesic_dggs_to_features
 
 
 def fix_isea4t_wkt(isea4t_wkt):
@@ -85,21 +85,22 @@ def get_isea4t_children_cells_within_bbox(isea4t_dggs,bounding_cell, bbox, targe
 def generate_grid(isea4t_dggs, resolution):
     # accuracy = isea4t_res_accuracy_dict.get(resolution)
     children = get_isea4t_children_cells(isea4t_dggs, isea4t_base_cells, resolution)
-    isea4t_features = []
+    isea4t_ids, cell_polygons = [], []
     for child in tqdm(children, desc="Generating ISEA4T DGGS", unit=" cells"):
         isea4t_cell = DggsCell(child)
         cell_polygon = isea4t_cell_to_polygon(isea4t_dggs, isea4t_cell)
         isea4t_id = isea4t_cell.get_cell_id()
-        num_edges = 3
         if resolution == 0:
             cell_polygon = fix_polygon(cell_polygon)
         elif isea4t_id.startswith('00') or isea4t_id.startswith('09')\
             or isea4t_id.startswith('14') or isea4t_id.startswith('04') or isea4t_id.startswith('19'):
             cell_polygon = fix_isea4t_antimeridian_cells(cell_polygon)
         
-        isea4t_feature = geodesic_dggs_to_feature('isea4t', isea4t_id,resolution, cell_polygon, num_edges)
-        isea4t_features.append(isea4t_feature)
-    
+        isea4t_ids.append(isea4t_id)
+        cell_polygons.append(cell_polygon)
+
+    num_edges = 3
+    isea4t_features = geodesic_dggs_to_features('isea4t', isea4t_ids, resolution, cell_polygons, num_edges)
     return {
             "type": "FeatureCollection",
             "features": isea4t_features
@@ -115,7 +116,7 @@ def generate_grid_within_bbox(isea4t_dggs, resolution,bbox):
     bbox_cells = isea4t_shape.get_shape().get_outer_ring().get_cells()
     bounding_cell = isea4t_dggs.get_bounding_dggs_cell(bbox_cells)
     bounding_children = get_isea4t_children_cells_within_bbox(isea4t_dggs, bounding_cell.get_cell_id(), bounding_box,resolution)
-    isea4t_features = []
+    isea4t_ids, cell_polygons = [], []
     for child in tqdm(bounding_children, desc="Generating ISEA4T DGGS", unit=" cells"):
         isea4t_cell = DggsCell(child)
         cell_polygon = isea4t_cell_to_polygon(isea4t_dggs,isea4t_cell)
@@ -125,12 +126,13 @@ def generate_grid_within_bbox(isea4t_dggs, resolution,bbox):
         
         elif isea4t_id.startswith('00') or isea4t_id.startswith('09') or isea4t_id.startswith('14') or isea4t_id.startswith('04') or isea4t_id.startswith('19'):
             cell_polygon = fix_isea4t_antimeridian_cells(cell_polygon)
-        num_edges = 3
                 
         # if cell_polygon.intersects(bounding_box):
-        isea4t_feature = geodesic_dggs_to_feature('isea4t', isea4t_id, resolution, cell_polygon, num_edges)
-        isea4t_features.append(isea4t_feature)           
-            
+        isea4t_ids.append(isea4t_id)
+        cell_polygons.append(cell_polygon)
+
+    num_edges = 3
+    isea4t_features = geodesic_dggs_to_features('isea4t', isea4t_ids, resolution, cell_polygons, num_edges)
     return {
         "type": "FeatureCollection",
         "features": isea4t_features
@@ -154,7 +156,7 @@ def generate_grid_resample(isea4t_dggs, resolution, geojson_features):
         isea4t_dggs, bounding_cell.get_cell_id(), unified_geom, resolution
     )
 
-    isea4t_features = []
+    isea4t_ids, cell_polygons = [], []
     for child in tqdm(bounding_children, desc="Generating ISEA4T DGGS", unit=" cells"):
         isea4t_cell = DggsCell(child)
         cell_polygon = isea4t_cell_to_polygon(isea4t_dggs, isea4t_cell)
@@ -165,15 +167,15 @@ def generate_grid_resample(isea4t_dggs, resolution, geojson_features):
         elif isea4t_id.startswith(('00', '09', '14', '04', '19')):
             cell_polygon = fix_isea4t_antimeridian_cells(cell_polygon)
 
-        num_edges = 3
-
         # Optional: only include cells intersecting original geometry
         if not cell_polygon.intersects(unified_geom):
             continue
 
-        isea4t_feature = geodesic_dggs_to_feature('isea4t', isea4t_id, resolution, cell_polygon, num_edges)
-        isea4t_features.append(isea4t_feature)
+        isea4t_ids.append(isea4t_id)
+        cell_polygons.append(cell_polygon)
 
+    num_edges = 3
+    isea4t_features = geodesic_dggs_to_features('isea4t', isea4t_ids, resolution, cell_polygons, num_edges)
     return {
         "type": "FeatureCollection",
         "features": isea4t_features
@@ -187,6 +189,10 @@ def main():
         '-b', '--bbox', type=float, nargs=4, 
         help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)"
     )
+    parser.add_argument(
+        '-f', '--format', type=str, choices=output_formats, default='geojson',
+        help="Output format (geojson, geojsonseq or geoparquet)"
+    )
     
     if (platform.system() == 'Windows'):
         isea4t_dggs = Eaggr(Model.ISEA4T)
@@ -211,9 +217,8 @@ def main():
             geojson_features = generate_grid_within_bbox(isea4t_dggs,resolution, bbox)
        
         # Define the GeoJSON file path
-        geojson_path = f"isea4t_grid_{resolution}.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        geojson_path = get_output_path(f"isea4t_grid_{resolution}", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
         print (f"GeoJSON saved as {geojson_path}")
 
@@ -2,15 +2,17 @@
 # https://ha8tks.github.io/Leaflet.Maidenhead/examples/
 # https://www.sotamaps.org/
 
-import json, math
+import math
 import argparse
 from vgrid.utils import maidenhead
 from tqdm import tqdm  
-from vgrid.generator.settings import max_cells, graticule_dggs_to_feature
+from vgrid.generator.settings import graticule_dggs_to_features, iter_graticule_dggs_features
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from shapely.geometry import Polygon
 from vgrid.stats.maidenheadstats import maidenhead_metrics
 
-def generate_grid(resolution):
+def iter_grid(resolution):
+    """Lazily yield the global Maidenhead grid at the given resolution as GeoJSON-like features."""
     if resolution == 1:
         lon_width, lat_width = 20, 10
     elif resolution == 2:
@@ -28,34 +30,36 @@ def generate_grid(resolution):
     y_cells = int((max_lat - min_lat) / lat_width)
     total_cells = x_cells * y_cells
 
-    maidenhead_features = []
-    with tqdm(total=total_cells, desc="Generating Maidenhead DGGS", unit=" cells") as pbar:
-        for i in range(x_cells):
-            for j in range(y_cells):
-                cell_min_lon = min_lon + i * lon_width
-                cell_max_lon = cell_min_lon + lon_width
-                cell_min_lat = min_lat + j * lat_width
-                cell_max_lat = cell_min_lat + lat_width
+    def cells():
+        with tqdm(total=total_cells, desc="Generating Maidenhead DGGS", unit=" cells") as pbar:
+            for i in range(x_cells):
+                for j in range(y_cells):
+                    cell_min_lon = min_lon + i * lon_width
+                    cell_max_lon = cell_min_lon + lon_width
+                    cell_min_lat = min_lat + j * lat_width
+                    cell_max_lat = cell_min_lat + lat_width
 
-                cell_center_lat = (cell_min_lat + cell_max_lat) / 2
-                cell_center_lat = (cell_min_lon + cell_max_lon) / 2
-                maidenhead_id = maidenhead.toMaiden(cell_center_lat, cell_center_lat, resolution)
-                _, _, min_lat_maiden, min_lon_maiden, max_lat_maiden, max_lon_maiden, _ = maidenhead.maidenGrid(maidenhead_id)
-                # Define the polygon based on the bounding box
-                cell_polygon = Polygon([
-                    [min_lon_maiden, min_lat_maiden],  # Bottom-left corner
-                    [max_lon_maiden, min_lat_maiden],  # Bottom-right corner
-                    [max_lon_maiden, max_lat_maiden],  # Top-right corner
-                    [min_lon_maiden, max_lat_maiden],  # Top-left corner
-                    [min_lon_maiden, min_lat_maiden]   # Closing the polygon (same as the first point)
-                ])
-                maidenhead_feature = graticule_dggs_to_feature('maidenhead',maidenhead_id,resolution,cell_polygon)
-                maidenhead_features.append(maidenhead_feature)
-                pbar.update(1)
+                    cell_center_lat = (cell_min_lat + cell_max_lat) / 2
+                    cell_center_lat = (cell_min_lon + cell_max_lon) / 2
+                    maidenhead_id = maidenhead.toMaiden(cell_center_lat, cell_center_lat, resolution)
+                    _, _, min_lat_maiden, min_lon_maiden, max_lat_maiden, max_lon_maiden, _ = maidenhead.maidenGrid(maidenhead_id)
+                    # Define the polygon based on the bounding box
+                    cell_polygon = Polygon([
+                        [min_lon_maiden, min_lat_maiden],  # Bottom-left corner
+                        [max_lon_maiden, min_lat_maiden],  # Bottom-right corner
+                        [max_lon_maiden, max_lat_maiden],  # Top-right corner
+                        [min_lon_maiden, max_lat_maiden],  # Top-left corner
+                        [min_lon_maiden, min_lat_maiden]   # Closing the polygon (same as the first point)
+                    ])
+                    yield maidenhead_id, cell_polygon
+                    pbar.update(1)
+
+    return iter_graticule_dggs_features('maidenhead', cells(), resolution)
 
+def generate_grid(resolution):
     return {
         "type": "FeatureCollection",
-        "features": maidenhead_features
+        "features": list(iter_grid(resolution))
     }
 
 def generate_grid_within_bbox(resolution, bbox):
@@ -80,7 +84,7 @@ def generate_grid_within_bbox(resolution, bbox):
     start_y = math.floor((min_lat - base_lat) / lat_width)
     end_y = math.floor((max_lat - base_lat) / lat_width)
 
-    maidenhead_features = []
+    maidenhead_ids, cell_polygons = [], []
 
     total_cells = (end_x - start_x + 1) * (end_y - start_y + 1)
 
@@ -112,12 +116,12 @@ def generate_grid_within_bbox(resolution, bbox):
                         [min_lon_maiden, min_lat_maiden]   # Closing the polygon (same as the first point)
                     ])
                     
-                    maidenhead_feature = graticule_dggs_to_feature('maidenhead',maidenhead_id,resolution,cell_polygon)            
-                 
-                    maidenhead_features.append(maidenhead_feature)
+                    maidenhead_ids.append(maidenhead_id)
+                    cell_polygons.append(cell_polygon)
 
                 pbar.update(1)
 
+    maidenhead_features = graticule_dggs_to_features('maidenhead', maidenhead_ids, resolution, cell_polygons)
     return {
         "type": "FeatureCollection",
         "features": maidenhead_features
@@ -131,6 +135,10 @@ def main():
         '-b', '--bbox', type=float, nargs=4, 
         help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)"
     ) 
+    parser.add_argument(
+        '-f', '--format', type=str, choices=output_formats, default='geojson',
+        help="Output format (geojson, geojsonseq or geoparquet)"
+    )
     args = parser.parse_args()
     resolution = args.resolution
     bbox = args.bbox if args.bbox else [-180, -90, 180, 90]
@@ -139,21 +147,16 @@ def main():
         # Calculate the number of cells at the given resolution
         num_cells,_,_ = maidenhead_metrics(resolution)
         print(f"Resolution {resolution} will generate {num_cells} cells ")
-        if num_cells > max_cells:
-            print(f"which exceeds the limit of {max_cells}.")
-            print("Please select a smaller resolution and try again.")
-            return
-        geojson_features = generate_grid(resolution)    
+        # Features are streamed to disk, so the world grid is not limited to max_cells
+        geojson_features = iter_grid(resolution)    
     else:
-        geojson_features = generate_grid_within_bbox(resolution, bbox)    
+        geojson_features = generate_grid_within_bbox(resolution, bbox)["features"]
    
-    if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"maidenhead_grid_{resolution}.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+    # Define the output file path
+    geojson_path = get_output_path(f"maidenhead_grid_{resolution}", args.format)
+    write_features(geojson_features, geojson_path, args.format)
 
-        print(f"GeoJSON saved as {geojson_path}")
+    print(f"GeoJSON saved as {geojson_path}")
         
 if __name__ == "__main__":
     main()
\ No newline at end of file
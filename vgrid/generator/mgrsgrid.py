@@ -5,8 +5,9 @@ from pyproj import CRS, Transformer
 import argparse
 import re
 from tqdm import tqdm 
-from vgrid.generator.settings import graticule_dggs_to_feature
+from vgrid.generator.settings import graticule_dggs_to_features
 from vgrid.utils import mgrs
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 import json
 import os
 
@@ -50,7 +51,7 @@ def generate_grid(gzd, resolution):    # Define the UTM CRS
     gzd_geom = shape(gzd_feature["geometry"])
 
     # Create grid polygons
-    mgrs_features = []
+    mgrs_ids, cell_polygons = [], []
     x_coords = np.arange(min_x, max_x, cell_size)
     y_coords = np.arange(min_y, max_y, cell_size)
     num_cells = len(x_coords) * len(y_coords)
@@ -69,16 +70,18 @@ def generate_grid(gzd, resolution):    # Define the UTM CRS
                 if cell_polygon.intersects(gzd_geom):
                     centroid_lat, centroid_lon  =  cell_polygon.centroid.y, cell_polygon.centroid.x,
                     mgrs_id = mgrs.toMgrs(centroid_lat, centroid_lon, resolution)
-                    mgrs_feature = graticule_dggs_to_feature("mgrs",mgrs_id,resolution,cell_polygon)             
                     # clip inside GZD:
                     if not gzd_geom.contains(cell_polygon):
                         intersected_polygon = cell_polygon.intersection(gzd_geom)  
                         if intersected_polygon:
                             intersected_centroid_lat, intersected_centroid_lon  =  intersected_polygon.centroid.y, intersected_polygon.centroid.x,
-                            interescted_mgrs_id = mgrs.toMgrs(intersected_centroid_lat, intersected_centroid_lon, resolution)            
-                            mgrs_feature = graticule_dggs_to_feature("mgrs",interescted_mgrs_id,resolution,intersected_polygon)
-                    mgrs_features.append(mgrs_feature)
+                            mgrs_id = mgrs.toMgrs(intersected_centroid_lat, intersected_centroid_lon, resolution)            
+                            cell_polygon = intersected_polygon
+                    mgrs_ids.append(mgrs_id)
+                    cell_polygons.append(cell_polygon)
                 pbar.update(1)
+
+    mgrs_features = graticule_dggs_to_features("mgrs", mgrs_ids, resolution, cell_polygons)
     return {
         "type": "FeatureCollection",
         "features": mgrs_features
@@ -90,6 +93,7 @@ def main():
     parser = argparse.ArgumentParser(description="Generate MGRS DGGS.")
     parser.add_argument("-r", "--resolution", type=int, default=0, required=True, help="Resolution [0..5]")
     parser.add_argument("-gzd", type = str, default='48P', required=True, help="GZD - Grid Zone Designator, e.g. 48P")
+    parser.add_argument("-f", "--format", type=str, choices=output_formats, default="geojson", help="Output format (geojson, geojsonseq or geoparquet)")
     # Parse the arguments
     args = parser.parse_args()
    
@@ -106,9 +110,8 @@ def main():
     geojson_features = generate_grid(gzd, resolution)
     
     if geojson_features:
-        geojson_path = f"mgrs_grid_{gzd}_{resolution}.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
+        geojson_path = get_output_path(f"mgrs_grid_{gzd}_{resolution}", args.format)
+        write_features(geojson_features["features"], geojson_path, args.format)
 
         print(f"GeoJSON saved as {geojson_path}")
     
@@ -1,9 +1,9 @@
-import json
 import argparse
 from vgrid.utils import olc
 from tqdm import tqdm
 from shapely.geometry import shape, box, Polygon
-from vgrid.generator.settings import max_cells, graticule_dggs_to_feature
+from vgrid.generator.settings import graticule_dggs_to_features, iter_graticule_dggs_features
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from shapely.ops import unary_union
 
 def calculate_total_cells(resolution, bbox):
@@ -18,10 +18,10 @@ def calculate_total_cells(resolution, bbox):
     
     return total_lat_steps * total_lng_steps
 
-def generate_grid(resolution):
+def iter_grid(resolution):
     """
-    Generate a global grid of Open Location Codes (Plus Codes) at the specified precision
-    as a GeoJSON-like feature collection.
+    Lazily yield a global grid of Open Location Codes (Plus Codes) at the specified precision
+    as GeoJSON-like features.
     """
     # Define the boundaries of the world
     sw_lat, sw_lng = -90, -180
@@ -31,41 +31,45 @@ def generate_grid(resolution):
     area = olc.decode(olc.encode(sw_lat, sw_lng, resolution))
     lat_step = area.latitudeHi - area.latitudeLo
     lng_step = area.longitudeHi - area.longitudeLo
-
-    olc_features = []
+    code_length = area.codeLength
 
     # Calculate the total number of steps for progress tracking
     total_lat_steps = int((ne_lat - sw_lat) / lat_step)
     total_lng_steps = int((ne_lng - sw_lng) / lng_step)
     total_steps = total_lat_steps * total_lng_steps
 
-    with tqdm(total=total_steps, desc="Generating OLC DGGS",unit=" cells") as pbar:
-        lat = sw_lat
-        while lat < ne_lat:
-            lng = sw_lng
-            while lng < ne_lng:
-                # Generate the Plus Code for the center of the cell
-                center_lat = lat + lat_step / 2
-                center_lon = lng + lng_step / 2
-                olc_id = olc.encode(center_lat, center_lon, resolution)
-                resolution = olc.decode(olc_id).codeLength
-                cell_polygon = Polygon([
-                            [lng, lat],  # SW
-                            [lng, lat + lat_step],  # NW
-                            [lng + lng_step, lat + lat_step],  # NE
-                            [lng + lng_step, lat],  # SE
-                            [lng, lat]  # Close the polygon
-                    ])
-                olc_feature = graticule_dggs_to_feature('olc',olc_id,resolution,cell_polygon)
-                olc_features.append(olc_feature)
-                lng += lng_step
-                pbar.update(1)  # Update progress bar
-            lat += lat_step
-
-    # Return the feature collection
+    def cells():
+        with tqdm(total=total_steps, desc="Generating OLC DGGS",unit=" cells") as pbar:
+            lat = sw_lat
+            while lat < ne_lat:
+                lng = sw_lng
+                while lng < ne_lng:
+                    # Generate the Plus Code for the center of the cell
+                    center_lat = lat + lat_step / 2
+                    center_lon = lng + lng_step / 2
+                    olc_id = olc.encode(center_lat, center_lon, resolution)
+                    cell_polygon = Polygon([
+                                [lng, lat],  # SW
+                                [lng, lat + lat_step],  # NW
+                                [lng + lng_step, lat + lat_step],  # NE
+                                [lng + lng_step, lat],  # SE
+                                [lng, lat]  # Close the polygon
+                        ])
+                    yield olc_id, cell_polygon
+                    lng += lng_step
+                    pbar.update(1)  # Update progress bar
+                lat += lat_step
+
+    return iter_graticule_dggs_features('olc', cells(), code_length)
+
+def generate_grid(resolution):
+    """
+    Generate a global grid of Open Location Codes (Plus Codes) at the specified precision
+    as a GeoJSON-like feature collection.
+    """
     return {
         "type": "FeatureCollection",
-        "features": olc_features
+        "features": list(iter_grid(resolution))
     }
 
 def generate_grid_within_bbox(resolution, bbox):
@@ -134,6 +138,7 @@ def refine_cell(bounds, current_resolution, target_resolution, bbox_poly):
     lng_step = area.longitudeHi - area.longitudeLo
 
     olc_features = []
+    olc_ids, olc_resolutions, cell_polygons = [], [], []
     lat = min_lat
     while lat < max_lat:
         lng = min_lon
@@ -157,8 +162,9 @@ def refine_cell(bounds, current_resolution, target_resolution, bbox_poly):
                         [lng, lat]  # Close the polygon
                 ])
             
-                olc_feature = graticule_dggs_to_feature('olc',olc_id,resolution,cell_polygon)
-                olc_features.append(olc_feature)
+                olc_ids.append(olc_id)
+                olc_resolutions.append(resolution)
+                cell_polygons.append(cell_polygon)
                 
                 # Recursively refine the cell if not at target resolution
                 if valid_resolution < target_resolution:
@@ -175,6 +181,7 @@ def refine_cell(bounds, current_resolution, target_resolution, bbox_poly):
             # pbar.update(1)
         lat += lat_step
 
+    olc_features.extend(graticule_dggs_to_features('olc', olc_ids, olc_resolutions, cell_polygons))
     return olc_features
 
 def generate_grid_resample(resolution, geojson_features):
@@ -243,6 +250,10 @@ def main():
         '-b', '--bbox', type=float, nargs=4, 
         help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)"
     )
+    parser.add_argument(
+        '-f', '--format', type=str, choices=output_formats, default='geojson',
+        help="Output format (geojson, geojsonseq or geoparquet)"
+    )
 
     args = parser.parse_args()
     resolution = args.resolution
@@ -250,23 +261,18 @@ def main():
   
     num_cells = calculate_total_cells(resolution, bbox)
 
+    # Features are streamed to disk, so the world grid is not limited to max_cells
     if  bbox == [-180, -90, 180, 90]:
         print(f"Resolution {resolution} will generate {num_cells} cells ")
-
-        if num_cells > max_cells:
-            print(f"which exceeds the limit of {max_cells}. ")
-            print("Please select a smaller resolution and try again.")
-            return
-        geojson_features = generate_grid(resolution)
+        geojson_features = iter_grid(resolution)
    
     else:
-        geojson_features = generate_grid_within_bbox(resolution, bbox)
+        geojson_features = generate_grid_within_bbox(resolution, bbox)["features"]
         
-    geojson_path = f"olc_grid_{resolution}.geojson"
-    with open(geojson_path, "w") as f:
-        json.dump(geojson_features, f, indent=2)
+    output_path = get_output_path(f"olc_grid_{resolution}", args.format)
+    write_features(geojson_features, output_path, args.format)
     
-    print(f"OLC grid saved to {geojson_path}")
+    print(f"OLC grid saved to {output_path}")
 
 if __name__ == "__main__":
     main()
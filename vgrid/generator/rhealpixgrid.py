@@ -1,15 +1,28 @@
 import argparse
-import json
 from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
+from vgrid.utils.rhealpixdggs.ellipsoids import WGS84_ELLIPSOID
 from vgrid.utils.rhealpixdggs.utils import my_round
+from vgrid.utils.rhealpixdggs.rhp_wrappers import rhp_to_polygons
 from shapely.geometry import Polygon, box, shape
 from tqdm import tqdm
-from vgrid.generator.settings import max_cells, geodesic_dggs_to_feature
+from functools import partial, lru_cache
+from vgrid.generator.settings import geodesic_dggs_to_feature, geodesic_dggs_to_features, iter_geodesic_dggs_features, iter_parallel_features, chunked
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from shapely.ops import unary_union
 
 from pyproj import Geod
 geod = Geod(ellps="WGS84")
-rhealpix_dggs = RHEALPixDGGS()
+rhealpix_cache_size = 1_000_000
+
+@lru_cache(maxsize=None)
+def shared_rhealpix_dggs(north_square, south_square):
+    return RHEALPixDGGS(ellipsoid=WGS84_ELLIPSOID, north_square=north_square, south_square=south_square, N_side=3)
+
+def get_rhealpix_dggs(north_square=0, south_square=0):
+    """Shared WGS84 rHEALPix DGGS (N_side=3) with the given polar square positions."""
+    return shared_rhealpix_dggs(north_square % 4, south_square % 4)
+
+rhealpix_dggs = get_rhealpix_dggs()
 
 # Function to filter cells crossing the antimeridian
 def fix_rhealpix_antimeridian_cells(boundary, threshold=-128):
@@ -17,34 +30,87 @@ def fix_rhealpix_antimeridian_cells(boundary, threshold=-128):
         return [(lon - 360 if lon > 0 else lon, lat) for lon, lat in boundary]
     return boundary
 
-# Function to convert cell vertices to a Shapely Polygon
-def rhealpix_cell_to_polygon(cell):
+def is_shared_dggs(rdggs):
+    # Cells are cached by suid, so only cells of the shared DGGS instances are cached
+    return rdggs is get_rhealpix_dggs(rdggs.north_square, rdggs.south_square)
+
+def compute_cell_polygon(cell):
     vertices = [tuple(my_round(coord, 14) for coord in vertex) for vertex in cell.vertices(plane=False)]
     if vertices[0] != vertices[-1]:
         vertices.append(vertices[0])
     vertices = fix_rhealpix_antimeridian_cells(vertices)
     return Polygon(vertices)
 
-def generate_grid(resolution):
-    rhealpix_features = []
+@lru_cache(maxsize=rhealpix_cache_size)
+def cached_cell_polygon(north_square, south_square, suid):
+    return compute_cell_polygon(get_rhealpix_dggs(north_square, south_square).cell(suid))
+
+@lru_cache(maxsize=rhealpix_cache_size)
+def cached_cell_neighbors(north_square, south_square, suid):
+    cell = get_rhealpix_dggs(north_square, south_square).cell(suid)
+    return tuple(neighbor.suid for neighbor in cell.neighbors(plane=False).values())
+
+# Function to convert cell vertices to a Shapely Polygon
+def rhealpix_cell_to_polygon(cell):
+    rdggs = cell.rdggs
+    if is_shared_dggs(rdggs):
+        return cached_cell_polygon(rdggs.north_square, rdggs.south_square, tuple(cell.suid))
+    return compute_cell_polygon(cell)
+
+def rhealpix_cell_neighbors(cell):
+    """Ellipsoidal edge neighbors of an rHEALPix cell."""
+    rdggs = cell.rdggs
+    if is_shared_dggs(rdggs):
+        return [rdggs.cell(suid) for suid in cached_cell_neighbors(rdggs.north_square, rdggs.south_square, tuple(cell.suid))]
+    return list(cell.neighbors(plane=False).values())
+
+def rhealpix_cells_to_polygons(rdggs, rhealpix_ids):
+    """
+    Vectorized rhealpix_cell_to_polygon for an array of rHEALPix cell IDs.
+    Returns the cell polygons and their number of edges (3 for darts, 4 otherwise).
+    """
+    # Cells crossing the antimeridian are shifted as fix_rhealpix_antimeridian_cells does
+    return rhp_to_polygons(rhealpix_ids, rdggs)
+
+def iter_rhealpix_cells(rhealpix_cells):
+    """Yield (rhealpix_id, cell_polygon, num_edges) for rHEALPix cells, projected one chunk at a time."""
+    for cells in chunked(rhealpix_cells):
+        rhealpix_ids = [str(cell) for cell in cells]
+        cell_polygons, num_edges = rhealpix_cells_to_polygons(cells[0].rdggs, rhealpix_ids)
+        yield from zip(rhealpix_ids, cell_polygons, num_edges.tolist())
+
+def subcells_features(suid, resolution):
+    """rHEALPix features of the subcells of a cell, one unit of work for a worker process."""
+    subcells = rhealpix_dggs.cell(suid).subcells(resolution)
+    return list(iter_geodesic_dggs_features('rhealpix', iter_rhealpix_cells(subcells), resolution))
+
+def iter_grid(resolution, workers=1):
+    """
+    Lazily yield the global rHEALPix grid at the given resolution as GeoJSON-like features,
+    optionally sharded across `workers` processes.
+    """
     total_cells = rhealpix_dggs.num_cells(resolution)
+    if workers > 1:
+        # Shards of at most 9**4 cells keep the processes evenly loaded
+        shards = [cell.suid for cell in rhealpix_dggs.grid(max(0, resolution - 4))]
+        return iter_parallel_features(partial(subcells_features, resolution=resolution), shards, workers,
+                                      total=total_cells, desc="Generating rHEALPix DGGS")
+
     rhealpix_grid = rhealpix_dggs.grid(resolution)
-            
-    with tqdm(total=total_cells, desc="Generating rHEALPix DGGS", unit=" cells") as pbar:
-        for rhealpix_cell in rhealpix_grid:
-            cell_polygon = rhealpix_cell_to_polygon(rhealpix_cell)
-            rhealpix_id = str(rhealpix_cell)
-            num_edges = 4
-            if rhealpix_cell.ellipsoidal_shape() == 'dart':
-                num_edges = 3
-            rhealpix_feature = geodesic_dggs_to_feature('rhealpix', rhealpix_id, resolution, cell_polygon, num_edges)
-            rhealpix_features.append(rhealpix_feature)
-            pbar.update(1)
-        
-        return {
-            "type": "FeatureCollection",
-            "features": rhealpix_features,
-        }
+
+    def cells():
+        with tqdm(total=total_cells, desc="Generating rHEALPix DGGS", unit=" cells") as pbar:
+            for rhealpix_cell in iter_rhealpix_cells(rhealpix_grid):
+                yield rhealpix_cell
+                pbar.update(1)
+
+    return iter_geodesic_dggs_features('rhealpix', cells(), resolution)
+
+def generate_grid(resolution, workers=1):
+    return {
+        "type": "FeatureCollection",
+        "features": list(iter_grid(resolution, workers)),
+    }
       
 def generate_grid_within_bbox(resolution, bbox):    
     bbox_polygon = box(*bbox)  # Create a bounding box polygon
@@ -72,6 +138,7 @@ def generate_grid_within_bbox(resolution, bbox):
     else:
         # Initialize sets and queue
         covered_cells = set()  # Cells that have been processed (by their unique ID)
+        intersecting_cells = {}  # Cell ID -> (cell, polygon) of the cells intersecting the bounding box
         queue = [seed_cell]  # Queue for BFS exploration
         while queue:
             current_cell = queue.pop()
@@ -84,30 +151,29 @@ def generate_grid_within_bbox(resolution, bbox):
             covered_cells.add(current_cell_id)
 
             # Convert current cell to polygon
-            cell_polygon = rhealpix_cell_to_polygon(current_cell)
+            cell_polygon = cached_cell_polygon(rhealpix_dggs.north_square, rhealpix_dggs.south_square, tuple(current_cell.suid))
 
             # Skip cells that do not intersect the bounding box
             if not cell_polygon.intersects(bbox_polygon):
                 continue
+            intersecting_cells[current_cell_id] = (current_cell, cell_polygon)
 
             # Get neighbors and add to queue
-            neighbors = current_cell.neighbors(plane=False)
-            for _, neighbor in neighbors.items():
+            for neighbor in rhealpix_cell_neighbors(current_cell):
                 neighbor_id = str(neighbor)  # Unique identifier for the neighbor
                 if neighbor_id not in covered_cells:
                     queue.append(neighbor)
 
-        for cell_id in tqdm(covered_cells, desc="Generating rHEALPix DGGS", unit=" cells"):
-            rhealpix_uids = (cell_id[0],) + tuple(map(int, cell_id[1:]))
-            cell = rhealpix_dggs.cell(rhealpix_uids)    
-            cell_polygon = rhealpix_cell_to_polygon(cell)          
-            if cell_polygon.intersects(bbox_polygon):             
-                num_edges = 4
-                if seed_cell.ellipsoidal_shape() == 'dart':
-                    num_edges = 3
-                rhealpix_feature = geodesic_dggs_to_feature('rhealpix', cell_id,resolution, cell_polygon, num_edges)
-                rhealpix_features.append(rhealpix_feature)
-                
+        rhealpix_ids, cell_polygons, cell_num_edges = [], [], []
+        for cell_id, (cell, cell_polygon) in tqdm(intersecting_cells.items(), desc="Generating rHEALPix DGGS", unit=" cells"):
+            num_edges = 4
+            if cell.ellipsoidal_shape() == 'dart':
+                num_edges = 3
+            rhealpix_ids.append(cell_id)
+            cell_polygons.append(cell_polygon)
+            cell_num_edges.append(num_edges)
+
+        rhealpix_features.extend(geodesic_dggs_to_features('rhealpix', rhealpix_ids, resolution, cell_polygons, cell_num_edges))
         return {
             "type": "FeatureCollection",
             "features": rhealpix_features,
@@ -142,6 +208,7 @@ def generate_grid_sample(resolution, geojson_features):
     
     # Step 4: Explore neighbors if more cells needed
     covered_cells = set()
+    intersecting_cells = {}
     queue = [seed_cell]
 
     while queue:
@@ -152,28 +219,27 @@ def generate_grid_sample(resolution, geojson_features):
             continue
 
         covered_cells.add(current_cell_id)
-        cell_polygon = rhealpix_cell_to_polygon(current_cell)
+        cell_polygon = cached_cell_polygon(rhealpix_dggs.north_square, rhealpix_dggs.south_square, tuple(current_cell.suid))
 
         if not cell_polygon.intersects(unified_geom):
             continue
+        intersecting_cells[current_cell_id] = (current_cell, cell_polygon)
 
-        neighbors = current_cell.neighbors(plane=False)
-        for _, neighbor in neighbors.items():
+        for neighbor in rhealpix_cell_neighbors(current_cell):
             neighbor_id = str(neighbor)
             if neighbor_id not in covered_cells:
                 queue.append(neighbor)
 
-    for cell_id in tqdm(covered_cells, desc="Generating rHEALPix DGGS", unit=" cells"):
-        rhealpix_uids = (cell_id[0],) + tuple(map(int, cell_id[1:]))
-        cell = rhealpix_dggs.cell(rhealpix_uids)
-        cell_polygon = rhealpix_cell_to_polygon(cell)
+    rhealpix_ids, cell_polygons, cell_num_edges = [], [], []
+    for cell_id, (cell, cell_polygon) in tqdm(intersecting_cells.items(), desc="Generating rHEALPix DGGS", unit=" cells"):
+        num_edges = 4
+        if cell.ellipsoidal_shape() == 'dart':
+            num_edges = 3
+        rhealpix_ids.append(cell_id)
+        cell_polygons.append(cell_polygon)
+        cell_num_edges.append(num_edges)
 
-        if cell_polygon.intersects(unified_geom):
-            num_edges = 4
-            if seed_cell.ellipsoidal_shape() == 'dart':
-                num_edges = 3
-            rhealpix_feature = geodesic_dggs_to_feature('rhealpix', cell_id, resolution, cell_polygon, num_edges)
-            rhealpix_features.append(rhealpix_feature)
+    rhealpix_features.extend(geodesic_dggs_to_features('rhealpix', rhealpix_ids, resolution, cell_polygons, cell_num_edges))
 
     return {
         "type": "FeatureCollection",
@@ -189,6 +255,14 @@ def main():
         '-b', '--bbox', type=float, nargs=4, 
         help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)"
     )
+    parser.add_argument(
+        '-f', '--format', type=str, choices=output_formats, default='geojson',
+        help="Output format (geojson, geojsonseq or geoparquet)"
+    )
+    parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Number of worker processes for the whole-world grid (default is 1)"
+    )
     args = parser.parse_args()
 
     # Initialize RHEALPix DGGS
@@ -202,23 +276,15 @@ def main():
         # Calculate the number of cells at the given resolution
         num_cells = rhealpix_dggs.num_cells(resolution)
         print(f"Resolution {resolution} will generate {num_cells} cells ")
-
-        if num_cells > max_cells:
-            print(
-                f"which exceeds the limit of {max_cells}."
-            )
-            print("Please select a smaller resolution and try again.")
-            return
-        # Generate grid within the bounding box
-        geojson_features = generate_grid(resolution)      
+        # Features are streamed to disk, so the world grid is not limited to max_cells
+        geojson_features = iter_grid(resolution, args.workers)
     else:
         # Generate grid within the bounding box
-        geojson_features = generate_grid_within_bbox(resolution, bbox)
-        # Define the GeoJSON file path
+        geojson_features = generate_grid_within_bbox(resolution, bbox)["features"]
     
-    geojson_path = f"rhealpix_grid_{resolution}.geojson"
-    with open(geojson_path, 'w') as f:
-        json.dump(geojson_features, f, indent=2)
+    # Define the output file path
+    geojson_path = get_output_path(f"rhealpix_grid_{resolution}", args.format)
+    write_features(geojson_features, geojson_path, args.format)
     print(f"GeoJSON saved as {geojson_path}")
          
 if __name__ == "__main__":
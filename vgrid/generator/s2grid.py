@@ -7,12 +7,14 @@
 # https://gis.stackexchange.com/questions/293716/creating-shapefile-of-s2-cells-for-given-level
 # https://s2.readthedocs.io/en/latest/quickstart.html
 from vgrid.utils import s2
-import json
-import argparse
+import argparse, sys
+import numpy as np
+import shapely
 from tqdm import tqdm
 from vgrid.utils.antimeridian import fix_polygon
 from shapely.geometry import Polygon
-from vgrid.generator.settings import geodesic_dggs_to_feature
+from vgrid.generator.settings import geodesic_dggs_to_features, iter_geodesic_dggs_features, chunked
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 from shapely.geometry import shape
 from shapely.ops import unary_union
 
@@ -31,80 +33,145 @@ def s2_cell_to_polygon(cell_id):
     fixed_polygon = fix_polygon(polygon)    
     return fixed_polygon
 
-def generate_grid(resolution,bbox):
-    min_lng, min_lat, max_lng, max_lat = bbox
-     # Define the cell level (S2 uses a level system for zoom, where level 30 is the highest resolution)
-    level = resolution
-    # Create a list to store the S2 cell IDs
-    cell_ids = []
-    # Define the cell covering
+def s2_cells_to_polygons(cell_ids):
+    """Polygons of S2 cell ids (uint64 array), from vectorized cell vertices."""
+    vertices = s2.cell_vertices(cell_ids)
+    rings = np.concatenate([vertices, vertices[:, :1]], axis=1)
+    lngs = vertices[:, :, 0]
+    # fix_polygon only wraps the longitudes of counterclockwise cells that stay clear of the antimeridian
+    wrapped = rings.copy()
+    wrapped[:, :, 0] = ((rings[:, :, 0] + 180) % 360) - 180
+    polygons = shapely.polygons(wrapped)
+    to_fix = ((lngs.max(axis=1) - lngs.min(axis=1) > 180)
+              | np.any(np.isclose(lngs, 180) | np.isclose(lngs, -180), axis=1)
+              | ~shapely.is_ccw(shapely.get_exterior_ring(polygons)))
+    for i in np.flatnonzero(to_fix):
+        polygons[i] = fix_polygon(Polygon(rings[i]))
+    return polygons
+
+# Points per edge and margin (as a fraction of the cell size) of the cell polygons tested while
+# covering geometries, so that the polygons of all subcells fit inside them
+cover_edge_points = 8
+cover_margin = 0.02
+
+class ShapelyRegion(object):
+    """
+    S2 region of a Shapely geometry in degrees, for s2.RegionCoverer.
+
+    Cells are tested with their densified boundaries grown by a margin, so that may_intersect
+    and contains also hold for the polygons of all their subcells. Cells around a pole or on the
+    antimeridian aren't simple polygons in longitude-latitude, so only their bounds are checked.
+    """
+    def __init__(self, geometry):
+        self.geometry = geometry
+        shapely.prepare(geometry)
+        min_lng, min_lat, max_lng, max_lat = geometry.bounds
+        self.rect = s2.LatLngRect(s2.LatLng.from_degrees(min_lat, min_lng), s2.LatLng.from_degrees(max_lat, max_lng))
+        self.contained = set()  # Ids of the cells found to be inside the geometry
+        self.polygons = {}  # Grown polygons of the last cells tested, by cell id
+
+    def get_cap_bound(self):
+        return self.rect.get_cap_bound()
+
+    def get_rect_bound(self):
+        return self.rect
+
+    def grown_polygon(self, cell):
+        # RegionCoverer tests the 4 children of a cell in turn, so grow them together
+        cell_id = cell.id()
+        if cell_id.id() not in self.polygons:
+            if cell_id.is_face():
+                cell_ids = np.array([cell_id.id()], dtype=np.uint64)
+            else:
+                cell_ids = s2.cell_id_children([cell_id.parent().id()], cell_id.level())
+            rings = s2.cell_vertices(cell_ids, cover_edge_points)
+            lngs, lats = rings[:, :, 0], rings[:, :, 1]
+            simple = ((np.ptp(lngs, axis=1) <= 180) & ~np.isclose(np.abs(lngs), 180).any(axis=1)
+                      & ~np.isclose(np.abs(lats), 90).any(axis=1))
+            margin = cover_margin * np.maximum(np.ptp(lngs, axis=1), np.ptp(lats, axis=1))
+            polygons = np.full(len(cell_ids), None, dtype=object)
+            polygons[simple] = shapely.buffer(shapely.polygons(rings[simple]), margin[simple], quad_segs=2)
+            self.polygons = dict(zip(cell_ids.tolist(), polygons))
+        return self.polygons[cell_id.id()]
+
+    def may_intersect(self, cell):
+        if not self.rect.may_intersect(cell):
+            return False
+        polygon = self.grown_polygon(cell)
+        return polygon is None or self.geometry.intersects(polygon)
+
+    def contains(self, cell):
+        polygon = self.grown_polygon(cell)
+        if polygon is not None and self.geometry.contains(polygon):
+            self.contained.add(cell.id().id())
+            return True
+        return False
+
+def s2_covering(region, resolution):
+    """
+    Cell ids (uint64) of a RegionCoverer covering of an S2 region with cells of resolution or coarser:
+    cells inside the region are kept whole and only cells on its boundary are subdivided.
+    """
     coverer = s2.RegionCoverer()
-    coverer.min_level = level
-    coverer.max_level = level
-    # coverer.max_cells = 1000_000  # Adjust as needed
-    # coverer.max_cells = 0  # Adjust as needed
-
-    # Define the region to cover (in this example, we'll use the entire world)
+    coverer.max_level = resolution
+    coverer.max_cells = sys.maxsize
+    return np.array([cell_id.id() for cell_id in coverer.get_covering(region)], dtype=np.uint64)
+
+def s2_cover(geometry, resolution, compact=False):
+    """
+    Cell ids (uint64) of the cells at resolution whose polygons intersect a Shapely geometry.
+
+    The cells are found top-down with a ShapelyRegion of the geometry: cells inside it are kept
+    with all their subcells without computing any polygons, and only the cells at the requested
+    resolution along its boundary are tested against the geometry itself. If compact is True,
+    complete sets of sibling cells are returned as their parent cell.
+    """
+    region = ShapelyRegion(geometry)
+    covering = s2_covering(region, resolution)
+    inside = np.isin(covering, np.fromiter(region.contained, dtype=np.uint64))
+    cell_ids = s2.cell_id_children(covering[~inside], resolution)
+    cell_ids = cell_ids[shapely.intersects(geometry, s2_cells_to_polygons(cell_ids))]
+    if compact:
+        union = s2.CellUnion(np.concatenate([covering[inside], cell_ids]).tolist())
+        return np.array([cell_id.id() for cell_id in union.cell_ids()], dtype=np.uint64)
+    return np.sort(np.concatenate([s2.cell_id_children(covering[inside], resolution), cell_ids]))
+
+def iter_grid(resolution,bbox):
+    """Lazily yield S2 cells covering bbox as GeoJSON-like features."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    # Cover the bbox with cells of the resolution or coarser, then expand the coarser cells
     region = s2.LatLngRect(
         s2.LatLng.from_degrees(min_lat, min_lng),
         s2.LatLng.from_degrees(max_lat, max_lng)
     )
+    covering = s2.cell_id_children(s2_covering(region, resolution), resolution)
+    num_edges = 4
 
-    # Get the covering cells
-    covering = coverer.get_covering(region)
+    def cells():
+        for cell_ids in chunked(tqdm(covering, desc="Generating S2 DGGS", unit = " cells")):
+            cell_ids = np.array(cell_ids, dtype=np.uint64)
+            for s2_token, cell_polygon in zip(s2.cell_ids_to_tokens(cell_ids).tolist(), s2_cells_to_polygons(cell_ids)):
+                yield s2_token, cell_polygon, num_edges
 
-    # Convert the covering cells to S2 cell IDs
-    for cell_id in covering:
-        cell_ids.append(cell_id)
-
-    s2_features = []    
-    num_edges = 4
-    
-    for cell_id in tqdm(cell_ids, desc="Generating S2 DGGS", unit = " cells"):
-        # Generate a Shapely Polygon
-        cell_polygon = s2_cell_to_polygon(cell_id)
-        s2_token = cell_id.to_token()
-        s2_feature = geodesic_dggs_to_feature("s2",s2_token,resolution,cell_polygon,num_edges)   
-        s2_features.append(s2_feature)
+    return iter_geodesic_dggs_features("s2", cells(), resolution)
 
+def generate_grid(resolution,bbox):
     return {
         "type": "FeatureCollection",
-        "features": s2_features
+        "features": list(iter_grid(resolution, bbox))
     }
 
 def generate_grid_resample(resolution,geojson_features):
     geometries = [shape(feature["geometry"]) for feature in geojson_features["features"]]
     unified_geom = unary_union(geometries)
 
-    # Step 2: Get bounding box from unified geometry
-    min_lng, min_lat, max_lng, max_lat = unified_geom.bounds
+    # Cover the actual geometry, polygonizing only the cells along its boundary
+    cell_ids = s2_cover(unified_geom, resolution)
+    s2_tokens = s2.cell_ids_to_tokens(cell_ids).tolist()
+    cell_polygons = s2_cells_to_polygons(cell_ids)
 
-    # Step 3: Configure the S2 coverer
-    level = resolution
-    coverer = s2.RegionCoverer()
-    coverer.min_level = level
-    coverer.max_level = level
-
-    # Step 4: Create a LatLngRect from the bounding box
-    region = s2.LatLngRect(
-        s2.LatLng.from_degrees(min_lat, min_lng),
-        s2.LatLng.from_degrees(max_lat, max_lng)
-    )
-
-    # Step 5: Get the covering cells
-    covering = coverer.get_covering(region)
-
-    s2_features = []
-    for cell_id in tqdm(covering, desc="Generating S2 DGGS", unit=" cells"):
-        # Convert S2 cell to polygon (must define `s2_cell_to_polygon`)
-        cell_polygon = s2_cell_to_polygon(cell_id)
-        
-        # Check intersection with actual geometry
-        if cell_polygon.intersects(unified_geom):
-            s2_token = cell_id.to_token()
-            num_edges = 4
-            s2_feature = geodesic_dggs_to_feature("s2", s2_token, resolution, cell_polygon, num_edges)
-            s2_features.append(s2_feature)
+    num_edges = 4
+    s2_features = geodesic_dggs_to_features("s2", s2_tokens, resolution, cell_polygons, num_edges)
 
     return {
         "type": "FeatureCollection",
@@ -120,6 +187,10 @@ def main():
         '-b', '--bbox', type=float, nargs=4, 
         help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)"
     ) 
+    parser.add_argument(
+        '-f', '--format', type=str, choices=output_formats, default='geojson',
+        help="Output format (geojson, geojsonseq or geoparquet)"
+    )
     args = parser.parse_args()
     resolution = args.resolution
     bbox = args.bbox if args.bbox else [-180, -90, 180, 90]
@@ -128,11 +199,11 @@ def main():
         print(f"Please select a resolution in [0..30] range and try again ")
         return
     
-    geojson_features = generate_grid(resolution,bbox)
-    # Define the GeoJSON file path
-    geojson_path = f"s2_grid_{resolution}.geojson"
-    with open(geojson_path, 'w') as f:
-        json.dump(geojson_features, f, indent=2)
+    # Define the output file path
+    geojson_path = get_output_path(f"s2_grid_{resolution}", args.format)
+    write_features(iter_grid(resolution, bbox), geojson_path, args.format)
+
+    print(f"S2 grid saved to {geojson_path}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
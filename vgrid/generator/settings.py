@@ -1,6 +1,12 @@
 from pyproj import Geod
 geod = Geod(ellps="WGS84")
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import shapely
 from shapely.geometry import mapping
+from tqdm import tqdm
 
 max_cells = 1_000_000
 chunk_size = 100_000
@@ -34,6 +40,134 @@ def geodesic_dggs_metrics(cell_polygon, num_edges):
     avg_edge_len = round(cell_perimeter / num_edges,3)    
     return center_lat, center_lon, avg_edge_len, cell_area
 
+def _exterior_coordinates(cell_polygons):
+    rings = shapely.get_exterior_ring(np.asarray(cell_polygons, dtype=object))
+    return shapely.get_coordinates(rings), shapely.get_num_coordinates(rings)
+
+def _pack(coords, counts):
+    max_count = int(counts.max()) if len(counts) else 0
+    starts = np.cumsum(counts) - counts
+    slots = np.minimum(np.arange(max_count)[None, :], counts[:, None] - 1)
+    return coords[starts[:, None] + slots]
+
+def pack_polygon_vertices(cell_polygons):
+    """
+    Pack the exterior rings of N Shapely Polygons into an (N, K, 2) lon/lat array.
+    Rings shorter than K are padded by repeating their closing vertex, which adds
+    zero-length edges and leaves areas, perimeters and centroids unchanged.
+    """
+    return _pack(*_exterior_coordinates(cell_polygons))
+
+def polygon_area_perimeter_batch(vertices, dedup=True):
+    """
+    Geodesic area and perimeter of N packed cells (see pack_polygon_vertices).
+    Geodesic area and perimeter do not change when a cell is shifted in longitude,
+    so with dedup cells are keyed on their vertices relative to the first vertex and only
+    distinct shapes (one per latitude row on graticule grids) are sent to pyproj.
+    Geodesic grids have next to no repeated shapes, so they pass dedup=False.
+    """
+    num_cells = len(vertices)
+    cell_area = np.zeros(num_cells)
+    cell_perimeter = np.zeros(num_cells)
+    if num_cells == 0:
+        return cell_area, cell_perimeter
+    if not dedup:
+        for i, cell_vertices in enumerate(vertices):
+            area, perimeter = geod.polygon_area_perimeter(cell_vertices[:, 0], cell_vertices[:, 1])
+            cell_area[i] = abs(area)
+            cell_perimeter[i] = abs(perimeter)
+        return cell_area, cell_perimeter
+    shifted = vertices.copy()
+    shifted[:, :, 0] -= vertices[:, :1, 0]
+    _, first_index, inverse = np.unique(shifted.reshape(num_cells, -1), axis=0, return_index=True, return_inverse=True)
+    unique_area = np.empty(len(first_index))
+    unique_perimeter = np.empty(len(first_index))
+    for i, cell_index in enumerate(first_index):
+        cell_vertices = vertices[cell_index]
+        area, perimeter = geod.polygon_area_perimeter(cell_vertices[:, 0], cell_vertices[:, 1])
+        unique_area[i] = abs(area)
+        unique_perimeter[i] = abs(perimeter)
+    inverse = inverse.reshape(-1)
+    return unique_area[inverse], unique_perimeter[inverse]
+
+def polygon_centroid_batch(vertices):
+    """Planar (lon/lat) centroids of N packed cells, matching Shapely's Polygon.centroid."""
+    # Same triangle fan from the first vertex and the same operation order as GEOS,
+    # so the rounded centroids agree with the scalar path to the last digit
+    x, y = vertices[:, :, 0], vertices[:, :, 1]
+    base_x, base_y = x[:, :1], y[:, :1]
+    x1, y1, x2, y2 = x[:, :-1], y[:, :-1], x[:, 1:], y[:, 1:]
+    area2 = (x1 - base_x) * (y2 - base_y) - (x2 - base_x) * (y1 - base_y)
+    area_sum2 = area2.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        center_lon = (area2 * (base_x + x1 + x2)).sum(axis=1) / 3 / area_sum2
+        center_lat = (area2 * (base_y + y1 + y2)).sum(axis=1) / 3 / area_sum2
+    # Degenerate (zero-area) cells, e.g. polar rHEALPix cells collapsed onto a meridian,
+    # go through Shapely, which falls back to the length-weighted centroid of the ring;
+    # the zero-length padding edges do not move it
+    degenerate = np.flatnonzero(area_sum2 == 0)
+    if len(degenerate):
+        centroids = shapely.centroid(shapely.polygons(vertices[degenerate]))
+        center_lon[degenerate] = shapely.get_x(centroids)
+        center_lat[degenerate] = shapely.get_y(centroids)
+    return center_lat, center_lon
+
+def geodesic_dggs_metrics_batch(vertices, num_edges):
+    """
+    Vectorized geodesic_dggs_metrics for N packed cells.
+
+    Args:
+        vertices (np.ndarray): (N, K, 2) lon/lat array, see pack_polygon_vertices.
+        num_edges (int or array-like): Number of edges, per cell or for all cells.
+
+    Returns:
+        tuple: center_lat, center_lon, avg_edge_len, cell_area as (N,) arrays (unrounded).
+    """
+    center_lat, center_lon = polygon_centroid_batch(vertices)
+    cell_area, cell_perimeter = polygon_area_perimeter_batch(vertices, dedup=False)
+    avg_edge_len = cell_perimeter / np.asarray(num_edges)
+    return center_lat, center_lon, avg_edge_len, cell_area
+
+def graticule_dggs_metrics_batch(vertices):
+    """
+    Vectorized graticule_dggs_metrics for N packed cells.
+
+    Returns:
+        tuple: center_lat, center_lon, cell_width, cell_height, cell_area as (N,) arrays (unrounded).
+    """
+    min_lon, min_lat = vertices[:, :, 0].min(axis=1), vertices[:, :, 1].min(axis=1)
+    max_lon, max_lat = vertices[:, :, 0].max(axis=1), vertices[:, :, 1].max(axis=1)
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2
+    cell_width = geod.inv(min_lon, min_lat, max_lon, min_lat)[2]
+    cell_height = geod.inv(min_lon, min_lat, min_lon, max_lat)[2]
+    cell_area, _ = polygon_area_perimeter_batch(vertices)
+    return center_lat, center_lon, cell_width, cell_height, cell_area
+
+def _packed_cells(cell_polygons):
+    """
+    Split cells into those the batch engine handles (Polygons without holes) and the rest
+    (e.g. MultiPolygons from antimeridian splits), which keep using the scalar path.
+    Returns the indices of the simple cells, their packed vertices and GeoJSON geometries.
+    """
+    geoms = np.asarray(cell_polygons, dtype=object)
+    simple = np.flatnonzero((shapely.get_type_id(geoms) == 3) & ~shapely.is_empty(geoms)
+                            & (shapely.get_num_interior_rings(geoms) == 0))
+    coords, counts = _exterior_coordinates(geoms[simple])
+    ends = np.cumsum(counts).tolist()
+    coords_list = [tuple(xy) for xy in coords.tolist()]
+    geometries = []
+    start = 0
+    for end in ends:
+        geometries.append({"type": "Polygon", "coordinates": (tuple(coords_list[start:end]),)})
+        start = end
+    return simple.tolist(), _pack(coords, counts), geometries
+
+def _per_cell(value, num_cells):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return list(value)
+    return [value] * num_cells
+
 # Convert Graticule DGGS cell to GeoJSON feature
 def graticule_dggs_to_feature(dggs_name, cell_id, resolution, cell_polygon):
     center_lat,center_lon,cell_width,cell_height,cell_area =  graticule_dggs_metrics(cell_polygon)
@@ -69,6 +203,133 @@ def geodesic_dggs_to_feature(dggs_name, cell_id, resolution, cell_polygon,num_ed
             }
     return feature
 
+# Convert a batch of Graticule DGGS cells to GeoJSON features
+def graticule_dggs_to_features(dggs_name, cell_ids, resolution, cell_polygons):
+    """
+    Batch equivalent of graticule_dggs_to_feature.
+    `resolution` may be a single value or one value per cell.
+    """
+    cell_polygons = list(cell_polygons)
+    num_cells = len(cell_polygons)
+    resolutions = _per_cell(resolution, num_cells)
+    metrics = [None] * num_cells
+    geometries = [None] * num_cells
+    if num_cells:
+        simple, vertices, simple_geometries = _packed_cells(cell_polygons)
+        columns = [array.tolist() for array in graticule_dggs_metrics_batch(vertices)]
+        for j, i in enumerate(simple):
+            center_lat, center_lon, cell_width, cell_height, cell_area = (column[j] for column in columns)
+            metrics[i] = (round(center_lat, 7), round(center_lon, 7), round(cell_width, 3),
+                          round(cell_height, 3), round(cell_area, 3))
+            geometries[i] = simple_geometries[j]
+
+    features = []
+    for i, (cell_id, cell_polygon) in enumerate(zip(cell_ids, cell_polygons)):
+        center_lat, center_lon, cell_width, cell_height, cell_area = metrics[i] or graticule_dggs_metrics(cell_polygon)
+        features.append({
+            "type": "Feature",
+            "geometry": geometries[i] or mapping(cell_polygon),
+            "properties": {
+                f"{dggs_name}": str(cell_id),
+                "resolution": resolutions[i],
+                "center_lat": center_lat,
+                "center_lon": center_lon,
+                "cell_width": cell_width,
+                "cell_height": cell_height,
+                "cell_area": cell_area
+            }
+        })
+    return features
+
+# Convert a batch of Geodesic DGGS cells to GeoJSON features
+def geodesic_dggs_to_features(dggs_name, cell_ids, resolution, cell_polygons, num_edges):
+    """
+    Batch equivalent of geodesic_dggs_to_feature.
+    `resolution` and `num_edges` may be single values or one value per cell.
+    """
+    cell_polygons = list(cell_polygons)
+    num_cells = len(cell_polygons)
+    resolutions = _per_cell(resolution, num_cells)
+    edges = _per_cell(num_edges, num_cells)
+    metrics = [None] * num_cells
+    geometries = [None] * num_cells
+    if num_cells:
+        simple, vertices, simple_geometries = _packed_cells(cell_polygons)
+        columns = [array.tolist() for array in geodesic_dggs_metrics_batch(vertices, [edges[i] for i in simple])]
+        for j, i in enumerate(simple):
+            center_lat, center_lon, avg_edge_len, cell_area = (column[j] for column in columns)
+            metrics[i] = (round(center_lat, 7), round(center_lon, 7), round(avg_edge_len, 3), round(cell_area, 3))
+            geometries[i] = simple_geometries[j]
+
+    features = []
+    for i, (cell_id, cell_polygon) in enumerate(zip(cell_ids, cell_polygons)):
+        center_lat, center_lon, avg_edge_len, cell_area = metrics[i] or geodesic_dggs_metrics(cell_polygon, edges[i])
+        features.append({
+            "type": "Feature",
+            "geometry": geometries[i] or mapping(cell_polygon),
+            "properties": {
+                f"{dggs_name}": str(cell_id),
+                "resolution": resolutions[i],
+                "center_lat": center_lat,
+                "center_lon": center_lon,
+                "avg_edge_len": avg_edge_len,
+                "cell_area": cell_area
+            }
+        })
+    return features
+
+def chunked(iterable, size=None):
+    """Yield successive lists of at most `size` (default: chunk_size) items from an iterable."""
+    size = size or chunk_size
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def iter_graticule_dggs_features(dggs_name, cells, resolution):
+    """
+    Lazily convert an iterable of (cell_id, cell_polygon) to Graticule DGGS features,
+    computing metrics one chunk_size batch at a time so memory stays bounded.
+    """
+    for chunk in chunked(cells):
+        cell_ids, cell_polygons = zip(*chunk)
+        yield from graticule_dggs_to_features(dggs_name, cell_ids, resolution, cell_polygons)
+
+def iter_geodesic_dggs_features(dggs_name, cells, resolution):
+    """
+    Lazily convert an iterable of (cell_id, cell_polygon, num_edges) to Geodesic DGGS features,
+    computing metrics one chunk_size batch at a time so memory stays bounded.
+    """
+    for chunk in chunked(cells):
+        cell_ids, cell_polygons, num_edges = zip(*chunk)
+        yield from geodesic_dggs_to_features(dggs_name, cell_ids, resolution, cell_polygons, num_edges)
+
+def iter_parallel(function, shards, workers):
+    """
+    Apply function to each shard in a pool of `workers` processes and yield the results in shard order.
+    At most 2 * workers shards are in flight, so memory stays bounded when the consumer is slower.
+    """
+    shards = iter(shards)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque(executor.submit(function, shard) for shard in islice(shards, 2 * workers))
+        while pending:
+            result = pending.popleft().result()
+            for shard in islice(shards, 1):
+                pending.append(executor.submit(function, shard))
+            yield result
+
+def iter_parallel_features(shard_features, shards, workers, total=None, desc=None):
+    """
+    Lazily yield the features of each shard, computed by shard_features(shard) in `workers` processes.
+    Features are yielded in shard order, so the output matches the serial generator.
+    """
+    with tqdm(total=total, desc=desc, unit=" cells") as pbar:
+        for features in iter_parallel(shard_features, shards, workers):
+            pbar.update(len(features))
+            yield from features
+
 mgrs_gzd_lon_dict = {
     '01': 1,
     '02': 2,
@@ -1,43 +1,41 @@
 import argparse
-import json
 from shapely.geometry import shape,Polygon
 from tqdm import tqdm
 from shapely.ops import unary_union
 from vgrid.utils import mercantile
-from vgrid.generator.settings import max_cells, graticule_dggs_to_feature
+from vgrid.generator.settings import graticule_dggs_to_features, iter_graticule_dggs_features
+from vgrid.utils.writers import output_formats, write_features, get_output_path
 
-def generate_grid(resolution,bbox):
-    tilecode_features = []
-    min_lon, min_lat, max_lon, max_lat = bbox # or [-180.0, -85.05112878,180.0,85.05112878]  
+def iter_grid(resolution, bbox):
+    """Lazily yield Tilecode cells within bbox as GeoJSON-like features."""
+    min_lon, min_lat, max_lon, max_lat = bbox
     tiles = mercantile.tiles(min_lon, min_lat, max_lon, max_lat, resolution)
-    
-    for tile in tqdm(tiles, desc="Generating Tilecode DGGS", unit = " cells"):
-        z, x, y = tile.z, tile.x, tile.y
-        tilecode_id = f"z{tile.z}x{tile.x}y{tile.y}"
-        bounds = mercantile.bounds(x, y, z)
-        if bounds:
-            # Create the bounding box coordinates for the polygon
-            min_lat, min_lon = bounds.south, bounds.west
-            max_lat, max_lon = bounds.north, bounds.east          
-            
-            cell_polygon = Polygon([
-                [min_lon, min_lat],  # Bottom-left corner
-                [max_lon, min_lat],  # Bottom-right corner
-                [max_lon, max_lat],  # Top-right corner
-                [min_lon, max_lat],  # Top-left corner
-                [min_lon, min_lat]   # Closing the polygon (same as the first point)
-            ])
-            tilecode_feature = graticule_dggs_to_feature("tilecode",tilecode_id,resolution,cell_polygon)   
-            tilecode_features.append(tilecode_feature)
 
+    def cells():
+        for tile in tqdm(tiles, desc="Generating Tilecode DGGS", unit=" cells"):
+            bounds = mercantile.bounds(tile.x, tile.y, tile.z)
+            if bounds:
+                # Create the bounding box coordinates for the polygon
+                cell_polygon = Polygon([
+                    [bounds.west, bounds.south],  # Bottom-left corner
+                    [bounds.east, bounds.south],  # Bottom-right corner
+                    [bounds.east, bounds.north],  # Top-right corner
+                    [bounds.west, bounds.north],  # Top-left corner
+                    [bounds.west, bounds.south]   # Closing the polygon (same as the first point)
+                ])
+                yield f"z{tile.z}x{tile.x}y{tile.y}", cell_polygon
+
+    return iter_graticule_dggs_features("tilecode", cells(), resolution)
+
+def generate_grid(resolution, bbox):
     return {
         "type": "FeatureCollection",
-        "features": tilecode_features
+        "features": list(iter_grid(resolution, bbox))
     }
 
 
 def generate_grid_resample(resolution, geojson_features):
-    tilecode_features = []
+    tilecode_ids, cell_polygons = [], []
 
     geometries = [shape(feature["geometry"]) for feature in geojson_features["features"]]
     unified_geom = unary_union(geometries)
@@ -63,9 +61,10 @@ def generate_grid_resample(resolution, geojson_features):
 
         # Check if tile polygon intersects the input geometry
         if tile_polygon.intersects(unified_geom):
-            tilecode_feature = graticule_dggs_to_feature("tilecode", tilecode_id, resolution, tile_polygon)
-            tilecode_features.append(tilecode_feature)
+            tilecode_ids.append(tilecode_id)
+            cell_polygons.append(tile_polygon)
 
+    tilecode_features = graticule_dggs_to_features("tilecode", tilecode_ids, resolution, cell_polygons)
     return {
         "type": "FeatureCollection",
         "features": tilecode_features
@@ -75,6 +74,7 @@ def main():
     parser = argparse.ArgumentParser(description='Generate Tilecode DGGS.')
     parser.add_argument('-r', '--resolution', type=int, required=True, help='resolution [0..26]')
     parser.add_argument('-b', '--bbox', type=float, nargs=4,  help="Bounding box in the format: min_lon min_lat max_lon max_lat (default is the whole world)") 
+    parser.add_argument('-f', '--format', type=str, choices=output_formats, default='geojson', help="Output format (geojson, geojsonseq or geoparquet)")
 
     args = parser.parse_args()
     resolution = args.resolution
@@ -84,24 +84,15 @@ def main():
         print(f"Please select a resolution in [0..26] range and try again ")
         return
     
+    # Features are streamed to disk, so the world grid is not limited to max_cells
     if bbox == [-180.0, -85.05112878,  180.0, 85.05112878]:  
         num_cells =  4**resolution
-        if num_cells > max_cells:
-            print(
-                f"Resolution {resolution} will generate {num_cells} cells "
-                f"which exceeds the limit of {max_cells}."
-            )
-            print("Please select a smaller resolution and try again.")
-            return    
+        print(f"Resolution {resolution} will generate {num_cells} cells ")
     
-    geojson_features = generate_grid(resolution, bbox)
-    if geojson_features:
-        # Define the GeoJSON file path
-        geojson_path = f"tilecode_grid_{resolution}.geojson"
-        with open(geojson_path, 'w') as f:
-            json.dump(geojson_features, f, indent=2)
-
-        print(f"GeoJSON saved as {geojson_path}")
+    geojson_path = get_output_path(f"tilecode_grid_{resolution}", args.format)
+    write_features(iter_grid(resolution, bbox), geojson_path, args.format)
+
+    print(f"GeoJSON saved as {geojson_path}")
 
 if __name__ == '__main__':
     main()
@@ -13,10 +13,13 @@ from vgrid.stats.geohashstats import geohash_metrics
 from vgrid.stats.tilecodestats import tilecode_metrics
 from vgrid.stats.quadkeystats import quadkey_metrics
 
-from shapely.geometry import shape
+import numpy as np
+import shapely
+from shapely.geometry import shape, Polygon
 from vgrid.generator import h3grid, s2grid, rhealpixgrid, isea4tgrid, qtmgrid, olcgrid, geohashgrid, tilecodegrid, quadkeygrid
+from vgrid.generator.settings import graticule_dggs_to_features, geodesic_dggs_to_features
+from vgrid.utils.geohash import geohash_children
 from numbers import Number
-from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
 from vgrid.utils.rhealpixdggs.ellipsoids import WGS84_ELLIPSOID
 from pyproj import Geod
 import platform
@@ -50,37 +53,37 @@ def get_nearest_resolution(geojson_features, from_dggs, to_dggs, from_field=None
             _, _, from_area = s2_metrics(from_resolution)        
         
         elif (from_dggs == 'rhealpix'):
-            rhealpix_uids = (from_field[0],) + tuple(map(int, from_field[1:]))
-            rhealpix_dggs = RHEALPixDGGS(ellipsoid=E, north_square=1, south_square=3, N_side=3) 
+            rhealpix_uids = (from_dggs_id[0],) + tuple(map(int, from_dggs_id[1:]))
+            rhealpix_dggs = rhealpixgrid.get_rhealpix_dggs(north_square=1, south_square=3)
             rhealpix_cell = rhealpix_dggs.cell(rhealpix_uids)
             from_resolution = rhealpix_cell.resolution   
             _, _, from_area = rhealpix_metrics(from_resolution)        
        
         elif (from_dggs == 'isea4t'):
             if (platform.system() == 'Windows'): 
-                from_resolution = len(from_field)-2
+                from_resolution = len(from_dggs_id)-2
                 _, _, from_area,_ = isea4t_metrics(isea4t_dggs,from_resolution)        
         
         elif (from_dggs == 'qtm'):
-            from_resolution = len(from_field)
+            from_resolution = len(from_dggs_id)
             _, _, from_area = qtm_metrics(from_resolution)        
         
         elif (from_dggs == 'olc'):
-            coord = olc.decode(from_field)  
+            coord = olc.decode(from_dggs_id)  
             from_resolution = coord.codeLength 
             _, _, from_area = olc_metrics(from_resolution)        
         
         elif (from_dggs == 'geohash'):
-            from_resolution = len(from_field)
+            from_resolution = len(from_dggs_id)
             _, _, from_area = geohash_metrics(from_resolution)        
         
         elif (from_dggs == 'tilecode'):
-            match = re.match(r'z(\d+)x(\d+)y(\d+)', from_field)
+            match = re.match(r'z(\d+)x(\d+)y(\d+)', from_dggs_id)
             from_resolution = int(match.group(1))
             _, _, from_area = tilecode_metrics(from_resolution)        
 
         elif (from_dggs == 'quadkey'):
-            tile = mercantile.quadkey_to_tile(from_resolution)    
+            tile = mercantile.quadkey_to_tile(from_dggs_id)    
             from_resolution = tile.z
             _, _, from_area = quadkey_metrics(from_resolution)        
 
@@ -203,41 +206,41 @@ def generate_grid(geojson_features, to_dggs, resolution):
 
 def resampling(layer1, layer2, resample_field):
     try:
-        layer1_features = []
+        layer1_shapes, layer1_values = [], []
         for feature in layer1["features"]:
             if resample_field not in feature["properties"]:
                 raise ValueError(f"There is no <{resample_field}> field in the input GeoJSON feattures.")
-            geom = shape(feature["geometry"])
-            value = feature["properties"][resample_field]
-            layer1_features.append((geom, value))
+            layer1_shapes.append(shape(feature["geometry"]))
+            layer1_values.append(feature["properties"][resample_field])
     except ValueError as e:
         print(e)
         return layer2
 
-    resampled_features = []
-    
-    for feature in tqdm(layer2["features"], desc="Resampling", unit=' cells'):
-        layer2_shape = shape(feature["geometry"])
-        resampled_value = 0
-        intersected_parts = []
-        
-        for l1_shape, l1_resample in layer1_features:
-            if layer2_shape.intersects(l1_shape):
-                if not isinstance(l1_resample, Number):
-                    print(f"\n Mon-numeric values found in <{resample_field}>. Resampled field calculation failed.")
-                    return layer2
-               
-                intersection = layer2_shape.intersection(l1_shape)
-                intersected_parts.append(intersection)
-                if not intersection.is_empty:
-                    proportion = intersection.area / l1_shape.area
-                    resampled_value += l1_resample * proportion
-            
-            if not intersected_parts:
-                continue  # Skip features that have no intersection
+    # Find intersecting (layer2, layer1) pairs with an STRtree over layer1 instead of testing every pair
+    layer1_shapes = np.array(layer1_shapes, dtype=object)
+    layer2_shapes = np.array([shape(feature["geometry"]) for feature in layer2["features"]], dtype=object)
+    tree = shapely.STRtree(layer1_shapes)
+    layer2_index, layer1_index = tree.query(layer2_shapes, predicate='intersects')
+    order = np.lexsort((layer1_index, layer2_index))
+    layer2_index, layer1_index = layer2_index[order], layer1_index[order]
 
+    if not all(isinstance(layer1_values[i], Number) for i in np.unique(layer1_index).tolist()):
+        print(f"\n Mon-numeric values found in <{resample_field}>. Resampled field calculation failed.")
+        return layer2
+
+    # Area-weighted contribution of each layer1 feature to the layer2 features it overlaps
+    layer1_areas = shapely.area(layer1_shapes)
+    intersection_areas = shapely.area(shapely.intersection(layer2_shapes[layer2_index], layer1_shapes[layer1_index]))
+    values = np.array(layer1_values, dtype=object)[layer1_index].astype(np.float64)
+    resampled_values = np.bincount(layer2_index, weights=values * intersection_areas / layer1_areas[layer1_index],
+                                   minlength=len(layer2_shapes)).tolist()
+    intersected = np.zeros(len(layer2_shapes), dtype=bool)
+    intersected[layer2_index] = True
+
+    resampled_features = []
+    for i, feature in enumerate(tqdm(layer2["features"], desc="Resampling", unit=' cells')):
         # Add resampled fileld to properties
-        feature["properties"][resample_field] = round(resampled_value, 3)
+        feature["properties"][resample_field] = round(resampled_values[i], 3) if intersected[i] else 0
         resampled_features.append(feature)
 
     return {
@@ -247,6 +250,134 @@ def resampling(layer1, layer2, resample_field):
         
         
 
+# DGGS whose cells nest exactly, grouped by hierarchy: cells of the same hierarchy
+# can be resampled to another resolution from their IDs alone
+nested_dggs = {'geohash': 'geohash', 'tilecode': 'tile', 'quadkey': 'tile', 's2': 's2'}
+
+def parse_nested_cell(dggs, cell_id):
+    """Hierarchy cell of a nested DGGS ID: the geohash string, a mercantile Tile or an S2 CellId."""
+    if dggs == 'geohash':
+        return str(cell_id)
+    elif dggs == 'tilecode':
+        z, x, y = map(int, re.match(r'z(\d+)x(\d+)y(\d+)$', cell_id).groups())
+        return mercantile.Tile(x, y, z)
+    elif dggs == 'quadkey':
+        return mercantile.quadkey_to_tile(cell_id)
+    return s2.CellId.from_token(cell_id)
+
+def nested_cell_id(dggs, cell):
+    if dggs == 'tilecode':
+        return f"z{cell.z}x{cell.x}y{cell.y}"
+    elif dggs == 'quadkey':
+        return mercantile.quadkey(cell)
+    elif dggs == 's2':
+        return cell.to_token()
+    return cell
+
+def nested_cell_resolution(cell):
+    if isinstance(cell, str):
+        return len(cell)
+    elif isinstance(cell, mercantile.Tile):
+        return cell.z
+    return cell.level()
+
+def nested_cell_parent(cell, resolution):
+    """Ancestor of a cell at a coarser (or the same) resolution, by ID arithmetic."""
+    if isinstance(cell, str):
+        return cell[:resolution]
+    elif isinstance(cell, mercantile.Tile):
+        shift = cell.z - resolution
+        return mercantile.Tile(cell.x >> shift, cell.y >> shift, resolution)
+    return cell.parent(resolution)
+
+def nested_cell_children(cell, resolution):
+    """Descendants of a cell at a finer resolution, by ID arithmetic."""
+    if isinstance(cell, str):
+        return geohash_children(cell, resolution)
+    elif isinstance(cell, mercantile.Tile):
+        shift = resolution - cell.z
+        return [mercantile.Tile((cell.x << shift) + dx, (cell.y << shift) + dy, resolution)
+                for dx in range(1 << shift) for dy in range(1 << shift)]
+    return list(cell.children(resolution))
+
+def nested_cells_to_features(dggs, cells, resolution):
+    cell_ids = [nested_cell_id(dggs, cell) for cell in cells]
+    if dggs == 's2':
+        cell_polygons = [s2grid.s2_cell_to_polygon(cell) for cell in cells]
+        return geodesic_dggs_to_features(dggs, cell_ids, resolution, cell_polygons, 4)
+    if dggs == 'geohash':
+        cell_polygons = geohashgrid.geohash_to_polygons(cells)
+    else:
+        cell_polygons = []
+        for cell in cells:
+            bounds = mercantile.bounds(cell)
+            cell_polygons.append(Polygon([
+                [bounds.west, bounds.south],
+                [bounds.east, bounds.south],
+                [bounds.east, bounds.north],
+                [bounds.west, bounds.north],
+                [bounds.west, bounds.south]
+            ]))
+    return graticule_dggs_to_features(dggs, cell_ids, resolution, cell_polygons)
+
+def resampling_nested(layer1, from_dggs, from_field, to_dggs, resolution, resample_field=None):
+    """
+    Resample between DGGS of the same nested hierarchy (geohash, tilecode/quadkey or S2)
+    using cell IDs only, without polygon overlay: a coarser target cell sums the values
+    of the source cells it contains, a finer target cell receives the value of its source
+    parent weighted by its share of the parent's area.
+    Returns None if the source cell IDs can not be parsed (fall back to resampling()).
+    """
+    try:
+        source_cells = [parse_nested_cell(from_dggs, feature["properties"][from_field]) for feature in layer1["features"]]
+    except Exception:
+        return None
+
+    values = None
+    if resample_field:
+        if not all(resample_field in feature["properties"] for feature in layer1["features"]):
+            print(f"There is no <{resample_field}> field in the input GeoJSON feattures.")
+        elif not all(isinstance(feature["properties"][resample_field], Number) for feature in layer1["features"]):
+            print(f"\n Mon-numeric values found in <{resample_field}>. Resampled field calculation failed.")
+        else:
+            values = [feature["properties"][resample_field] for feature in layer1["features"]]
+
+    # Step 1: Map every source cell to its target parent, or to its target children
+    target_cells = {}
+    target_values = {}
+    splits = []
+    for i, cell in enumerate(tqdm(source_cells, desc="Resampling", unit=' cells')):
+        if nested_cell_resolution(cell) >= resolution:
+            parent = nested_cell_parent(cell, resolution)
+            parent_id = nested_cell_id(to_dggs, parent)
+            target_cells[parent_id] = parent
+            if values is not None:
+                target_values[parent_id] = target_values.get(parent_id, 0) + values[i]
+        else:
+            children = nested_cell_children(cell, resolution)
+            child_ids = [nested_cell_id(to_dggs, child) for child in children]
+            target_cells.update(zip(child_ids, children))
+            if values is not None:
+                splits.append((values[i], child_ids))
+
+    features = nested_cells_to_features(to_dggs, list(target_cells.values()), resolution)
+
+    # Step 2: Split parent values over their children in proportion to the child cell areas
+    if values is not None:
+        cell_areas = {feature["properties"][to_dggs]: feature["properties"]["cell_area"] for feature in features}
+        for value, child_ids in splits:
+            total_area = sum(cell_areas[child_id] for child_id in child_ids)
+            for child_id in child_ids:
+                target_values[child_id] = target_values.get(child_id, 0) + value * cell_areas[child_id] / total_area
+        for feature in features:
+            feature["properties"][resample_field] = round(target_values[feature["properties"][to_dggs]], 3)
+
+    return {
+        "type": "FeatureCollection",
+        "features": features
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(description="DGGS Resample")
     dggs_options = ['h3', 's2', 'rhealpix', 'isea4t', 'qtm', 'olc', 'geohash', 'tilecode', 'quadkey']
@@ -292,7 +423,8 @@ def main():
         print(f"Error: The file {geojson} does not exist.")
         return
 
-    if (from_dggs == to_dggs):
+    nested = nested_dggs.get(from_dggs) is not None and nested_dggs.get(from_dggs) == nested_dggs.get(to_dggs)
+    if (from_dggs == to_dggs) and not (nested and to_resolution):
         print("To DGGS must be different with From DGGS")
         return
      
@@ -305,9 +437,15 @@ def main():
     if not to_resolution:
         to_resolution = get_nearest_resolution(geojson_features, from_dggs, to_dggs,from_field)
     if to_resolution:
-        resampled_features = generate_grid(geojson_features, to_dggs, to_resolution)
-        if  resample_field: 
-            resampled_features = resampling(geojson_features, resampled_features,resample_field)
+        resampled_features = None
+        if nested:
+            # Nested hierarchies are resampled from the cell IDs, without polygon overlay
+            resampled_features = resampling_nested(geojson_features, from_dggs, from_field or from_dggs,
+                                                   to_dggs, to_resolution, resample_field)
+        if resampled_features is None:
+            resampled_features = generate_grid(geojson_features, to_dggs, to_resolution)
+            if  resample_field: 
+                resampled_features = resampling(geojson_features, resampled_features,resample_field)
             
         # Define the GeoJSON file path
         if resampled_features:
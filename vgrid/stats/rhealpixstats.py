@@ -1,13 +1,13 @@
 import locale
 import argparse
 import csv
-from vgrid.utils.rhealpixdggs.dggs import RHEALPixDGGS
 from vgrid.utils.rhealpixdggs.utils import my_round, wrap_longitude, wrap_latitude
+from vgrid.generator.rhealpixgrid import get_rhealpix_dggs
 from texttable import Texttable
 
 locale.setlocale(locale.LC_ALL, '')
 
-rdggs = RHEALPixDGGS()
+rdggs = get_rhealpix_dggs()
 
 def rhealpix_metrics(res):
     num_cells = rdggs.num_cells(res)  
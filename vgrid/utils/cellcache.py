@@ -0,0 +1,151 @@
+"""
+Optional persistent cache of DGGS cell features, keyed by (dggs, cell_id).
+
+Cell polygons (as WKB) and their metrics are stored in a SQLite file, so repeated jobs over
+the same area skip the boundary and geodesic metric computations. The cache is disabled unless
+the VGRID_CELL_CACHE environment variable names the SQLite file (or set_cell_cache() is called).
+VGRID_CELL_CACHE_SIZE bounds the number of cached cells; the least recently used cells are evicted first.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import shapely
+from shapely.geometry import mapping, shape
+
+default_max_cells = 10_000_000
+flush_size = 10_000
+
+class CellCache:
+    """Size-bounded LRU store of cell features in a SQLite file."""
+    def __init__(self, path, max_cells=default_max_cells):
+        self.path = path
+        self.max_cells = max_cells
+        self.connection = None
+        self.pid = None
+
+    def connect(self):
+        # One connection per process, so the cache also works from forked worker processes
+        if self.connection is None or self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS cells (
+                dggs TEXT NOT NULL, cell_id TEXT NOT NULL, geometry BLOB, properties TEXT, used INTEGER,
+                PRIMARY KEY (dggs, cell_id)) WITHOUT ROWID""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS cells_used ON cells (used)")
+            self.connection.commit()
+            self.tick, self.count = self.connection.execute("SELECT COALESCE(MAX(used), 0), COUNT(*) FROM cells").fetchone()
+            self.pending = {}  # (dggs, cell_id) -> (geometry, properties) not written yet
+            self.touched = {}  # (dggs, cell_id) -> last use of cached cells
+            self.pid = os.getpid()
+            atexit.register(self.flush)
+        return self.connection
+
+    def get(self, dggs_name, cell_id):
+        """(geometry WKB, properties JSON) of a cached cell, or None if the cell is not cached."""
+        connection = self.connect()
+        key = (dggs_name, str(cell_id))
+        row = self.pending.get(key)
+        if row is None:
+            row = connection.execute("SELECT geometry, properties FROM cells WHERE dggs = ? AND cell_id = ?", key).fetchone()
+            if row is None:
+                return None
+            self.tick += 1
+            self.touched[key] = self.tick
+            if len(self.touched) >= flush_size:
+                self.flush()
+        return row
+
+    def contains(self, dggs_name, cell_ids):
+        """Whether each of cell_ids is cached, without marking the cells as used."""
+        connection = self.connect()
+        keys = [str(cell_id) for cell_id in cell_ids]
+        cached = {cell_id for name, cell_id in self.pending if name == dggs_name}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = connection.execute(f"SELECT cell_id FROM cells WHERE dggs = ? AND cell_id IN ({', '.join('?' * len(batch))})",
+                                      [dggs_name, *batch])
+            cached.update(row[0] for row in rows)
+        return [key in cached for key in keys]
+
+    def put(self, dggs_name, cell_id, feature):
+        """Cache a cell feature (None caches that the cell has no valid feature)."""
+        self.connect()
+        if feature is None:
+            row = (None, None)
+        else:
+            row = (shapely.to_wkb(shape(feature['geometry'])), json.dumps(feature['properties']))
+        self.pending[(dggs_name, str(cell_id))] = row
+        if len(self.pending) >= flush_size:
+            self.flush()
+
+    def flush(self):
+        """Write pending cells and last uses, then evict the least recently used cells over max_cells."""
+        if self.connection is None or self.pid != os.getpid() or not (self.pending or self.touched):
+            return
+        connection = self.connection
+        rows = []
+        for (dggs_name, cell_id), (geometry, properties) in self.pending.items():
+            self.tick += 1
+            rows.append((dggs_name, cell_id, geometry, properties, self.tick))
+        cursor = connection.executemany("INSERT OR IGNORE INTO cells VALUES (?, ?, ?, ?, ?)", rows)
+        self.count += max(cursor.rowcount, 0)
+        connection.executemany("UPDATE cells SET used = ? WHERE dggs = ? AND cell_id = ?",
+                               [(used, dggs_name, cell_id) for (dggs_name, cell_id), used in self.touched.items()])
+        if self.count > self.max_cells:
+            connection.execute("""DELETE FROM cells WHERE (dggs, cell_id) IN (
+                SELECT dggs, cell_id FROM cells ORDER BY used LIMIT ?)""", (self.count - self.max_cells,))
+            self.count = connection.execute("SELECT COUNT(*) FROM cells").fetchone()[0]
+        connection.commit()
+        self.pending = {}
+        self.touched = {}
+
+    def close(self):
+        self.flush()
+        if self.connection is not None and self.pid == os.getpid():
+            self.connection.close()
+        self.connection = None
+
+cell_cache = None
+
+def set_cell_cache(path, max_cells=default_max_cells):
+    """Enable the persistent cell cache at path, or disable it if path is None."""
+    global cell_cache
+    if cell_cache is not None:
+        cell_cache.close()
+    cell_cache = CellCache(path, max_cells) if path else None
+    return cell_cache
+
+def cached_cells(dggs_name, cell_ids):
+    """
+    Whether each of cell_ids is in the cell cache (all False when the cache is disabled), so
+    batch builders can compute polygons for the cache misses only.
+    """
+    if cell_cache is None:
+        return [False] * len(cell_ids)
+    return cell_cache.contains(dggs_name, cell_ids)
+
+def cell_feature(dggs_name, cell_id, build):
+    """
+    Feature of a DGGS cell from the cell cache; build(cell_id) makes it (or returns None) when
+    the cache is disabled or does not have the cell yet. A new feature dict is returned on every call.
+    """
+    if cell_cache is None:
+        return build(cell_id)
+    row = cell_cache.get(dggs_name, cell_id)
+    if row is None:
+        feature = build(cell_id)
+        cell_cache.put(dggs_name, cell_id, feature)
+        return feature
+    geometry, properties = row
+    if geometry is None:
+        return None
+    return {
+        "type": "Feature",
+        "geometry": mapping(shapely.from_wkb(geometry)),
+        "properties": json.loads(properties),
+    }
+
+if os.environ.get("VGRID_CELL_CACHE"):
+    set_cell_cache(os.environ["VGRID_CELL_CACHE"], int(os.environ.get("VGRID_CELL_CACHE_SIZE", default_max_cells)))
@@ -7,8 +7,12 @@ try:
 except ImportError:
 	_geohash = None
 
+import numpy as np
+
 __version__ = "0.8.5"
-__all__ = ['encode','decode','decode_exactly','bbox', 'neighbors', 'expand']
+__all__ = ['encode','decode','decode_exactly','bbox', 'neighbors', 'expand', 'encode_array',
+	'encode_int_array', 'int_array_to_hashcodes', 'decode_array', 'bbox_array',
+	'lattice_to_int_array', 'int_array_to_lattice', 'lattice_decode']
 
 _base32 = '0123456789bcdefghjkmnpqrstuvwxyz'
 _base32_map = {}
@@ -123,6 +127,101 @@ def encode(latitude, longitude, precision=12):
 	
 	return _encode_i2c(lat,lon,lat_length,lon_length)[:precision]
 
+def _encode_array_i(latitudes, longitudes, precision):
+	latitudes = np.asarray(latitudes, dtype=np.float64)
+	longitudes = np.asarray(longitudes, dtype=np.float64)
+	if np.any((latitudes >= 90.0) | (latitudes < -90.0)):
+		raise Exception("invalid latitude.")
+	longitudes = np.where((longitudes < -180.0) | (longitudes >= 180.0), (longitudes + 180.0) % 360.0 - 180.0, longitudes)
+	
+	# Same truncation as _float_hex_to_int: scaling by a power of two is exact, so floor() is too
+	lat_length = precision*5//2
+	lon_length = precision*5 - lat_length
+	lat = np.floor(latitudes/90.0 * float(1<<(lat_length-1))).astype(np.int64) + (1<<(lat_length-1))
+	lon = np.floor(longitudes/180.0 * float(1<<(lon_length-1))).astype(np.int64) + (1<<(lon_length-1))
+	return lat, lon, lat_length, lon_length
+
+def _spread_bits(x):
+	# Bits 0..31 of x moved to the even bits 0..62, like the boost tables of _uint64_interleave
+	x = x.astype(np.uint64) & np.uint64(0x00000000FFFFFFFF)
+	for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+						(2, 0x3333333333333333), (1, 0x5555555555555555)):
+		x = (x | (x << np.uint64(shift))) & np.uint64(mask)
+	return x
+
+def _squeeze_bits(x):
+	# Inverse of _spread_bits: the even bits of x packed into bits 0..31
+	x = x.astype(np.uint64) & np.uint64(0x5555555555555555)
+	for shift, mask in ((1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+						(8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF)):
+		x = (x | (x >> np.uint64(shift))) & np.uint64(mask)
+	return x.astype(np.int64)
+
+def encode_int_array(latitudes, longitudes, precision=12):
+	'''
+	vectorized encode() to uint64 integers holding the 5*precision bits of the hashcodes, precision up to 12.
+	integers of the same precision sort in the same order as their hashcodes.
+	'''
+	if precision < 1 or precision > 12:
+		raise ValueError("precision must be in the range of [1, 12]")
+	
+	lat, lon, _, _ = _encode_array_i(latitudes, longitudes, precision)
+	return lattice_to_int_array(lat, lon, precision)
+
+def lattice_to_int_array(lat, lon, precision=12):
+	'''
+	uint64 integers of the cells at row lat and column lon of the grid of a precision (up to 12),
+	which has 2**(precision*5//2) rows from the south and twice or as many columns from the west.
+	'''
+	bit_length = precision*5
+	# Interleave bits, longitude first: with an odd bit count longitude has the extra (lowest) bit
+	odd = bit_length%2
+	return (_spread_bits(np.asarray(lon)) << np.uint64(1 - odd)) | (_spread_bits(np.asarray(lat)) << np.uint64(odd))
+
+def int_array_to_lattice(ints, precision=12):
+	'''
+	inverse of lattice_to_int_array(): rows and columns of uint64 integers of a precision.
+	'''
+	ints = np.asarray(ints, dtype=np.uint64)
+	odd = np.uint64(precision*5%2)
+	return _squeeze_bits(ints >> odd), _squeeze_bits(ints >> (np.uint64(1) - odd))
+
+def int_array_to_hashcodes(ints, precision=12):
+	'''
+	hashcodes of uint64 integers from encode_int_array() of the same precision.
+	'''
+	ints = np.asarray(ints, dtype=np.uint64).reshape(-1)
+	shifts = np.arange(precision*5 - 5, -5, -5, dtype=np.uint64)
+	codes = ((ints[:, None] >> shifts) & np.uint64(0x1F)).astype(np.intp)
+	chars = np.frombuffer(_base32.encode('ascii'), dtype=np.uint8)[codes]
+	return np.ascontiguousarray(chars).view('S%d' % precision).reshape(-1).astype(str)
+
+def encode_array(latitudes, longitudes, precision=12):
+	'''
+	vectorized encode() for numpy arrays of latitudes and longitudes, returns an array of hashcodes.
+	'''
+	if precision < 1 or precision > 24:
+		raise ValueError("precision must be in the range of [1, 24]")
+	
+	if precision <= 12:
+		ints = encode_int_array(latitudes, longitudes, precision)
+		return int_array_to_hashcodes(ints, precision).reshape(np.shape(ints))
+	
+	latitudes = np.asarray(latitudes, dtype=np.float64)
+	lat, lon, lat_length, lon_length = _encode_array_i(latitudes, longitudes, precision)
+	
+	# Interleave bits (longitude first), 5 bits per base32 character
+	codes = np.zeros((latitudes.size, precision), dtype=np.uint8)
+	for i in range(precision*5):
+		if i%2 == 0:
+			bit = (lon >> (lon_length-1-i//2)) & 1
+		else:
+			bit = (lat >> (lat_length-1-i//2)) & 1
+		codes[:, i//5] = (codes[:, i//5] << 1) | bit.reshape(-1).astype(np.uint8)
+	
+	chars = np.frombuffer(_base32.encode('ascii'), dtype=np.uint8)[codes]
+	return chars.view('S%d' % precision).reshape(latitudes.shape).astype(str)
+
 def _decode_c2i(hashcode):
 	lon = 0
 	lat = 0
@@ -235,6 +334,63 @@ def bbox(hashcode):
 	
 	return ret
 
+_base32_values = np.full(128, -1, dtype=np.int64)
+_base32_values[np.frombuffer(_base32.encode('ascii'), dtype=np.uint8)] = np.arange(32)
+
+def _decode_array_i(hashcodes):
+	# vectorized _decode_c2i() for hashcodes of 1 to 12 characters
+	hashcodes = np.asarray(hashcodes, dtype=str).reshape(-1)
+	lengths = np.char.str_len(hashcodes)
+	if np.any((lengths < 1) | (lengths > 12)):
+		raise ValueError("hashcodes must have 1 to 12 characters")
+	
+	chars = hashcodes.astype('<U12').view(np.uint32).reshape(-1, 12)
+	values = _base32_values[np.minimum(chars, 127)]
+	ints = np.zeros(len(hashcodes), dtype=np.uint64)
+	for i in range(12):
+		inside = i < lengths
+		if np.any(values[inside, i] < 0):
+			raise ValueError("invalid geohash character.")
+		ints = np.where(inside, (ints << np.uint64(5)) | values[:, i].astype(np.uint64), ints)
+	
+	bit_length = lengths*5
+	lat_length = bit_length//2
+	lon_length = bit_length - lat_length
+	odd = (bit_length%2).astype(np.uint64)
+	lat = _squeeze_bits(ints >> odd)
+	lon = _squeeze_bits(ints >> (np.uint64(1) - odd))
+	return lat, lon, lat_length, lon_length
+
+def decode_array(hashcodes, delta=False):
+	'''
+	vectorized decode() for an array of hashcodes: arrays of center latitudes and longitudes (and deltas).
+	'''
+	(lat,lon,lat_length,lon_length) = _decode_array_i(hashcodes)
+	return lattice_decode(lat, lon, lat_length, lon_length, delta)
+
+def lattice_decode(lat, lon, lat_length, lon_length, delta=False):
+	'''
+	decode() of the cells at rows lat and columns lon of a grid with lat_length and lon_length bits.
+	'''
+	latitude_delta  = 90.0/np.exp2(lat_length)
+	longitude_delta = 180.0/np.exp2(lon_length)
+	latitude = (lat - np.left_shift(1, lat_length-1)) / np.exp2(lat_length-1) * 90.0 + latitude_delta
+	longitude = (lon - np.left_shift(1, lon_length-1)) / np.exp2(lon_length-1) * 180.0 + longitude_delta
+	if delta:
+		return latitude,longitude,latitude_delta,longitude_delta
+	return latitude,longitude
+
+def bbox_array(hashcodes):
+	'''
+	vectorized bbox() for an array of hashcodes: (N, 4) array of the west, south, east and north borders.
+	'''
+	(lat,lon,lat_length,lon_length) = _decode_array_i(hashcodes)
+	latitude_delta  = 180.0/np.exp2(lat_length)
+	longitude_delta = 360.0/np.exp2(lon_length)
+	latitude = (lat - np.left_shift(1, lat_length-1)) / np.exp2(lat_length-1) * 90.0
+	longitude = (lon - np.left_shift(1, lon_length-1)) / np.exp2(lon_length-1) * 180.0
+	return np.stack([longitude, latitude, longitude+longitude_delta, latitude+latitude_delta], axis=-1)
+
 def neighbors(hashcode):
 	if _geohash and len(hashcode)<25:
 		return _geohash.neighbors(hashcode)
@@ -59,6 +59,7 @@
 
 import re
 import math
+import numpy as np
 
 # A separator used to break the code into two parts to aid memorability.
 SEPARATOR_ = '+'
@@ -297,6 +298,52 @@ def encode(latitude, longitude, codeLength=PAIR_CODE_LENGTH_):
                                          codeLength) + SEPARATOR_
 
 
+def encode_array(latitudes, longitudes, codeLength=PAIR_CODE_LENGTH_):
+    """
+    Vectorized encode() for arrays of latitudes and longitudes.
+    Uses the same integer method as encode() so the codes are identical.
+    Returns:
+      A NumPy array of Open Location Codes.
+    """
+    if codeLength < 2 or (codeLength < PAIR_CODE_LENGTH_ and
+                          codeLength % 2 == 1):
+        raise ValueError('Invalid Open Location Code length - ' +
+                         str(codeLength))
+    codeLength = min(codeLength, MAX_DIGIT_COUNT_)
+    latitude = np.clip(np.asarray(latitudes, dtype=np.float64), -LATITUDE_MAX_, LATITUDE_MAX_)
+    longitude = np.asarray(longitudes, dtype=np.float64)
+    longitude = np.where((longitude < -LONGITUDE_MAX_) | (longitude >= LONGITUDE_MAX_),
+                         (longitude + LONGITUDE_MAX_) % 360 - LONGITUDE_MAX_, longitude)
+    latitude = np.where(latitude == 90, latitude - computeLatitudePrecision(codeLength), latitude)
+
+    latVal = np.floor(np.round((latitude + LATITUDE_MAX_) * FINAL_LAT_PRECISION_, 6)).astype(np.int64)
+    lngVal = np.floor(np.round((longitude + LONGITUDE_MAX_) * FINAL_LNG_PRECISION_, 6)).astype(np.int64)
+
+    # Digit indices into CODE_ALPHABET_, filled from the least significant end.
+    digits = np.zeros(latitude.shape + (MAX_DIGIT_COUNT_,), dtype=np.uint8)
+    if codeLength > PAIR_CODE_LENGTH_:
+        for i in range(MAX_DIGIT_COUNT_ - 1, PAIR_CODE_LENGTH_ - 1, -1):
+            digits[..., i] = (latVal % GRID_ROWS_) * GRID_COLUMNS_ + lngVal % GRID_COLUMNS_
+            latVal //= GRID_ROWS_
+            lngVal //= GRID_COLUMNS_
+    else:
+        latVal //= pow(GRID_ROWS_, GRID_CODE_LENGTH_)
+        lngVal //= pow(GRID_COLUMNS_, GRID_CODE_LENGTH_)
+    for i in range(PAIR_CODE_LENGTH_ - 2, -1, -2):
+        digits[..., i + 1] = lngVal % ENCODING_BASE_
+        digits[..., i] = latVal % ENCODING_BASE_
+        latVal //= ENCODING_BASE_
+        lngVal //= ENCODING_BASE_
+
+    chars = np.frombuffer(CODE_ALPHABET_.encode('ascii'), dtype=np.uint8)[digits[..., :codeLength]]
+    if codeLength < SEPARATOR_POSITION_:
+        padding = np.full(latitude.shape + (SEPARATOR_POSITION_ - codeLength,), ord(PADDING_CHARACTER_), dtype=np.uint8)
+        chars = np.concatenate([chars, padding], axis=-1)
+    separator = np.full(latitude.shape + (1,), ord(SEPARATOR_), dtype=np.uint8)
+    chars = np.concatenate([chars[..., :SEPARATOR_POSITION_], separator, chars[..., SEPARATOR_POSITION_:]], axis=-1)
+    return np.ascontiguousarray(chars).view(f'S{chars.shape[-1]}').reshape(latitude.shape).astype(str)
+
+
 def decode(code):
     """
     Decodes an Open Location Code into the location coordinates.
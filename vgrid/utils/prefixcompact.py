@@ -0,0 +1,33 @@
+"""
+Compaction of string cell IDs whose parent is the ID without its last character.
+
+This covers the hierarchical DGGS with prefix IDs (rHEALPix, QTM, Geohash, Quadkey), which differ
+only in their branching factor: 9 (or N_side**2) for rHEALPix, 4 for QTM and Quadkey, 32 for Geohash.
+The IDs are sorted once, so the children of each parent are contiguous, and are then merged
+bottom-up one ID length at a time: a parent is complete when its children count equals the
+branching factor. The whole compaction is O(N log N).
+"""
+import numpy as np
+
+def compact_prefix_ids(cell_ids, num_children, min_length=1):
+    """Replace complete sets of sibling cell IDs by their parent, finest resolution first.
+
+    Returns a sorted array of unique IDs; IDs are never compacted shorter than min_length.
+    """
+    cell_ids = np.unique(np.asarray(cell_ids, dtype=str))
+    lengths = np.char.str_len(cell_ids)
+    compacted = [cell_ids[lengths <= min_length]]
+    merged = cell_ids[:0]  # Parents made at the previous (longer) length
+    for length in range(int(lengths.max(initial=0)), min_length, -1):
+        level = cell_ids[lengths == length]
+        if len(merged):
+            level = np.unique(np.concatenate([level, merged]))
+        # Casting to a shorter string type drops the last character; sorted IDs keep siblings together
+        parents = level.astype(f"<U{length - 1}")
+        starts = np.flatnonzero(np.concatenate([[True], parents[1:] != parents[:-1]]))
+        counts = np.diff(np.append(starts, len(parents)))
+        complete = counts == num_children
+        compacted.append(level[~np.repeat(complete, counts)])
+        merged = parents[starts[complete]]
+    compacted.append(merged)
+    return np.unique(np.concatenate(compacted))
@@ -27,7 +27,10 @@
 ################
 
 import math
-from shapely.geometry import Point, Polygon, LinearRing
+import numpy as np
+import shapely
+from shapely.geometry import Polygon, LinearRing
+from vgrid.utils.prefixcompact import compact_prefix_ids
 
 def findCrossedMeridiansByLatitude(vert1, vert2, newLat):
 
@@ -285,6 +288,19 @@ def qtm_id_to_facet(qtm_id):
     return facet
 #   return facet[:-1]  # Drop the True/False flag
 
+def facet_contains(facet, lat, lon):
+    """Whether a point is strictly inside a facet, from the signs of the point against the facet edges."""
+    vertices = facet[:4]  # triangles repeat their first vertex, rectangles have four
+    signs = set()
+    for (lat0, lon0), (lat1, lon1) in zip(vertices, vertices[1:] + vertices[:1]):
+        if lat0 == lat1 and lon0 == lon1:
+            continue
+        cross = (lon1 - lon0) * (lat - lat0) - (lat1 - lat0) * (lon - lon0)
+        if cross == 0:
+            return False
+        signs.add(cross > 0)
+    return len(signs) == 1
+
 def latlon_to_qtm_id(lat, lon, resolution):   
     # Base octahedral face definitions
     p90_n180, p90_n90, p90_p0, p90_p90, p90_p180 = (90.0, -180.0), (90.0, -90.0), (90.0, 0.0), (90.0, 90.0), (90.0, 180.0)
@@ -305,8 +321,7 @@ def latlon_to_qtm_id(lat, lon, resolution):
 
     # Find the initial facet containing (lat, lon)
     for facet_id, facet in initial_facets.items():
-        facet_geom = constructGeometry(facet)  
-        if facet_geom.contains(Point(lon, lat)):
+        if facet_contains(facet, lat, lon):
             qtm_id = facet_id
             current_facet = facet
             break
@@ -317,8 +332,7 @@ def latlon_to_qtm_id(lat, lon, resolution):
     for _ in range(1, resolution):
         subfacets = divideFacet(current_facet)
         for i, subfacet in enumerate(subfacets):
-            subfacet_geom = constructGeometry(subfacet)  
-            if subfacet_geom.contains(Point(lon, lat)):
+            if facet_contains(subfacet, lat, lon):
                 qtm_id += str(i)
                 current_facet = subfacet
                 break
@@ -360,3 +374,315 @@ def qtm_children(qtm_id, resolution=None):
 
     recurse(qtm_id, len(qtm_id))
     return children
+
+
+################ 
+# Facet arrays
+################
+
+# Facets as arrays: (N, 4, 2) (lat, lon) vertices (triangles repeat their first vertex) and
+# kinds 0: up triangle, 1: down triangle, 2: north pole rectangle, 3: south pole rectangle.
+initial_facet_vertices = np.array([
+    [(0.0, -180.0), (0.0, -90.0), (90.0, -90.0), (90.0, -180.0)],
+    [(0.0, -90.0), (0.0, 0.0), (90.0, 0.0), (90.0, -90.0)],
+    [(0.0, 0.0), (0.0, 90.0), (90.0, 90.0), (90.0, 0.0)],
+    [(0.0, 90.0), (0.0, 180.0), (90.0, 180.0), (90.0, 90.0)],
+    [(-90.0, -180.0), (-90.0, -90.0), (0.0, -90.0), (0.0, -180.0)],
+    [(-90.0, -90.0), (-90.0, 0.0), (0.0, 0.0), (0.0, -90.0)],
+    [(-90.0, 0.0), (-90.0, 90.0), (0.0, 90.0), (0.0, 0.0)],
+    [(-90.0, 90.0), (-90.0, 180.0), (0.0, 180.0), (0.0, 90.0)],
+])
+initial_facet_kinds = np.array([2, 2, 2, 2, 3, 3, 3, 3])
+
+# Edges bisected by divideFacet for each kind of facet, as (from, to) vertex indices
+bisected_edges = np.array([
+    [(0, 1), (1, 2), (2, 0)],
+    [(0, 1), (1, 2), (2, 0)],
+    [(0, 1), (1, 2), (3, 0)],
+    [(1, 2), (2, 3), (3, 0)],
+])
+# Subfacets of each kind of facet, as indices into the facet vertices (0-3) and the new vertices (4-6)
+subfacet_vertices = np.array([
+    [[4, 5, 6, 4], [6, 5, 2, 6], [0, 4, 6, 0], [4, 1, 5, 4]],
+    [[6, 4, 5, 6], [0, 4, 6, 0], [6, 5, 2, 6], [4, 1, 5, 4]],
+    [[4, 5, 6, 4], [6, 5, 2, 3], [0, 4, 6, 0], [4, 1, 5, 4]],
+    [[6, 4, 5, 6], [0, 1, 4, 6], [6, 5, 3, 6], [5, 4, 2, 5]],
+])
+subfacet_kinds = np.array([[1, 0, 0, 0], [0, 1, 1, 1], [1, 2, 0, 0], [0, 3, 1, 1]])
+
+# math.acos and math.atan2 round differently from NumPy, so use them to match divideFacet exactly
+_acos = np.frompyfunc(math.acos, 1, 1)
+_atan2 = np.frompyfunc(math.atan2, 2, 1)
+
+def facet_midpoints(vert1, vert2):
+    """Vectorized divideFacet bisector of the edges from vert1 to vert2, (N, 2) (lat, lon) arrays."""
+    lat1, lon1 = vert1[:, 0], vert1[:, 1]
+    lat2, lon2 = vert2[:, 0], vert2[:, 1]
+    new_lat = (lat1 + lat2) / 2
+    straight = (lat1 == lat2) | (lon1 == lon2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # findCrossedMeridiansByLatitude
+        theta = np.radians(new_lat)
+        theta1, lamb1 = np.radians(lat1), np.radians(lon1)
+        theta2, lamb2 = np.radians(lat2), np.radians(lon2)
+        dlamb = lamb2 - lamb1
+        x = np.sin(theta1) * np.cos(theta2) * np.cos(theta) * np.sin(dlamb)
+        y = np.sin(theta1) * np.cos(theta2) * np.cos(theta) * np.cos(dlamb) - np.cos(theta1) * np.sin(theta2) * np.cos(theta)
+        z = np.cos(theta1) * np.cos(theta2) * np.sin(theta) * np.sin(dlamb)
+        crossing = ~straight
+        lambm = np.zeros_like(x)
+        dlambI = np.zeros_like(x)
+        if crossing.any():
+            lambm[crossing] = _atan2(-y[crossing], x[crossing]).astype(float)
+            dlambI[crossing] = _acos(z[crossing] / np.sqrt(x[crossing] * x[crossing] + y[crossing] * y[crossing])).astype(float)
+        lon_1 = (np.degrees(lamb1 + lambm - dlambI) + 540) % 360 - 180
+        lon_2 = (np.degrees(lamb1 + lambm + dlambI) + 540) % 360 - 180
+    # lonCheck
+    lesser, greater = np.minimum(lon1, lon2), np.maximum(lon1, lon2)
+    new_lon = np.where((lon_1 > lesser) & (lon_1 < greater), lon_1, lon_2)
+    return np.where(straight[:, None], np.stack([new_lat, (lon1 + lon2) / 2], axis=1), np.stack([new_lat, new_lon], axis=1))
+
+def divide_facets(vertices, kinds):
+    """Vectorized divideFacet: the (N, 4, 4, 2) vertices and (N, 4) kinds of the subfacets of N facets."""
+    edges = bisected_edges[kinds]
+    index = np.arange(len(kinds))[:, None]
+    new_vertices = np.stack([facet_midpoints(vertices[index[:, 0], edges[:, i, 0]], vertices[index[:, 0], edges[:, i, 1]])
+                             for i in range(3)], axis=1)
+    points = np.concatenate([vertices, new_vertices], axis=1)
+    return points[index[:, :, None], subfacet_vertices[kinds]], subfacet_kinds[kinds]
+
+def facets_contain(vertices, lats, lons):
+    """Vectorized facet_contains for N facets and N points."""
+    # Contiguous (vertex, lat/lon, ...) arrays
+    vertices = np.ascontiguousarray(np.moveaxis(vertices, (-2, -1), (0, 1)))
+    positive = negative = True
+    for k in range(4):
+        lat0, lon0 = vertices[k]
+        lat1, lon1 = vertices[(k + 1) % 4]
+        cross = (lon1 - lon0) * (lats - lat0) - (lat1 - lat0) * (lons - lon0)
+        # Triangles repeat their first vertex, skip that empty edge
+        empty = (lat0 == lat1) & (lon0 == lon1)
+        positive = positive & ((cross > 0) | empty)
+        negative = negative & ((cross < 0) | empty)
+    return positive | negative
+
+def latlon_to_qtm_id_array(lats, lons, resolution):
+    """
+    Vectorized latlon_to_qtm_id for arrays of latitudes and longitudes.
+    Returns an object array of QTM IDs, with None for points outside the initial facets.
+    """
+    packed = latlon_to_packed_qtm(lats, lons, resolution)
+    # Convert each distinct cell once
+    unique, inverse = np.unique(packed, return_inverse=True)
+    return unpack_qtm_ids(unique)[inverse.ravel()]
+
+def qtm_ids_to_facets(qtm_ids):
+    """Vectorized qtm_id_to_facet: the (N, 4, 2) vertices and (N,) kinds of the facets of QTM IDs."""
+    return packed_qtm_to_facets(pack_qtm_ids(qtm_ids))
+
+def facet_polygons(vertices):
+    """Vectorized constructGeometry: shapely polygons of (N, 4, 2) facet vertices."""
+    return shapely.polygons(vertices[..., ::-1])
+
+def qtm_cover(geometry, resolution, compact=False, margin=0.25):
+    """
+    QTM IDs at a resolution whose facets intersect a shapely geometry, found top-down from the
+    initial facets. Only facets intersecting the geometry are subdivided, one level at a time.
+    Facets well inside the geometry (with a margin relative to their size, as subfacet vertices
+    are not on the straight facet edges) keep all their subfacets without computing them, as a
+    single facet if compact=True; complete sets of subfacets are also merged into their facet then.
+    """
+    shapely.prepare(geometry)
+    vertices, kinds = initial_facet_vertices, initial_facet_kinds
+    qtm_ids = np.array([str(i + 1) for i in range(8)])
+    covered = []
+    for level in range(1, resolution + 1):
+        polygons = facet_polygons(vertices)
+        keep = shapely.intersects(geometry, polygons)
+        if level == resolution:
+            covered.append(qtm_ids[keep])
+            break
+        size = np.ptp(vertices, axis=1).max(axis=1)
+        inside = keep & shapely.contains(geometry, shapely.buffer(polygons, margin * size, quad_segs=2))
+        if inside.any():
+            if compact:
+                covered.append(qtm_ids[inside])
+            else:
+                suffixes = np.array([''])
+                for _ in range(resolution - level):
+                    suffixes = np.char.add(suffixes[:, None], np.array(['0', '1', '2', '3'])).ravel()
+                covered.append(np.char.add(qtm_ids[inside][:, None], suffixes).ravel())
+        # Subdivide the facets on the geometry boundary; their parents are no longer needed
+        boundary = keep & ~inside
+        subfacets, subkinds = divide_facets(vertices[boundary], kinds[boundary])
+        vertices, kinds = subfacets.reshape(-1, 4, 2), subkinds.ravel()
+        qtm_ids = np.char.add(qtm_ids[boundary][:, None], np.array(['0', '1', '2', '3'])).ravel()
+
+    covered = np.concatenate(covered) if covered else np.array([], dtype=str)
+    if compact:
+        covered = compact_qtm_ids(covered)
+    return covered.tolist()
+
+def compact_qtm_ids(qtm_ids):
+    """Replace complete sets of 4 sibling QTM IDs by their parent, finest resolution first."""
+    return compact_prefix_ids(qtm_ids, 4)
+
+################ 
+# Packed QTM IDs
+################
+
+# A QTM ID packs into a 64-bit integer as 3 bits for the initial facet (octant), 2 bits for each
+# of up to 23 subdivision digits (left-aligned) and 5 bits for the resolution:
+#   bits 51-53: octant - 1, bits 49-50: 1st digit, ..., bits 5-6: 23rd digit, bits 0-4: resolution
+# Packed IDs sort like their strings, parents just before their subfacets. -1 marks no cell.
+max_qtm_resolution = 24
+octant_shift = 51
+resolution_mask = 0x1F
+
+def digit_shift(level):
+    """Bit position of the subdivision digit that makes a facet at level (2..24) from its parent."""
+    return octant_shift - 2 * (level - 1)
+
+def packed_qtm_resolution(packed):
+    """Resolutions of packed QTM IDs."""
+    return np.asarray(packed, dtype=np.int64) & resolution_mask
+
+def pack_qtm_ids(qtm_ids):
+    """Packed 64-bit integers of an array of QTM ID strings."""
+    qtm_ids = np.asarray(qtm_ids, dtype=str)
+    if qtm_ids.size == 0:
+        return np.empty(0, dtype=np.int64)
+    width = qtm_ids.dtype.itemsize // 4
+    chars = np.ascontiguousarray(qtm_ids).view(np.uint32).reshape(len(qtm_ids), width).astype(np.int64)
+    resolutions = (chars != 0).sum(axis=1)
+    digits = chars - ord('0')
+    present = np.arange(width) < resolutions[:, None]
+    if (resolutions < 1).any() or (resolutions > max_qtm_resolution).any() or (chars[present] == 0).any():
+        raise ValueError(f"Invalid QTM ID: resolution must be 1-{max_qtm_resolution}")
+    if ((digits[:, 0] < 1) | (digits[:, 0] > 8)).any():
+        raise ValueError("Invalid QTM ID: Base facet must be 1-8")
+    if width > 1 and ((present[:, 1:] & ((digits[:, 1:] < 0) | (digits[:, 1:] > 3))).any()):
+        raise ValueError("Invalid QTM ID: subdivision digits must be 0-3")
+    packed = (digits[:, 0] - 1) << octant_shift
+    for level in range(2, width + 1):
+        packed |= np.where(present[:, level - 1], digits[:, level - 1], 0) << digit_shift(level)
+    return packed | resolutions
+
+def unpack_qtm_ids(packed):
+    """Object array of the QTM ID strings of packed QTM IDs, None for -1."""
+    packed = np.asarray(packed, dtype=np.int64)
+    valid = packed >= 0
+    resolutions = np.where(valid, packed & resolution_mask, 0)
+    chars = np.zeros((len(packed), max_qtm_resolution), dtype=np.uint32)
+    chars[:, 0] = np.where(valid, ((packed >> octant_shift) & 7) + ord('1'), 0)
+    for level in range(2, max_qtm_resolution + 1):
+        chars[:, level - 1] = np.where(resolutions >= level, ((packed >> digit_shift(level)) & 3) + ord('0'), 0)
+    # Trailing zero characters are dropped by the fixed width string type
+    qtm_ids = chars.view(f'<U{max_qtm_resolution}').ravel().astype(object)
+    qtm_ids[~valid] = None
+    return qtm_ids
+
+def packed_qtm_parent(packed, resolution=None):
+    """Packed parents of packed QTM IDs at a coarser resolution (default: the next coarser one), -1 for none."""
+    packed = np.asarray(packed, dtype=np.int64)
+    resolutions = packed & resolution_mask
+    target = resolutions - 1 if resolution is None else np.full_like(resolutions, resolution)
+    # Keep the octant and the digits of the parent resolution
+    kept = np.left_shift(np.int64(-1), digit_shift(np.maximum(target, 1)))
+    return np.where((target >= 1) & (target <= resolutions) & (packed >= 0), (packed & kept) | target, -1)
+
+def packed_qtm_children(packed, resolution=None):
+    """
+    (N, 4 ** k) array of the packed subfacets of packed QTM IDs, all at the same resolution, k levels finer
+    (default: the next finer resolution), in QTM ID order.
+    """
+    packed = np.asarray(packed, dtype=np.int64)
+    resolutions = packed & resolution_mask
+    if len(packed) == 0:
+        return np.empty((0, 4 if resolution is None else 4 ** max(resolution, 0)), dtype=np.int64)
+    if (resolutions != resolutions[0]).any():
+        raise ValueError("Packed QTM IDs must have the same resolution")
+    current = int(resolutions[0])
+    resolution = current + 1 if resolution is None else resolution
+    if resolution < current or resolution > max_qtm_resolution:
+        raise ValueError(f"Invalid QTM resolution {resolution}")
+    suffixes = np.arange(4 ** (resolution - current), dtype=np.int64) << digit_shift(resolution)
+    return ((packed & ~resolution_mask)[:, None] | suffixes) | resolution
+
+def latlon_to_packed_qtm(lats, lons, resolution):
+    """
+    Packed QTM IDs of arrays of latitudes and longitudes, as latlon_to_qtm_id, with -1 for
+    points outside the initial facets.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    inside = facets_contain(initial_facet_vertices[None], lats[:, None], lons[:, None])
+    found = inside.any(axis=1)
+    base = np.argmax(inside, axis=1)
+    vertices = initial_facet_vertices[base]
+    kinds = initial_facet_kinds[base]
+    packed = base.astype(np.int64) << octant_shift
+    levels = np.ones(len(lats), dtype=np.int64)
+    index = np.arange(len(lats))
+    for _ in range(1, resolution):
+        # Subdivide each distinct facet once, for all the points in it
+        _, first, inverse = np.unique(packed | levels, return_index=True, return_inverse=True)
+        subfacets, subkinds = divide_facets(vertices[first], kinds[first])
+        subfacets, subkinds = subfacets[inverse.ravel()], subkinds[inverse.ravel()]
+        inside = facets_contain(subfacets, lats[:, None], lons[:, None])
+        # Points in none of the subfacets keep their facet, as in latlon_to_qtm_id
+        has = inside.any(axis=1)
+        digit = np.argmax(inside, axis=1)
+        vertices = np.where(has[:, None, None], subfacets[index, digit], vertices)
+        kinds = np.where(has, subkinds[index, digit], kinds)
+        levels += has
+        packed |= np.where(has, digit.astype(np.int64) << digit_shift(levels), 0)
+    return np.where(found, packed | levels, -1)
+
+def packed_qtm_to_facets(packed):
+    """
+    The (N, 4, 2) vertices and (N,) kinds of the facets of packed QTM IDs. Facets are subdivided
+    level by level, once for all IDs sharing a parent, not from the root for every ID.
+    """
+    packed = np.asarray(packed, dtype=np.int64)
+    unique, inverse = np.unique(packed, return_inverse=True)
+    if (unique < 0).any():
+        raise ValueError("Invalid packed QTM ID")
+    resolutions = unique & resolution_mask
+    vertices = np.empty((len(unique), 4, 2))
+    kinds = np.empty(len(unique), dtype=np.int64)
+
+    # Facets of the distinct prefixes of the IDs at each level, starting with the octants
+    prefixes = np.unique(packed_qtm_parent(unique, 1))
+    prefix_vertices = initial_facet_vertices[prefixes >> octant_shift]
+    prefix_kinds = initial_facet_kinds[prefixes >> octant_shift]
+    for level in range(1, int(resolutions.max(initial=0)) + 1):
+        if level > 1:
+            prefixes_below = np.unique(packed_qtm_parent(unique[resolutions >= level], level))
+            parents, parent_index = np.unique(np.searchsorted(prefixes, packed_qtm_parent(prefixes_below)), return_inverse=True)
+            subfacets, subkinds = divide_facets(prefix_vertices[parents], prefix_kinds[parents])
+            digits = (prefixes_below >> digit_shift(level)) & 3
+            prefixes = prefixes_below
+            prefix_vertices = subfacets[parent_index.ravel(), digits]
+            prefix_kinds = subkinds[parent_index.ravel(), digits]
+        at_level = np.flatnonzero(resolutions == level)
+        position = np.searchsorted(prefixes, unique[at_level])
+        vertices[at_level], kinds[at_level] = prefix_vertices[position], prefix_kinds[position]
+    inverse = inverse.ravel()
+    return vertices[inverse], kinds[inverse]
+
+def compact_packed_qtm(packed):
+    """Replace complete sets of 4 sibling packed QTM IDs by their parent, finest resolution first."""
+    packed = np.unique(np.asarray(packed, dtype=np.int64))
+    resolutions = packed & resolution_mask
+    for level in range(int(resolutions.max(initial=1)), 1, -1):
+        at_level = resolutions == level
+        parents = packed_qtm_parent(packed[at_level])
+        unique, counts = np.unique(parents, return_counts=True)
+        full = unique[counts == 4]
+        if len(full):
+            merged = np.zeros(len(packed), dtype=bool)
+            merged[np.flatnonzero(at_level)[np.isin(parents, full)]] = True
+            packed = np.unique(np.concatenate([packed[~merged], full]))
+            resolutions = packed & resolution_mask
+    return packed
@@ -152,6 +152,7 @@ orient the DGGS so that the planar origin (0, 0) is on Auckland, New Zealand ::
 # *****************************************************************************
 # Import third-party modules.
 from numpy import array, base_repr, ceil, log, pi
+import numpy as np
 
 # Import standard modules.
 from itertools import product
@@ -167,7 +168,7 @@ from vgrid.utils.rhealpixdggs.ellipsoids import (
     UNIT_SPHERE,
     UNIT_SPHERE_RADIANS,
 )
-from vgrid.utils.rhealpixdggs.utils import my_round
+from vgrid.utils.rhealpixdggs.utils import my_round, auth_rad, wrap_longitude_array, wrap_latitude_array
 from numpy.testing import assert_allclose
 
 
@@ -819,6 +820,218 @@ class RHEALPixDGGS(object):
             suid.append(self.child_order[(int(suid_row[i], N), int(suid_col[i], N))])
         return Cell(self, suid)
 
+    def cells_from_points(self, resolution, lons, lats):
+        """
+        Vectorized version of cell_from_point(resolution, (lon, lat), plane=False)
+        for arrays of longitudes `lons` and latitudes `lats` on the ellipsoid.
+        Return an object array of the cell IDs (as str(cell)), with None for
+        points that don't lie in the DGGS.
+
+        EXAMPLES::
+
+            >>> rdggs = RHEALPixDGGS()
+            >>> print(rdggs.cells_from_points(2, [0, 80, 100], [0, -20, 89]).tolist())
+            ['Q33', 'Q82', 'N44']
+
+        """
+        lons = np.asarray(lons, dtype=float).ravel()
+        lats = np.asarray(lats, dtype=float).ravel()
+        if self.N_side**2 >= 10:
+            # Cell IDs are not digit strings then, see Cell.__str__().
+            cells = [
+                self.cell_from_point(resolution, p, plane=False)
+                for p in zip(lons.tolist(), lats.tolist())
+            ]
+            return np.array([None if c is None else str(c) for c in cells], dtype=object)
+
+        # Get the rectangular coordinates of the points, as the rhealpix() projection does.
+        ellipsoid = self.ellipsoid
+        lam = wrap_longitude_array(lons - ellipsoid.lon_0, radians=ellipsoid.radians)
+        phi = wrap_latitude_array(lats - ellipsoid.lat_0, radians=ellipsoid.radians)
+        if not ellipsoid.radians:
+            lam, phi = np.deg2rad(lam), np.deg2rad(phi)
+        x, y = pjr.rhealpix_ellipsoid_array(
+            lam, phi, e=ellipsoid.e, north_square=self.north_square, south_square=self.south_square
+        )
+        R_A = auth_rad(ellipsoid.a, ellipsoid.e)
+        x, y = R_A * x, R_A * y
+
+        # Determine the resolution 0 cells, with the tests of cell_from_point().
+        ns = self.north_square
+        ss = self.south_square
+        R = self.ellipsoid.R_A
+        equatorial = (y >= -R * pi / 4) & (y <= R * pi / 4)
+        s0 = np.select(
+            [
+                (y > R * pi / 4) & (y < R * 3 * pi / 4)
+                & (x > R * (-pi + ns * (pi / 2))) & (x < R * (-pi / 2 + ns * (pi / 2))),
+                (y > -R * 3 * pi / 4) & (y < -R * pi / 4)
+                & (x > R * (-pi + ss * (pi / 2))) & (x < R * (-pi / 2 + ss * (pi / 2))),
+                equatorial & (x >= -R * pi) & (x < -R * pi / 2),
+                equatorial & (x >= -R * pi / 2) & (x < 0),
+                equatorial & (x >= 0) & (x < R * pi / 2),
+                equatorial & (x >= R * pi / 2) & (x < R * pi),
+            ],
+            [0, 5, 1, 2, 3, 4],
+            -1,
+        )
+        inside = s0 >= 0
+        s0 = np.where(inside, s0, 0)
+
+        # Row and column of the cells within their resolution 0 cells.
+        w = self.cell_width(0)
+        ul = np.array([self.ul_vertex[c] for c in CELLS0])
+        dx = np.where(inside, np.abs(x - ul[s0, 0]) / w, 0)
+        dy = np.where(inside, np.abs(y - ul[s0, 1]) / w, 0)
+        smidgen = 0.5 * self.cell_width(self.max_resolution) / w
+        dx = np.where(dx == 1, dx - smidgen, dx)
+        dy = np.where(dy == 1, dy - smidgen, dy)
+        N = self.N_side
+        rows = (dy * N**resolution).astype(np.int64)
+        cols = (dx * N**resolution).astype(np.int64)
+
+        # Spell out the cell IDs: the resolution 0 cell and one child digit per resolution.
+        chars = np.empty((len(lons), resolution + 1), dtype=np.uint8)
+        chars[:, 0] = np.frombuffer("".join(CELLS0).encode(), dtype=np.uint8)[s0]
+        for i in range(resolution):
+            power = N ** (resolution - 1 - i)
+            chars[:, i + 1] = ord("0") + (rows // power % N) * N + cols // power % N
+        cell_ids = chars.view("S%d" % (resolution + 1)).ravel().astype(str).astype(object)
+        cell_ids[~inside] = None
+        return cell_ids
+
+    def parse_cell_ids(self, cell_ids):
+        """
+        Split cell ID strings such as 'N45' into the arrays (s0, digits, resolution),
+        where s0 is the index of the resolution 0 cell in CELLS0 and digits is
+        a (number of cells, maximum resolution) array padded with zeros.
+        For internal use.
+        """
+        cell_ids = np.asarray(cell_ids, dtype=str).ravel()
+        n = len(cell_ids)
+        width = max(cell_ids.dtype.itemsize // 4, 1)
+        codes = cell_ids.view(np.uint32).reshape(n, width).astype(np.int64)
+        resolution = np.char.str_len(cell_ids) - 1
+        s0 = codes[:, 0] - ord(CELLS0[0])
+        digits = np.where(codes[:, 1:] > 0, codes[:, 1:] - ord("0"), 0)
+        return s0, digits, resolution
+
+    def ellipsoidal_shapes(self, cell_ids):
+        """
+        Vectorized version of Cell.ellipsoidal_shape() for an array of cell IDs.
+
+        EXAMPLES::
+
+            >>> rdggs = RHEALPixDGGS()
+            >>> print(rdggs.ellipsoidal_shapes(['N', 'P4', 'N0', 'N1', 'S48']).tolist())
+            ['cap', 'quad', 'dart', 'skew_quad', 'dart']
+
+        """
+        s0, digits, resolution = self.parse_cell_ids(cell_ids)
+        return self._ellipsoidal_shapes(s0, digits, resolution)
+
+    def _ellipsoidal_shapes(self, s0, digits, resolution):
+        N = self.N_side
+        padding = np.arange(digits.shape[1]) >= resolution[:, None]
+
+        def all_in(values):
+            return (np.isin(digits, values) | padding).all(axis=1)
+
+        cap = all_in([(N**2 - 1) // 2]) if N % 2 == 1 else np.zeros(len(s0), dtype=bool)
+        dart = all_in([i * (N + 1) for i in range(N)]) | all_in(
+            [(i + 1) * (N - 1) for i in range(N)]
+        )
+        return np.select(
+            [(s0 >= 1) & (s0 <= 4), cap, dart], ["quad", "cap", "dart"], "skew_quad"
+        )
+
+    def boundaries(self, cell_ids, closed=False, n=2):
+        """
+        Vectorized version of Cell.vertices(plane=False) for an array of cell
+        IDs, as given by str(cell).
+        Return an (N, 4, 2) array of the longitude-latitude vertices of
+        the N cells, starting with the northwest vertex and going clockwise,
+        or an (N, 5, 2) array of closed rings if `closed` = True.
+        With `n` > 2, each edge is sampled with `n` points as in
+        Cell.boundary(n), giving (N, 4n - 4, 2) arrays.
+
+        EXAMPLES::
+
+            >>> rdggs = RHEALPixDGGS()
+            >>> print(my_round(rdggs.boundaries(['P4']).tolist(), 10))
+            [[[-60.0, 12.8953129584], [-30.0, 12.8953129584], [-30.0, -12.8953129584], [-60.0, -12.8953129584]]]
+
+        """
+        s0, digits, resolution = self.parse_cell_ids(cell_ids)
+        count, max_resolution = digits.shape
+        N = self.N_side
+        ns = self.north_square
+        ss = self.south_square
+
+        # Planar upper left vertices, as in Cell.ul_vertex().
+        powers = N ** np.arange(max_resolution - 1, -1, -1, dtype=np.int64)
+        shift = N ** (max_resolution - resolution)
+        row = ((digits // N) * powers).sum(axis=1) // shift
+        col = ((digits % N) * powers).sum(axis=1) // shift
+        scale = np.array([N ** (-k) for k in range(max_resolution + 1)])[resolution]
+        ul = np.array([self.ul_vertex[c] for c in CELLS0])
+        x = ul[s0, 0] + self.cell_width(0) * (col * scale)
+        y = ul[s0, 1] - self.cell_width(0) * (row * scale)
+        w = np.array([self.cell_width(k) for k in range(max_resolution + 1)])[resolution]
+        vx = np.stack([x, x + w, x + w, x], axis=1)
+        vy = np.stack([y, y, y - w, y - w], axis=1)
+
+        # Start with the northwest vertex, as in Cell.nw_vertex().
+        region = np.select([s0 == 0, s0 == 5], [1, -1], 0)
+        shapes = self._ellipsoidal_shapes(s0, digits, resolution)
+        start = np.zeros(count, dtype=np.int64)
+        R_A = self.ellipsoid.R_A
+        skew = shapes == "skew_quad"
+        if skew.any():
+            triangle, _ = pjr.triangle_array(
+                (x + w / 2)[skew] / R_A, (y - w / 2)[skew] / R_A,
+                north_square=ns, south_square=ss, inverse=True,
+            )
+            start[skew] = np.where(region[skew] == 1, -((triangle - ns) % 4) % 4, (triangle - ss) % 4)
+        dart = shapes == "dart"
+        if dart.any():
+            _, lat = self._inverse_rhealpix(vx[dart], vy[dart])
+            # Polewards vertex, the last one in case of ties.
+            i = 3 - np.argmax(np.abs(lat)[:, ::-1], axis=1)
+            start[dart] = np.where(region[dart] == 1, i, (i + 1) % 4)
+        if n > 2:
+            # Points along the edges, each edge going from one vertex to the next.
+            t = np.arange(n - 1) / (n - 1)
+            x, y, w = x[:, None], y[:, None], w[:, None]
+            zero = 0 * t
+            vx = np.concatenate([x + w * t, x + w + zero, x + w - w * t, x + zero], axis=1)
+            vy = np.concatenate([y + zero, y - w * t, y - w + zero, y - w + w * t], axis=1)
+        m = vx.shape[1]
+        order = (start[:, None] * (m // 4) + np.arange(m)) % m
+        vx = np.take_along_axis(vx, order, axis=1)
+        vy = np.take_along_axis(vy, order, axis=1)
+
+        # Project to the ellipsoid.
+        lon, lat = self._inverse_rhealpix(vx, vy, polar=(region != 0)[:, None])
+        result = np.stack([lon, lat], axis=-1)
+        if closed:
+            result = np.concatenate([result, result[:, :1]], axis=1)
+        return result
+
+    def _inverse_rhealpix(self, x, y, polar=None):
+        # Vectorized self.rhealpix(x, y, inverse=True) for arrays.
+        ellipsoid = self.ellipsoid
+        R_A = auth_rad(ellipsoid.a, ellipsoid.e)
+        lam, phi = pjr.rhealpix_ellipsoid_inverse_array(
+            x / R_A, y / R_A, e=ellipsoid.e,
+            north_square=self.north_square, south_square=self.south_square, polar=polar,
+        )
+        if not ellipsoid.radians:
+            lam, phi = np.rad2deg(lam), np.rad2deg(phi)
+        lam = wrap_longitude_array(lam + ellipsoid.lon_0, radians=ellipsoid.radians)
+        phi = wrap_latitude_array(phi + ellipsoid.lat_0, radians=ellipsoid.radians)
+        return lam, phi
+
     def cell_from_region(self, ul, dr, plane=True):
         """
         Return the smallest planar or ellipsoidal cell wholly containing
@@ -20,7 +20,7 @@ By 'ellipsoid' below, I mean an oblate ellipsoid of revolution.
 # *****************************************************************************
 
 # Import third-party modules.
-from numpy import pi, floor, sqrt, sin, arcsin, sign, array, deg2rad, rad2deg
+from numpy import pi, floor, sqrt, sin, arcsin, sign, array, deg2rad, rad2deg, abs, where, minimum, clip, asarray
 from typing import Callable
 
 # Import my modules.
@@ -155,6 +155,55 @@ def healpix_ellipsoid_inverse(x: float, y: float, e: float = 0) -> tuple[float,
     return lam, phi
 
 
+def healpix_sphere_array(lam, phi):
+    """
+    Vectorized healpix_sphere() for NumPy arrays of longitudes `lam` and
+    latitudes `phi` (radians). Returns the arrays (x, y).
+    """
+    lam, phi = asarray(lam, dtype=float), asarray(phi, dtype=float)
+    phi0 = arcsin(2.0 / 3)
+    equatorial = abs(phi) <= phi0
+    sigma = sqrt(3 * (1 - abs(sin(phi))))
+    cap_number = minimum(floor(2 * lam / pi + 2), 3)
+    lamc = -3 * pi / 4 + (pi / 2) * cap_number
+    x = where(equatorial, lam, lamc + (lam - lamc) * sigma)
+    y = where(equatorial, 3 * pi / 8 * sin(phi), sign(phi) * pi / 4 * (2 - sigma))
+    return x, y
+
+
+def healpix_sphere_inverse_array(x, y):
+    """
+    Vectorized healpix_sphere_inverse() for NumPy arrays of points (x, y)
+    assumed to lie in the HEALPix image. Returns the arrays (lam, phi).
+    """
+    x, y = asarray(x, dtype=float), asarray(y, dtype=float)
+    equatorial = abs(y) <= pi / 4
+    polar = ~equatorial & (abs(y) < pi / 2)
+    cap_number = minimum(floor(2 * x / pi + 2), 3)
+    xc = -3 * pi / 4 + (pi / 2) * cap_number
+    tau = where(polar, 2 - 4 * abs(y) / pi, 1)
+    lam = where(equatorial, x, where(polar, clip(xc + (x - xc) / tau, -pi, pi), -pi))
+    phi = where(
+        equatorial,
+        arcsin(clip(8 * y / (3 * pi), -1, 1)),
+        where(polar, sign(y) * arcsin(1 - tau**2 / 3), sign(y) * pi / 2),
+    )
+    return lam, phi
+
+
+def healpix_ellipsoid_array(lam, phi, e: float = 0):
+    """Vectorized healpix_ellipsoid() for NumPy arrays (radians)."""
+    beta = auth_lat(asarray(phi, dtype=float), e, radians=True)
+    return healpix_sphere_array(lam, beta)
+
+
+def healpix_ellipsoid_inverse_array(x, y, e: float = 0):
+    """Vectorized healpix_ellipsoid_inverse() for NumPy arrays in the HEALPix image."""
+    lam, beta = healpix_sphere_inverse_array(x, y)
+    phi = auth_lat(beta, e, radians=True, inverse=True)
+    return lam, phi
+
+
 def in_healpix_image(x: float, y: float) -> bool:
     """
     Return True if and only if `(x, y)` lies in the image of the HEALPix
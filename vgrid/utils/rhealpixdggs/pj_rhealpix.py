@@ -18,7 +18,7 @@ By 'ellipsoid' below, I mean an oblate ellipsoid of revolution.
 # *****************************************************************************
 
 # Import third-party modules.
-from numpy import pi, sign, array, identity, dot, deg2rad, rad2deg
+from numpy import pi, sign, array, identity, dot, deg2rad, rad2deg, asarray, where, select
 from typing import Callable
 
 # Import my modules.
@@ -27,6 +27,8 @@ from vgrid.utils.rhealpixdggs.pj_healpix import (
     healpix_sphere_inverse,
     healpix_ellipsoid,
     healpix_ellipsoid_inverse,
+    healpix_ellipsoid_array,
+    healpix_ellipsoid_inverse_array,
 )
 from vgrid.utils.rhealpixdggs.utils import my_round, auth_rad
 
@@ -411,6 +413,102 @@ def rhealpix_ellipsoid_inverse(
     return healpix_ellipsoid_inverse(x, y, e=e)
 
 
+def triangle_array(x, y, north_square: int = 0, south_square: int = 0, inverse: bool = False):
+    """
+    Vectorized triangle() for NumPy arrays of points (x, y).
+    Returns the arrays (triangle_number, region) where region is
+    1 (north_polar), -1 (south_polar) or 0 (equatorial) and the triangle number
+    is -1 in the equatorial region.
+    """
+    x, y = asarray(x, dtype=float), asarray(y, dtype=float)
+    region = select([y > pi / 4, y < -pi / 4], [1, -1], 0)
+    if not inverse:
+        triangle_number = select([x < -pi / 2, x < 0, x < pi / 2], [0, 1, 2], 3)
+    else:
+        eps = 1e-15  # Fuzz to avoid some rounding errors.
+        # North polar triangles.
+        L1 = x - (-3 * pi / 4 + (north_square - 1) * pi / 2)
+        L2 = -x + (-3 * pi / 4 + (north_square + 1) * pi / 2)
+        north = select(
+            [
+                (y < L1 - eps) & (y >= L2 - eps),
+                (y >= L1 - eps) & (y > L2 + eps),
+                (y > L1 + eps) & (y <= L2 + eps),
+            ],
+            [(north_square + 1) % 4, (north_square + 2) % 4, (north_square + 3) % 4],
+            north_square,
+        )
+        # South polar triangles.
+        L1 = x - (-3 * pi / 4 + (south_square + 1) * pi / 2)
+        L2 = -x + (-3 * pi / 4 + (south_square - 1) * pi / 2)
+        south = select(
+            [
+                (y <= L1 + eps) & (y > L2 + eps),
+                (y < L1 - eps) & (y <= L2 + eps),
+                (y >= L1 - eps) & (y < L2 - eps),
+            ],
+            [(south_square + 1) % 4, (south_square + 2) % 4, (south_square + 3) % 4],
+            south_square,
+        )
+        triangle_number = where(region == 1, north, south)
+    return where(region == 0, -1, triangle_number), region
+
+
+def combine_triangles_array(
+    x, y, north_square: int = 0, south_square: int = 0, inverse: bool = False, polar=None
+):
+    """
+    Vectorized combine_triangles() for NumPy arrays of points (x, y).
+    Points where the boolean array `polar` is False are treated as
+    equatorial (like region='equatorial' in the scalar functions).
+    """
+    north_square = north_square % 4
+    south_square = south_square % 4
+    x, y = asarray(x, dtype=float), asarray(y, dtype=float)
+    c, region = triangle_array(
+        x, y, north_square=north_square, south_square=south_square, inverse=inverse
+    )
+    if polar is not None:
+        region = where(polar, region, 0)
+    tcx = -3 * pi / 4 + c * pi / 2
+    tcy = sign(y) * pi / 2
+    ux = where(region == 1, -3 * pi / 4 + north_square * pi / 2, -3 * pi / 4 + south_square * pi / 2)
+    uy = where(region == 1, pi / 2, -pi / 2)
+    # Number of quarter turns of the rotation (see ROTATE).
+    turns = where(region == 1, c - north_square, -(c - south_square))
+    if not inverse:
+        dx, dy = x - tcx, y - tcy
+        ox, oy = ux, uy
+    else:
+        turns = -turns
+        dx, dy = x - ux, y - uy
+        ox, oy = tcx, tcy
+    turns = turns % 4
+    rx = select([turns == 0, turns == 1, turns == 2], [dx, -dy, -dx], dy)
+    ry = select([turns == 0, turns == 1, turns == 2], [dy, dx, -dy], -dx)
+    polar_points = region != 0
+    return where(polar_points, rx + ox, x), where(polar_points, ry + oy, y)
+
+
+def rhealpix_ellipsoid_array(lam, phi, e: float = 0, north_square: int = 0, south_square: int = 0):
+    """Vectorized rhealpix_ellipsoid() for NumPy arrays (radians)."""
+    x, y = healpix_ellipsoid_array(lam, phi, e)
+    return combine_triangles_array(x, y, north_square=north_square, south_square=south_square)
+
+
+def rhealpix_ellipsoid_inverse_array(
+    x, y, e: float = 0, north_square: int = 0, south_square: int = 0, polar=None
+):
+    """
+    Vectorized rhealpix_ellipsoid_inverse() for NumPy arrays of points in the
+    rHEALPix image. `polar` is as in combine_triangles_array().
+    """
+    x, y = combine_triangles_array(
+        x, y, north_square=north_square, south_square=south_square, inverse=True, polar=polar
+    )
+    return healpix_ellipsoid_inverse_array(x, y, e=e)
+
+
 def in_rhealpix_image(
     x: float, y: float, north_square: int = 0, south_square: int = 0
 ) -> bool:
@@ -1,16 +1,25 @@
 from typing import Literal
 from warnings import warn
 
+import numpy as np
+import shapely
+
 # Pre-defined DGGS using WGS84 ellipsoid and n == 3 for cell side subpartitioning
 from vgrid.utils.rhealpixdggs.dggs import WGS84_003
 
 from vgrid.utils.rhealpixdggs.cell import Cell, CELLS0
+from vgrid.utils.prefixcompact import compact_prefix_ids
 
 # ======== Messages and constants ======== #
 
 
 CELL_RING_WARNING = "WARNING: Implementation of cell rings is incomplete. Requesting a {0} ring that involves more than two resolution 0 cube faces will return unexpected results."
 
+# Points per cell edge when testing coarse cells against a geometry in polyfill/linetrace,
+# and the margin around those cells relative to their size
+COVER_EDGE_POINTS = 9
+COVER_MARGIN = 0.02
+
 
 # ======== Main API ======== #
 
@@ -392,17 +401,103 @@ def k_ring(rhpindex: str, k: int = 1, verbose: bool = True) -> list[str]:
 #    pass
 
 
-def polyfill(geometry, resolution: int) -> list[str]:
-    raise NotImplementedError()
+def rhp_to_polygons(rhpindexes: list[str], rdggs=WGS84_003) -> tuple:
+    """
+    Turn an array of rHEALPix cell addresses into shapely polygons of their corner
+    coordinates (in degrees, rounded to 14 decimals), shifting cells that cross the
+    antimeridian to negative longitudes.
+
+    Returns the polygons and the number of edges of the cells (3 for darts, 4 otherwise).
+    """
+    vertices = np.round(rdggs.boundaries(rhpindexes), 14)
+    lons = vertices[..., 0]
+    crossing = (lons < -128).any(axis=1)[:, None]
+    vertices[..., 0] = np.where(crossing & (lons > 0), lons - 360, lons)
+    num_edges = np.where(rdggs.ellipsoidal_shapes(rhpindexes) == "dart", 3, 4)
+    return shapely.polygons(vertices), num_edges
+
+
+def polyfill(
+    geometry, resolution: int, compact: bool = False, rdggs=WGS84_003
+) -> list[str]:
+    """
+    Cover a shapely geometry (in degrees) with the cells at the requested resolution
+    whose polygons (see rhp_to_polygons) intersect it.
 
+    The cells are found top-down from the resolution 0 cells: cells well inside the
+    geometry are kept with all their subcells without computing any polygons, and only
+    cells on the geometry boundary are subdivided. If compact is True, complete sets of
+    sibling cells are returned as their parent cell.
+    """
+    return _cover(geometry, resolution, rdggs, compact)
 
-def linetrace(geometry, resolution: int) -> list[str]:
-    raise NotImplementedError()
+
+def linetrace(geometry, resolution: int, rdggs=WGS84_003) -> list[str]:
+    """
+    Cover a shapely (multi)line string (in degrees) with the cells at the requested
+    resolution whose polygons intersect it, subdividing only the cells along the line.
+    """
+    return _cover(geometry, resolution, rdggs, False)
 
 
 # ======== Helper functions ======== #
 
 
+def _cover(geometry, resolution: int, rdggs, compact: bool) -> list[str]:
+    shapely.prepare(geometry)
+    _, min_lat, _, max_lat = geometry.bounds
+    digits = np.array([str(d) for d in range(rdggs.N_side**2)])
+    cells = np.array(CELLS0)
+    covered = []
+
+    for level in range(resolution):
+        if len(cells) == 0:
+            break
+
+        # Densified cell boundaries, grown by a margin so that the polygons of all
+        # subcells fit inside them
+        rings = rdggs.boundaries(cells, closed=True, n=COVER_EDGE_POINTS)
+        lons, lats = rings[..., 0], rings[..., 1]
+        size = np.maximum(np.ptp(lons, axis=1), np.ptp(lats, axis=1))
+        margin = COVER_MARGIN * size
+        near = np.zeros(len(cells), dtype=bool)
+        inside = np.zeros(len(cells), dtype=bool)
+
+        # Cells around a pole or on the antimeridian aren't simple polygons in
+        # longitude-latitude, so only check their latitude range
+        caps = rdggs.ellipsoidal_shapes(cells) == "cap"
+        wrapped = caps | (np.ptp(lons, axis=1) > 180) | np.isclose(np.abs(lons), 180).any(axis=1)
+        north = np.char.startswith(cells, "N")
+        lat_low = np.where(caps & ~north, -90, lats.min(axis=1)) - margin
+        lat_high = np.where(caps & north, 90, lats.max(axis=1)) + margin
+        near[wrapped] = ((lat_low <= max_lat) & (lat_high >= min_lat))[wrapped]
+
+        grown = shapely.buffer(shapely.polygons(rings[~wrapped]), margin[~wrapped], quad_segs=2)
+        near[~wrapped] = shapely.intersects(geometry, grown)
+        inside[~wrapped] = shapely.contains(geometry, grown)
+
+        if inside.any():
+            if compact:
+                covered.append(cells[inside])
+            else:
+                suffixes = np.array([""])
+                for _ in range(resolution - level):
+                    suffixes = np.char.add(suffixes[:, None], digits).ravel()
+                covered.append(np.char.add(cells[inside][:, None], suffixes).ravel())
+        boundary = cells[near & ~inside]
+        cells = np.char.add(boundary[:, None], digits).ravel()
+
+    # Test the cells at the requested resolution against the geometry itself
+    if len(cells):
+        polygons, _ = rhp_to_polygons(cells, rdggs)
+        covered.append(cells[shapely.intersects(geometry, polygons)])
+
+    covered = np.concatenate(covered) if covered else np.array([], dtype=str)
+    if compact:
+        covered = compact_prefix_ids(covered, rdggs.N_side**2)
+    return covered.tolist()
+
+
 def _neighbor_direction(cell: Cell, neighbor: Cell) -> str:
     n_dict = cell.neighbors()
     for dir in n_dict:
@@ -17,7 +17,9 @@ unless indicated otherwise.
 # *****************************************************************************
 
 # Import standard modules.
-from math import asin, copysign, log, pi, sin, sqrt
+from math import asin, copysign, log, pi, sqrt
+import numpy as np
+from numpy import sin  # Elementwise, so the power series below also accept arrays
 from typing import Any
 
 
@@ -113,6 +115,35 @@ def wrap_latitude(phi: float, radians: bool = False) -> float:
     return result
 
 
+def wrap_longitude_array(lam, radians: bool = False):
+    """
+    Vectorized wrap_longitude() for NumPy arrays.
+
+    EXAMPLES::
+
+        >>> print(wrap_longitude_array([-190, 0, 180]).tolist())
+        [170.0, 0.0, -180.0]
+    """
+    half_range = pi if radians else 180
+    lam = np.asarray(lam, dtype=float)
+    wrapped = lam % (2 * half_range)
+    wrapped = np.where(wrapped >= half_range, wrapped - 2 * half_range, wrapped)
+    return np.where((lam < -half_range) | (lam >= half_range), wrapped, lam)
+
+
+def wrap_latitude_array(phi, radians: bool = False):
+    """
+    Vectorized wrap_latitude() for NumPy arrays.
+
+    EXAMPLES::
+
+        >>> print(wrap_latitude_array([100, -45, 270]).tolist())
+        [-80.0, -45.0, -90.0]
+    """
+    half_range = pi if radians else 180
+    phi = wrap_longitude_array(phi, radians=radians)
+    return np.where(np.abs(phi) <= half_range / 2, phi, phi - np.copysign(half_range, phi))
+
 def auth_lat(
     phi: float, e: float, inverse: bool = False, radians: bool = False
 ) -> float:
@@ -11,6 +11,8 @@ import functools
 import heapq
 import math
 
+import numpy as np
+
 
 @functools.total_ordering
 class Angle(object):
@@ -3079,4 +3081,211 @@ class RegionCoverer(object):
 
     @classmethod
     def get_simple_covering(cls, region, start, level):
-        return cls.flood_fill(region, CellId.from_point(start).parent(level))
\ No newline at end of file
+        return cls.flood_fill(region, CellId.from_point(start).parent(level))
+
+
+################
+# NumPy arrays
+################
+
+# Array versions of the CellId conversions (quadratic projection), with cell ids as uint64.
+# Each step mirrors the scalar code above, so both give the same cell ids and vertices.
+_LOOKUP_POS = np.array(LOOKUP_POS, dtype=np.int64)
+_LOOKUP_IJ = np.array(LOOKUP_IJ, dtype=np.int64)
+_HEX_DIGITS = np.array(list('0123456789abcdef'))
+_HEX_VALUES = np.full(128, -1, dtype=np.int64)
+_HEX_VALUES[np.frombuffer(b'0123456789abcdef', dtype=np.uint8)] = np.arange(16)
+_HEX_VALUES[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+_HEX_VALUES[0] = 0
+
+# math.atan2 rounds differently from NumPy, so use it to match LatLng.from_point exactly
+_atan2 = np.frompyfunc(math.atan2, 2, 1)
+
+
+def _st_to_uv(s):
+    return np.where(s >= 0.5, (1.0 / 3.0) * (4 * s * s - 1),
+                    (1.0 / 3.0) * (1 - 4 * (1 - s) * (1 - s)))
+
+
+def _uv_to_st(u):
+    root = np.sqrt(1 + 3 * np.abs(u))
+    return np.where(u >= 0, 0.5 * root, 1 - 0.5 * root)
+
+
+def _st_to_ij(s):
+    return np.clip(np.floor(CellId.MAX_SIZE * s), 0, CellId.MAX_SIZE - 1).astype(np.int64)
+
+
+def _xyz_to_face_uv(x, y, z):
+    ax, ay, az = np.abs(x), np.abs(y), np.abs(z)
+    face = np.where(ax > ay, np.where(ax > az, 0, 2), np.where(ay > az, 1, 2))
+    face = face + 3 * (np.choose(face, (x, y, z)) < 0)
+    axis = np.choose(face % 3, (x, y, z))
+    u = np.choose(face, (y, -x, -x, z, z, -y)) / axis
+    v = np.choose(face, (z, z, -y, y, -x, -x)) / axis
+    return face, u, v
+
+
+def _face_uv_to_xyz(face, u, v):
+    x = np.choose(face, (1, -u, -u, -1, v, v))
+    y = np.choose(face, (u, 1, -v, -v, -1, u))
+    z = np.choose(face, (v, v, 1, -u, -u, -1))
+    return x, y, z
+
+
+def _face_ij_to_cell_ids(face, i, j):
+    n = face.astype(np.int64) << (CellId.POS_BITS - 1)
+    bits = face & SWAP_MASK
+    mask = (1 << LOOKUP_BITS) - 1
+    for k in range(7, -1, -1):
+        bits = bits + (((i >> (k * LOOKUP_BITS)) & mask) << (LOOKUP_BITS + 2))
+        bits = bits + (((j >> (k * LOOKUP_BITS)) & mask) << 2)
+        bits = _LOOKUP_POS[bits]
+        n |= (bits >> 2) << (k * 2 * LOOKUP_BITS)
+        bits &= (SWAP_MASK | INVERT_MASK)
+    return (n.astype(np.uint64) << np.uint64(1)) | np.uint64(1)
+
+
+def _cell_ids_to_face_ij(cell_ids):
+    face = (cell_ids >> np.uint64(CellId.POS_BITS)).astype(np.int64)
+    bits = face & SWAP_MASK
+    i = np.zeros(len(cell_ids), dtype=np.int64)
+    j = np.zeros(len(cell_ids), dtype=np.int64)
+    for k in range(7, -1, -1):
+        nbits = CellId.MAX_LEVEL - 7 * LOOKUP_BITS if k == 7 else LOOKUP_BITS
+        digits = (cell_ids >> np.uint64(k * 2 * LOOKUP_BITS + 1)) & np.uint64((1 << (2 * nbits)) - 1)
+        bits = _LOOKUP_IJ[bits + (digits.astype(np.int64) << 2)]
+        i += (bits >> (LOOKUP_BITS + 2)) << (k * LOOKUP_BITS)
+        j += ((bits >> 2) & ((1 << LOOKUP_BITS) - 1)) << (k * LOOKUP_BITS)
+        bits &= (SWAP_MASK | INVERT_MASK)
+    return face, i, j
+
+
+def is_valid_cell_ids(cell_ids):
+    """Boolean mask of the valid cell ids in an array, like CellId.is_valid."""
+    cell_ids = np.asarray(cell_ids, dtype=np.uint64)
+    lsb = cell_ids & (~cell_ids + np.uint64(1))
+    return ((cell_ids >> np.uint64(CellId.POS_BITS)) < CellId.NUM_FACES) & \
+        ((lsb & np.uint64(0x1555555555555555)) != 0)
+
+
+def cell_levels(cell_ids):
+    """Levels of an array of cell ids."""
+    cell_ids = np.asarray(cell_ids, dtype=np.uint64)
+    lsb = cell_ids & (~cell_ids + np.uint64(1))
+    return CellId.MAX_LEVEL - np.log2(lsb.astype(np.float64)).astype(np.int64) // 2
+
+
+def cell_id_parents(cell_ids, level):
+    """Parents at the given level of an array of cell ids (of that level or finer)."""
+    cell_ids = np.asarray(cell_ids, dtype=np.uint64)
+    lsb = CellId.lsb_for_level(level)
+    return (cell_ids & np.uint64(~(lsb - 1) & 0xffffffffffffffff)) | np.uint64(lsb)
+
+
+def cell_ids_from_latlng(lat, lng, level=CellId.MAX_LEVEL):
+    """Cell ids (uint64) at the given level of arrays of latitudes and longitudes in degrees.
+
+    Same as CellId.from_lat_lng(LatLng.from_degrees(lat, lng)).parent(level) for each point.
+    """
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+    theta = np.radians(np.asarray(lng, dtype=np.float64))
+    cosphi = np.cos(phi)
+    face, u, v = _xyz_to_face_uv(np.cos(theta) * cosphi, np.sin(theta) * cosphi, np.sin(phi))
+    cell_ids = _face_ij_to_cell_ids(face, _st_to_ij(_uv_to_st(u)), _st_to_ij(_uv_to_st(v)))
+    return cell_id_parents(cell_ids, level)
+
+
+def cell_id_children(cell_ids, level):
+    """Sorted descendants at the given level of an array of cell ids (of that level or coarser)."""
+    cell_ids = np.asarray(cell_ids, dtype=np.uint64)
+    levels = cell_levels(cell_ids)
+    lsb = np.uint64(CellId.lsb_for_level(level))
+    children = [cell_ids[:0]]
+    for cell_level in np.unique(levels).tolist():
+        begin = cell_ids[levels == cell_level] - np.uint64(CellId.lsb_for_level(cell_level)) + lsb
+        steps = np.arange(4 ** (level - cell_level), dtype=np.uint64) * (lsb << np.uint64(1))
+        children.append((begin[:, None] + steps).ravel())
+    return np.sort(np.concatenate(children))
+
+
+def compact_cell_ids(cell_ids):
+    """Sorted cell ids without duplicates or cells inside other cells, with complete sets of
+    4 siblings replaced by their parent, finest level first; the cells of CellUnion.normalize.
+    """
+    cell_ids = np.asarray(cell_ids, dtype=np.uint64)
+    # Cells cover the leaf ranges [id - (lsb - 1), id + (lsb - 1)], which are nested or disjoint:
+    # sorted by range start (larger ranges first), a cell is covered if an earlier range reaches its end
+    lsb = cell_ids & (~cell_ids + np.uint64(1))
+    range_min, range_max = cell_ids - (lsb - np.uint64(1)), cell_ids + (lsb - np.uint64(1))
+    order = np.lexsort((~range_max, range_min))
+    cell_ids, range_max = cell_ids[order], range_max[order]
+    covered = np.zeros(len(cell_ids), dtype=bool)
+    covered[1:] = range_max[1:] <= np.maximum.accumulate(range_max)[:-1]
+    cell_ids = cell_ids[~covered]
+
+    levels = cell_levels(cell_ids)
+    compacted = [cell_ids[levels == 0]]
+    merged = cell_ids[:0]  # Parents made at the previous (finer) level
+    for level in range(int(levels.max(initial=0)), 0, -1):
+        level_ids = np.sort(np.concatenate([cell_ids[levels == level], merged]))
+        # Sorted disjoint cells keep siblings together
+        parents = cell_id_parents(level_ids, level - 1)
+        starts = np.flatnonzero(np.concatenate([[True], parents[1:] != parents[:-1]]))
+        counts = np.diff(np.append(starts, len(parents)))
+        complete = counts == 4
+        compacted.append(level_ids[~np.repeat(complete, counts)])
+        merged = parents[starts[complete]]
+    compacted.append(merged)
+    return np.sort(np.concatenate(compacted))
+
+
+def cell_vertices(cell_ids, n=1):
+    """(N, 4 * n, 2) array of the (lng, lat) vertices in degrees of cell ids, in Cell.get_vertex order.
+
+    With n > 1, each edge is sampled at n points (from its first vertex), along the great circle.
+    """
+    cell_ids = np.asarray(cell_ids, dtype=np.uint64)
+    face, i, j = _cell_ids_to_face_ij(cell_ids)
+    size = np.left_shift(1, CellId.MAX_LEVEL - cell_levels(cell_ids))
+    scale = 1.0 / CellId.MAX_SIZE
+    u = _st_to_uv(scale * np.stack([i & -size, (i & -size) + size], axis=1))
+    v = _st_to_uv(scale * np.stack([j & -size, (j & -size) + size], axis=1))
+    # Vertex k has u bound (k >> 1) ^ (k & 1) and v bound k >> 1: SW, SE, NE, NW
+    u, v = u[:, [0, 1, 1, 0]], v[:, [0, 0, 1, 1]]
+    if n > 1:
+        # Cell edges are straight lines in (u, v)
+        t = np.arange(n) / n
+        u = (u[:, :, None] + (np.roll(u, -1, axis=1) - u)[:, :, None] * t).reshape(len(u), -1)
+        v = (v[:, :, None] + (np.roll(v, -1, axis=1) - v)[:, :, None] * t).reshape(len(v), -1)
+    x, y, z = _face_uv_to_xyz(face[:, None], u, v)
+    norm = 1.0 / np.sqrt(x * x + y * y + z * z)
+    x, y, z = x * norm, y * norm, z * norm
+    lat = _atan2(z, np.sqrt(x * x + y * y)).astype(np.float64)
+    lng = _atan2(y, x).astype(np.float64)
+    return np.stack([np.degrees(lng), np.degrees(lat)], axis=-1)
+
+
+def cell_ids_to_tokens(cell_ids):
+    """Tokens of an array of cell ids, like CellId.to_token."""
+    cell_ids = np.asarray(cell_ids, dtype=np.uint64)
+    shifts = np.arange(60, -4, -4, dtype=np.uint64)
+    nibbles = (cell_ids[:, None] >> shifts) & np.uint64(0xf)
+    hex_ids = _HEX_DIGITS[nibbles.astype(np.intp)].view('<U16').ravel()
+    return np.char.rstrip(hex_ids, '0')
+
+
+def cell_ids_from_tokens(tokens):
+    """Cell ids (uint64) of an array of tokens, like CellId.from_token."""
+    tokens = np.asarray(tokens, dtype=str)
+    if np.any(np.char.str_len(tokens) > 16):
+        raise ValueError('S2 tokens have at most 16 hex digits')
+    # Shorter tokens are padded with NUL characters, which count as trailing zeros
+    codes = tokens.astype('<U16').view(np.uint32).reshape(-1, 16)
+    nibbles = _HEX_VALUES[np.minimum(codes, 127)]
+    if np.any(nibbles < 0):
+        raise ValueError('S2 tokens must be hex strings')
+    cell_ids = np.zeros(len(codes), dtype=np.uint64)
+    for column in nibbles.T.astype(np.uint64):
+        cell_ids = (cell_ids << np.uint64(4)) | column
+    return cell_ids
@@ -4,6 +4,7 @@
 
 from vgrid.utils import mercantile
 import math
+import numpy as np
 from shapely.geometry import Polygon
 from shapely.ops import transform
 import pyproj
@@ -130,6 +131,13 @@ def tilecode2zxy(tilecode_id):
         # Raise an error if the format does not match
         raise ValueError("Invalid format. Expected format: 'zXxYyZ'")
 
+# Tiles only cover the Web Mercator latitudes; mercantile.tile() would put points beyond them in the edge rows
+max_latitude = 85.0511287798066
+
+def check_latitude(lat):
+    if not -max_latitude <= lat <= max_latitude:
+        raise mercantile.InvalidLatitudeError(f"Latitude {lat} is outside the tile range [-{max_latitude}, {max_latitude}]")
+
 def latlon2tilecode(lat, lon, zoom):
     """
     Converts latitude, longitude, and zoom level to a tilecode_id with format 'zXxYyZ'.
@@ -143,6 +151,7 @@ def latlon2tilecode(lat, lon, zoom):
         str: A string representing the tile code in the format 'zXxYyZ'.
     """
     # Get the tile coordinates (x, y) for the given lat, lon, and zoom level
+    check_latitude(lat)
     tile = mercantile.tile(lon, lat, zoom)
     
     # Format the tile coordinates into the tilecode_id string
@@ -151,10 +160,60 @@ def latlon2tilecode(lat, lon, zoom):
     return tilecode_id
 
 def latlon2quadkey(lat, lon, zoom):   
+    check_latitude(lat)
     tile = mercantile.tile(lon, lat, zoom)
     quadkey = mercantile.quadkey(tile)   
     return quadkey
 
+def latlon2tile_array(lats, lons, zoom):
+    """
+    Vectorized mercantile.tile() for arrays of latitudes and longitudes.
+
+    Returns:
+        tuple: Arrays of tile x and y indices at the given zoom level, -1 for latitudes
+        outside the tile range (where the scalar encoders raise).
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    x = np.asarray(lons, dtype=np.float64) / 360.0 + 0.5
+    sinlat = np.sin(np.radians(lats))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = 0.5 - 0.25 * np.log((1.0 + sinlat) / (1.0 - sinlat)) / math.pi
+
+    Z2 = math.pow(2, zoom)
+    # Same clamping and EPSILON nudge as mercantile.tile()
+    xtile = np.where(x <= 0, 0, np.where(x >= 1, Z2 - 1, np.floor((x + mercantile.EPSILON) * Z2)))
+    ytile = np.where(y <= 0, 0, np.where(y >= 1, Z2 - 1, np.floor((y + mercantile.EPSILON) * Z2)))
+    outside = ~((lats >= -max_latitude) & (lats <= max_latitude))
+    return np.where(outside, -1, xtile).astype(np.int64), np.where(outside, -1, ytile).astype(np.int64)
+
+def tile_ids_outside(cell_ids, xtile):
+    """Cell id array with None for the points outside the tile range (object dtype if there are any)."""
+    outside = xtile < 0
+    if outside.any():
+        cell_ids = cell_ids.astype(object)
+        cell_ids[outside] = None
+    return cell_ids
+
+def latlon2tilecode_array(lats, lons, zoom):
+    """
+    Vectorized latlon2tilecode(): returns an array of tilecode_ids with format 'zXxYyZ'.
+    """
+    xtile, ytile = latlon2tile_array(lats, lons, zoom)
+    return tile_ids_outside(np.char.add(np.char.add(f"z{zoom}x", xtile.astype(str)), np.char.add("y", ytile.astype(str))), xtile)
+
+def latlon2quadkey_array(lats, lons, zoom):
+    """
+    Vectorized latlon2quadkey(): returns an array of quadkeys.
+    """
+    xtile, ytile = latlon2tile_array(lats, lons, zoom)
+    if zoom == 0:
+        return tile_ids_outside(np.full(xtile.shape, '', dtype='<U1'), xtile)
+    digits = np.empty(xtile.shape + (zoom,), dtype=np.uint8)
+    for i, z in enumerate(range(zoom, 0, -1)):
+        mask = 1 << (z - 1)
+        digits[..., i] = ord('0') + ((xtile & mask) != 0) + 2 * ((ytile & mask) != 0)
+    return tile_ids_outside(digits.view(f'S{zoom}').reshape(xtile.shape).astype(str), xtile)
+
 
 def quadkey2latlon(quadkey_id):   
     tile = mercantile.quadkey_to_tile(quadkey_id)    
@@ -0,0 +1,157 @@
+"""
+Streaming writers for DGGS feature outputs.
+
+Features are consumed one at a time from any iterable (typically a generator such as
+h3grid.iter_grid), so outputs of any size are written with constant memory.
+GeoParquet output needs the optional pyarrow package (pip install vgrid[parquet]).
+"""
+import json
+import shapely
+from shapely.geometry import shape
+from vgrid.generator.settings import chunked
+
+output_formats = ['geojson', 'geojsonseq', 'geoparquet']
+output_extensions = {
+    'geojson': 'geojson',
+    'geojsonseq': 'geojsonl',
+    'geoparquet': 'parquet',
+}
+
+def write_geojson(features, output_path):
+    """
+    Write features as a GeoJSON FeatureCollection, one feature at a time.
+
+    Returns:
+        int: Number of features written.
+    """
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for feature in features:
+            if count:
+                f.write(',\n')
+            f.write(json.dumps(feature))
+            count += 1
+        f.write('\n]}\n')
+    return count
+
+def write_geojsonseq(features, output_path):
+    """
+    Write features as newline-delimited GeoJSON (GeoJSONSeq / NDJSON), one feature per line.
+
+    Returns:
+        int: Number of features written.
+    """
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for feature in features:
+            f.write(json.dumps(feature))
+            f.write('\n')
+            count += 1
+    return count
+
+def geoparquet_metadata(geometry_column='geometry'):
+    """GeoParquet 1.0 file metadata for a WKB geometry column in OGC:CRS84 (the default CRS)."""
+    return {
+        "version": "1.0.0",
+        "primary_column": geometry_column,
+        "columns": {
+            geometry_column: {
+                "encoding": "WKB",
+                "geometry_types": [],
+            }
+        },
+    }
+
+def properties_table(pa, properties):
+    """
+    Arrow table of property dicts with one column per key found in any of them (in first-seen order),
+    typed from all their values, so ints and floats mixed in a column become doubles.
+    """
+    keys = list(dict.fromkeys(key for row in properties for key in row))
+    return pa.table({key: [row.get(key) for row in properties] for key in keys})
+
+def conform_columns(pa, table, schema):
+    """Columns of a properties table cast to the file schema, raising if it has new columns or wider types."""
+    unified = pa.unify_schemas([schema, table.schema], promote_options='permissive')
+    if not unified.equals(schema):
+        raise ValueError(f"Feature properties do not match the GeoParquet schema:\n{table.schema}\n"
+                         f"Expected (a subset of):\n{schema}\nPass the full schema with `schema=`.")
+    return [table.column(field.name).cast(field.type) if field.name in table.column_names
+            else pa.nulls(table.num_rows, field.type) for field in schema]
+
+def write_geoparquet(features, output_path, chunk_size=None, schema=None):
+    """
+    Write features as GeoParquet: a WKB `geometry` column plus one typed column per property.
+
+    Features are buffered chunk_size at a time and each chunk is flushed as one row group.
+    The property columns are `schema` (a pyarrow schema) if given. Otherwise they are inferred
+    from the keys and values of all features when `features` is a list, or of the first chunk
+    for other iterables. A chunk with a property missing from the columns, or a value that doesn't
+    fit its column type (e.g. a float in an int column), raises ValueError instead of being cast.
+
+    Returns:
+        int: Number of features written.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("GeoParquet output requires pyarrow. Install it with: pip install pyarrow")
+
+    if schema is None and isinstance(features, (list, tuple)) and features:
+        schema = pa.unify_schemas([properties_table(pa, [feature.get("properties") or {} for feature in chunk]).schema
+                                   for chunk in chunked(features, chunk_size)], promote_options='permissive')
+
+    count = 0
+    writer = None
+    try:
+        for chunk in chunked(features, chunk_size):
+            geometries = [shape(feature["geometry"]) if feature.get("geometry") else None for feature in chunk]
+            table = properties_table(pa, [feature.get("properties") or {} for feature in chunk])
+
+            if writer is None:
+                schema = schema if schema is not None else table.schema
+                file_schema = schema.append(pa.field("geometry", pa.binary()))
+                file_schema = file_schema.with_metadata({b"geo": json.dumps(geoparquet_metadata()).encode('utf-8')})
+                writer = pq.ParquetWriter(output_path, file_schema)
+
+            if table.num_columns:
+                columns = conform_columns(pa, table, schema)
+            else:
+                columns = [pa.nulls(len(chunk), field.type) for field in schema]
+            columns.append(pa.array(shapely.to_wkb(geometries), type=pa.binary()))
+            table = pa.Table.from_arrays(columns, schema=writer.schema)
+            writer.write_table(table, row_group_size=len(chunk))
+            count += len(chunk)
+
+        if writer is None:
+            # No features: write an empty file that still carries the geometry column
+            file_schema = pa.schema([pa.field("geometry", pa.binary())],
+                                    metadata={b"geo": json.dumps(geoparquet_metadata()).encode('utf-8')})
+            writer = pq.ParquetWriter(output_path, file_schema)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+def write_features(features, output_path, format='geojson', schema=None):
+    """
+    Stream features to `output_path` in one of `output_formats`.
+    `schema` optionally declares the GeoParquet property columns (see write_geoparquet).
+
+    Returns:
+        int: Number of features written.
+    """
+    format = format.lower()
+    if format == 'geojson':
+        return write_geojson(features, output_path)
+    elif format == 'geojsonseq':
+        return write_geojsonseq(features, output_path)
+    elif format == 'geoparquet':
+        return write_geoparquet(features, output_path, schema=schema)
+    raise ValueError(f"Unsupported output format: {format}. Choose from {output_formats}")
+
+def get_output_path(base_name, format='geojson'):
+    """Output file name for `base_name` with the extension matching `format`."""
+    return f"{base_name}.{output_extensions[format.lower()]}"